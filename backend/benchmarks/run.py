@@ -0,0 +1,523 @@
+"""
+Micro-benchmarks for the hot paths.
+
+Cases:
+- validate_odds_response on small/large synthetic slates (benchmarks.slate)
+- columnar market store load + validate with 1, 3 and 4 markets (the
+  time per row should stay flat as markets are added)
+- odds query index build, and one filtered page answered from it
+- line history: recording an unchanged board (the steady state) and one
+  event's history after 50 refreshes
+- line-move detection on an unchanged board and on one where every 20th
+  line moved
+- consensus update on a board where every 20th line moved
+- alert evaluation of the same board against 20,000 rules
+- calculate_straight_bet_ev
+- parlay EV: every round robin of 12 legs (exact), and a correlated
+  6-leg parlay (simulated, 200,000 samples)
+- EVResult serialization (jsonable_encoder, what FastAPI does per response)
+- get_sports_by_category
+- route handlers end to end through the ASGI app (TestClient), with the
+  Odds API call answered from a synthetic slate
+
+Each case reports ops/sec (median of several timed repeats, loop count
+auto-calibrated) plus tracemalloc peak and retained memory for one call.
+
+Run from backend/:
+    python -m benchmarks.run                     # full run, compare to baseline if present
+    python -m benchmarks.run --quick             # fewer/shorter repeats
+    python -m benchmarks.run -k validate         # only cases whose name contains "validate"
+    python -m benchmarks.run --save-baseline     # record this machine's baseline
+    python -m benchmarks.run -o results.json     # also write the results
+
+Baselines are machine-specific, so benchmarks/baseline.json is not committed;
+record one on your machine before starting a change, then re-run after.
+The exit status is 1 when any case is slower than the baseline by more than
+--tolerance (default 20%).
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ODDS_API_KEY", "benchmark")
+
+from benchmarks.slate import generate_slate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Fail when ops/sec drops more than this fraction below baseline
+DEFAULT_TOLERANCE = 0.20
+
+# (events, books) per slate size
+SCALES = {
+    "small": (20, 6),
+    "large": (300, 14),
+}
+
+# name → setup function returning the zero-argument callable to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+# --- Cases ---
+
+def _validate_case(scale: str):
+    from services.validated_odds import validate_odds_response
+
+    events, books = SCALES[scale]
+    slate = generate_slate(events=events, books=books, seed=1)
+    meta = {"x-requests-remaining": "450", "x-requests-used": "50"}
+
+    def run():
+        return validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta=meta)
+    return run
+
+
+@case("validate_odds_response[small]")
+def _validate_small():
+    return _validate_case("small")
+
+
+@case("validate_odds_response[large]")
+def _validate_large():
+    return _validate_case("large")
+
+
+@case("validate_odds_response[large,3way]")
+def _validate_three_way():
+    from services.validated_odds import validate_odds_response
+
+    events, books = SCALES["large"]
+    slate = generate_slate(events=events, books=books, outcomes=3, sport_key="soccer_epl", seed=2)
+
+    def run():
+        return validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta={})
+    return run
+
+
+def _market_store_case(markets):
+    from services.market_store import MarketSnapshot, validate_markets
+    from services.validated_odds import SUPPORTED_SPORTSBOOKS
+
+    events, books = SCALES["large"]
+    slate = generate_slate(events=events, books=books, seed=1, markets=markets)
+
+    def run():
+        raw = MarketSnapshot.from_odds(slate, "basketball_nba", datetime.utcnow())
+        return validate_markets(raw, markets, SUPPORTED_SPORTSBOOKS)
+    return run
+
+
+@case("market_store[large,h2h]")
+def _market_store_h2h():
+    return _market_store_case(("h2h",))
+
+
+@case("market_store[large,h2h+spreads+totals]")
+def _market_store_featured():
+    return _market_store_case(("h2h", "spreads", "totals"))
+
+
+@case("market_store[large,featured+player_points]")
+def _market_store_props():
+    return _market_store_case(("h2h", "spreads", "totals", "player_points"))
+
+
+def _odds_body(scale: str) -> dict:
+    from services.validated_odds import odds_response_body, validate_odds_response
+
+    events, books = SCALES[scale]
+    slate = generate_slate(events=events, books=books, seed=1, stale_fraction=0)
+    return odds_response_body(validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta={}))
+
+
+@case("odds_query:index[large]")
+def _odds_index():
+    from services.odds_query import OddsIndex
+
+    body = _odds_body("large")
+    return lambda: OddsIndex(body)
+
+
+@case("odds_query:team+books+page[large]")
+def _odds_query():
+    from services.odds_query import OddsIndex, parse_query
+
+    index = OddsIndex(_odds_body("large"))
+    query = parse_query(books="draftkings,fanduel", team="lakers", limit=20)
+    return lambda: index.answer(query)
+
+
+def _line_history(scale: str):
+    import tempfile
+    from services.line_history import LineHistory, ticks_from_body
+
+    history = LineHistory(tempfile.mkdtemp(prefix="ironman-bench-"))
+    ticks = list(ticks_from_body(_odds_body(scale)))
+    history.record("basketball_nba", ticks)
+    return history, ticks
+
+
+@case("line_history:record unchanged[large]")
+def _line_history_record():
+    history, ticks = _line_history("large")
+    return lambda: history.record("basketball_nba", ticks)
+
+
+@case("line_history:event history[large]")
+def _line_history_query():
+    history, ticks = _line_history("large")
+    for refresh in range(1, 50):  # every 20th line moves on each refresh
+        history.record("basketball_nba", [
+            tick._replace(price=tick.price + refresh / 100, timestamp=tick.timestamp + refresh)
+            for tick in ticks[refresh % 20::20]
+        ])
+    event_id = ticks[0].event_id
+    return lambda: history.history("basketball_nba", event_id)
+
+
+def _line_moves(moved_every: int):
+    from services.line_history import ticks_from_body
+    from services.line_moves import LineMoveDetector
+
+    ticks = list(ticks_from_body(_odds_body("large")))
+    detector = LineMoveDetector()
+    detector.observe("basketball_nba", ticks)
+    if moved_every == 0:
+        return lambda: detector.observe("basketball_nba", ticks)
+    boards = [ticks, [t._replace(price=t.price + 0.1) if i % moved_every == 0 else t for i, t in enumerate(ticks)]]
+    state = {"n": 0}
+
+    def observe():
+        state["n"] += 1
+        return detector.observe("basketball_nba", boards[state["n"] % 2])
+    return observe
+
+
+@case("line_moves:observe unchanged[large]")
+def _line_moves_unchanged():
+    return _line_moves(0)
+
+
+@case("line_moves:observe 5% moved[large]")
+def _line_moves_moved():
+    return _line_moves(20)
+
+
+@case("consensus:update 5% moved[large]")
+def _consensus_moved():
+    from services.consensus import ConsensusEngine
+    from services.line_history import ticks_from_body
+
+    ticks = list(ticks_from_body(_odds_body("large")))
+    engine = ConsensusEngine()
+    boards = [ticks, [t._replace(price=t.price + 0.1) if i % 20 == 0 else t for i, t in enumerate(ticks)]]
+    state = {"n": 0}
+
+    def update():
+        state["n"] += 1
+        return engine.update("basketball_nba", boards[state["n"] % 2])
+    return update
+
+
+@case("alerts:observe 20k rules 5% moved[large]")
+def _alerts_moved():
+    from services.alerts import AlertEngine, make_rule
+    from services.consensus import ConsensusEngine
+    from services.line_history import ticks_from_body
+
+    ticks = list(ticks_from_body(_odds_body("large")))
+    books = sorted({t.book for t in ticks})
+    consensus = ConsensusEngine()
+    engine = AlertEngine(consensus)
+    for i in range(20_000):
+        rule = make_rule(f"user{i % 2000}", "basketball_nba", books=[books[i % len(books)]],
+                         min_edge=0.2 + (i % 100) / 1000)
+        engine.add_rule(rule)
+    # Small moves: a few alerts per refresh, the rest of the rules never looked at
+    boards = [ticks, [t._replace(price=t.price + 0.03) if i % 20 == 0 else t for i, t in enumerate(ticks)]]
+    state = {"n": 0}
+
+    def observe():
+        state["n"] += 1
+        board = boards[state["n"] % 2]
+        consensus.update("basketball_nba", board)
+        return engine.observe("basketball_nba", board)
+    return observe
+
+
+def _ev_kwargs():
+    return dict(
+        odds=Decimal("2.05"),
+        true_probability=Decimal("0.52"),
+        cash_stake=Decimal("100"),
+        odds_timestamp=datetime.utcnow() - timedelta(seconds=5),
+        odds_source="the-odds-api-v4",
+        max_odds_age_seconds=3600,
+    )
+
+
+@case("calculate_straight_bet_ev")
+def _ev():
+    from services.ev_calculator import calculate_straight_bet_ev
+
+    kwargs = _ev_kwargs()
+    return lambda: calculate_straight_bet_ev(**kwargs)
+
+
+@case("parlay:round robin 12 legs by 2-12")
+def _parlay_round_robin():
+    from services.parlay_ev import Leg, round_robin
+
+    legs = [Leg(1.9 + 0.05 * i, 0.5 + 0.01 * i) for i in range(12)]
+    return lambda: round_robin(legs, list(range(2, 13)), 10)
+
+
+@case("parlay:correlated 6 legs 200k samples")
+def _parlay_correlated():
+    from services.parlay_ev import Leg, simulate
+
+    legs = [Leg(1.9 + 0.05 * i, 0.5 + 0.01 * i) for i in range(6)]
+    correlation = [[1.0 if i == j else 0.3 for j in range(6)] for i in range(6)]
+    return lambda: simulate(legs, [2, 3, 6], 10, correlation, samples=200_000, seed=1)
+
+
+@case("ev_result_serialize")
+def _ev_serialize():
+    from fastapi.encoders import jsonable_encoder
+    from services.ev_calculator import calculate_straight_bet_ev
+
+    result = calculate_straight_bet_ev(**_ev_kwargs())
+    return lambda: json.dumps(jsonable_encoder(result))
+
+
+@case("get_sports_by_category")
+def _sports():
+    from config.sports import get_sports_by_category
+    return get_sports_by_category
+
+
+def _client():
+    from fastapi.testclient import TestClient
+    from utils.logger import configure_access_log
+    import main
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    configure_access_log(sample_rate=0.0, slow_request_ms=float("inf"))
+    return TestClient(main.app)
+
+
+@case("route:POST /api/ev/calculate")
+def _route_ev():
+    client = _client()
+    body = {
+        "odds": 2.05,
+        "true_probability": 0.52,
+        "cash_stake": 100.0,
+        "odds_timestamp": (datetime.utcnow() - timedelta(seconds=5)).isoformat(),
+        "odds_source": "the-odds-api-v4",
+    }
+    return lambda: client.post("/api/ev/calculate", json=body)
+
+
+@case("route:GET /api/odds/{sport_key}")
+def _route_odds():
+    import services.validated_odds as validated_odds
+    from services import stale_odds
+
+    client = _client()
+    events, books = SCALES["small"]
+    slate = generate_slate(events=events, books=books, seed=3)
+    response = {
+        "data": slate,
+        "meta": {"x-requests-remaining": "450", "x-requests-used": "50"},
+        "retrieved_at": datetime.utcnow().isoformat() + "Z",
+    }
+    # Answer the upstream call from the synthetic slate (no network)
+    validated_odds.get_odds = lambda sport_key: response
+
+    def uncached():
+        # Drop the in-process snapshot so every call pays fetch + validate + encode
+        stale_odds.clear()
+        return client.get("/api/odds/basketball_nba")
+    return uncached
+
+
+@case("route:GET /api/odds/{sport_key} 304")
+def _route_odds_not_modified():
+    import services.validated_odds as validated_odds
+    from services import stale_odds
+
+    client = _client()
+    events, books = SCALES["small"]
+    response = {
+        "data": generate_slate(events=events, books=books, seed=3),
+        "meta": {"x-requests-remaining": "450", "x-requests-used": "50"},
+        "retrieved_at": datetime.utcnow().isoformat() + "Z",
+    }
+    validated_odds.get_odds = lambda sport_key: response
+    stale_odds.clear()
+    etag = client.get("/api/odds/basketball_nba").headers["etag"]
+    return lambda: client.get("/api/odds/basketball_nba", headers={"If-None-Match": etag})
+
+
+@case("route:GET /api/odds/sports/available")
+def _route_sports():
+    client = _client()
+    return lambda: client.get("/api/odds/sports/available")
+
+
+# --- Measurement ---
+
+def measure(fn: Callable[[], object], min_time: float, repeats: int) -> dict:
+    fn()  # warm up (imports, caches)
+
+    loops = 1
+    while True:
+        elapsed = _time_loops(fn, loops)
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    times = [_time_loops(fn, loops) for _ in range(repeats)]
+    per_op = [t / loops for t in times]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    del kept
+
+    median = statistics.median(per_op)
+    return {
+        "ops_per_sec": round(1 / median, 2),
+        "median_us": round(median * 1e6, 3),
+        "best_us": round(min(per_op) * 1e6, 3),
+        "loops": loops,
+        "repeats": repeats,
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1),
+    }
+
+
+def _time_loops(fn, loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def run_cases(names: List[str], quick: bool = False) -> Dict[str, dict]:
+    min_time, repeats = (0.05, 3) if quick else (0.2, 7)
+    results = {}
+    for name in names:
+        results[name] = measure(CASES[name](), min_time, repeats)
+        r = results[name]
+        print(f"{name:45s} {r['ops_per_sec']:>12,.1f} ops/s  {r['median_us']:>12,.1f} µs  "
+              f"peak {r['peak_kib']:>9,.1f} KiB")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[Tuple[str, float]]:
+    """[(case, current/baseline ops ratio)] for every case slower than tolerance allows."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("ops_per_sec"):
+            continue
+        ratio = current["ops_per_sec"] / base["ops_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Shorter, noisier run")
+    parser.add_argument("-o", "--output", help="Write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed ops/sec drop vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    if not names:
+        print(f"No benchmark matches {args.filter!r}", file=sys.stderr)
+        return 2
+
+    results = run_cases(names, quick=args.quick)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} (run with --save-baseline first)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+
+    print(f"\nvs baseline ({args.baseline}):")
+    for name, current in results.items():
+        if name in baseline and baseline[name].get("ops_per_sec"):
+            ratio = current["ops_per_sec"] / baseline[name]["ops_per_sec"]
+            print(f"  {name:45s} {ratio:6.2f}x")
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} case(s) more than {args.tolerance:.0%} slower than baseline:")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:.2f}x")
+        return 1
+    print("\nOK: no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
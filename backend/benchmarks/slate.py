@@ -0,0 +1,183 @@
+"""
+Synthetic slate generator.
+
+Builds Odds API /odds payloads (the exact JSON shape get_odds returns in
+"data") at any scale, deterministically from a seed, so benchmark runs are
+comparable across commits.
+
+Knobs:
+- events × books × outcomes (2 = moneyline, 3 = three-way with Draw)
+- markets: "h2h" plus any of "spreads", "totals" and "player_*" props
+  (PROP_PLAYERS players per event, Over/Under each)
+- stale_fraction: share of bookmakers whose last_update is older than the
+  60 s freshness limit
+- malformed_fraction: share of events/bookmakers/outcomes carrying one of
+  the defects validate_odds_response filters out
+
+Usage:
+    from benchmarks.slate import generate_slate
+    data = generate_slate(events=200, books=10, seed=7)
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+# Real Odds API bookmaker keys; the first few are in SUPPORTED_SPORTSBOOKS,
+# the tail is not (exercises the unsupported-book filter)
+BOOKS = [
+    ("draftkings", "DraftKings"),
+    ("fanduel", "FanDuel"),
+    ("betmgm", "BetMGM"),
+    ("williamhill_us", "William Hill"),
+    ("bovada", "Bovada"),
+    ("pointsbetus", "PointsBet"),
+    ("betrivers", "BetRivers"),
+    ("unibet", "Unibet"),
+    ("betonlineag", "BetOnline.ag"),
+    ("mybookieag", "MyBookie.ag"),
+    ("pinnacle", "Pinnacle"),
+    ("betfair_ex_eu", "Betfair"),
+    ("williamhill", "William Hill (UK)"),
+    ("sport888", "888sport"),
+]
+
+TEAMS = [
+    "Hawks", "Celtics", "Nets", "Hornets", "Bulls", "Cavaliers", "Mavericks",
+    "Nuggets", "Pistons", "Warriors", "Rockets", "Pacers", "Clippers", "Lakers",
+    "Grizzlies", "Heat", "Bucks", "Timberwolves", "Pelicans", "Knicks",
+    "Thunder", "Magic", "76ers", "Suns", "Trail Blazers", "Kings", "Spurs",
+    "Raptors", "Jazz", "Wizards",
+]
+
+EVENT_DEFECTS = ("missing_id", "missing_team", "bad_commence_time")
+BOOK_DEFECTS = ("missing_title", "bad_last_update")
+OUTCOME_DEFECTS = ("missing_price", "price_at_one", "price_not_number")
+
+# Players per event for player_* prop markets
+PROP_PLAYERS = 6
+
+
+def _iso(dt: datetime) -> str:
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+def _prices(rng: random.Random, outcomes: int, margin: float) -> List[float]:
+    """Decimal prices for a fair split of probability plus the book margin."""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(outcomes)]
+    total = sum(weights)
+    return [round(1 / ((w / total) * (1 + margin)), 2) for w in weights]
+
+
+def generate_slate(
+    events: int = 50,
+    books: int = 8,
+    outcomes: int = 2,
+    stale_fraction: float = 0.1,
+    malformed_fraction: float = 0.02,
+    seed: int = 42,
+    sport_key: str = "basketball_nba",
+    now: Optional[datetime] = None,
+    markets: Sequence[str] = ("h2h",)
+) -> List[dict]:
+    """Odds API events list (see module docstring for the knobs)."""
+    if outcomes not in (2, 3):
+        raise ValueError("outcomes must be 2 (moneyline) or 3 (three-way)")
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    book_pool = (BOOKS * (books // len(BOOKS) + 1))[:books]
+
+    slate = []
+    for i in range(events):
+        home, away = rng.sample(TEAMS, 2)
+        event = {
+            "id": f"{seed:x}{i:06x}{rng.getrandbits(32):08x}",
+            "sport_key": sport_key,
+            "sport_title": sport_key.split("_")[-1].upper(),
+            "commence_time": _iso(now + timedelta(minutes=rng.randint(10, 60 * 72))),
+            "home_team": home,
+            "away_team": away,
+            "bookmakers": [],
+        }
+        names = [home, away] + (["Draw"] if outcomes == 3 else [])
+
+        for key, title in book_pool:
+            stale = rng.random() < stale_fraction
+            age = rng.randint(61, 900) if stale else rng.randint(0, 45)
+            margin = rng.uniform(0.02, 0.07)
+            book = {
+                "key": key,
+                "title": title,
+                "last_update": _iso(now - timedelta(seconds=age)),
+                "markets": [
+                    {"key": market, "last_update": _iso(now - timedelta(seconds=age)),
+                     "outcomes": _market_outcomes(rng, market, names, home, away, margin)}
+                    for market in markets
+                ],
+            }
+            if rng.random() < malformed_fraction:
+                _break_book(rng, book)
+            for market in book["markets"]:
+                for outcome in market["outcomes"]:
+                    if rng.random() < malformed_fraction:
+                        _break_outcome(rng, outcome)
+            event["bookmakers"].append(book)
+
+        if rng.random() < malformed_fraction:
+            _break_event(rng, event)
+        slate.append(event)
+    return slate
+
+
+def _market_outcomes(rng: random.Random, market: str, names: List[str], home: str, away: str,
+                     margin: float) -> List[dict]:
+    if market == "h2h":
+        return [{"name": n, "price": p} for n, p in zip(names, _prices(rng, len(names), margin))]
+    if market == "spreads":
+        line = rng.randint(1, 12) + 0.5
+        prices = _prices(rng, 2, margin)
+        return [{"name": home, "price": prices[0], "point": -line},
+                {"name": away, "price": prices[1], "point": line}]
+    if market == "totals":
+        total = rng.randint(200, 240) + 0.5
+        prices = _prices(rng, 2, margin)
+        return [{"name": "Over", "price": prices[0], "point": total},
+                {"name": "Under", "price": prices[1], "point": total}]
+    if market.startswith("player_"):
+        outcomes = []
+        for n in range(PROP_PLAYERS):
+            player = f"{(home, away)[n % 2]} Player {n // 2 + 1}"
+            line = rng.randint(5, 30) + 0.5
+            prices = _prices(rng, 2, margin)
+            outcomes += [{"name": "Over", "description": player, "price": prices[0], "point": line},
+                         {"name": "Under", "description": player, "price": prices[1], "point": line}]
+        return outcomes
+    raise ValueError(f"Unsupported market for the slate generator: {market}")
+
+
+def _break_event(rng: random.Random, event: dict):
+    defect = rng.choice(EVENT_DEFECTS)
+    if defect == "missing_id":
+        event.pop("id")
+    elif defect == "missing_team":
+        event["home_team"] = None
+    else:
+        event["commence_time"] = "not-a-date"
+
+
+def _break_book(rng: random.Random, book: dict):
+    defect = rng.choice(BOOK_DEFECTS)
+    if defect == "missing_title":
+        book.pop("title")
+    else:
+        book["last_update"] = "yesterday"
+
+
+def _break_outcome(rng: random.Random, outcome: dict):
+    defect = rng.choice(OUTCOME_DEFECTS)
+    if defect == "missing_price":
+        outcome.pop("price")
+    elif defect == "price_at_one":
+        outcome["price"] = 1.0
+    else:
+        outcome["price"] = "N/A"
@@ -1,11 +1,50 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    ODDS_API_KEY: str
+    ODDS_API_KEY: str = ""  # empty: app still starts, odds endpoints return 503
+    ODDS_API_BASE: str = "https://api.the-odds-api.com/v4"  # point at a fake upstream for load tests
     MONGO_URI: str = "mongodb://localhost:27017"
+    STORAGE_BACKEND: str = "mongo"  # "mongo" or "sqlite"
+    SQLITE_PATH: str = "ironman.db"
     PORT: int = 8000
     CORS_ORIGIN: str = "*"
     LOG_LEVEL: str = "info"
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # fraction of fast 2xx/3xx requests logged
+    SLOW_REQUEST_MS: float = 1000.0  # always log requests slower than this
+    SPORTS_CATALOG_REFRESH_SECONDS: float = 600.0  # active-sport refresh from /sports (free against quota); 0 = static list
+    ODDS_SNAPSHOT_DIR: str = ""  # set (e.g. /dev/shm/ironman-odds) to share odds across uvicorn workers
+    ODDS_SNAPSHOT_INTERVAL: float = 20.0  # seconds an odds snapshot is reused (in-process or shared) before refreshing
+    LINE_HISTORY_DIR: str = ""  # set to record every price change (append-only, see services.line_history)
+    LINE_HISTORY_RETENTION_DAYS: float = 30.0  # older history segments are deleted
+    LINE_MOVES_ENABLED: bool = False  # line-move/steam detection on every odds refresh (see services.line_moves)
+    LINE_MOVE_THRESHOLDS: Dict[str, Dict[str, float]] = {}  # JSON, {"default"|sport: {move, steam_move, steam_books, window_seconds}}
+    CONSENSUS_ENABLED: bool = False  # weighted no-vig consensus per outcome (see services.consensus)
+    CONSENSUS_BOOK_WEIGHTS: Dict[str, float] = {}  # JSON, book key → sharpness weight (0 excludes the book)
+    CONSENSUS_DEFAULT_WEIGHT: float = 1.0  # weight of books not listed
+    CONSENSUS_HALF_LIFE_SECONDS: float = 0.0  # recency decay of a book's quote by its last_update (0 = none)
+    CONSENSUS_MIN_BOOKS: int = 3  # books that must quote an outcome before EV uses its consensus
+    CONSENSUS_MAX_AGE_SECONDS: float = 120.0  # EV refuses a consensus not refreshed for this long
+    ALERTS_ENABLED: bool = False  # EV alert rules on every odds refresh, needs CONSENSUS_ENABLED (see services.alerts)
+    ALERT_RULES_FILE: str = ""  # JSON file shared by all workers (empty: rules in memory, lost on restart)
+    ALERT_WEBHOOK_URL: str = ""  # alerts are also POSTed here, e.g. a local notifier (empty disables)
+    RATE_LIMIT_ENABLED: bool = False  # per-client token buckets + concurrency caps on /api/odds, /api/ev, /api/bets
+    RATE_LIMIT_ODDS_PER_MINUTE: float = 30.0
+    RATE_LIMIT_ODDS_BURST: int = 10
+    RATE_LIMIT_EV_PER_MINUTE: float = 120.0
+    RATE_LIMIT_EV_BURST: int = 30
+    RATE_LIMIT_BETS_PER_MINUTE: float = 60.0
+    RATE_LIMIT_BETS_BURST: int = 20
+    MAX_CONCURRENT_REQUESTS: int = 64  # in-flight limited requests per worker; 0 = no cap
+    MAX_CONCURRENT_ODDS_REQUESTS: int = 16  # odds requests hold a thread for the upstream call
+    RATE_LIMIT_PROXY_HOPS: int = 0  # trusted proxies in front (Render: 1); client IP read from X-Forwarded-For
+    CLOSING_LINE_CAPTURE_ENABLED: bool = False  # run the closing-line scheduler in the API process
+    PROFILING_ENABLED: bool = False  # installs the profiling middleware and /api/admin/profiles
+    PROFILE_ADMIN_TOKEN: str = ""  # X-Profile / X-Admin-Token value; empty disables both
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests profiled without the header
+    PROFILE_DIR: str = "profiles"
+    PROFILE_KEEP: int = 50  # newest profiles kept on disk
 
     class Config:
         env_file = ".env"
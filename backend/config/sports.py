@@ -105,10 +105,10 @@ SUPPORTED_SPORTS = {
 }
 
 
-def get_sports_by_category():
-    """Group sports by category for UI display"""
+def get_sports_by_category(sports=None):
+    """Group sports (default: all supported) by category for UI display"""
     categories = {}
-    for key, sport in SUPPORTED_SPORTS.items():
+    for key, sport in (SUPPORTED_SPORTS if sports is None else sports).items():
         category = sport["category"]
         if category not in categories:
             categories[category] = []
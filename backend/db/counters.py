@@ -0,0 +1,74 @@
+"""
+Idempotent counter updates for summary/rollup documents.
+
+Each update $inc's a set of counters on one document (upserting it) and, when
+an op id is given, pushes the op id into the document's "ops" ledger in the
+same atomic update. The filter excludes documents that already hold the op
+id, so a replay either matches nothing or collides with the unique key index
+(DuplicateKeyError) - in both cases nothing is counted twice.
+
+Collections used this way need a unique index on the key fields.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+# How many recent op ids each document remembers for idempotent replays
+RECENT_OPS_KEPT = 1000
+
+DUPLICATE_KEY = 11000
+
+
+def _counter_update(key: dict, increment: dict, op_id: Optional[str]) -> Tuple[dict, dict]:
+    query = dict(key)
+    update = {
+        "$inc": increment,
+        "$set": {"updatedAt": datetime.utcnow()},
+    }
+    if op_id:
+        query["ops"] = {"$ne": op_id}
+        update["$push"] = {"ops": {"$each": [op_id], "$slice": -RECENT_OPS_KEPT}}
+    return query, update
+
+
+def increment_counters(collection, key: dict, increment: dict, op_id: Optional[str] = None) -> bool:
+    """
+    Apply increments to one document.
+
+    Returns True if applied, False if empty or the op id was already applied.
+    """
+    if not increment:
+        return False
+    query, update = _counter_update(key, increment, op_id)
+    try:
+        collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def increment_counters_many(collection, updates: Iterable[Tuple[dict, dict]], op_id: Optional[str] = None) -> int:
+    """
+    Apply (key, increment) pairs in one unordered bulk_write.
+
+    Returns how many documents were incremented; already-applied op ids are
+    skipped silently.
+    """
+    requests = [
+        UpdateOne(*_counter_update(key, inc, op_id), upsert=True)
+        for key, inc in updates if inc
+    ]
+    if not requests:
+        return 0
+    try:
+        result = collection.bulk_write(requests, ordered=False)
+        return result.modified_count + result.upserted_count
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nModified", 0) + e.details.get("nUpserted", 0)
@@ -1,8 +1,42 @@
-from pymongo import MongoClient
+import threading
+
 from config.settings import settings
 
-client = MongoClient(settings.MONGO_URI)
-db = client["ironman"]
+# Created on first use: importing this module must not touch the network,
+# and most deployments never use Mongo (bet routes disabled / SQLite backend)
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from pymongo import MongoClient
+                _client = MongoClient(settings.MONGO_URI, connect=False)
+    return _client
+
+
+def get_db():
+    return get_client()["ironman"]
+
+
+def close_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
 
 def get_bets_collection():
-    return db["bets"]
+    return get_db()["bets"]
+
+def get_summaries_collection():
+    return get_db()["bet_summaries"]
+
+def get_closing_snapshots_collection():
+    return get_db()["closing_snapshots"]
+
+def get_rollups_collection(period: str):
+    return get_db()[f"rollups_{period}"]
@@ -0,0 +1,199 @@
+"""
+MongoDB implementation of BetRepository.
+
+Collections:
+    bets                                    bet documents
+    bet_summaries                           one counter document per user
+    rollups_day / rollups_week / rollups_month
+    closing_snapshots                       one document per event
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from db.counters import increment_counters, increment_counters_many
+from db.mongo import (
+    get_bets_collection,
+    get_closing_snapshots_collection,
+    get_rollups_collection,
+    get_summaries_collection,
+)
+from db.repository import BetRepository
+
+
+ROLLUP_PERIODS = ("day", "week", "month")
+
+
+class MongoRepository(BetRepository):
+
+    def __init__(self):
+        self._indexes_ready = False
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        bets = get_bets_collection()
+        bets.create_index("id", unique=True)
+        bets.create_index("user")
+        bets.create_index([("event_id", 1), ("result", 1)])
+        bets.create_index([("closing_odds", 1), ("commence_time", 1)])
+        bets.create_index("rollup_pending", sparse=True)
+        # Unique keys turn replayed op-id upserts into DuplicateKeyError (see db/counters)
+        get_summaries_collection().create_index("user", unique=True)
+        for period in ROLLUP_PERIODS:
+            get_rollups_collection(period).create_index(
+                [("user", 1), ("dim", 1), ("key", 1), ("period_start", 1)],
+                unique=True
+            )
+        get_closing_snapshots_collection().create_index("event_id", unique=True)
+        self._indexes_ready = True
+
+    def _bets(self):
+        self._ensure_indexes()
+        return get_bets_collection()
+
+    # --- Bets ---
+
+    def insert_bet(self, bet: dict) -> None:
+        # insert_one adds _id to the dict it is given
+        self._bets().insert_one(dict(bet))
+
+    def get_bet(self, bet_id: str) -> Optional[dict]:
+        return self._bets().find_one({"id": bet_id}, {"_id": 0})
+
+    def find_bets(self, user: str) -> List[dict]:
+        return list(self._bets().find({"user": user}, {"_id": 0}))
+
+    def bet_users(self) -> List[str]:
+        return self._bets().distinct("user")
+
+    def update_bet(self, bet_id: str, changes: dict) -> Optional[dict]:
+        return self._bets().find_one_and_update(
+            {"id": bet_id},
+            {"$set": changes},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    def update_bets(self, updates: List[Tuple[str, dict]], only_if_unset: Optional[str] = None) -> int:
+        if not updates:
+            return 0
+        requests = []
+        for bet_id, changes in updates:
+            query = {"id": bet_id}
+            if only_if_unset:
+                query[only_if_unset] = None
+            requests.append(UpdateOne(query, {"$set": changes}))
+        return self._bets().bulk_write(requests, ordered=False).modified_count
+
+    def find_pending_closing_events(self, start: datetime, end: datetime) -> List[dict]:
+        pipeline = [
+            {"$match": {
+                "closing_odds": None,
+                "event_id": {"$ne": None},
+                "commence_time": {"$gte": start, "$lte": end}
+            }},
+            {"$group": {
+                "_id": {"sport": "$sport", "event_id": "$event_id"},
+                "commence_time": {"$min": "$commence_time"}
+            }}
+        ]
+        return [
+            {"sport": row["_id"]["sport"], "event_id": row["_id"]["event_id"], "commence_time": row["commence_time"]}
+            for row in self._bets().aggregate(pipeline)
+        ]
+
+    def find_bets_missing_closing(self, event_id: str) -> List[dict]:
+        return list(self._bets().find({"event_id": event_id, "closing_odds": None}, {"_id": 0}))
+
+    def find_open_bets(self, event_ids: List[str]) -> List[dict]:
+        return list(self._bets().find({"event_id": {"$in": event_ids}, "result": None}, {"_id": 0}))
+
+    def find_rollup_pending(self, limit: int) -> List[dict]:
+        return list(self._bets().find({"rollup_pending": True}, {"_id": 0}).limit(limit))
+
+    # --- Summaries ---
+
+    def increment_summary(self, user: str, increment: Dict[str, float], op_id: Optional[str] = None) -> bool:
+        self._ensure_indexes()
+        return increment_counters(get_summaries_collection(), {"user": user}, increment, op_id)
+
+    def get_summary(self, user: str) -> dict:
+        self._ensure_indexes()
+        return get_summaries_collection().find_one({"user": user}, {"_id": 0, "user": 0, "ops": 0}) or {}
+
+    def set_summary(self, user: str, summary: dict) -> None:
+        # $set keeps the op-id ledger so replays of applied ops stay no-ops
+        self._ensure_indexes()
+        get_summaries_collection().update_one(
+            {"user": user},
+            {"$set": {**summary, "updatedAt": datetime.utcnow()}},
+            upsert=True
+        )
+
+    # --- Rollups ---
+
+    def increment_rollups(
+        self,
+        period: str,
+        updates: Iterable[Tuple[dict, Dict[str, float]]],
+        op_id: Optional[str] = None
+    ) -> int:
+        self._ensure_indexes()
+        nested = [(key, {f"counters.{k}": v for k, v in inc.items()}) for key, inc in updates]
+        return increment_counters_many(get_rollups_collection(period), nested, op_id)
+
+    def find_rollups(
+        self,
+        period: str,
+        user: str,
+        dim: str,
+        key: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[dict]:
+        self._ensure_indexes()
+        query = {"user": user, "dim": dim, "key": key}
+        if start or end:
+            query["period_start"] = {}
+            if start:
+                query["period_start"]["$gte"] = start
+            if end:
+                query["period_start"]["$lte"] = end
+        cursor = get_rollups_collection(period).find(
+            query, {"_id": 0, "period_start": 1, "counters": 1}
+        ).sort("period_start", 1)
+        return list(cursor)
+
+    def set_user_rollups(self, period: str, user: str, buckets: Dict[tuple, dict]) -> int:
+        # Counters are overwritten in place so each bucket keeps its op-id ledger
+        self._ensure_indexes()
+        collection = get_rollups_collection(period)
+        requests = [
+            UpdateOne(
+                {"user": user, "dim": dim, "key": key, "period_start": start},
+                {"$set": {"counters": counters, "updatedAt": datetime.utcnow()}},
+                upsert=True
+            )
+            for (dim, key, start), counters in buckets.items()
+        ]
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        for doc in collection.find({"user": user}, {"dim": 1, "key": 1, "period_start": 1}):
+            if (doc["dim"], doc["key"], doc["period_start"]) not in buckets:
+                collection.delete_one({"_id": doc["_id"]})
+        return len(requests)
+
+    # --- Closing snapshots ---
+
+    def save_closing_snapshot(self, snapshot: dict) -> None:
+        self._ensure_indexes()
+        get_closing_snapshots_collection().replace_one(
+            {"event_id": snapshot["event_id"]}, snapshot, upsert=True
+        )
+
+    def get_closing_snapshot(self, event_id: str) -> Optional[dict]:
+        self._ensure_indexes()
+        return get_closing_snapshots_collection().find_one({"event_id": event_id}, {"_id": 0})
@@ -0,0 +1,182 @@
+"""
+Storage Repository
+
+The one storage interface the bet, CLV, settlement and rollup services talk
+to. Two implementations:
+
+- MongoRepository  (db/mongo_repository.py) - the default, MONGO_URI
+- SQLiteRepository (db/sqlite.py)           - embedded, single-node / offline
+
+Select with STORAGE_BACKEND=mongo|sqlite (SQLITE_PATH for the database file).
+
+Conventions shared by both implementations:
+- Bets are plain dicts keyed by their "id" (uuid string); datetimes are
+  naive UTC.
+- Counter increments use dotted paths ("totals.bets",
+  "by_sport.basketball_nba.clv_sum"). Path segments never contain dots
+  (see bet_metrics.field_key).
+- Increments that carry an op id are applied at most once per scope.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class StorageError(Exception):
+    """Raised when the storage backend is misconfigured or unavailable"""
+    pass
+
+
+class BetRepository(ABC):
+    """
+    Storage interface for bets, summaries, rollups and closing snapshots.
+
+    Every method is abstract, so a backend missing one fails when it is
+    constructed rather than on the first call.
+    """
+
+    # --- Bets ---
+
+    @abstractmethod
+    def insert_bet(self, bet: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_bet(self, bet_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_bets(self, user: str) -> List[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def bet_users(self) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_bet(self, bet_id: str, changes: dict) -> Optional[dict]:
+        """Apply changes to one bet atomically; returns the bet BEFORE the change."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_bets(self, updates: List[Tuple[str, dict]], only_if_unset: Optional[str] = None) -> int:
+        """
+        Bulk-apply (bet id, changes) pairs.
+
+        only_if_unset: field that must still be None for the update to apply
+        (e.g. "result", so a bet is only settled once). Returns bets updated.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_pending_closing_events(self, start: datetime, end: datetime) -> List[dict]:
+        """[{"sport", "event_id", "commence_time"}] for events with bets missing closing odds."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_bets_missing_closing(self, event_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_open_bets(self, event_ids: List[str]) -> List[dict]:
+        """Unsettled bets on any of the given events."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_rollup_pending(self, limit: int) -> List[dict]:
+        """Settled bets not yet folded into summaries/rollups."""
+        raise NotImplementedError
+
+    # --- Summaries ---
+
+    @abstractmethod
+    def increment_summary(self, user: str, increment: Dict[str, float], op_id: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_summary(self, user: str) -> dict:
+        """{"totals": {...}, "by_sport": {...}, "by_book": {...}, "updatedAt"} ({} if none)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_summary(self, user: str, summary: dict) -> None:
+        raise NotImplementedError
+
+    # --- Rollups ---
+
+    @abstractmethod
+    def increment_rollups(
+        self,
+        period: str,
+        updates: Iterable[Tuple[dict, Dict[str, float]]],
+        op_id: Optional[str] = None
+    ) -> int:
+        """
+        Apply (bucket key, counter increments) pairs for one period.
+
+        Bucket keys are {"user", "dim", "key", "period_start"}; increments are
+        flat counter names. Returns buckets incremented.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_rollups(
+        self,
+        period: str,
+        user: str,
+        dim: str,
+        key: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[dict]:
+        """Buckets as [{"period_start", "counters"}] in period_start order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_user_rollups(self, period: str, user: str, buckets: Dict[tuple, dict]) -> int:
+        """Replace a user's buckets with {(dim, key, period_start): counters}."""
+        raise NotImplementedError
+
+    # --- Closing snapshots ---
+
+    @abstractmethod
+    def save_closing_snapshot(self, snapshot: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_closing_snapshot(self, event_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+
+_repository: Optional[BetRepository] = None
+_lock = threading.Lock()
+
+
+def create_repository(backend: str, **options) -> BetRepository:
+    """Build a repository for a backend name ("mongo" or "sqlite")."""
+    if backend == "mongo":
+        from db.mongo_repository import MongoRepository
+        return MongoRepository()
+    if backend == "sqlite":
+        from db.sqlite import SQLiteRepository
+        return SQLiteRepository(options.get("path", "ironman.db"))
+    raise StorageError(f"Unknown STORAGE_BACKEND '{backend}'. Use 'mongo' or 'sqlite'.")
+
+
+def get_repository() -> BetRepository:
+    """The process-wide repository, created on first use from settings."""
+    global _repository
+    if _repository is None:
+        with _lock:
+            if _repository is None:
+                from config.settings import settings
+                _repository = create_repository(settings.STORAGE_BACKEND, path=settings.SQLITE_PATH)
+    return _repository
+
+
+def set_repository(repository: Optional[BetRepository]) -> None:
+    """Swap the process-wide repository (tests, benchmarks)."""
+    global _repository
+    _repository = repository
@@ -0,0 +1,436 @@
+"""
+Embedded SQLite implementation of BetRepository.
+
+For single-node deployments and offline benchmarking: no external services,
+sub-millisecond local reads and writes.
+
+- WAL journal + synchronous=NORMAL: readers never block the writer and
+  commits do not fsync the main database file.
+- One connection per thread with a large prepared-statement cache; every
+  query is a constant SQL string so it is compiled once per connection.
+- Bets are stored as a JSON document plus the handful of columns we query
+  on, each covered by a (partial) index.
+- Counter increments are UPSERTs inside one transaction; op ids are claimed
+  in applied_ops in the same transaction, so replays are no-ops.
+
+Datetimes are stored as naive-UTC ISO strings, which sort chronologically.
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from db.repository import BetRepository, StorageError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    sport TEXT,
+    event_id TEXT,
+    commence_time TEXT,
+    closing_odds REAL,
+    result TEXT,
+    rollup_pending INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bets_by_user ON bets(user);
+CREATE INDEX IF NOT EXISTS bets_open_by_event ON bets(event_id) WHERE result IS NULL;
+CREATE INDEX IF NOT EXISTS bets_missing_closing ON bets(commence_time)
+    WHERE closing_odds IS NULL AND event_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS bets_rollup_pending ON bets(id) WHERE rollup_pending = 1;
+
+CREATE TABLE IF NOT EXISTS summary_counters (
+    user TEXT NOT NULL,
+    path TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (user, path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS summary_meta (
+    user TEXT PRIMARY KEY,
+    updated_at TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_counters (
+    period TEXT NOT NULL,
+    user TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (period, user, dim, key, period_start, counter)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS applied_ops (
+    scope TEXT NOT NULL,
+    op_id TEXT NOT NULL,
+    PRIMARY KEY (scope, op_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS closing_snapshots (
+    event_id TEXT PRIMARY KEY,
+    sport TEXT,
+    captured_at TEXT,
+    doc TEXT NOT NULL
+);
+"""
+
+# Fields update_bets can guard on (must be real columns)
+GUARD_COLUMNS = ("result", "closing_odds")
+
+INSERT_BET = (
+    "INSERT INTO bets (id, user, sport, event_id, commence_time, closing_odds, result, rollup_pending, doc) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_BET = (
+    "UPDATE bets SET sport = ?, event_id = ?, commence_time = ?, closing_odds = ?, result = ?, "
+    "rollup_pending = ?, doc = ? WHERE id = ?"
+)
+SELECT_BET = "SELECT doc FROM bets WHERE id = ?"
+SELECT_BET_UNSET = {
+    "result": "SELECT doc FROM bets WHERE id = ? AND result IS NULL",
+    "closing_odds": "SELECT doc FROM bets WHERE id = ? AND closing_odds IS NULL",
+}
+SELECT_USER_BETS = "SELECT doc FROM bets WHERE user = ?"
+SELECT_USERS = "SELECT DISTINCT user FROM bets"
+SELECT_PENDING_CLOSING = (
+    "SELECT sport, event_id, MIN(commence_time) FROM bets "
+    "WHERE closing_odds IS NULL AND event_id IS NOT NULL AND commence_time BETWEEN ? AND ? "
+    "GROUP BY sport, event_id"
+)
+SELECT_MISSING_CLOSING = (
+    "SELECT doc FROM bets WHERE event_id = ? AND closing_odds IS NULL AND event_id IS NOT NULL"
+)
+SELECT_OPEN_BETS = (
+    "SELECT doc FROM bets WHERE result IS NULL AND event_id IN (SELECT value FROM json_each(?))"
+)
+SELECT_ROLLUP_PENDING = "SELECT doc FROM bets WHERE rollup_pending = 1 LIMIT ?"
+
+CLAIM_OP = "INSERT OR IGNORE INTO applied_ops (scope, op_id) VALUES (?, ?)"
+
+UPSERT_SUMMARY = (
+    "INSERT INTO summary_counters (user, path, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (user, path) DO UPDATE SET value = value + excluded.value"
+)
+UPSERT_SUMMARY_META = (
+    "INSERT INTO summary_meta (user, updated_at) VALUES (?, ?) "
+    "ON CONFLICT (user) DO UPDATE SET updated_at = excluded.updated_at"
+)
+SELECT_SUMMARY = "SELECT path, value FROM summary_counters WHERE user = ?"
+SELECT_SUMMARY_META = "SELECT updated_at FROM summary_meta WHERE user = ?"
+DELETE_SUMMARY = "DELETE FROM summary_counters WHERE user = ?"
+INSERT_SUMMARY = "INSERT INTO summary_counters (user, path, value) VALUES (?, ?, ?)"
+
+UPSERT_ROLLUP = (
+    "INSERT INTO rollup_counters (period, user, dim, key, period_start, counter, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (period, user, dim, key, period_start, counter) DO UPDATE SET value = value + excluded.value"
+)
+SELECT_ROLLUPS = (
+    "SELECT period_start, counter, value FROM rollup_counters "
+    "WHERE period = ? AND user = ? AND dim = ? AND key = ? AND period_start BETWEEN ? AND ? "
+    "ORDER BY period_start"
+)
+DELETE_USER_ROLLUPS = "DELETE FROM rollup_counters WHERE period = ? AND user = ?"
+INSERT_ROLLUP = (
+    "INSERT INTO rollup_counters (period, user, dim, key, period_start, counter, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+UPSERT_SNAPSHOT = (
+    "INSERT INTO closing_snapshots (event_id, sport, captured_at, doc) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (event_id) DO UPDATE SET sport = excluded.sport, "
+    "captured_at = excluded.captured_at, doc = excluded.doc"
+)
+SELECT_SNAPSHOT = "SELECT doc FROM closing_snapshots WHERE event_id = ?"
+
+MIN_TS = "0000"
+MAX_TS = "9999"
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    """Naive-UTC ISO string (sorts chronologically)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {"$date": _ts(value)}
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite document")
+
+
+def _json_hook(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(doc: dict) -> str:
+    return json.dumps(doc, default=_json_default, separators=(",", ":"))
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_json_hook)
+
+
+def _bet_columns(bet: dict) -> tuple:
+    """Indexed columns mirrored from the bet document."""
+    return (
+        bet.get("sport"),
+        bet.get("event_id"),
+        _ts(bet.get("commence_time")),
+        bet.get("closing_odds"),
+        bet.get("result"),
+        1 if bet.get("rollup_pending") else 0,
+    )
+
+
+def _nest(rows: Iterable[Tuple[str, float]]) -> dict:
+    """Turn dotted-path counters back into nested dicts."""
+    nested: dict = {}
+    for path, value in rows:
+        *parents, leaf = path.split(".")
+        node = nested
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return nested
+
+
+def _flatten(doc: dict, prefix: str = "") -> List[Tuple[str, float]]:
+    rows = []
+    for key, value in doc.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            rows.extend(_flatten(value, f"{path}."))
+        else:
+            rows.append((path, value))
+    return rows
+
+
+class SQLiteRepository(BetRepository):
+
+    def __init__(self, path: str = "ironman.db"):
+        if path == ":memory:":
+            raise StorageError("SQLiteRepository needs a database file (connections are per thread)")
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,  # explicit BEGIN/COMMIT below
+                check_same_thread=False,
+                cached_statements=256
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """Write transaction (BEGIN IMMEDIATE takes the write lock up front)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _docs(self, sql: str, params: tuple) -> List[dict]:
+        return [_loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    # --- Bets ---
+
+    def insert_bet(self, bet: dict) -> None:
+        with self._tx() as conn:
+            conn.execute(INSERT_BET, (bet["id"], bet["user"], *_bet_columns(bet), _dumps(bet)))
+
+    def get_bet(self, bet_id: str) -> Optional[dict]:
+        docs = self._docs(SELECT_BET, (bet_id,))
+        return docs[0] if docs else None
+
+    def find_bets(self, user: str) -> List[dict]:
+        return self._docs(SELECT_USER_BETS, (user,))
+
+    def bet_users(self) -> List[str]:
+        return [row[0] for row in self._connection().execute(SELECT_USERS)]
+
+    def _apply(self, conn, select_sql: str, bet_id: str, changes: dict) -> Optional[dict]:
+        row = conn.execute(select_sql, (bet_id,)).fetchone()
+        if row is None:
+            return None
+        old = _loads(row[0])
+        new = {**old, **changes}
+        conn.execute(UPDATE_BET, (*_bet_columns(new), _dumps(new), bet_id))
+        return old
+
+    def update_bet(self, bet_id: str, changes: dict) -> Optional[dict]:
+        with self._tx() as conn:
+            return self._apply(conn, SELECT_BET, bet_id, changes)
+
+    def update_bets(self, updates: List[Tuple[str, dict]], only_if_unset: Optional[str] = None) -> int:
+        if only_if_unset is None:
+            select_sql = SELECT_BET
+        elif only_if_unset in GUARD_COLUMNS:
+            select_sql = SELECT_BET_UNSET[only_if_unset]
+        else:
+            raise StorageError(f"Cannot guard updates on '{only_if_unset}'")
+
+        updated = 0
+        with self._tx() as conn:
+            for bet_id, changes in updates:
+                if self._apply(conn, select_sql, bet_id, changes) is not None:
+                    updated += 1
+        return updated
+
+    def find_pending_closing_events(self, start: datetime, end: datetime) -> List[dict]:
+        rows = self._connection().execute(SELECT_PENDING_CLOSING, (_ts(start), _ts(end)))
+        return [
+            {"sport": sport, "event_id": event_id, "commence_time": datetime.fromisoformat(commence)}
+            for sport, event_id, commence in rows
+        ]
+
+    def find_bets_missing_closing(self, event_id: str) -> List[dict]:
+        return self._docs(SELECT_MISSING_CLOSING, (event_id,))
+
+    def find_open_bets(self, event_ids: List[str]) -> List[dict]:
+        return self._docs(SELECT_OPEN_BETS, (json.dumps(list(event_ids)),))
+
+    def find_rollup_pending(self, limit: int) -> List[dict]:
+        return self._docs(SELECT_ROLLUP_PENDING, (limit,))
+
+    # --- Summaries ---
+
+    def _claim_op(self, conn, scope: str, op_id: Optional[str]) -> bool:
+        if not op_id:
+            return True
+        return conn.execute(CLAIM_OP, (scope, op_id)).rowcount == 1
+
+    def increment_summary(self, user: str, increment: Dict[str, float], op_id: Optional[str] = None) -> bool:
+        if not increment:
+            return False
+        with self._tx() as conn:
+            if not self._claim_op(conn, f"summary:{user}", op_id):
+                return False
+            conn.executemany(UPSERT_SUMMARY, [(user, path, value) for path, value in increment.items()])
+            conn.execute(UPSERT_SUMMARY_META, (user, _ts(datetime.utcnow())))
+        return True
+
+    def get_summary(self, user: str) -> dict:
+        conn = self._connection()
+        summary = _nest(conn.execute(SELECT_SUMMARY, (user,)))
+        meta = conn.execute(SELECT_SUMMARY_META, (user,)).fetchone()
+        if meta:
+            summary["updatedAt"] = datetime.fromisoformat(meta[0])
+        return summary
+
+    def set_summary(self, user: str, summary: dict) -> None:
+        with self._tx() as conn:
+            conn.execute(DELETE_SUMMARY, (user,))
+            conn.executemany(INSERT_SUMMARY, [(user, path, value) for path, value in _flatten(summary)])
+            conn.execute(UPSERT_SUMMARY_META, (user, _ts(datetime.utcnow())))
+
+    # --- Rollups ---
+
+    def increment_rollups(
+        self,
+        period: str,
+        updates: Iterable[Tuple[dict, Dict[str, float]]],
+        op_id: Optional[str] = None
+    ) -> int:
+        updates = [(key, inc) for key, inc in updates if inc]
+        if not updates:
+            return 0
+
+        # All buckets of one call belong to one bet, so one op claim per
+        # (period, user) covers them - they commit or roll back together.
+        rows = []
+        users = set()
+        for key, inc in updates:
+            users.add(key["user"])
+            start = _ts(key["period_start"])
+            for counter, value in inc.items():
+                rows.append((period, key["user"], key["dim"], key["key"], start, counter, value))
+
+        with self._tx() as conn:
+            for user in users:
+                if not self._claim_op(conn, f"rollups:{period}:{user}", op_id):
+                    return 0
+            conn.executemany(UPSERT_ROLLUP, rows)
+        return len(updates)
+
+    def find_rollups(
+        self,
+        period: str,
+        user: str,
+        dim: str,
+        key: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[dict]:
+        rows = self._connection().execute(
+            SELECT_ROLLUPS,
+            (period, user, dim, key, _ts(start) or MIN_TS, _ts(end) or MAX_TS)
+        )
+        buckets: List[dict] = []
+        for period_start, counter, value in rows:
+            if not buckets or buckets[-1]["_ts"] != period_start:
+                buckets.append({"_ts": period_start, "period_start": datetime.fromisoformat(period_start), "counters": {}})
+            buckets[-1]["counters"][counter] = value
+        for bucket in buckets:
+            del bucket["_ts"]
+        return buckets
+
+    def set_user_rollups(self, period: str, user: str, buckets: Dict[tuple, dict]) -> int:
+        rows = [
+            (period, user, dim, key, _ts(start), counter, value)
+            for (dim, key, start), counters in buckets.items()
+            for counter, value in counters.items()
+        ]
+        with self._tx() as conn:
+            conn.execute(DELETE_USER_ROLLUPS, (period, user))
+            conn.executemany(INSERT_ROLLUP, rows)
+        return len(buckets)
+
+    # --- Closing snapshots ---
+
+    def save_closing_snapshot(self, snapshot: dict) -> None:
+        with self._tx() as conn:
+            conn.execute(UPSERT_SNAPSHOT, (
+                snapshot["event_id"],
+                snapshot.get("sport"),
+                _ts(snapshot.get("captured_at")),
+                _dumps(snapshot)
+            ))
+
+    def get_closing_snapshot(self, event_id: str) -> Optional[dict]:
+        docs = self._docs(SELECT_SNAPSHOT, (event_id,))
+        return docs[0] if docs else None
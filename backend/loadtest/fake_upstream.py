@@ -0,0 +1,170 @@
+"""
+Fake Odds API upstream for load tests.
+
+Serves the v4 endpoints the backend calls, with payloads from the benchmark
+slate generator (fresh timestamps on every call) and a configurable response
+delay and error rate, and counts every call so the load test can report upstream usage.
+
+    GET /v4/sports                     sports list
+    GET /v4/sports/{sport}/odds        odds slate for ?markets= (x-requests-* headers set)
+    GET /v4/sports/{sport}/events/{id}/odds   one event, any markets (props)
+    GET /v4/sports/{sport}/scores      empty scores list
+    GET /__stats                       {"calls": {"odds": n, ...}, "total": n}
+
+With error_rate > 0 that fraction of /v4 calls answers 503 (set it to 1.0 on
+a running server to simulate an outage).
+
+Run standalone:
+    python -m loadtest.fake_upstream --port 9100 --latency-ms 150
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.slate import generate_slate
+from config.sports import SUPPORTED_SPORTS
+
+# Simulated quota the x-requests-remaining header counts down from
+QUOTA = 500_000
+
+
+class FakeOddsAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 150.0, jitter_ms: float = 50.0,
+                 events: int = 15, books: int = 8, seed: int = 42, error_rate: float = 0.0):
+        super().__init__(address, FakeOddsHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.events = events
+        self.books = books
+        self.seed = seed
+        self.error_rate = error_rate
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def count(self, endpoint: str) -> int:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            return sum(self.calls.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = dict(self.calls)
+        return {"calls": calls, "total": sum(calls.values())}
+
+    def delay(self):
+        ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class FakeOddsHandler(BaseHTTPRequestHandler):
+    server: FakeOddsAPI
+
+    def log_message(self, format, *args):
+        pass  # thousands of requests; keep the terminal quiet
+
+    def _send(self, status: int, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        markets = tuple(parse_qs(url.query).get("markets", ["h2h"])[0].split(","))
+
+        if parts == ["__stats"]:
+            return self._send(200, self.server.stats())
+
+        if parts == ["v4", "sports"]:
+            self.server.count("sports")
+            self.server.delay()
+            if self.server.fails():
+                return self._send(503, {"message": "Service unavailable"})
+            return self._send(200, [
+                {"key": key, "group": sport["category"], "title": sport["title"], "active": True}
+                for key, sport in SUPPORTED_SPORTS.items()
+            ])
+
+        if len(parts) == 4 and parts[:2] == ["v4", "sports"] and parts[3] in ("odds", "scores"):
+            sport_key, endpoint = parts[2], parts[3]
+            used = self.server.count(endpoint)
+            self.server.delay()
+            if self.server.fails():
+                return self._send(503, {"message": "Service unavailable"})
+            if endpoint == "scores":
+                return self._send(200, [])
+            return self._send(200, self._slate(sport_key, used, markets), self._quota(used))
+
+        if len(parts) == 6 and parts[:2] == ["v4", "sports"] and parts[3] == "events" and parts[5] == "odds":
+            used = self.server.count("event_odds")
+            self.server.delay()
+            if self.server.fails():
+                return self._send(503, {"message": "Service unavailable"})
+            event = self._slate(parts[2], used, markets, events=1)[0]
+            event["id"] = parts[4]
+            return self._send(200, event, self._quota(used))
+
+        self._send(404, {"message": "Unknown endpoint"})
+
+    def _slate(self, sport_key: str, used: int, markets, events: int = None) -> list:
+        return generate_slate(
+            events=events or self.server.events, books=self.server.books,
+            outcomes=3 if sport_key.startswith("soccer") else 2,
+            stale_fraction=0.05, malformed_fraction=0.01,
+            seed=self.server.seed + used, sport_key=sport_key, markets=markets
+        )
+
+    @staticmethod
+    def _quota(used: int) -> dict:
+        return {"x-requests-remaining": str(max(0, QUOTA - used)), "x-requests-used": str(used)}
+
+
+def start(port: int = 0, **options) -> FakeOddsAPI:
+    """Start in a background thread; port 0 picks a free port."""
+    server = FakeOddsAPI(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-odds-api", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Odds API upstream")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--events", type=int, default=15)
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered 503")
+    args = parser.parse_args()
+
+    server = FakeOddsAPI(("127.0.0.1", args.port), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         events=args.events, books=args.books, error_rate=args.error_rate)
+    print(f"Fake Odds API on {server.url} (set ODDS_API_BASE to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
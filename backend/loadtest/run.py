@@ -0,0 +1,345 @@
+"""
+End-to-end load test: the real app under uvicorn against a fake Odds API.
+
+Boots loadtest.fake_upstream on a free port, starts `uvicorn main:app` in a
+subprocess with ODDS_API_BASE pointed at it, then drives virtual users that
+behave like ProfessionalDashboard.jsx:
+
+- on load: GET /api/odds/sports/available, then GET /api/odds/{sport}
+- every --poll-interval seconds (the dashboard's 30 s auto-refresh):
+  GET /api/odds/{sport}
+- ad hoc, at --ev-per-minute on average (Poisson): POST /api/ev/calculate
+  with a price and timestamp taken from the last odds response
+
+Users start spread over --ramp seconds so their polls are not in lockstep.
+Reports throughput, p50/p95/p99 latency and errors per route, plus the
+upstream calls the app made.
+
+Run from backend/ (needs httpx, which the test suite already uses):
+    python -m loadtest.run --users 200 --duration 120 -o before.json
+    ... make a change ...
+    python -m loadtest.run --users 200 --duration 120 -o after.json --compare before.json
+    python -m loadtest.run compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from loadtest import fake_upstream
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SPORTS = ["basketball_nba", "americanfootball_nfl", "icehockey_nhl", "soccer_epl"]
+
+# Seconds to wait for uvicorn to answer /health
+BOOT_TIMEOUT = 30.0
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Latency samples and outcomes per route label."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, seconds: float, status: Optional[int]):
+        self.latencies.setdefault(route, []).append(seconds)
+        codes = self.statuses.setdefault(route, {})
+        key = str(status) if status is not None else "exception"
+        codes[key] = codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            routes[route] = {
+                "requests": len(ordered),
+                "rps": round(len(ordered) / elapsed, 2),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "errors": self.errors.get(route, 0),
+                "statuses": self.statuses[route],
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "errors": sum(self.errors.values()),
+            "routes": routes,
+        }
+
+
+class DashboardUser:
+    """One browser tab running ProfessionalDashboard."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, sport: str,
+                 poll_interval: float, ev_per_minute: float, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.sport = sport
+        self.poll_interval = poll_interval
+        self.ev_rate = ev_per_minute / 60.0
+        self.rng = rng
+        self.prices: List[dict] = []
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            pass
+        self.recorder.record(route, time.perf_counter() - start, response.status_code if response else None)
+        return response
+
+    async def fetch_odds(self):
+        response = await self.request("GET /api/odds/{sport_key}", "GET", f"/api/odds/{self.sport}")
+        if response is None or response.status_code != 200:
+            return
+        self.prices = [
+            {
+                "price": outcome["price"],
+                "timestamp": book["last_update"],
+                "outcome": outcome["name"],
+                "bookmaker": book["title"],
+                "event": f"{event['away_team']} @ {event['home_team']}",
+            }
+            for event in response.json().get("events", [])
+            for book in event["bookmakers"]
+            for outcome in book["outcomes"]
+        ]
+
+    async def calculate_ev(self):
+        if not self.prices:
+            return
+        pick = self.rng.choice(self.prices)
+        await self.request("POST /api/ev/calculate", "POST", "/api/ev/calculate", json={
+            "odds": float(pick["price"]),
+            "true_probability": round(min(0.95, max(0.05, 1 / float(pick["price"]) + self.rng.uniform(-0.05, 0.08))), 3),
+            "cash_stake": self.rng.choice([10, 25, 50, 100]),
+            "odds_timestamp": pick["timestamp"],
+            "odds_source": "the-odds-api-v4",
+            "event_description": pick["event"],
+            "outcome_name": pick["outcome"],
+            "bookmaker_name": pick["bookmaker"],
+        })
+
+    async def run(self, start_delay: float, stop_at: float):
+        await asyncio.sleep(start_delay)
+        if time.monotonic() >= stop_at:
+            return
+        await self.request("GET /api/odds/sports/available", "GET", "/api/odds/sports/available")
+        await self.fetch_odds()
+
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            now = time.monotonic()
+            next_ev = now + self.rng.expovariate(self.ev_rate) if self.ev_rate > 0 else float("inf")
+            wake = min(next_poll, next_ev, stop_at)
+            await asyncio.sleep(max(0.0, wake - now))
+            if wake >= stop_at:
+                return
+            if wake == next_poll:
+                await self.fetch_odds()
+                next_poll += self.poll_interval
+            else:
+                await self.calculate_ev()
+
+
+async def drive(base_url: str, users: int, duration: float, ramp: float, poll_interval: float,
+                ev_per_minute: float, sports: List[str], seed: int) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        start = time.monotonic()
+        stop_at = start + duration
+        tasks = [
+            DashboardUser(client, recorder, sports[i % len(sports)], poll_interval, ev_per_minute,
+                          random.Random(rng.random())).run(rng.uniform(0, ramp), stop_at)
+            for i in range(users)
+        ]
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+    return recorder.summary(elapsed)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(upstream_url: str, workers: int, log_file) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "ODDS_API_BASE": upstream_url,
+        "ODDS_API_KEY": "loadtest",
+        "ACCESS_LOG_SAMPLE_RATE": "0",
+        "RATE_LIMIT_ENABLED": "false",  # every virtual user shares 127.0.0.1
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + BOOT_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stop_app(process)
+    log_file.seek(0)
+    raise RuntimeError(f"App did not start:\n{log_file.read().decode(errors='replace')[-2000:]}")
+
+
+def stop_app(process: subprocess.Popen):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_scenario(args) -> dict:
+    upstream = fake_upstream.start(latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_latency_ms / 3)
+    with tempfile.TemporaryFile() as log_file:
+        process, url = start_app(upstream.url, args.workers, log_file)
+        try:
+            before = upstream.stats()["total"]
+            summary = asyncio.run(drive(
+                url, users=args.users, duration=args.duration, ramp=args.ramp or min(args.poll_interval, args.duration),
+                poll_interval=args.poll_interval, ev_per_minute=args.ev_per_minute,
+                sports=args.sports.split(","), seed=args.seed
+            ))
+            stats = upstream.stats()
+        finally:
+            stop_app(process)
+            upstream.shutdown()
+
+    summary["upstream_calls"] = stats["total"] - before
+    summary["upstream_by_endpoint"] = stats["calls"]
+    summary["scenario"] = {
+        "users": args.users, "duration_s": args.duration, "poll_interval_s": args.poll_interval,
+        "ev_per_minute": args.ev_per_minute, "sports": args.sports, "workers": args.workers,
+        "upstream_latency_ms": args.upstream_latency_ms, "seed": args.seed,
+    }
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"\n{summary['requests']} requests in {summary['elapsed_s']} s "
+          f"({summary['rps']} req/s), {summary['errors']} errors, "
+          f"{summary.get('upstream_calls', '?')} upstream calls")
+    print(f"{'route':36s} {'reqs':>7s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for route, r in summary["routes"].items():
+        print(f"{route:36s} {r['requests']:7d} {r['rps']:8.2f} {r['p50_ms']:9.1f} "
+              f"{r['p95_ms']:9.1f} {r['p99_ms']:9.1f} {r['errors']:7d}")
+
+
+def compare(before: dict, after: dict) -> List[str]:
+    """Human-readable before → after lines (negative % = faster / fewer)."""
+    def change(old, new):
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    lines = [
+        f"throughput: {before['rps']} → {after['rps']} req/s ({change(before['rps'], after['rps'])})",
+        f"errors: {before['errors']} → {after['errors']}",
+        f"upstream calls: {before.get('upstream_calls')} → {after.get('upstream_calls')} "
+        f"({change(before.get('upstream_calls'), after.get('upstream_calls'))})",
+    ]
+    for route in sorted(set(before["routes"]) | set(after["routes"])):
+        old, new = before["routes"].get(route), after["routes"].get(route)
+        if not old or not new:
+            lines.append(f"{route}: only in {'after' if new else 'before'}")
+            continue
+        lines.append(
+            f"{route}: p50 {old['p50_ms']} → {new['p50_ms']} ms ({change(old['p50_ms'], new['p50_ms'])}), "
+            f"p95 {old['p95_ms']} → {new['p95_ms']} ms ({change(old['p95_ms'], new['p95_ms'])}), "
+            f"p99 {old['p99_ms']} → {new['p99_ms']} ms ({change(old['p99_ms'], new['p99_ms'])})"
+        )
+    return lines
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="loadtest.run compare", description="Compare two load test results")
+        parser.add_argument("before")
+        parser.add_argument("after")
+        args = parser.parse_args(argv[1:])
+        print("\n".join(compare(_load(args.before), _load(args.after))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Dashboard load test against a fake Odds API")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent dashboard tabs")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--ramp", type=float, default=None, help="Spread user start over this many seconds "
+                                                                 "(default: one poll interval)")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Odds auto-refresh period")
+    parser.add_argument("--ev-per-minute", type=float, default=2.0, help="EV calculations per user per minute")
+    parser.add_argument("--sports", default=",".join(DEFAULT_SPORTS), help="Comma-separated; users round-robin")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--upstream-latency-ms", type=float, default=150.0, help="Fake Odds API response delay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    summary = run_scenario(args)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.compare:
+        print(f"\nvs {args.compare}:")
+        print("\n".join(compare(_load(args.compare), summary)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,21 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from config.settings import settings
-from utils.logger import log_requests
-from utils.errors import odds_api_error_handler, validation_exception_handler, http_exception_handler
+from utils.startup import startup
 
-# CORRECT ENDPOINTS - Safe for deployment
-from routes import health, ev, validated_odds
+with startup.phase("import framework"):
+    import asyncio
+    import sys
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from starlette.concurrency import run_in_threadpool
+
+with startup.phase("import app"):
+    from config.settings import settings
+    from utils.logger import logger, log_requests, configure_access_log
+    from utils.errors import odds_api_error_handler, validation_exception_handler, http_exception_handler
+
+    # CORRECT ENDPOINTS - Safe for deployment
+    from routes import health, ev, validated_odds, line_moves, consensus, alerts, metrics
 
 # DISABLED ENDPOINTS - Contain incorrect math or unsupported features
 # from routes import clv, odds_best, bets, odds
@@ -14,12 +24,153 @@ from routes import health, ev, validated_odds
 # - clv: CLV calculation not part of MVP
 # - odds_best: Best lines finder - needs review before enabling
 
+
+def warm_up(app: FastAPI):
+    """
+    Pay first-request costs before /health/ready reports ready.
+
+    Runs in a worker thread after the server is already accepting
+    connections, so /health (liveness) answers immediately.
+    """
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+
+    from fastapi.encoders import jsonable_encoder
+
+    from services.ev_calculator import calculate_straight_bet_ev
+    from services.odds_service import _get_session
+
+    steps = [
+        ("openapi schema", app.openapi),
+        ("http session", _get_session),
+        ("retry policy", lambda: __import__("tenacity")),
+        ("ev models", lambda: jsonable_encoder(calculate_straight_bet_ev(
+            odds=Decimal("2.0"), true_probability=Decimal("0.5"), cash_stake=Decimal("1"),
+            odds_timestamp=datetime.utcnow() - timedelta(seconds=1), odds_source="warm-up"
+        ))),
+    ]
+    with startup.phase("warm-up"):
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"Warm-up step '{name}' failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler = None
+    if settings.CLOSING_LINE_CAPTURE_ENABLED:
+        # Optional subsystem: only imported (pymongo, scheduler) when enabled
+        from services.closing_line_service import ClosingLineScheduler
+        scheduler = ClosingLineScheduler()
+        scheduler.start()
+
+    # Active sports: the first refresh runs right away in the background
+    from services.sports_catalog import catalog
+    if settings.SPORTS_CATALOG_REFRESH_SECONDS > 0:
+        catalog.start(settings.SPORTS_CATALOG_REFRESH_SECONDS)
+
+    poller = None
+    if settings.ODDS_SNAPSHOT_DIR:
+        # Every worker runs one; only the flock holder fetches
+        from services.odds_poller import OddsSnapshotPoller
+        from services.snapshot_store import get_snapshot_store
+        poller = OddsSnapshotPoller(get_snapshot_store(), interval=settings.ODDS_SNAPSHOT_INTERVAL)
+        poller.start()
+
+    history = None
+    if settings.LINE_HISTORY_DIR:
+        # Compaction and retention; only the process holding the writer lock does any work
+        from services.line_history import get_line_history
+        history = get_line_history()
+        history.start()
+
+    feeds = []
+    if settings.LINE_MOVES_ENABLED:
+        # Built now so bad LINE_MOVE_THRESHOLDS fail startup rather than the first refresh
+        from services.line_moves import get_line_move_detector
+        feeds.append(get_line_move_detector().observe)
+    if settings.CONSENSUS_ENABLED:
+        from services.consensus import get_consensus_engine
+        feeds.append(get_consensus_engine().update)
+
+    alert_engine = None
+    if settings.ALERTS_ENABLED:
+        from services.alerts import AlertError, WebhookSink, get_alert_engine
+        alert_engine = get_alert_engine()
+        if alert_engine is None:
+            raise AlertError("ALERTS_ENABLED needs CONSENSUS_ENABLED: rules compare prices with the consensus")
+        feeds.append(alert_engine.observe)
+        if settings.ALERT_WEBHOOK_URL:
+            # With shared snapshots every worker sees every alert: only the leader posts them
+            alert_engine.sinks.append(WebhookSink(
+                settings.ALERT_WEBHOOK_URL, gate=(lambda: poller.is_leader) if poller is not None else None
+            ))
+        alert_engine.start()
+
+    watcher = None
+    if feeds and settings.ODDS_SNAPSHOT_DIR:
+        # Refreshes happen in the leader: every worker follows the published snapshots
+        from services.odds_poller import SnapshotWatcher
+        from services.snapshot_store import get_snapshot_store
+        watcher = SnapshotWatcher(get_snapshot_store(), feeds)
+        watcher.start()
+
+    if not settings.ODDS_API_KEY:
+        logger.warning("ODDS_API_KEY is not set: odds endpoints will return 503")
+
+    async def warm_up_then_ready():
+        await run_in_threadpool(warm_up, app)
+        startup.mark_ready()
+        logger.info(startup.summary())
+
+    warm_up_task = asyncio.create_task(warm_up_then_ready())
+    try:
+        yield
+    finally:
+        warm_up_task.cancel()
+        catalog.stop()
+        if scheduler is not None:
+            scheduler.stop()
+        if poller is not None:
+            poller.stop()
+        if history is not None:
+            history.stop()
+        if watcher is not None:
+            watcher.stop()
+        if alert_engine is not None:
+            alert_engine.stop()
+        if "services.stale_odds" in sys.modules:
+            from services.stale_odds import shutdown as stop_revalidation
+            stop_revalidation()
+        if "db.mongo" in sys.modules:
+            from db.mongo import close_client
+            close_client()
+
+
 app = FastAPI(
     title="Better Bets API",
     description="Mathematically correct betting EV calculator. MVP: Cash bets only.",
-    version="0.1.0-mvp"
+    version="0.1.0-mvp",
+    lifespan=lifespan
 )
 
+# Installed before CORS so 429 responses still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    from utils.rate_limit import Budget, RateLimiter
+
+    app.middleware("http")(RateLimiter(
+        {
+            "odds": Budget(settings.RATE_LIMIT_ODDS_PER_MINUTE, settings.RATE_LIMIT_ODDS_BURST,
+                           settings.MAX_CONCURRENT_ODDS_REQUESTS),
+            "ev": Budget(settings.RATE_LIMIT_EV_PER_MINUTE, settings.RATE_LIMIT_EV_BURST),
+            "bets": Budget(settings.RATE_LIMIT_BETS_PER_MINUTE, settings.RATE_LIMIT_BETS_BURST),
+        },
+        max_concurrent=settings.MAX_CONCURRENT_REQUESTS,
+        proxy_hops=settings.RATE_LIMIT_PROXY_HOPS
+    ))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.CORS_ORIGIN],
@@ -27,12 +178,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+configure_access_log(sample_rate=settings.ACCESS_LOG_SAMPLE_RATE, slow_request_ms=settings.SLOW_REQUEST_MS)
 app.middleware("http")(log_requests)
 
+# Opt-in profiling: nothing is installed unless enabled
+if settings.PROFILING_ENABLED:
+    from routes import profiles
+    from utils.profiler import RequestProfiler
+
+    app.middleware("http")(RequestProfiler(
+        profiles.profile_store,
+        admin_token=settings.PROFILE_ADMIN_TOKEN,
+        sample_rate=settings.PROFILE_SAMPLE_RATE
+    ))
+    app.include_router(profiles.router)
+
 # ENABLED ROUTERS (MVP)
 app.include_router(health.router)
 app.include_router(ev.router)
 app.include_router(validated_odds.router)
+app.include_router(line_moves.router)
+app.include_router(consensus.router)
+app.include_router(alerts.router)
+app.include_router(metrics.router)
 
 app.add_exception_handler(Exception, odds_api_error_handler)
 app.add_exception_handler(422, validation_exception_handler)
@@ -8,6 +8,9 @@ class Bet(BaseModel):
     matchup: str
     sportsbook: str
     sport: str
+    event_id: Optional[str] = None  # The Odds API event id (enables closing-line capture)
+    outcome: Optional[str] = None  # Outcome bet on, as named by The Odds API
+    commence_time: Optional[datetime] = None
     odds: float
     stake: float
     closing_odds: Optional[float] = None
@@ -0,0 +1,181 @@
+"""
+Alert Endpoints
+
+EV alert rules (services.alerts) and the alerts they trigger:
+
+    POST   /api/alerts/rules             create a rule
+    GET    /api/alerts/rules?user=       a user's rules
+    DELETE /api/alerts/rules/{rule_id}   delete a rule (?user= must own it)
+    GET    /api/alerts?user=             a user's recent alerts (poll with since_id)
+    GET    /api/alerts/stream?user=      server-sent events, one "alert" per trigger
+
+The sports with rules are kept refreshing by the engine itself, so alerts
+arrive whether or not anyone is connected.
+"""
+
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from config.sports import SUPPORTED_SPORTS
+from services.alerts import AlertEngine, AlertError, get_alert_engine, make_rule
+
+router = APIRouter(prefix="/api/alerts", tags=["alerts"])
+
+# Stream: seconds between checks for new alerts
+STREAM_POLL_SECONDS = 1.0
+
+# Stream: comment line sent when nothing happened for this long (keeps proxies from closing it)
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+# Stream: client reconnect delay (SSE "retry" field)
+STREAM_RETRY_MS = 3000
+
+
+class AlertRuleRequest(BaseModel):
+    """Request body for an alert rule"""
+    user: str = Field(..., min_length=1, example="alice")
+    sport_key: str = Field(..., example="basketball_nba")
+    market: str = Field("h2h", description="h2h, spreads, totals, ...", example="h2h")
+    books: List[str] = Field(
+        default_factory=list,
+        description="Bookmaker keys to watch (empty: any book)",
+        example=["fanduel"]
+    )
+    min_edge: float = Field(
+        0.02,
+        description="Alert when price × consensus probability - 1 reaches this (0.02 = 2% EV)",
+        example=0.02
+    )
+    min_books: int = Field(3, ge=1, description="Books that must quote the outcome for its consensus")
+    min_price: float = Field(1.0, ge=1.0)
+    max_price: float = Field(1000.0, ge=1.0)
+    event_id: Optional[str] = Field(None, description="Only this event (a watchlist)")
+    outcome: Optional[str] = Field(
+        None,
+        description="Only this outcome; spreads and totals include the point, e.g. 'Lakers -5.5'"
+    )
+
+
+def _engine() -> AlertEngine:
+    engine = get_alert_engine()
+    if engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Alerts unavailable", "message": "ALERTS_ENABLED (and CONSENSUS_ENABLED) is off"}
+        )
+    return engine
+
+
+@router.post("/rules", status_code=status.HTTP_201_CREATED)
+def create_alert_rule(request: AlertRuleRequest):
+    """
+    Create an EV alert rule.
+
+    Raises:
+        422: Unsupported sport key, invalid rule, or the user has too many rules
+        503: Alerts are not enabled (ALERTS_ENABLED)
+    """
+    engine = _engine()
+    # The engine keeps every rule's sport refreshing: only sports the app can fetch
+    if request.sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Unsupported sport", "message": f"{request.sport_key} is not a supported sport key"}
+        )
+    fields = request.model_dump()
+    try:
+        rule = engine.add_rule(make_rule(fields.pop("user"), fields.pop("sport_key"), **fields))
+    except AlertError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid alert rule", "message": str(e)}
+        )
+    return rule.as_dict()
+
+
+@router.get("/rules")
+def list_alert_rules(user: str = Query(..., min_length=1)):
+    """A user's alert rules."""
+    rules = _engine().rules(user)
+    return {"user": user, "rules": [rule.as_dict() for rule in rules], "count": len(rules)}
+
+
+@router.delete("/rules/{rule_id}")
+def delete_alert_rule(rule_id: str, user: str = Query(..., min_length=1)):
+    """
+    Delete one of the user's alert rules.
+
+    Raises:
+        404: No such rule for this user
+    """
+    if not _engine().remove_rule(rule_id, user):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "Rule not found", "message": f"{user} has no alert rule {rule_id}"}
+        )
+    return {"status": "deleted", "rule_id": rule_id}
+
+
+@router.get("")
+def get_alerts(
+    user: str = Query(..., min_length=1),
+    since_id: int = Query(0, ge=0, description="Only alerts after this id (the last_id of the previous poll)")
+):
+    """
+    A user's recent alerts, oldest first. Poll with since_id set to the
+    previous response's last_id to get only what is new.
+    """
+    engine = _engine()
+    last_id = max(since_id, engine.latest_id)
+    alerts = engine.since(since_id, user)
+    return {
+        "user": user,
+        "alerts": [alert.as_dict() for alert in alerts],
+        "count": len(alerts),
+        "last_id": max([last_id] + [alert.id for alert in alerts])
+    }
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    user: str = Query(..., min_length=1),
+    since_id: Optional[int] = Query(None, ge=0, description="Replay alerts after this id first")
+):
+    """
+    Server-sent events: one "alert" event per trigger, with the alert id as
+    the event id, so a reconnecting EventSource resumes after Last-Event-ID.
+    Without since_id or Last-Event-ID only new alerts are sent.
+    """
+    engine = _engine()
+    if since_id is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        since_id = int(last_event_id) if last_event_id.isdigit() else engine.latest_id
+    return StreamingResponse(
+        alert_events(request, engine, user, since_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def alert_events(request: Request, engine: AlertEngine, user: str, after: int):
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    sent_at = time.monotonic()
+    while not await request.is_disconnected():
+        now = time.monotonic()
+        alerts = engine.since(after, user)
+        for alert in alerts:
+            yield f"id: {alert.id}\nevent: alert\ndata: {json.dumps(alert.as_dict())}\n\n"
+            after = alert.id
+        if alerts:
+            sent_at = now
+        elif now - sent_at >= STREAM_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            sent_at = now
+        await asyncio.sleep(STREAM_POLL_SECONDS)
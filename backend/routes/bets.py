@@ -1,7 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
+from datetime import datetime
+from typing import Optional
 from models.bet import Bet
-from services.bet_service import log_bet, fetch_bets
+from services.bet_service import log_bet, fetch_bets, update_closing_odds
+from services.summary_service import get_user_summary
+from services.rollup_service import get_rollup_series, RollupQueryError
 from models.responses import LoggedBetResponse, BetHistoryResponse
+from utils.wire_formats import columns, negotiated_response
 
 router = APIRouter(prefix="/api/bets", tags=["bets"])
 
@@ -11,5 +16,35 @@ def log_bet_route(bet: Bet):
     return {"status": "logged", "bet": result}
 
 @router.get("/history/{user}", response_model=BetHistoryResponse)
-def get_history(user: str):
-    return {"bets": fetch_bets(user)}
+def get_history(user: str, request: Request):
+    # Also the bet export: Accept msgpack or Arrow (one row per bet)
+    return negotiated_response(request, {"bets": fetch_bets(user)}, _bets_table)
+
+def _bets_table(body: dict):
+    timestamps = ("loggedAt", "commence_time", "settledAt", "closing_captured_at", "updatedAt")
+    return columns(body["bets"], timestamps=timestamps), {}
+
+@router.get("/summary/{user}")
+def get_summary(user: str):
+    return get_user_summary(user)
+
+@router.get("/rollups/{user}")
+def get_rollups(
+    user: str,
+    period: str = Query("day", description="day, week or month"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sport: Optional[str] = None,
+    book: Optional[str] = None
+):
+    try:
+        return get_rollup_series(user, period=period, start=start, end=end, sport=sport, book=book)
+    except RollupQueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.post("/{bet_id}/closing-odds")
+def set_closing_odds(bet_id: str, closing_odds: float):
+    bet = update_closing_odds(bet_id, closing_odds)
+    if bet is None:
+        raise HTTPException(status_code=404, detail="Bet not found")
+    return {"status": "updated", "bet": bet}
@@ -5,5 +5,5 @@ from services.clv_service import generate_clv_report
 router = APIRouter(prefix="/api/clv", tags=["clv"])
 
 @router.get("/report")
-def clv_report(user: str):
-    return generate_clv_report(user)
+def clv_report(user: str, include_values: bool = False):
+    return generate_clv_report(user, include_values=include_values)
@@ -0,0 +1,73 @@
+"""
+Consensus Endpoints
+
+The weighted no-vig market consensus (services.consensus) per event:
+GET /api/odds/{sport_key}/consensus. Like the line-move endpoints, a
+request keeps the sport refreshing so the consensus follows the board.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from config.sports import SUPPORTED_SPORTS
+from services.consensus import ConsensusEngine, get_consensus_engine
+from services.stale_odds import keep_fresh
+
+router = APIRouter(prefix="/api/odds", tags=["odds"])
+
+
+def _engine(sport_key: str) -> ConsensusEngine:
+    engine = get_consensus_engine()
+    if engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Consensus unavailable", "message": "CONSENSUS_ENABLED is off"}
+        )
+    # The request keeps the sport refreshing: only sports the app can fetch
+    if sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Unsupported sport", "message": f"{sport_key} is not a supported sport key"}
+        )
+    return engine
+
+
+@router.get("/{sport_key}/consensus")
+def get_consensus(
+    sport_key: str,
+    event_id: Optional[str] = Query(None, description="Odds API event id (default: every event)"),
+    market: Optional[str] = Query(None, description="h2h, spreads, totals, ... (default: every market)")
+):
+    """
+    Weighted no-vig consensus probability and fair odds for every outcome,
+    per event and market, with the number of books behind each outcome.
+
+    Raises:
+        404: event_id has no consensus (unknown event, or no book quotes it)
+        422: Unsupported sport key
+        503: Consensus is not enabled (CONSENSUS_ENABLED)
+    """
+    engine = _engine(sport_key)
+    keep_fresh(sport_key)
+    events = []
+    for event in ([event_id] if event_id else sorted(engine.events(sport_key))):
+        markets = engine.event(sport_key, event)
+        if market is not None:
+            markets = {name: found for name, found in markets.items() if name == market}
+        if markets:
+            events.append({
+                "event_id": event,
+                "markets": {name: found.as_dict() for name, found in markets.items()}
+            })
+    if event_id and not events:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "No consensus", "message": f"No book quotes event {event_id}"}
+        )
+    return {
+        "sport_key": sport_key,
+        "weights": engine.describe(),
+        "events": events,
+        "count": len(events)
+    }
@@ -3,15 +3,20 @@ EV Calculation Endpoint
 
 Provides mathematically correct Expected Value calculations.
 
-ONLY SUPPORTS: Straight cash bets (no bonus, no insurance, no hedging)
+ONLY SUPPORTS: Straight cash bets, and cash parlays / round robins over
+them (no bonus, no insurance, no hedging, no teasers)
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field
 from decimal import Decimal
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import List, Optional
 
+from config.settings import settings
+from config.sports import SUPPORTED_SPORTS
+from services.consensus import get_consensus_engine
 from services.ev_calculator import (
     calculate_straight_bet_ev,
     validate_ev_input,
@@ -21,9 +26,17 @@ from services.ev_calculator import (
     InvalidStakeError,
     StaleDataError
 )
+from services.parlay_ev import DEFAULT_SAMPLES, MAX_LEGS, MAX_SAMPLES, Leg, ParlayError, round_robin, simulate
+from services.stale_odds import keep_fresh
+from utils.wire_formats import columns, negotiated_response
 
 router = APIRouter(prefix="/api/ev", tags=["ev"])
 
+# Most bets one POST /api/ev/calculate/batch may carry
+MAX_BATCH_SIZE = 1000
+
+PROBABILITY_SOURCES = ("user", "consensus")
+
 
 class EVRequest(BaseModel):
     """Request body for EV calculation"""
@@ -33,9 +46,10 @@ class EVRequest(BaseModel):
         gt=1.0,
         example=2.05
     )
-    true_probability: float = Field(
-        ...,
-        description="YOUR estimated probability that bet wins (0-1). Example: 0.52 for 52%",
+    true_probability: Optional[float] = Field(
+        None,
+        description="YOUR estimated probability that bet wins (0-1). Example: 0.52 for 52%. "
+                    "Required unless probability_source is consensus",
         gt=0.0,
         lt=1.0,
         example=0.52
@@ -56,6 +70,27 @@ class EVRequest(BaseModel):
         description="Source of odds data",
         example="the-odds-api-v4"
     )
+    probability_source: str = Field(
+        "user",
+        description="user (true_probability) or consensus (the weighted no-vig market consensus "
+                    "for sport_key/event_id/market/outcome_name)",
+        example="user"
+    )
+    sport_key: Optional[str] = Field(
+        None,
+        description="Sport of the event (probability_source consensus)",
+        example="americanfootball_nfl"
+    )
+    event_id: Optional[str] = Field(
+        None,
+        description="Odds API event id (probability_source consensus)"
+    )
+    market: str = Field(
+        "h2h",
+        description="Market of the outcome (probability_source consensus); "
+                    "spreads and totals outcomes include the point, e.g. 'Kansas City Chiefs -3.5'",
+        example="h2h"
+    )
     # Optional transparency fields
     event_description: Optional[str] = Field(
         None,
@@ -74,13 +109,51 @@ class EVRequest(BaseModel):
     )
 
 
+class ParlayLeg(BaseModel):
+    """One parlay leg"""
+    odds: float = Field(..., description="Decimal odds. Must be > 1.0", gt=1.0, example=1.91)
+    probability: float = Field(
+        ...,
+        description="YOUR estimated probability that the leg wins (0-1)",
+        gt=0.0,
+        lt=1.0,
+        example=0.55
+    )
+    name: Optional[str] = Field(None, description="Leg description", example="Chiefs -3.5")
+
+
+class ParlayRequest(BaseModel):
+    """Request body for parlay / round-robin EV"""
+    legs: List[ParlayLeg] = Field(..., min_items=2, max_items=MAX_LEGS)
+    stake: float = Field(..., description="Cash stake per parlay", gt=0.0, example=10.00)
+    sizes: Optional[List[int]] = Field(
+        None,
+        description="Round-robin sizes, e.g. [2, 3] for by 2s and by 3s (default: the straight parlay of every leg)",
+        example=[2, 3]
+    )
+    correlation: Optional[List[List[float]]] = Field(
+        None,
+        description="Leg correlation matrix (one row per leg, 1 on the diagonal) for same-game legs; "
+                    "results are then simulated"
+    )
+    samples: Optional[int] = Field(None, description="Simulation samples (correlation only)", ge=1000, le=MAX_SAMPLES)
+    seed: Optional[int] = Field(None, description="Simulation seed, for repeatable results")
+
+
+class EVBatchRequest(BaseModel):
+    """Request body for batch EV calculation"""
+    bets: List[EVRequest] = Field(..., min_items=1, max_items=MAX_BATCH_SIZE)
+
+
 @router.post("/calculate", status_code=status.HTTP_200_OK)
 def calculate_ev(request: EVRequest):
     """
     Calculate Expected Value for a straight cash bet.
 
     CRITICAL NOTES:
-    - Uses YOUR probability estimate, not market implied probability
+    - Uses YOUR probability estimate, not market implied probability, unless
+      probability_source is "consensus": then the weighted no-vig consensus
+      of the books quoting the outcome (CONSENSUS_MIN_BOOKS at least)
     - Only supports cash bets (no bonus funds)
     - Odds must be less than 60 seconds old
     - Does NOT account for: bonuses, insurance, hedging, parlays
@@ -89,9 +162,43 @@ def calculate_ev(request: EVRequest):
         EVResult with full calculation provenance
 
     Raises:
-        422: Invalid input (bad probability, odds, stake, or stale timestamp)
+        422: Invalid input (bad probability, odds, stake, or stale timestamp),
+             or no fresh consensus for the outcome
         500: Calculation error
+        503: probability_source consensus while CONSENSUS_ENABLED is off
+    """
+    return _calculate(request)
+
+
+@router.post("/calculate/batch", status_code=status.HTTP_200_OK)
+def calculate_ev_batch(batch: EVBatchRequest, request: Request):
     """
+    Calculate Expected Value for up to MAX_BATCH_SIZE straight cash bets.
+
+    Each bet is checked exactly as POST /api/ev/calculate checks it; a bet
+    that fails is listed in "errors" with its index and the detail the
+    single endpoint would return, and the rest are still calculated.
+
+    Accept: application/msgpack or application/vnd.apache.arrow.stream
+    (one row per calculated bet) returns the results in a binary format.
+    """
+    results, errors = [], []
+    for index, item in enumerate(batch.bets):
+        try:
+            results.append({"index": index, **jsonable_encoder(_calculate(item))})
+        except HTTPException as e:
+            errors.append({"index": index, "status_code": e.status_code, "detail": e.detail})
+    body = {"results": results, "errors": errors, "calculated": len(results), "failed": len(errors)}
+    return negotiated_response(request, body, _batch_table)
+
+
+def _batch_table(body: dict):
+    envelope = {key: value for key, value in body.items() if key != "results"}
+    return columns(body["results"], timestamps=("calculation_timestamp", "odds_timestamp")), envelope
+
+
+def _calculate(request: EVRequest):
+    """EVResult for one request; HTTPException with the error detail otherwise."""
     try:
         # Parse timestamp
         try:
@@ -105,6 +212,9 @@ def calculate_ev(request: EVRequest):
                     "expected_format": "ISO 8601 (e.g., 2025-12-31T18:30:00Z)"
                 }
             )
+        # The calculator compares against naive UTC
+        if odds_ts.tzinfo is not None:
+            odds_ts = odds_ts.astimezone(timezone.utc).replace(tzinfo=None)
 
         # Build odds source detail for transparency
         odds_source_detail = None
@@ -116,19 +226,26 @@ def calculate_ev(request: EVRequest):
                 "api_source": request.odds_source
             }
 
+        probability, probability_detail = _probability(request)
+
         # Calculate EV
         result = calculate_straight_bet_ev(
             odds=Decimal(str(request.odds)),
-            true_probability=Decimal(str(request.true_probability)),
+            true_probability=Decimal(str(probability)),
             cash_stake=Decimal(str(request.cash_stake)),
             odds_timestamp=odds_ts,
             odds_source=request.odds_source,
             max_odds_age_seconds=60,
-            odds_source_detail=odds_source_detail
+            odds_source_detail=odds_source_detail,
+            probability_source=request.probability_source,
+            probability_source_detail=probability_detail
         )
 
         return result
 
+    except HTTPException:
+        raise
+
     except StaleDataError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -189,6 +306,130 @@ def calculate_ev(request: EVRequest):
         )
 
 
+def _probability(request: EVRequest):
+    """(probability, provenance) from the requested source; HTTPException if unavailable."""
+    if request.probability_source not in PROBABILITY_SOURCES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "Invalid probability source",
+                "message": f"probability_source must be one of: {', '.join(PROBABILITY_SOURCES)}"
+            }
+        )
+    if request.probability_source == "user":
+        if request.true_probability is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={
+                    "error": "Missing probability",
+                    "message": "true_probability is required when probability_source is user"
+                }
+            )
+        return request.true_probability, None
+
+    engine = get_consensus_engine()
+    if engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Consensus unavailable", "message": "CONSENSUS_ENABLED is off"}
+        )
+    if not (request.sport_key and request.event_id and request.outcome_name):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "Missing consensus outcome",
+                "message": "probability_source consensus requires sport_key, event_id and outcome_name"
+            }
+        )
+    # keep_fresh fetches the sport: never for a key the app does not support
+    if request.sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Unsupported sport", "message": f"{request.sport_key} is not a supported sport key"}
+        )
+    keep_fresh(request.sport_key)
+    found = engine.consensus(request.sport_key, request.event_id, request.market)
+    outcome = found.outcomes.get(request.outcome_name) if found is not None else None
+    if outcome is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "No consensus",
+                "message": f"No book quotes {request.outcome_name!r} in {request.market} for event {request.event_id}"
+            }
+        )
+    if outcome.books < settings.CONSENSUS_MIN_BOOKS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "Thin consensus",
+                "message": f"{outcome.books} book(s) quote {request.outcome_name!r}; "
+                           f"at least {settings.CONSENSUS_MIN_BOOKS} required"
+            }
+        )
+    age = datetime.now(timezone.utc).timestamp() - found.refreshed_at
+    if age > settings.CONSENSUS_MAX_AGE_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "Consensus too old",
+                "message": f"The consensus was last refreshed {age:.0f} seconds ago; retry shortly",
+                "max_age_seconds": settings.CONSENSUS_MAX_AGE_SECONDS
+            }
+        )
+    detail = {
+        "sport_key": request.sport_key,
+        "event_id": request.event_id,
+        "market": request.market,
+        "outcome": request.outcome_name,
+        "probability": round(outcome.probability, 6),
+        "fair_odds": round(outcome.fair_odds, 4),
+        "books": outcome.books,
+        **{key: value for key, value in found.as_dict().items() if key != "outcomes"},
+        **engine.describe()
+    }
+    return round(outcome.probability, 6), detail
+
+
+@router.post("/parlay", status_code=status.HTTP_200_OK)
+def calculate_parlay_ev(request: ParlayRequest):
+    """
+    EV of a straight parlay or of round robins over the legs, for cash stakes.
+
+    Each parlay pays stake × the product of its legs' odds when all of them
+    win; a round robin by k places one such parlay per k-leg combination.
+    Independent legs are calculated exactly; with a correlation matrix the
+    legs win together as the matrix says and the results are simulated
+    (with a standard error), alongside the independent figures.
+
+    Raises:
+        422: Invalid legs, sizes or correlation matrix
+    """
+    legs = [Leg(leg.odds, leg.probability) for leg in request.legs]
+    sizes = sorted(set(request.sizes)) if request.sizes else [len(legs)]
+    try:
+        independent = round_robin(legs, sizes, request.stake)
+        if request.correlation is None:
+            results, correlated = independent, None
+        else:
+            samples = request.samples or DEFAULT_SAMPLES
+            results = correlated = simulate(legs, sizes, request.stake, request.correlation, samples, request.seed)
+    except ParlayError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid parlay", "message": str(e)}
+        )
+    body = {
+        "legs": [leg.model_dump() for leg in request.legs],
+        "results": [result.as_dict() for result in results],
+        "formula": "EV = Σ parlays stake × (P × O - 1), P and O the products over each parlay's legs",
+        "calculation_timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    if correlated is not None:
+        body["independent_results"] = [result.as_dict() for result in independent]
+    return body
+
+
 @router.get("/health")
 def ev_health():
     """
@@ -199,18 +440,20 @@ def ev_health():
     return {
         "status": "healthy",
         "features_supported": [
-            "straight_cash_bets"
+            "straight_cash_bets",
+            "parlays",
+            "round_robins",
+            "same_game_parlays (correlation matrix, simulated)"
         ],
         "features_not_supported": [
             "bonus_bets",
             "matched_betting",
             "insurance",
             "hedging",
-            "parlays",
-            "teasers",
-            "same_game_parlays"
+            "teasers"
         ],
         "max_odds_age_seconds": 60,
         "formula": "EV = stake × (P × O - 1)",
-        "probability_source": "user_provided"
+        "probability_source": "user_provided",
+        "probability_sources": list(PROBABILITY_SOURCES)
     }
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
 
+from config.settings import settings
+from services.odds_service import odds_api_breaker
+from utils.startup import startup
+
 router = APIRouter()
 
 @router.get("/health")
@@ -19,14 +24,17 @@ def health():
             "ev_calculation": True,
             "live_odds": True,
             "odds_validation": True,
-            "timestamp_staleness_check": True
+            "timestamp_staleness_check": True,
+            "parlays": True,
+            "round_robins": True,
+            "same_game_parlays": True
         },
         "features_disabled": {
             "bonus_bets": "Not implemented - requires sportsbook policy database",
             "matched_betting": "Not implemented - requires dual-book support",
             "insurance": "Not implemented - requires sportsbook policy database",
             "hedging": "Not implemented",
-            "parlays": "Not implemented",
+            "teasers": "Not implemented",
             "kelly_calculator": "Removed - was using incorrect probability source",
             "clv_tracking": "Disabled - not part of MVP",
             "devig_odds": "Disabled - not part of MVP"
@@ -34,7 +42,7 @@ def health():
         "constraints": {
             "max_odds_age_seconds": 60,
             "supported_sportsbooks": ["draftkings"],
-            "supported_markets": ["h2h"],
+            "supported_markets": ["h2h", "spreads", "totals", "player_props"],
             "odds_format": "decimal"
         },
         "warnings": [
@@ -44,3 +52,22 @@ def health():
             "Odds must be refreshed within 60 seconds"
         ]
     }
+
+
+@router.get("/health/ready")
+def ready():
+    """
+    Readiness check (use this as the platform health check path).
+
+    503 until startup warm-up has finished; includes the startup timing
+    report so cold starts can be tracked per deploy. An open Odds API
+    circuit does not make the instance unready: odds are served stale.
+    """
+    report = startup.report()
+    body = {
+        "status": "ready" if report["ready"] else "starting",
+        "odds_api_configured": bool(settings.ODDS_API_KEY),
+        "odds_api_circuit": odds_api_breaker.state,
+        "startup": report
+    }
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=body)
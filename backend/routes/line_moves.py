@@ -0,0 +1,140 @@
+"""
+Line Moves Endpoints
+
+Line moves and steam detected on the odds refreshes (services.line_moves),
+as a poll (GET /api/odds/{sport_key}/moves) or a server-sent event stream
+(GET /api/odds/{sport_key}/moves/stream).
+
+Both keep the sport refreshing while someone is listening: without shared
+snapshots they refresh it like GET /api/odds/{sport_key} would (one
+upstream call per ODDS_SNAPSHOT_INTERVAL, whatever the client count);
+with them they mark it wanted, so the leader worker polls it.
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from config.sports import SUPPORTED_SPORTS
+from services.line_moves import MOVE_KINDS, LineMoveDetector, get_line_move_detector
+from services.stale_odds import keep_fresh
+
+router = APIRouter(prefix="/api/odds", tags=["odds"])
+
+# Stream: seconds between checks for new moves
+STREAM_POLL_SECONDS = 1.0
+
+# Stream: seconds between keep-fresh calls for the sport
+STREAM_REFRESH_SECONDS = 5.0
+
+# Stream: comment line sent when nothing happened for this long (keeps proxies from closing it)
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+# Stream: client reconnect delay (SSE "retry" field)
+STREAM_RETRY_MS = 3000
+
+
+def _detector(sport_key: str, kind: Optional[str]) -> LineMoveDetector:
+    detector = get_line_move_detector()
+    if detector is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Line moves unavailable", "message": "LINE_MOVES_ENABLED is off"}
+        )
+    # Both endpoints keep the sport refreshing: only sports the app can fetch
+    if sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Unsupported sport", "message": f"{sport_key} is not a supported sport key"}
+        )
+    if kind is not None and kind not in MOVE_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid kind", "message": f"kind must be one of: {', '.join(MOVE_KINDS)}"}
+        )
+    return detector
+
+
+@router.get("/{sport_key}/moves")
+def get_line_moves(
+    sport_key: str,
+    since_id: int = Query(0, ge=0, description="Only moves after this id (the last_id of the previous poll)"),
+    event_id: Optional[str] = Query(None, description="Odds API event id"),
+    kind: Optional[str] = Query(None, description="move or steam")
+):
+    """
+    Recent line moves and steam for a sport, oldest first.
+
+    Poll with since_id set to the previous response's last_id to get only
+    what is new. Only the most recent moves are kept (RECENT_MOVES across
+    all sports).
+
+    Raises:
+        422: Unsupported sport key, or invalid kind
+        503: Detection is not enabled (LINE_MOVES_ENABLED)
+    """
+    detector = _detector(sport_key, kind)
+    keep_fresh(sport_key)
+    last_id = max(since_id, detector.latest_id)
+    moves = detector.since(since_id, sport_key, event_id, kind)
+    return {
+        "sport_key": sport_key,
+        "thresholds": detector.thresholds(sport_key)._asdict(),
+        "moves": [move.as_dict() for move in moves],
+        "count": len(moves),
+        "last_id": max([last_id] + [move.id for move in moves])
+    }
+
+
+@router.get("/{sport_key}/moves/stream")
+async def stream_line_moves(
+    sport_key: str,
+    request: Request,
+    since_id: Optional[int] = Query(None, ge=0, description="Replay moves after this id first"),
+    event_id: Optional[str] = Query(None, description="Odds API event id"),
+    kind: Optional[str] = Query(None, description="move or steam")
+):
+    """
+    Server-sent events: one "move" or "steam" event per detection, with the
+    move id as the event id, so a reconnecting EventSource resumes after
+    Last-Event-ID. Without since_id or Last-Event-ID only new moves are sent.
+
+    Raises:
+        422: Unsupported sport key, or invalid kind
+        503: Detection is not enabled (LINE_MOVES_ENABLED)
+    """
+    detector = _detector(sport_key, kind)
+    if since_id is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        since_id = int(last_event_id) if last_event_id.isdigit() else detector.latest_id
+    return StreamingResponse(
+        move_events(request, detector, sport_key, since_id, event_id, kind),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def move_events(request: Request, detector: LineMoveDetector, sport_key: str, after: int,
+                      event_id: Optional[str] = None, kind: Optional[str] = None):
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    refreshed_at, sent_at = 0.0, time.monotonic()
+    while not await request.is_disconnected():
+        now = time.monotonic()
+        if now - refreshed_at >= STREAM_REFRESH_SECONDS:
+            refreshed_at = now
+            await run_in_threadpool(keep_fresh, sport_key)
+        moves = detector.since(after, sport_key, event_id, kind)
+        for move in moves:
+            yield f"id: {move.id}\nevent: {move.kind}\ndata: {json.dumps(move.as_dict())}\n\n"
+            after = move.id
+        if moves:
+            sent_at = now
+        elif now - sent_at >= STREAM_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            sent_at = now
+        await asyncio.sleep(STREAM_POLL_SECONDS)
@@ -0,0 +1,21 @@
+"""
+Metrics Endpoint
+
+Prometheus scrape target: request latency per route, Odds API latency and
+quota, validation timing and drop counts, cache hits and snapshot age.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Current metric values in Prometheus text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,56 @@
+"""
+Profile Admin Endpoints
+
+List and download request profiles captured by utils.profiler.
+Only mounted when PROFILING_ENABLED is set; every call needs
+X-Admin-Token: <PROFILE_ADMIN_TOKEN>.
+"""
+
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from config.settings import settings
+from utils.profiler import ProfileNotFoundError, ProfileStore, folded
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["admin"])
+
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_KEEP)
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    token = settings.PROFILE_ADMIN_TOKEN
+    if not token or not secrets.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"error": "forbidden", "message": "Valid X-Admin-Token required"}
+        )
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """Captured profiles, newest first (metadata only)."""
+    profiles = profile_store.list()
+    return {"count": len(profiles), "profiles": profiles}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|folded)$", description="json, or folded stacks for flamegraph tools")
+):
+    """Download one profile."""
+    try:
+        profile = profile_store.load(profile_id)
+    except ProfileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "profile_not_found", "profile_id": profile_id}
+        )
+    if format == "folded":
+        return PlainTextResponse(
+            folded(profile),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+        )
+    return profile
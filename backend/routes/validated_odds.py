@@ -4,20 +4,68 @@ Validated Odds Endpoint
 Returns only validated, current odds from supported sportsbooks.
 """
 
-from fastapi import APIRouter, HTTPException, status, Query
+import json
+import re
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from config.sports import SUPPORTED_SPORTS
 from services.validated_odds import (
-    get_validated_odds,
     OddsAPIError,
     OddsValidationError,
     SUPPORTED_SPORTSBOOKS
 )
-from config.sports import SUPPORTED_SPORTS, get_sports_by_category
+from services.line_history import get_line_history
+from services.odds_query import IndexCache, OddsQuery, OddsQueryError, MAX_PAGE_SIZE, parse_query
+from services.snapshot_store import get_snapshot_store, valid_sport_key
+from services.stale_odds import (
+    get_cached_market_snapshot,
+    get_odds_snapshot,
+    mark_stale,
+    STALE_MAX_AGE_SECONDS
+)
+from services.sports_catalog import catalog
+from utils.http_cache import RepresentationCache, cached_response, content_tag, encode_body
+from utils.wire_formats import columns, negotiated_response
+from utils.logger import record_cache
 
 router = APIRouter(prefix="/api/odds", tags=["odds"])
 
+# Encoded + compressed bodies, rebuilt once per snapshot version
+representations = RepresentationCache()
+
+# Filtered pages (one entry per distinct query) and the indexes behind them
+query_representations = RepresentationCache(max_items=512)
+indexes = IndexCache()
+
+_MARKET_KEY = re.compile(r"^[a-z0-9_]+$")
+MAX_MARKETS_PER_REQUEST = 10
+
+
+def _require_supported(sport_key: str):
+    """422 for a sport outside config.sports.SUPPORTED_SPORTS, before any upstream call or want."""
+    if sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Unsupported sport", "message": f"{sport_key} is not a supported sport key"}
+        )
+
 
 @router.get("/{sport_key}")
-def get_odds_for_sport(sport_key: str):
+def get_odds_for_sport(
+    sport_key: str,
+    request: Request,
+    books: Optional[str] = Query(None, description="Comma-separated bookmaker keys"),
+    team: Optional[str] = Query(None, max_length=100, description="Team name or part of one"),
+    commence_from: Optional[datetime] = Query(None, description="Events starting at or after"),
+    commence_to: Optional[datetime] = Query(None, description="Events starting at or before"),
+    min_price: Optional[float] = Query(None, description="Only outcomes at or above this decimal price"),
+    max_price: Optional[float] = Query(None, description="Only outcomes at or below this decimal price"),
+    fields: Optional[str] = Query(None, description="Comma-separated event fields to return"),
+    limit: Optional[int] = Query(None, description=f"Page size (1-{MAX_PAGE_SIZE})"),
+    offset: int = Query(0, description="Matches to skip")
+):
     """
     Get validated odds for a sport.
 
@@ -27,6 +75,24 @@ def get_odds_for_sport(sport_key: str):
     - Odds in valid range (> 1.0 decimal)
     - Head-to-head markets only (no spreads/totals in MVP)
 
+    Odds are served from a snapshot at most ODDS_SNAPSHOT_INTERVAL (+ fetch
+    time) old: this process's own, or with ODDS_SNAPSHOT_DIR set the one
+    shared by all workers. Responses carry an ETag per snapshot version;
+    If-None-Match gets a 304 until the snapshot changes, and large bodies
+    are gzip/brotli compressed once per version.
+
+    During an Odds API outage the last good snapshot is served with
+    "stale": true and its age (see services.stale_odds); EV calculation
+    rejects odds from it once they are over 60 seconds old.
+
+    Query parameters filter, project and paginate the snapshot from indexes
+    built once per version (see services.odds_query); filtered responses
+    add total_events, offset, limit and next_offset, and get their own ETag.
+
+    Accept: application/msgpack or application/vnd.apache.arrow.stream
+    (one row per outcome price) returns the same odds in a binary format,
+    encoded once per version (see utils.wire_formats).
+
     Args:
         sport_key: Sport identifier (e.g., 'americanfootball_nfl')
 
@@ -34,23 +100,61 @@ def get_odds_for_sport(sport_key: str):
         Validated odds with timestamps and source attribution
 
     Raises:
-        503: Odds API unavailable
+        422: Unsupported sport key, or invalid query parameters
+        503: Odds API unavailable and no snapshot to fall back on
         500: Validation error
     """
+    _require_supported(sport_key)
     try:
-        validated = get_validated_odds(sport_key)
-
-        return {
-            "events": [event.dict() for event in validated.events],
-            "retrieved_at": validated.retrieved_at.isoformat() + "Z",
-            "api_requests_remaining": validated.api_requests_remaining,
-            "api_requests_used": validated.api_requests_used,
-            "source": validated.source,
-            "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.keys()),
-            "max_odds_age_seconds": 60
-        }
+        query = parse_query(books, team, commence_from, commence_to, min_price, max_price, fields, limit, offset)
+    except OddsQueryError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid query", "message": str(e)}
+        )
+
+    # Off-season: the live catalog says there is nothing to fetch
+    if not catalog.is_active(sport_key):
+        return negotiated_response(request, _inactive_sport_body(sport_key), odds_table)
+
+    # Multi-worker mode: serve the snapshot the leader worker published
+    store = get_snapshot_store()
+    if store is not None and valid_sport_key(sport_key):
+        snapshot = store.read_fresh(sport_key)
+        record_cache(snapshot is not None)
+        if snapshot is not None:
+            version = f"{snapshot.seq:x}-{int(snapshot.published_at * 1_000_000):x}"
+            if query is not None:
+                return _query_response(request, sport_key, version, lambda: json.loads(snapshot.payload), query)
+            representation = representations.get(sport_key, version, lambda: snapshot.payload)
+            return cached_response(request, representation, odds_table)
+
+    try:
+        snapshot, stale, cached = get_odds_snapshot(sport_key)
+        if store is None:
+            record_cache(cached)
+        if stale:
+            # Age changes on every request: no ETag
+            body = snapshot.body
+            if query is not None:
+                body = indexes.get(sport_key, snapshot.version, lambda: snapshot.body).answer(query)
+            return negotiated_response(request, mark_stale(body, snapshot.fetched_at), odds_table)
+        if query is not None:
+            return _query_response(request, sport_key, snapshot.version, lambda: snapshot.body, query)
+        representation = representations.get(sport_key, snapshot.version, lambda: encode_body(snapshot.body))
+        return cached_response(request, representation, odds_table)
 
     except OddsAPIError as e:
+        # Multi-worker mode: the shared snapshot outlives this worker's memory
+        if store is not None and valid_sport_key(sport_key):
+            snapshot = store.read(sport_key)
+            if snapshot is not None and snapshot.age <= STALE_MAX_AGE_SECONDS:
+                body = json.loads(snapshot.payload)
+                if query is not None:
+                    body = indexes.get(
+                        sport_key, f"{snapshot.seq:x}-{int(snapshot.published_at * 1_000_000):x}", lambda: body
+                    ).answer(query)
+                return negotiated_response(request, mark_stale(body, snapshot.published_at), odds_table)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail={
@@ -78,17 +182,198 @@ def get_odds_for_sport(sport_key: str):
         )
 
 
-@router.get("/sports/available")
-def get_available_sports():
+@router.get("/{sport_key}/markets")
+def get_markets_for_sport(
+    sport_key: str,
+    markets: str = Query("h2h,spreads,totals", description="Comma-separated market keys"),
+    event_id: Optional[str] = Query(None, description="Required for player props and alternate lines")
+):
+    """
+    Get validated odds for several markets (h2h, spreads, totals, props).
+
+    Served from a columnar snapshot (services.market_store) reused for
+    ODDS_SNAPSHOT_INTERVAL. Each requested market costs upstream quota.
+    Outcomes carry "point" for spreads/totals/props and "description"
+    (the player) for props.
+
+    Raises:
+        422: Unsupported sport key, invalid market list, or props requested without event_id
+        503: Odds API unavailable
+    """
+    _require_supported(sport_key)
+    keys = tuple(dict.fromkeys(key.strip() for key in markets.split(",") if key.strip()))
+    if not keys or len(keys) > MAX_MARKETS_PER_REQUEST or not all(_MARKET_KEY.match(key) for key in keys):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "Invalid markets",
+                "message": f"Give 1-{MAX_MARKETS_PER_REQUEST} comma-separated market keys, e.g. h2h,spreads,totals"
+            }
+        )
+
+    try:
+        snapshot = get_cached_market_snapshot(sport_key, keys, event_id)
+    except OddsValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid markets", "message": str(e)}
+        )
+    except OddsAPIError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Odds API unavailable", "message": str(e)}
+        )
+
+    return {
+        "events": snapshot.to_events(),
+        "markets": list(keys),
+        "rows": len(snapshot),
+        "retrieved_at": snapshot.retrieved_at.isoformat() + "Z",
+        "api_requests_remaining": snapshot.meta.get("x-requests-remaining"),
+        "api_requests_used": snapshot.meta.get("x-requests-used"),
+        "source": "the-odds-api-v4",
+        "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.keys()),
+        "max_odds_age_seconds": 60
+    }
+
+
+@router.get("/{sport_key}/history")
+def get_line_history_for_event(
+    sport_key: str,
+    request: Request,
+    event_id: str = Query(..., description="Odds API event id"),
+    book: Optional[str] = Query(None, description="Bookmaker key"),
+    market: Optional[str] = Query(None, description="Market key, e.g. h2h"),
+    outcome: Optional[str] = Query(None, description="Outcome, e.g. a team name or 'Lakers -5.5'"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None)
+):
     """
-    Get list of supported sports with categories.
+    Price history (every recorded change) for one event, oldest first.
 
-    Returns sports grouped by category (NFL, NBA, Soccer, etc.)
+    Narrow it to one line with book, market and outcome. Served from the
+    line history (services.line_history); Accept msgpack or Arrow for the
+    binary formats.
+
+    Raises:
+        422: Invalid sport key
+        503: Line history is not enabled (LINE_HISTORY_DIR)
     """
+    history = get_line_history()
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "Line history unavailable", "message": "LINE_HISTORY_DIR is not set"}
+        )
+    if not valid_sport_key(sport_key):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "Invalid sport key", "message": sport_key}
+        )
+    ticks = history.history(
+        sport_key, event_id, book=book, market=market, outcome=outcome,
+        since=_unix_seconds(since), until=_unix_seconds(until)
+    )
+    body = {
+        "sport_key": sport_key,
+        "event_id": event_id,
+        "ticks": [
+            {
+                "timestamp": datetime.utcfromtimestamp(tick.timestamp).isoformat() + "Z",
+                "book": tick.book,
+                "market": tick.market,
+                "outcome": tick.outcome,
+                "price": tick.price
+            }
+            for tick in ticks
+        ],
+        "count": len(ticks)
+    }
+    return negotiated_response(request, body, _history_table)
+
+
+def _unix_seconds(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return value.timestamp()
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _history_table(body: dict):
+    envelope = {key: value for key, value in body.items() if key != "ticks"}
+    return columns(body["ticks"], timestamps=("timestamp",)), envelope
+
+
+def _query_response(request: Request, sport_key: str, version: str, body: Callable[[], dict], query: OddsQuery):
+    """Filtered page for a snapshot version; built once per (version, query)."""
+    canonical = query.canonical()
+    representation = query_representations.get(
+        f"{sport_key}?{canonical}", content_tag(f"{version}?{canonical}".encode()),
+        lambda: encode_body(indexes.get(sport_key, version, body).answer(query))
+    )
+    return cached_response(request, representation, odds_table)
+
+
+def odds_table(body: dict):
+    """Arrow form of an odds body: one row per outcome price, envelope in metadata."""
+    rows = []
+    for event in body["events"]:
+        base = {"event_id": event["id"]}
+        base.update((key, event[key]) for key in ("sport_key", "commence_time", "home_team", "away_team") if key in event)
+        if "bookmakers" not in event:  # projected away: one row per event
+            rows.append(base)
+            continue
+        for book in event["bookmakers"]:
+            for outcome in book["outcomes"]:
+                rows.append({
+                    **base,
+                    "book": book["key"],
+                    "book_title": book["title"],
+                    "last_update": book["last_update"],
+                    "outcome": outcome["name"],
+                    "price": outcome["price"]
+                })
+    envelope = {key: value for key, value in body.items() if key != "events"}
+    return columns(rows, timestamps=("commence_time", "last_update")), envelope
+
+
+def _inactive_sport_body(sport_key: str) -> dict:
+    state = catalog.state
     return {
-        "sports": SUPPORTED_SPORTS,
-        "by_category": get_sports_by_category(),
-        "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.values()),
-        "total_sports": len(SUPPORTED_SPORTS),
-        "total_sportsbooks": len(SUPPORTED_SPORTSBOOKS)
+        "events": [],
+        "retrieved_at": state.refreshed_at.isoformat() + "Z",
+        "source": "the-odds-api-v4",
+        "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.keys()),
+        "max_odds_age_seconds": 60,
+        "stale": False,
+        "sport_active": False,
+        "message": f"{sport_key} has no active season at the moment"
     }
+
+
+def _sports_catalog_body(state) -> bytes:
+    return encode_body({
+        "sports": state.sports,
+        "by_category": state.by_category,
+        "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.values()),
+        "total_sports": len(state.sports),
+        "total_sportsbooks": len(SUPPORTED_SPORTSBOOKS),
+        "catalog": "live" if state.live else "static"
+    })
+
+
+@router.get("/sports/available")
+def get_available_sports(request: Request):
+    """
+    Get list of supported sports that are currently in season, with categories.
+
+    Returns sports grouped by category (NFL, NBA, Soccer, etc.) from the
+    sports catalog cache (services.sports_catalog); the full supported list
+    until the first successful refresh. The ETag changes with the active set.
+    """
+    state = catalog.state
+    representation = representations.get(
+        "sports:available", content_tag(state.version.encode()), lambda: _sports_catalog_body(state)
+    )
+    return cached_response(request, representation)
@@ -0,0 +1,631 @@
+"""
+EV alert rules ("any NBA moneyline at FanDuel with EV > 2% vs consensus"),
+evaluated on every odds refresh.
+
+A rule matches a price when the book's price beats the weighted no-vig
+consensus (services.consensus) of the outcome by at least min_edge:
+
+    edge = consensus probability × price - 1    (EV per unit staked)
+
+with optional filters: books (empty: any), event_id and outcome (a
+watchlist), a price range and the fewest books behind the consensus.
+
+Rules are indexed, so a refresh costs nothing per rule that cannot match:
+
+    (sport, market) → book (or "*" for any book) → rules sorted by min_edge
+
+Only (event, market) groups with a changed price are evaluated (a changed
+price moves the consensus too, so every book of the group is re-checked).
+For each (book, outcome) price the edge is computed once and the rules
+that can match are the prefix of the book's and the "*" bucket with
+min_edge <= edge, found by bisection - O(log rules) when nothing fires,
+whatever the rule count.
+
+An alert fires once per (rule, event, market, book, outcome) and is
+re-armed when the edge drops back below the rule's min_edge, so a price
+sitting above the threshold across refreshes alerts once. Alerts are kept
+in a ring buffer with increasing ids for GET /api/alerts and the per-user
+event stream, and handed to the sinks (WebhookSink: POSTs them as JSON to
+ALERT_WEBHOOK_URL from a background thread).
+
+Rules live in memory, or in ALERT_RULES_FILE: every change is made under
+an flock on the file's lock and written atomically, and each worker
+reloads the file when it changes, so all workers share one rule set. Like
+line moves, evaluation is per process; with shared snapshots only the
+snapshot leader posts to the webhook, so each alert is delivered once.
+
+Sports with rules (supported sports only) are kept refreshing
+(stale_odds.keep_fresh) while the engine runs, whether or not anyone is
+watching the board.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime, timezone
+from queue import Empty, Full, Queue
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config.sports import SUPPORTED_SPORTS
+from services.consensus import ConsensusEngine
+from services.line_history import Tick
+from utils.metrics import ALERTS, ALERT_WEBHOOK_FAILURES
+
+logger = logging.getLogger("ironman")
+
+# Alerts kept for GET /api/alerts and for stream clients catching up
+RECENT_ALERTS = 5000
+
+# Rules one user may have
+MAX_RULES_PER_USER = 200
+
+# Rules in total
+MAX_RULES = 100_000
+
+# Seconds between checks of ALERT_RULES_FILE for changes made by other workers
+RELOAD_SECONDS = 2.0
+
+# Seconds between keep-fresh calls for the sports with rules
+KEEP_FRESH_SECONDS = 5.0
+
+# Prices not refreshed for this long are forgotten (finished events)
+PRICE_TTL_SECONDS = 6 * 3600.0
+
+# Seconds between sweeps for forgotten prices
+SWEEP_SECONDS = 600.0
+
+ANY_BOOK = "*"
+
+
+class AlertError(Exception):
+    """Invalid alert rule, or too many rules"""
+    pass
+
+
+class AlertRule(NamedTuple):
+    id: str
+    user: str
+    sport_key: str
+    market: str = "h2h"
+    books: Tuple[str, ...] = ()  # empty: any book
+    min_edge: float = 0.02  # EV per unit staked vs the consensus (0.02 = 2%)
+    min_books: int = 3  # books behind the consensus probability
+    min_price: float = 1.0
+    max_price: float = 1000.0
+    event_id: Optional[str] = None
+    outcome: Optional[str] = None
+    created_at: float = 0.0
+
+    def matches(self, event_id: str, outcome: str, price: float, books: int) -> bool:
+        return (
+            books >= self.min_books
+            and self.min_price <= price <= self.max_price
+            and (self.event_id is None or self.event_id == event_id)
+            and (self.outcome is None or self.outcome == outcome)
+        )
+
+    def as_dict(self) -> dict:
+        rule = self._asdict()
+        rule["books"] = list(self.books)
+        rule["created_at"] = _iso(self.created_at)
+        return rule
+
+
+# What a user sets on a rule (the rest is assigned)
+RULE_FIELDS = AlertRule._fields[3:-1]
+
+
+def make_rule(user: str, sport_key: str, now: Optional[float] = None, **fields) -> AlertRule:
+    """
+    A new rule with a fresh id.
+
+    Raises:
+        AlertError: unknown field, or a value out of range
+    """
+    unknown = set(fields) - set(RULE_FIELDS)
+    if unknown:
+        raise AlertError(f"Unknown alert rule field(s): {', '.join(sorted(unknown))}")
+    if not user or not sport_key:
+        raise AlertError("An alert rule needs a user and a sport_key")
+    fields["books"] = tuple(sorted(set(fields.get("books") or ())))
+    rule = AlertRule(uuid.uuid4().hex[:16], user, sport_key, created_at=time.time() if now is None else now,
+                     **fields)
+    if not -1 < rule.min_edge < 10:
+        raise AlertError(f"min_edge must be between -1 and 10, got {rule.min_edge}")
+    if rule.min_books < 1:
+        raise AlertError(f"min_books must be at least 1, got {rule.min_books}")
+    if not 1 <= rule.min_price <= rule.max_price:
+        raise AlertError(f"Need 1 <= min_price <= max_price, got {rule.min_price} and {rule.max_price}")
+    return rule
+
+
+class Alert(NamedTuple):
+    id: int
+    rule_id: str
+    user: str
+    sport_key: str
+    event_id: str
+    market: str
+    outcome: str
+    book: str
+    price: float
+    fair_probability: float
+    edge: float
+    books: int  # behind the consensus
+    line_timestamp: float  # the book's last_update
+    triggered_at: float
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "rule_id": self.rule_id,
+            "user": self.user,
+            "sport_key": self.sport_key,
+            "event_id": self.event_id,
+            "market": self.market,
+            "outcome": self.outcome,
+            "book": self.book,
+            "price": self.price,
+            "fair_probability": round(self.fair_probability, 6),
+            "fair_odds": round(1 / self.fair_probability, 4),
+            "edge": round(self.edge, 4),
+            "books": self.books,
+            "line_timestamp": _iso(self.line_timestamp),
+            "triggered_at": _iso(self.triggered_at),
+        }
+
+
+def _iso(ts: float) -> Optional[str]:
+    if ts != ts:  # NaN: the book sent no usable last_update
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _Bucket:
+    """Rules of one (sport, market, book), sorted by min_edge."""
+
+    __slots__ = ("edges", "ids")
+
+    def __init__(self):
+        self.edges: List[float] = []
+        self.ids: List[str] = []
+
+    def add(self, rule: AlertRule):
+        index = bisect_right(self.edges, rule.min_edge)
+        self.edges.insert(index, rule.min_edge)
+        self.ids.insert(index, rule.id)
+
+    def remove(self, rule: AlertRule):
+        index = self.ids.index(rule.id)
+        del self.edges[index], self.ids[index]
+
+    def matching(self, edge: float) -> List[str]:
+        return self.ids[:bisect_right(self.edges, edge)]
+
+    def between(self, low: float, high: float) -> List[str]:
+        """Rules with low < min_edge <= high."""
+        return self.ids[bisect_right(self.edges, low):bisect_right(self.edges, high)]
+
+
+class _Line:
+    """Last evaluation of one (book, outcome) price."""
+
+    __slots__ = ("edge", "price", "books", "version", "matched")
+
+    def __init__(self, edge: float, price: float, books: int, version: int, matched: set):
+        self.edge = edge
+        self.price = price
+        self.books = books
+        self.version = version  # of the rule set
+        self.matched = matched  # rules alerted and still above their min_edge
+
+
+class _Group:
+    """Current prices of one (event, market) across books."""
+
+    __slots__ = ("prices", "lines", "updated")
+
+    def __init__(self):
+        self.prices: Dict[Tuple[str, str], Tuple[float, float]] = {}  # (book, outcome) → (price, last_update)
+        self.lines: Dict[Tuple[str, str], _Line] = {}
+        self.updated = 0.0
+
+
+class AlertEngine:
+    def __init__(self, consensus: ConsensusEngine, rules_file: str = "", recent: int = RECENT_ALERTS):
+        self.consensus = consensus
+        self.rules_file = rules_file
+        self.sinks: List[Callable[[List[Alert]], object]] = []
+        self._rules: Dict[str, AlertRule] = {}
+        self._version = 0  # bumped on every rule change
+        self._per_user: Dict[str, int] = {}
+        self._index: Dict[Tuple[str, str], Dict[str, _Bucket]] = {}  # (sport, market) → book → bucket
+        self._groups: Dict[Tuple[str, str, str], _Group] = {}  # (sport, event, market)
+        self._recent: Deque[Alert] = deque(maxlen=recent)
+        self._last_id = 0
+        self._file_mtime = None
+        self._checked_at = 0.0
+        self._swept_at = 0.0
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if rules_file:
+            self._reload(force=True)
+
+    # --- Rules ---
+
+    def rules(self, user: Optional[str] = None) -> List[AlertRule]:
+        self._reload()
+        with self._lock:
+            return [rule for rule in self._rules.values() if user is None or rule.user == user]
+
+    def sports(self) -> List[str]:
+        with self._lock:
+            return sorted({sport_key for sport_key, _ in self._index})
+
+    def add_rule(self, rule: AlertRule) -> AlertRule:
+        """Raises AlertError when the user or the engine is at its rule limit."""
+        def add(rules: Dict[str, AlertRule], per_user: Dict[str, int]):
+            if len(rules) >= MAX_RULES:
+                raise AlertError(f"Alert rule limit reached ({MAX_RULES})")
+            if per_user.get(rule.user, 0) >= MAX_RULES_PER_USER:
+                raise AlertError(f"{rule.user} already has {MAX_RULES_PER_USER} alert rules")
+            rules[rule.id] = rule
+            return [rule], []
+        self._change(add)
+        return rule
+
+    def remove_rule(self, rule_id: str, user: Optional[str] = None) -> bool:
+        """False if there is no such rule (of that user)."""
+        removed = []
+
+        def remove(rules: Dict[str, AlertRule], per_user: Dict[str, int]):
+            rule = rules.get(rule_id)
+            if rule is not None and (user is None or rule.user == user):
+                removed.append(rules.pop(rule_id))
+            return [], removed
+        self._change(remove)
+        return bool(removed)
+
+    def _change(self, apply: Callable[[Dict[str, AlertRule], Dict[str, int]], tuple]):
+        """apply(rules, rules per user) edits the rules and returns (added, removed)."""
+        with self._lock:
+            if not self.rules_file:
+                added, removed = apply(self._rules, self._per_user)
+                for rule in removed:
+                    self._unindex(rule)
+                for rule in added:
+                    self._index_rule(rule)
+                self._version += 1
+                return
+            # Read-modify-write under the lock, so workers never lose each other's changes
+            with open(self.rules_file + ".lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                rules = self._read_file()
+                per_user: Dict[str, int] = {}
+                for rule in rules.values():
+                    per_user[rule.user] = per_user.get(rule.user, 0) + 1
+                apply(rules, per_user)
+                tmp = f"{self.rules_file}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"rules": [rule._asdict() for rule in rules.values()]}, f)
+                os.replace(tmp, self.rules_file)
+                self._file_mtime = os.stat(self.rules_file).st_mtime_ns
+                self._set_rules(rules)
+
+    def _read_file(self) -> Dict[str, AlertRule]:
+        try:
+            with open(self.rules_file) as f:
+                stored = json.load(f)["rules"]
+        except FileNotFoundError:
+            return {}
+        rules = {}
+        for fields in stored:
+            fields["books"] = tuple(fields["books"])
+            rule = AlertRule(**fields)
+            rules[rule.id] = rule
+        return rules
+
+    def _reload(self, force: bool = False):
+        """Pick up rule changes other workers wrote to ALERT_RULES_FILE."""
+        if not self.rules_file:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.rules_file).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._file_mtime and not force:
+            return
+        try:
+            rules = self._read_file()
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Could not read alert rules from {self.rules_file}: {e}")
+            return
+        with self._lock:
+            self._file_mtime = mtime
+            self._set_rules(rules)
+
+    def _set_rules(self, rules: Dict[str, AlertRule]):
+        """Swap in a rule set read from the file, re-indexing what was added or removed."""
+        for rule_id in set(self._rules) - set(rules):
+            self._unindex(self._rules[rule_id])
+        for rule_id in set(rules) - set(self._rules):
+            self._index_rule(rules[rule_id])
+        self._rules = rules
+        self._version += 1
+
+    def _index_rule(self, rule: AlertRule):
+        self._per_user[rule.user] = self._per_user.get(rule.user, 0) + 1
+        by_book = self._index.setdefault((rule.sport_key, rule.market), {})
+        for book in rule.books or (ANY_BOOK,):
+            by_book.setdefault(book, _Bucket()).add(rule)
+
+    def _unindex(self, rule: AlertRule):
+        self._per_user[rule.user] -= 1
+        if not self._per_user[rule.user]:
+            del self._per_user[rule.user]
+        key = (rule.sport_key, rule.market)
+        by_book = self._index[key]
+        for book in rule.books or (ANY_BOOK,):
+            by_book[book].remove(rule)
+            if not by_book[book].ids:
+                del by_book[book]
+        if not by_book:
+            del self._index[key]
+
+    # --- Evaluation ---
+
+    def observe(self, sport_key: str, ticks: Iterable[Tick], now: Optional[float] = None) -> List[Alert]:
+        """Feed one refresh (after the consensus engine); returns the alerts it triggered."""
+        now = time.time() if now is None else now
+        self._reload()
+        found = []
+        with self._lock:
+            index, groups = self._index, self._groups
+            changed = set()
+            for tick in ticks:
+                if (sport_key, tick.market) not in index:
+                    continue
+                key = (sport_key, tick.event_id, tick.market)
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = _Group()
+                group.updated = now
+                line = (tick.book, tick.outcome)
+                previous = group.prices.get(line)
+                if previous is None or previous[0] != tick.price:
+                    changed.add(key)
+                group.prices[line] = (tick.price, tick.timestamp)
+            for key in changed:
+                found += self._evaluate(key, groups[key], now)
+            if now - self._swept_at >= SWEEP_SECONDS:
+                self._sweep(now)
+        if found:
+            ALERTS.labels(sport_key).inc(len(found))
+            for sink in self.sinks:
+                try:
+                    sink(found)
+                except Exception as e:
+                    logger.warning(f"Alert sink failed: {e}")
+        return found
+
+    def _evaluate(self, key: Tuple[str, str, str], group: _Group, now: float) -> List[Alert]:
+        sport_key, event_id, market = key
+        consensus = self.consensus.consensus(sport_key, event_id, market, now)
+        if consensus is None:
+            return []
+        by_book = self._index.get((sport_key, market), {})
+        anywhere = by_book.get(ANY_BOOK)
+        found = []
+        for line, (price, line_ts) in group.prices.items():
+            book, outcome = line
+            fair = consensus.outcomes.get(outcome)
+            previous = group.lines.get(line)
+            if fair is None:
+                group.lines.pop(line, None)
+                continue
+            edge = fair.probability * price - 1
+            buckets = [bucket for bucket in (by_book.get(book), anywhere) if bucket is not None]
+            if (previous is not None and previous.price == price and previous.books == fair.books
+                    and previous.version == self._version):
+                # Only the consensus moved: just the rules whose min_edge the edge crossed
+                matched, alerted = previous.matched, ()
+                if edge < previous.edge:
+                    for bucket in buckets:
+                        matched.difference_update(bucket.between(edge, previous.edge))
+                    fresh = ()
+                else:
+                    fresh = [rule_id for bucket in buckets for rule_id in bucket.between(previous.edge, edge)]
+            else:
+                # Rules still matching from before are not alerted again
+                matched, alerted = set(), previous.matched if previous is not None else ()
+                fresh = [rule_id for bucket in buckets for rule_id in bucket.matching(edge)]
+            for rule_id in fresh:
+                rule = self._rules[rule_id]
+                if not rule.matches(event_id, outcome, price, fair.books):
+                    continue
+                matched.add(rule_id)
+                if rule_id in alerted:
+                    continue
+                self._last_id = max(self._last_id + 1, int(now * 1_000_000))
+                alert = Alert(
+                    self._last_id, rule_id, rule.user, sport_key, event_id, market, outcome, book,
+                    price, fair.probability, edge, fair.books, line_ts, now
+                )
+                self._recent.append(alert)
+                found.append(alert)
+            group.lines[line] = _Line(edge, price, fair.books, self._version, matched)
+        return found
+
+    def _sweep(self, now: float):
+        cutoff = now - PRICE_TTL_SECONDS
+        for key in [k for k, group in self._groups.items() if group.updated < cutoff]:
+            del self._groups[key]
+        self._swept_at = now
+
+    # --- Reads ---
+
+    @property
+    def latest_id(self) -> int:
+        return self._last_id
+
+    def since(self, after_id: int, user: Optional[str] = None) -> List[Alert]:
+        """Alerts with id > after_id, oldest first (only what is still in the buffer)."""
+        with self._lock:
+            newer = []
+            for alert in reversed(self._recent):
+                if alert.id <= after_id:
+                    break
+                newer.append(alert)
+        return [alert for alert in reversed(newer) if user is None or alert.user == user]
+
+    # --- Background ---
+
+    def _loop(self):
+        from services.stale_odds import keep_fresh
+        while not self._stop.is_set():
+            self._reload()
+            for sport_key in self.sports():
+                # A rules file may predate the route's check: never poll an unsupported key
+                if sport_key in SUPPORTED_SPORTS:
+                    keep_fresh(sport_key)
+            self._stop.wait(KEEP_FRESH_SECONDS)
+
+    def start(self):
+        """Keep the sports with rules refreshing, and start the sinks."""
+        for sink in self.sinks:
+            if hasattr(sink, "start"):
+                sink.start()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="alert-keep-fresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        for sink in self.sinks:
+            if hasattr(sink, "stop"):
+                sink.stop()
+
+
+class WebhookSink:
+    """
+    POSTs alerts as {"alerts": [...]} to a URL, in batches, from a
+    background thread (a slow receiver never holds up a refresh; when the
+    queue is full alerts are dropped and counted). gate() false skips
+    delivery - with shared snapshots only the leader worker posts.
+    """
+
+    def __init__(self, url: str, gate: Optional[Callable[[], bool]] = None, timeout: float = 5.0,
+                 max_queue: int = 10_000, batch: int = 100):
+        self.url = url
+        self.gate = gate
+        self.timeout = timeout
+        self.batch = batch
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __call__(self, alerts: List[Alert]):
+        if self.gate is not None and not self.gate():
+            return
+        for alert in alerts:
+            try:
+                self._queue.put_nowait(alert)
+            except Full:
+                ALERT_WEBHOOK_FAILURES.labels("dropped").inc()
+
+    def flush(self, session=None) -> int:
+        """Post what is queued; returns how many alerts were delivered."""
+        delivered = 0
+        while True:
+            alerts = []
+            while len(alerts) < self.batch:
+                try:
+                    alerts.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            if not alerts:
+                return delivered
+            try:
+                if session is None:
+                    import requests
+                    session = requests.Session()
+                response = session.post(self.url, json={"alerts": [a.as_dict() for a in alerts]},
+                                        timeout=self.timeout)
+                response.raise_for_status()
+                delivered += len(alerts)
+            except Exception as e:
+                ALERT_WEBHOOK_FAILURES.labels("error").inc(len(alerts))
+                logger.warning(f"Alert webhook delivery to {self.url} failed ({len(alerts)} alerts): {e}")
+
+    def _loop(self):
+        import requests
+        session = requests.Session()
+        while not self._stop.is_set():
+            self.flush(session)
+            self._stop.wait(0.5)
+        self.flush(session)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="alert-webhook", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout + 5)
+
+
+_engine: Optional[AlertEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> Optional[AlertEngine]:
+    """Process-wide engine, or None when ALERTS_ENABLED (or CONSENSUS_ENABLED) is off."""
+    global _engine
+    if _engine is None:
+        from config.settings import settings
+        from services.consensus import get_consensus_engine
+        if not settings.ALERTS_ENABLED:
+            return None
+        consensus = get_consensus_engine()
+        if consensus is None:
+            return None
+        with _engine_lock:
+            if _engine is None:
+                _engine = AlertEngine(consensus, settings.ALERT_RULES_FILE)
+    return _engine
+
+
+def set_alert_engine(engine: Optional[AlertEngine]):
+    """Override the process-wide engine (tests)."""
+    global _engine
+    _engine = engine
+
+
+def evaluate_alerts(sport_key: str, ticks: Iterable[Tick]):
+    """Feed a refresh if alerts are enabled; never lets evaluation fail the refresh."""
+    engine = get_alert_engine()
+    if engine is None:
+        return
+    try:
+        engine.observe(sport_key, ticks)
+    except Exception as e:
+        logger.warning(f"Alert evaluation failed for {sport_key}: {e}")
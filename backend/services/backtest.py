@@ -0,0 +1,404 @@
+"""
+EV backtesting over the recorded line history.
+
+Replays the h2h ticks recorded by services.line_history in time order and
+applies a selection rule at every price change: the current price at a
+book is compared with the no-vig consensus across books (each book's
+implied probabilities normalized to 1 and averaged, as in
+closing_line_service.no_vig_consensus), and a hypothetical bet is placed
+when the rule accepts it - by default when
+
+    edge = price × consensus probability - 1 >= min_edge
+
+Each bet is placed at most once per (event, outcome), at the first price
+that qualifies, and valued like a logged bet:
+
+- ev: calculate_straight_bet_ev with the consensus probability as the
+  true probability
+- clv: bet_metrics.closing_line_value against the same book's last
+  recorded price before commence_time (or its last price if the results
+  carry no commence_time)
+- result and pnl: settlement_service.bet_result / bet_metrics.realized_pnl
+  against final scores (bets on events without a result stay open)
+
+The report has ROI on settled stake, expected ROI, CLV and the maximum
+drawdown of cumulative P&L in bet order.
+
+Work is split into one partition per (sport, UTC day) and run on a
+process pool. History only records changes, so each partition first
+replays the WARMUP_SECONDS before its day without betting (the writer
+re-records every line at least that often).
+
+Rules are declarative (BacktestRule); for anything else, set `select` to
+an importable top-level function taking a Candidate and returning a bool
+(it is pickled to the worker processes).
+
+    python -m services.backtest --sports basketball_nba --from 2025-01-01 --to 2025-03-31 \\
+        --min-edge 0.03 --results results.json --workers 8
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.bet_metrics import closing_line_value, realized_pnl
+from services.ev_calculator import EVCalculationError, calculate_straight_bet_ev
+from services.line_history import SEGMENT_SECONDS, LineHistory
+from services.settlement_service import bet_result
+
+logger = logging.getLogger("ironman")
+
+# Replayed before each partition's day to rebuild the prices in effect at midnight
+WARMUP_SECONDS = 2 * SEGMENT_SECONDS
+
+# Odds are historical by definition: calculate_straight_bet_ev's freshness check does not apply
+_ANY_AGE = 10 ** 12
+
+ODDS_SOURCE = "backtest"
+
+
+class BacktestError(Exception):
+    """Invalid backtest parameters"""
+    pass
+
+
+class Candidate(NamedTuple):
+    """A price the rule is asked about."""
+    timestamp: float
+    sport_key: str
+    event_id: str
+    book: str
+    outcome: str
+    price: float
+    fair_probability: float  # no-vig consensus
+    edge: float  # price × fair_probability - 1
+    books: int  # books in the consensus
+
+
+class BacktestRule(NamedTuple):
+    min_edge: float = 0.03
+    min_books: int = 3  # books with a full set of prices needed for a consensus
+    books: Optional[FrozenSet[str]] = None  # books you can bet at; None = any
+    min_price: float = 1.01
+    max_price: float = 1000.0
+    stake: float = 100.0
+    select: Optional[Callable[[Candidate], bool]] = None  # extra predicate, top-level function
+
+    def accepts(self, candidate: Candidate) -> bool:
+        return (candidate.edge >= self.min_edge
+                and self.min_price <= candidate.price <= self.max_price
+                and (self.books is None or candidate.book in self.books)
+                and (self.select is None or bool(self.select(candidate))))
+
+    def describe(self) -> dict:
+        rule = self._asdict()
+        rule["books"] = sorted(self.books) if self.books is not None else None
+        rule["select"] = f"{self.select.__module__}:{self.select.__qualname__}" if self.select else None
+        return rule
+
+
+class BacktestBet(NamedTuple):
+    placed_at: float
+    sport_key: str
+    event_id: str
+    book: str
+    outcome: str
+    price: float
+    fair_probability: float
+    stake: float
+    ev: float
+    closing_price: Optional[float]
+    clv: Optional[float]
+    result: Optional[str]  # win / lose / push, None while the event has no result
+    pnl: Optional[float]
+
+
+class Partition(NamedTuple):
+    directory: str
+    sport_key: str
+    day: date
+    rule: BacktestRule
+    results: Dict[str, dict]  # event_id → result (settlement_service format, optional commence_time)
+
+
+class PartitionResult(NamedTuple):
+    sport_key: str
+    day: date
+    ticks: int
+    bets: List[BacktestBet]
+
+
+def _unix(value) -> Optional[float]:
+    """Datetime or ISO string (naive = UTC) → unix seconds."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _day_start(day: date) -> float:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def consensus(prices: Dict[str, Dict[str, float]], min_books: int) -> Tuple[Dict[str, float], int]:
+    """
+    No-vig probability per outcome from the books quoting every outcome
+    seen for the event; ({}, n) when fewer than min_books do.
+    """
+    outcomes = set()
+    for book_prices in prices.values():
+        outcomes.update(book_prices)
+    totals = dict.fromkeys(outcomes, 0.0)
+    books = 0
+    for book_prices in prices.values():
+        if len(book_prices) != len(outcomes):
+            continue
+        implied = {name: 1 / price for name, price in book_prices.items()}
+        margin = sum(implied.values())
+        for name, probability in implied.items():
+            totals[name] += probability / margin
+        books += 1
+    if books < min_books:
+        return {}, books
+    return {name: total / books for name, total in totals.items()}, books
+
+
+def _value(bet: Candidate, stake: float, closing_price: Optional[float], result: Optional[dict]) -> Optional[BacktestBet]:
+    try:
+        ev = calculate_straight_bet_ev(
+            odds=Decimal(str(bet.price)),
+            true_probability=Decimal(str(round(bet.fair_probability, 6))),
+            cash_stake=Decimal(str(stake)),
+            odds_timestamp=datetime.utcfromtimestamp(bet.timestamp),
+            odds_source=ODDS_SOURCE,
+            max_odds_age_seconds=_ANY_AGE
+        ).ev_cash
+    except EVCalculationError:
+        return None
+    outcome = bet_result({"outcome": bet.outcome, "sport": bet.sport_key}, result) if result else None
+    pnl = realized_pnl({"result": outcome, "stake": stake, "odds": bet.price})
+    return BacktestBet(
+        bet.timestamp, bet.sport_key, bet.event_id, bet.book, bet.outcome, bet.price,
+        round(bet.fair_probability, 6), stake, float(ev), closing_price,
+        closing_line_value(bet.price, closing_price), outcome, pnl
+    )
+
+
+def backtest_partition(partition: Partition) -> PartitionResult:
+    """Replay one sport-day (runs in a worker process)."""
+    history = LineHistory(partition.directory)
+    sport_key, rule, results = partition.sport_key, partition.rule, partition.results
+    start = _day_start(partition.day)
+    commence = {event_id: _unix(result.get("commence_time")) for event_id, result in results.items()}
+
+    prices: Dict[str, Dict[str, Dict[str, float]]] = {}  # event → book → outcome → price
+    for tick in history.scan(sport_key, start - WARMUP_SECONDS, start):
+        if tick.market == "h2h":
+            prices.setdefault(tick.event_id, {}).setdefault(tick.book, {})[tick.outcome] = tick.price
+
+    ticks = history.scan(sport_key, start, start + 86400)
+    placed: Dict[Tuple[str, str], Candidate] = {}
+    for tick in ticks:
+        if tick.market != "h2h":
+            continue
+        event = prices.setdefault(tick.event_id, {})
+        event.setdefault(tick.book, {})[tick.outcome] = tick.price
+        starts_at = commence.get(tick.event_id)
+        if starts_at is not None and tick.timestamp >= starts_at:
+            continue
+        fair, books = consensus(event, rule.min_books)
+        if not fair:
+            continue
+        for book, book_prices in event.items():
+            for outcome, price in book_prices.items():
+                if (tick.event_id, outcome) in placed or outcome not in fair:
+                    continue
+                candidate = Candidate(
+                    tick.timestamp, sport_key, tick.event_id, book, outcome, price,
+                    fair[outcome], price * fair[outcome] - 1, books
+                )
+                if rule.accepts(candidate):
+                    placed[(tick.event_id, outcome)] = candidate
+
+    bets = []
+    closing: Dict[str, Dict[Tuple[str, str], float]] = {}
+    for (event_id, _), candidate in placed.items():
+        if event_id not in closing:
+            starts_at = commence.get(event_id)
+            closing[event_id] = {
+                (tick.book, tick.outcome): tick.price
+                for tick in history.history(sport_key, event_id, market="h2h")
+                if starts_at is None or tick.timestamp < starts_at
+            }
+        bet = _value(candidate, rule.stake, closing[event_id].get((candidate.book, candidate.outcome)),
+                     results.get(event_id))
+        if bet is not None:
+            bets.append(bet)
+    return PartitionResult(sport_key, partition.day, len(ticks), bets)
+
+
+def summarize(bets: List[BacktestBet]) -> dict:
+    """ROI, EV, CLV and drawdown over bets in placement order."""
+    settled = [b for b in bets if b.pnl is not None]
+    staked = sum(b.stake for b in bets)
+    settled_stake = sum(b.stake for b in settled)
+    pnl = sum(b.pnl for b in settled)
+    ev = sum(b.ev for b in bets)
+    clvs = [b.clv for b in bets if b.clv is not None]
+
+    cumulative = peak = drawdown = 0.0
+    for bet in settled:
+        cumulative += bet.pnl
+        peak = max(peak, cumulative)
+        drawdown = max(drawdown, peak - cumulative)
+
+    return {
+        "bets": len(bets),
+        "settled": len(settled),
+        "open": len(bets) - len(settled),
+        "wins": sum(1 for b in settled if b.result == "win"),
+        "losses": sum(1 for b in settled if b.result == "lose"),
+        "pushes": sum(1 for b in settled if b.result == "push"),
+        "staked": round(staked, 2),
+        "pnl": round(pnl, 2),
+        "roi": round(pnl / settled_stake, 4) if settled_stake else None,
+        "expected_value": round(ev, 2),
+        "expected_roi": round(ev / staked, 4) if staked else None,
+        "clv_mean": round(sum(clvs) / len(clvs), 4) if clvs else None,
+        "clv_positive_share": round(sum(1 for c in clvs if c > 0) / len(clvs), 4) if clvs else None,
+        "max_drawdown": round(drawdown, 2),
+    }
+
+
+def _days(first: date, last: date) -> List[date]:
+    if last < first:
+        raise BacktestError(f"Backtest range ends before it starts: {first} → {last}")
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+def run_backtest(
+    directory: str,
+    sports: Iterable[str],
+    first_day: date,
+    last_day: date,
+    rule: BacktestRule = BacktestRule(),
+    results: Iterable[dict] = (),
+    workers: int = 1,
+    include_bets: bool = False
+) -> dict:
+    """
+    Backtest a rule over every (sport, day) in [first_day, last_day].
+
+    results are final scores as settlement_service.ResultsSource returns
+    them (an optional commence_time stops betting and fixes the closing
+    line). workers > 1 runs the partitions on a process pool.
+
+    Raises:
+        BacktestError: invalid range or rule
+    """
+    if rule.min_books < 1 or rule.stake <= 0:
+        raise BacktestError(f"Invalid rule: {rule.describe()}")
+    sports = list(sports)
+    by_sport: Dict[str, Dict[str, dict]] = {sport: {} for sport in sports}
+    for result in results:
+        if result.get("sport") in by_sport:
+            by_sport[result["sport"]][result["event_id"]] = result
+    partitions = [
+        Partition(directory, sport, day, rule, by_sport[sport])
+        for sport in sports for day in _days(first_day, last_day)
+    ]
+
+    started = time.perf_counter()
+    if workers > 1 and len(partitions) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as pool:
+            done = list(pool.map(backtest_partition, partitions, chunksize=1))
+    else:
+        done = [backtest_partition(partition) for partition in partitions]
+
+    # A line can qualify again in a later partition: keep the first bet per (event, outcome)
+    bets: Dict[Tuple[str, str, str], BacktestBet] = {}
+    for bet in sorted((b for part in done for b in part.bets), key=lambda b: b.placed_at):
+        bets.setdefault((bet.sport_key, bet.event_id, bet.outcome), bet)
+    ordered = list(bets.values())
+
+    report = {
+        "rule": rule.describe(),
+        "sports": sports,
+        "from": first_day.isoformat(),
+        "to": last_day.isoformat(),
+        "partitions": len(partitions),
+        "ticks": sum(part.ticks for part in done),
+        **summarize(ordered),
+        "by_sport": {sport: summarize([b for b in ordered if b.sport_key == sport]) for sport in sports},
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+    if include_bets:
+        report["bet_list"] = [bet._asdict() for bet in ordered]
+    return report
+
+
+def _import_select(path: str) -> Callable[[Candidate], bool]:
+    module, _, name = path.partition(":")
+    try:
+        return getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise BacktestError(f"Cannot import selection rule {path!r}: {e}")
+
+
+def main(argv=None) -> int:
+    from config.settings import settings
+
+    defaults = BacktestRule()
+    parser = argparse.ArgumentParser(description="Backtest a betting rule over the recorded line history")
+    parser.add_argument("--history", default=settings.LINE_HISTORY_DIR, help="line history directory")
+    parser.add_argument("--sports", required=True, help="comma-separated sport keys")
+    parser.add_argument("--from", dest="first", required=True, type=date.fromisoformat)
+    parser.add_argument("--to", dest="last", required=True, type=date.fromisoformat)
+    parser.add_argument("--min-edge", type=float, default=defaults.min_edge)
+    parser.add_argument("--min-books", type=int, default=defaults.min_books)
+    parser.add_argument("--books", help="comma-separated books you can bet at")
+    parser.add_argument("--min-price", type=float, default=defaults.min_price)
+    parser.add_argument("--max-price", type=float, default=defaults.max_price)
+    parser.add_argument("--stake", type=float, default=defaults.stake)
+    parser.add_argument("--select", help="extra predicate, module:function taking a Candidate")
+    parser.add_argument("--results", help="final scores JSON (settlement_service format)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bets", action="store_true", help="include every bet in the report")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        if not args.history:
+            raise BacktestError("No line history directory (--history or LINE_HISTORY_DIR)")
+        results = []
+        if args.results:
+            from services.settlement_service import FileResultsSource
+            results = FileResultsSource(args.results).fetch_results()
+        rule = BacktestRule(
+            min_edge=args.min_edge, min_books=args.min_books,
+            books=frozenset(args.books.split(",")) if args.books else None,
+            min_price=args.min_price, max_price=args.max_price, stake=args.stake,
+            select=_import_select(args.select) if args.select else None
+        )
+        report = run_backtest(args.history, args.sports.split(","), args.first, args.last, rule,
+                              results, args.workers, include_bets=args.bets)
+    except Exception as e:
+        print(f"backtest failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
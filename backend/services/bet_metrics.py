@@ -0,0 +1,167 @@
+"""
+Bet Metrics
+
+Pure helpers that turn a stored bet document into the numbers we aggregate:
+realized P&L, closing line value and the additive "contribution" a bet makes
+to any running summary.
+
+Summaries are kept as running counts, sums and sums of squares, so every
+change to a bet (logged, closing odds filled in, settled) can be applied as
+an increment: contribution(new) - contribution(old).
+
+No database access here - callers decide where the increments go.
+"""
+
+from math import sqrt
+from typing import Optional
+
+
+# Metrics tracked as (n, sum, sumsq) in every summary
+METRICS = ("stake", "clv", "pnl", "ev", "settled_stake")
+
+SETTLED_RESULTS = ("win", "lose", "push")
+
+
+def closing_line_value(odds: float, closing_odds: Optional[float]) -> Optional[float]:
+    """CLV of a bet against the closing price (same formula log_bet has always used)."""
+    if not closing_odds:
+        return None
+    return round((odds - closing_odds) / abs(closing_odds), 3)
+
+
+def realized_pnl(bet: dict) -> Optional[float]:
+    """
+    Realized profit/loss of a settled bet (decimal odds).
+
+    win  → stake × (odds - 1)
+    lose → -stake
+    push → 0
+    Returns None while the bet is open.
+    """
+    result = bet.get("result")
+    if result == "win":
+        return round(bet["stake"] * (bet["odds"] - 1), 2)
+    if result == "lose":
+        return -round(bet["stake"], 2)
+    if result == "push":
+        return 0.0
+    return None
+
+
+def metric_values(bet: dict) -> dict:
+    """Value of each tracked metric for a bet (None = not known yet)."""
+    pnl = bet.get("pnl")
+    if pnl is None:
+        pnl = realized_pnl(bet)
+    settled = bet.get("result") in SETTLED_RESULTS
+    return {
+        "stake": bet.get("stake"),
+        "clv": bet.get("clv"),
+        "pnl": pnl,
+        "ev": bet.get("expectedValue"),
+        "settled_stake": bet.get("stake") if settled else None,
+    }
+
+
+def contribution(bet: Optional[dict]) -> dict:
+    """
+    Additive contribution of one bet to a summary.
+
+    Keys are flat counter names ("bets", "clv_n", "clv_sum", "clv_sumsq",
+    "clv_positive", "results_win", ...). A missing bet contributes nothing.
+    """
+    if not bet:
+        return {}
+
+    counters = {"bets": 1}
+    for metric, value in metric_values(bet).items():
+        if value is None:
+            continue
+        counters[f"{metric}_n"] = 1
+        counters[f"{metric}_sum"] = value
+        counters[f"{metric}_sumsq"] = value * value
+
+    clv = bet.get("clv")
+    if clv is not None and clv > 0:
+        counters["clv_positive"] = 1
+
+    result = bet.get("result")
+    if result in SETTLED_RESULTS:
+        counters[f"results_{result}"] = 1
+
+    return counters
+
+
+def contribution_delta(old: Optional[dict], new: Optional[dict]) -> dict:
+    """Counter increments that turn old's contribution into new's (zeros dropped)."""
+    before = contribution(old)
+    after = contribution(new)
+    delta = {}
+    for key in before.keys() | after.keys():
+        value = after.get(key, 0) - before.get(key, 0)
+        if value:
+            delta[key] = value
+    return delta
+
+
+def field_key(name: Optional[str]) -> str:
+    """Make a sport/book name safe to use as a document field name."""
+    if not name:
+        return "unknown"
+    return str(name).replace(".", "_").replace("$", "_")
+
+
+def summary_increment(bet: dict, delta: dict) -> dict:
+    """
+    Expand counter increments into dotted summary paths.
+
+    Every counter is applied to the user's totals and to the bet's
+    per-sport and per-book breakdowns.
+    """
+    if not delta:
+        return {}
+    sport = field_key(bet.get("sport"))
+    book = field_key(bet.get("sportsbook"))
+    increment = {}
+    for key, value in delta.items():
+        increment[f"totals.{key}"] = value
+        increment[f"by_sport.{sport}.{key}"] = value
+        increment[f"by_book.{book}.{key}"] = value
+    return increment
+
+
+def add_counters(target: dict, counters: dict) -> dict:
+    """Accumulate counters into target in place (used by rebuilds)."""
+    for key, value in counters.items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+def describe(counters: Optional[dict]) -> dict:
+    """
+    Turn raw counters into the stats the CLV and ROI views show.
+
+    mean and stddev (population) come straight from n, sum and sumsq.
+    """
+    counters = counters or {}
+    stats = {"bets": int(counters.get("bets", 0))}
+
+    for metric in METRICS:
+        n = counters.get(f"{metric}_n", 0)
+        total = counters.get(f"{metric}_sum", 0.0)
+        sumsq = counters.get(f"{metric}_sumsq", 0.0)
+        mean = total / n if n else None
+        stddev = sqrt(max(sumsq / n - mean * mean, 0.0)) if n else None
+        stats[metric] = {
+            "count": int(n),
+            "sum": round(total, 4),
+            "mean": round(mean, 4) if mean is not None else None,
+            "stddev": round(stddev, 4) if stddev is not None else None,
+        }
+
+    stats["clv"]["positive"] = int(counters.get("clv_positive", 0))
+    stats["results"] = {r: int(counters.get(f"results_{r}", 0)) for r in SETTLED_RESULTS}
+
+    settled_stake = stats["settled_stake"]["sum"]
+    stats["roi"] = round(stats["pnl"]["sum"] / settled_stake, 4) if settled_stake else None
+    return stats
@@ -1,12 +1,14 @@
 
-from db.mongo import get_bets_collection
+from db.repository import get_repository
 from models.bet import Bet
+from services.bet_metrics import closing_line_value
+from services.summary_service import record_bet_change
 from datetime import datetime
 import uuid
 
 def log_bet(bet: Bet):
     # Compute closing line value
-    clv = round((bet.odds - bet.closing_odds) / abs(bet.closing_odds), 3) if bet.closing_odds else None
+    clv = closing_line_value(bet.odds, bet.closing_odds)
 
     # EV calculation
     implied_prob = 1 / bet.odds
@@ -26,8 +28,27 @@ def log_bet(bet: Bet):
     bet_dict["kellySize"] = round(kelly_fraction * bet.stake, 2)
     bet_dict["loggedAt"] = datetime.utcnow()
 
-    get_bets_collection().insert_one(bet_dict)
+    get_repository().insert_bet(bet_dict)
+    record_bet_change(None, bet_dict, op_id=f"log:{bet_dict['id']}")
     return bet_dict
 
+def update_closing_odds(bet_id: str, closing_odds: float):
+    repo = get_repository()
+    bet = repo.get_bet(bet_id)
+    if bet is None:
+        return None
+
+    changes = {
+        "closing_odds": closing_odds,
+        "clv": closing_line_value(bet["odds"], closing_odds)
+    }
+    # BEFORE image + our changes gives the exact old/new pair for the summary delta
+    old = repo.update_bet(bet_id, changes)
+    if old is None:
+        return None
+    new = {**old, **changes}
+    record_bet_change(old, new)
+    return new
+
 def fetch_bets(user: str):
-    return list(get_bets_collection().find({"user": user}, {"_id": 0}))
+    return get_repository().find_bets(user)
@@ -0,0 +1,308 @@
+"""
+Closing Line Capture
+
+Fills in closing_odds and CLV for open bets automatically, so CLV no longer
+depends on users typing the closing price in by hand.
+
+How it works:
+- Bets logged with event_id + commence_time are "pending" until they get
+  closing odds.
+- Shortly before each kickoff (CAPTURE_LEAD_SECONDS) we snapshot the event:
+  every supported book's final price plus a no-vig consensus price.
+- Each affected bet gets closing_odds (its own book's price), the consensus
+  closing price and CLV in ONE bulk update per event.
+
+Thundering herd:
+The Odds API returns every event of a sport in a single call, so captures
+are coalesced per sport: all events of a sport kicking off within
+CAPTURE_WINDOW_SECONDS share one upstream fetch, and fetches run through a
+small bounded pool. Three hundred Saturday kickoffs cost one call per sport
+per window, not one per event.
+"""
+
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from db.repository import get_repository
+from services.bet_metrics import closing_line_value
+from services.summary_service import record_bet_change
+from services.validated_odds import ValidatedOddsEvent, get_validated_odds
+
+logger = logging.getLogger("ironman")
+
+
+# Capture this long before commence_time
+CAPTURE_LEAD_SECONDS = 120
+
+# Events of the same sport due within this window share one fetch
+CAPTURE_WINDOW_SECONDS = 180
+
+# Upper bound on simultaneous upstream fetches
+MAX_CONCURRENT_FETCHES = 4
+
+# How often the scheduler looks for newly logged bets
+POLL_INTERVAL_SECONDS = 30
+
+
+def _utc_naive(dt: datetime) -> datetime:
+    """Normalize to naive UTC (how Mongo hands datetimes back)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def no_vig_consensus(event: ValidatedOddsEvent) -> Dict[str, float]:
+    """
+    Consensus fair odds per outcome across all books on the event.
+
+    Each book's implied probabilities are normalized to sum to 1 (margin
+    removed), averaged across books, and converted back to decimal odds.
+    """
+    totals: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for book in event.bookmakers:
+        implied = {o.name: 1 / float(o.price) for o in book.outcomes}
+        margin = sum(implied.values())
+        for name, prob in implied.items():
+            totals[name] = totals.get(name, 0.0) + prob / margin
+            counts[name] = counts.get(name, 0) + 1
+
+    return {
+        name: round(counts[name] / total, 4)
+        for name, total in totals.items()
+        if total > 0
+    }
+
+
+def closing_snapshot(event: ValidatedOddsEvent, captured_at: datetime) -> dict:
+    """Final price at every book plus the no-vig consensus for one event."""
+    return {
+        "event_id": event.id,
+        "sport": event.sport_key,
+        "commence_time": _utc_naive(event.commence_time),
+        "captured_at": captured_at,
+        "books": {
+            book.key: {
+                "title": book.title,
+                "last_update": _utc_naive(book.last_update),
+                "prices": {o.name: float(o.price) for o in book.outcomes}
+            }
+            for book in event.bookmakers
+        },
+        "consensus": no_vig_consensus(event)
+    }
+
+
+def _book_prices(snapshot: dict, sportsbook: str) -> Optional[dict]:
+    """Find a bet's book in the snapshot by key or display title."""
+    wanted = (sportsbook or "").lower()
+    for key, book in snapshot["books"].items():
+        if key.lower() == wanted or book["title"].lower() == wanted:
+            return book["prices"]
+    return None
+
+
+def closing_changes(bet: dict, snapshot: dict) -> Optional[dict]:
+    """
+    Fields to $set on a bet from its event's closing snapshot.
+
+    closing_odds prefers the bet's own book; if that book no longer quotes
+    the event, the consensus price is used so the bet still gets CLV.
+    """
+    outcome = bet.get("outcome")
+    consensus = snapshot["consensus"].get(outcome)
+    book_prices = _book_prices(snapshot, bet.get("sportsbook"))
+    book_price = book_prices.get(outcome) if book_prices else None
+
+    closing = book_price or consensus
+    if closing is None:
+        return None
+
+    return {
+        "closing_odds": closing,
+        "closing_consensus_odds": consensus,
+        "closing_source": "book" if book_price else "consensus",
+        "closing_captured_at": snapshot["captured_at"],
+        "clv": closing_line_value(bet["odds"], closing)
+    }
+
+
+def find_pending_events(now: datetime, horizon_seconds: int) -> List[dict]:
+    """
+    Events with open bets still missing closing odds.
+
+    Returns [{"sport", "event_id", "commence_time"}] for events starting
+    between now and now + horizon.
+    """
+    return get_repository().find_pending_closing_events(now, now + timedelta(seconds=horizon_seconds))
+
+
+def apply_closing_snapshot(snapshot: dict) -> int:
+    """Write closing odds + CLV to every pending bet on the event. Returns bets updated."""
+    repo = get_repository()
+
+    changed = []
+    updates = []
+    for bet in repo.find_bets_missing_closing(snapshot["event_id"]):
+        changes = closing_changes(bet, snapshot)
+        if changes is None:
+            continue
+        updates.append((bet["id"], changes))
+        changed.append((bet, {**bet, **changes}))
+
+    if not updates:
+        return 0
+
+    # Guarding on closing_odds makes a re-run a no-op
+    repo.update_bets(updates, only_if_unset="closing_odds")
+    for old, new in changed:
+        record_bet_change(old, new, op_id=f"close:{old['id']}")
+    return len(updates)
+
+
+def capture_sport(sport: str, event_ids: List[str]) -> int:
+    """
+    One upstream fetch for a sport, then one bulk update per captured event.
+
+    Returns the number of bets updated.
+    """
+    odds = get_validated_odds(sport)
+    captured_at = datetime.utcnow()
+    wanted = set(event_ids)
+
+    repo = get_repository()
+    updated = 0
+    for event in odds.events:
+        if event.id not in wanted:
+            continue
+        snapshot = closing_snapshot(event, captured_at)
+        repo.save_closing_snapshot(snapshot)
+        updated += apply_closing_snapshot(snapshot)
+
+    missing = wanted - {e.id for e in odds.events}
+    if missing:
+        logger.warning(f"closing lines: {len(missing)} {sport} events not quoted at capture time")
+    return updated
+
+
+class ClosingLineScheduler:
+    """
+    Min-heap of capture times, drained in per-sport batches.
+
+    load_pending and capture are injectable so the scheduling logic can be
+    exercised without Mongo or the Odds API.
+    """
+
+    def __init__(
+        self,
+        lead_seconds: int = CAPTURE_LEAD_SECONDS,
+        window_seconds: int = CAPTURE_WINDOW_SECONDS,
+        max_concurrent_fetches: int = MAX_CONCURRENT_FETCHES,
+        poll_interval_seconds: int = POLL_INTERVAL_SECONDS,
+        load_pending: Callable[[datetime, int], List[dict]] = find_pending_events,
+        capture: Callable[[str, List[str]], int] = capture_sport
+    ):
+        self.lead = timedelta(seconds=lead_seconds)
+        self.window = timedelta(seconds=window_seconds)
+        self.max_concurrent_fetches = max_concurrent_fetches
+        self.poll_interval_seconds = poll_interval_seconds
+        self._load_pending = load_pending
+        self._capture = capture
+        self._heap: list = []
+        self._scheduled: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, now: datetime) -> int:
+        """Schedule captures for newly seen pending events. Returns how many were added."""
+        added = 0
+        horizon = int((self.lead + self.window).total_seconds()) + self.poll_interval_seconds
+        for event in self._load_pending(now, horizon):
+            key = (event["sport"], event["event_id"])
+            if key in self._scheduled:
+                continue
+            due = _utc_naive(event["commence_time"]) - self.lead
+            heapq.heappush(self._heap, (due, event["sport"], event["event_id"]))
+            self._scheduled.add(key)
+            added += 1
+        return added
+
+    def due_batches(self, now: datetime) -> Dict[str, List[str]]:
+        """
+        Pop everything due now, grouped by sport.
+
+        Events of an already-due sport that fall due within the window are
+        pulled forward so they ride the same upstream fetch.
+        """
+        batches: Dict[str, List[str]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, sport, event_id = heapq.heappop(self._heap)
+            batches.setdefault(sport, []).append(event_id)
+
+        if batches:
+            window_end = now + self.window
+            remaining = []
+            for due, sport, event_id in self._heap:
+                if sport in batches and due <= window_end:
+                    batches[sport].append(event_id)
+                else:
+                    remaining.append((due, sport, event_id))
+            heapq.heapify(remaining)
+            self._heap = remaining
+
+        for sport, event_ids in batches.items():
+            for event_id in event_ids:
+                self._scheduled.discard((sport, event_id))
+        return batches
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Refresh, then capture every due sport batch. Returns bets updated."""
+        now = now or datetime.utcnow()
+        self.refresh(now)
+        batches = self.due_batches(now)
+        if not batches:
+            return 0
+
+        updated = 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_fetches) as pool:
+            futures = {pool.submit(self._capture, sport, ids): sport for sport, ids in batches.items()}
+            for future, sport in futures.items():
+                try:
+                    updated += future.result()
+                except Exception as e:
+                    logger.error(f"closing lines: capture failed for {sport}: {e}")
+        return updated
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"closing lines: scheduler error: {e}")
+            self._stop.wait(self.poll_interval_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="closing-lines", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    scheduler = ClosingLineScheduler()
+    scheduler.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -1,21 +1,23 @@
 
-from db.mongo import get_bets_collection
+from db.repository import get_repository
+from services.summary_service import get_user_summary
 
-def generate_clv_report(user: str):
-    bets = list(get_bets_collection().find({"user": user, "clv": {"$ne": None}}, {"_id": 0}))
-    if not bets:
+def generate_clv_report(user: str, include_values: bool = False):
+    # Point read of the running summary - no scan of the bet history
+    clv = get_user_summary(user)["totals"]["clv"]
+    if not clv["count"]:
         return {"user": user, "bets": 0, "average_clv": None, "positive_clv": 0, "sharp_rate": None, "clv_data": []}
 
-    clv_values = [b["clv"] for b in bets if "clv" in b]
-    avg_clv = round(sum(clv_values) / len(clv_values), 4)
-    pos_count = sum(1 for c in clv_values if c > 0)
-    sharp_rate = round(pos_count / len(clv_values) * 100, 2)
-
-    return {
+    report = {
         "user": user,
-        "bets": len(clv_values),
-        "average_clv": avg_clv,
-        "positive_clv": pos_count,
-        "sharp_rate": sharp_rate,
-        "clv_data": clv_values
+        "bets": clv["count"],
+        "average_clv": clv["mean"],
+        "clv_stddev": clv["stddev"],
+        "positive_clv": clv["positive"],
+        "sharp_rate": round(clv["positive"] / clv["count"] * 100, 2),
+        "clv_data": []
     }
+    if include_values:
+        bets = get_repository().find_bets(user)
+        report["clv_data"] = [b["clv"] for b in bets if b.get("clv") is not None]
+    return report
@@ -0,0 +1,323 @@
+"""
+Weighted no-vig consensus: a fair probability for every outcome, from the
+market itself.
+
+Each book's quote for an (event, market) has its margin removed (implied
+probabilities normalized to sum to 1, as in
+closing_line_service.no_vig_consensus) and the consensus is the weighted
+mean across books:
+
+    p(o) = Σ_b w_b · d_b · p_b(o) / Σ_b w_b · d_b
+
+w_b is the book's sharpness weight (CONSENSUS_BOOK_WEIGHTS, else
+CONSENSUS_DEFAULT_WEIGHT; 0 leaves the book out) and d_b the recency
+decay 2^(-(now - t_b) / half_life) of the book's last_update t_b. The
+decay's now-dependent factor is common to every book and cancels in the
+ratio, so each quote is stored with the time-independent factor
+w_b · 2^((t_b - t0) / half_life) (t0 per event, rebased when it grows
+large) and the sums never need re-decaying.
+
+Updates are incremental: a refresh's ticks are grouped per (event,
+market, book) and only a book whose quote changed is touched -
+its old contribution is subtracted from the per-outcome sums and the new
+one added, O(outcomes) per book, never a pass over the board. Sums are
+recomputed from the quotes every RESUM_EVERY updates to shed float drift.
+
+A book missing from refreshes for QUOTE_TTL_SECONDS (it pulled the
+market) drops out when the event is next read. Spreads and totals are
+keyed by outcome label ("Lakers -5.5"), so each point's consensus comes
+from the books quoting that point.
+
+Fed like line-move detection: stale_odds on each refresh, or the
+odds_poller.SnapshotWatcher in every worker with shared snapshots.
+Read per event by GET /api/odds/{sport}/consensus and by POST
+/api/ev/calculate with probability_source "consensus".
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.line_history import Tick
+
+logger = logging.getLogger("ironman")
+
+# Quotes not seen in a refresh for this long are dropped (the book pulled the market)
+QUOTE_TTL_SECONDS = 600.0
+
+# Events not updated for this long are forgotten
+EVENT_TTL_SECONDS = 6 * 3600.0
+
+# Seconds between sweeps for forgotten events
+SWEEP_SECONDS = 600.0
+
+# Exact recomputation of an event's sums after this many incremental updates
+RESUM_EVERY = 1000
+
+# Rebase an event's decay reference when a factor's exponent passes this
+MAX_DECAY_EXPONENT = 50.0
+
+
+class ConsensusError(Exception):
+    """Invalid consensus weights or decay"""
+    pass
+
+
+class OutcomeConsensus(NamedTuple):
+    probability: float
+    books: int
+
+    @property
+    def fair_odds(self) -> float:
+        return 1 / self.probability
+
+
+class Consensus(NamedTuple):
+    sport_key: str
+    event_id: str
+    market: str
+    outcomes: Dict[str, OutcomeConsensus]
+    line_updated_at: float  # newest book last_update in the consensus
+    refreshed_at: float  # when a refresh last included the event
+
+    def as_dict(self) -> dict:
+        return {
+            "outcomes": {
+                name: {
+                    "probability": round(outcome.probability, 6),
+                    "fair_odds": round(outcome.fair_odds, 4),
+                    "books": outcome.books
+                }
+                for name, outcome in self.outcomes.items()
+            },
+            "line_updated_at": _iso(self.line_updated_at),
+            "refreshed_at": _iso(self.refreshed_at),
+        }
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _Quote:
+    __slots__ = ("prices", "probabilities", "timestamp", "weight", "factor", "seen")
+
+    def __init__(self, prices: Dict[str, float], probabilities: Dict[str, float], timestamp: float,
+                 weight: float, factor: float, seen: float):
+        self.prices = prices
+        self.probabilities = probabilities
+        self.timestamp = timestamp
+        self.weight = weight
+        self.factor = factor  # weight × decay relative to the market's t0
+        self.seen = seen
+
+
+class _Market:
+    """One (event, market): current quote per book and the running sums."""
+
+    __slots__ = ("quotes", "sums", "weights", "counts", "t0", "updates", "refreshed_at")
+
+    def __init__(self, t0: float):
+        self.quotes: Dict[str, _Quote] = {}
+        self.sums: Dict[str, float] = {}  # outcome → Σ factor × probability
+        self.weights: Dict[str, float] = {}  # outcome → Σ factor
+        self.counts: Dict[str, int] = {}  # outcome → books quoting it
+        self.t0 = t0
+        self.updates = 0
+        self.refreshed_at = 0.0
+
+    def add(self, quote: _Quote):
+        sums, weights, counts, factor = self.sums, self.weights, self.counts, quote.factor
+        for outcome, probability in quote.probabilities.items():
+            sums[outcome] = sums.get(outcome, 0.0) + factor * probability
+            weights[outcome] = weights.get(outcome, 0.0) + factor
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def remove(self, quote: _Quote):
+        sums, weights, counts, factor = self.sums, self.weights, self.counts, quote.factor
+        for outcome, probability in quote.probabilities.items():
+            counts[outcome] -= 1
+            if counts[outcome] == 0:
+                del sums[outcome], weights[outcome], counts[outcome]
+            else:
+                sums[outcome] -= factor * probability
+                weights[outcome] -= factor
+
+    def resum(self):
+        self.sums, self.weights, self.counts = {}, {}, {}
+        for quote in self.quotes.values():
+            self.add(quote)
+
+
+class ConsensusEngine:
+    def __init__(self, book_weights: Optional[Dict[str, float]] = None, default_weight: float = 1.0,
+                 half_life_seconds: float = 0.0):
+        book_weights = dict(book_weights or {})
+        if default_weight < 0 or any(w < 0 for w in book_weights.values()):
+            raise ConsensusError("Consensus book weights must not be negative")
+        if half_life_seconds < 0:
+            raise ConsensusError("Consensus half-life must not be negative (0 = no decay)")
+        self.book_weights = book_weights
+        self.default_weight = default_weight
+        self.half_life_seconds = half_life_seconds
+        self._rate = math.log(2) / half_life_seconds if half_life_seconds else 0.0
+        self._markets: Dict[Tuple[str, str, str], _Market] = {}  # (sport, event, market)
+        self._events: Dict[Tuple[str, str], List[str]] = {}  # (sport, event) → markets
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+
+    def weight(self, book: str) -> float:
+        return self.book_weights.get(book, self.default_weight)
+
+    # --- Updates ---
+
+    def update(self, sport_key: str, ticks: Iterable[Tick], now: Optional[float] = None) -> int:
+        """Apply a refresh; returns how many book quotes changed."""
+        now = time.time() if now is None else now
+        quotes: Dict[Tuple[str, str, str], Tuple[Dict[str, float], float]] = {}
+        for tick in ticks:
+            key = (tick.event_id, tick.market, tick.book)
+            quote = quotes.get(key)
+            if quote is None:
+                quotes[key] = ({tick.outcome: tick.price}, tick.timestamp)
+            else:
+                quote[0][tick.outcome] = tick.price
+                if tick.timestamp > quote[1]:
+                    quotes[key] = (quote[0], tick.timestamp)
+        changed = 0
+        with self._lock:
+            for (event_id, market, book), (prices, timestamp) in quotes.items():
+                changed += self._quote(sport_key, event_id, market, book, prices, timestamp, now)
+            if now - self._swept_at >= SWEEP_SECONDS:
+                self._sweep(now)
+        return changed
+
+    def _quote(self, sport_key, event_id, market, book, prices, timestamp, now) -> int:
+        if timestamp != timestamp:  # NaN: no usable last_update
+            timestamp = now
+        key = (sport_key, event_id, market)
+        state = self._markets.get(key)
+        if state is None:
+            state = self._markets[key] = _Market(timestamp)
+            self._events.setdefault((sport_key, event_id), []).append(market)
+        state.refreshed_at = now
+        old = state.quotes.get(book)
+        if old is not None and old.timestamp == timestamp and old.prices == prices:
+            old.seen = now
+            return 0
+
+        weight = self.weight(book)
+        implied = {outcome: 1 / price for outcome, price in prices.items() if price > 1}
+        if old is not None:
+            state.remove(old)
+            del state.quotes[book]
+        if weight <= 0 or len(implied) < 2:
+            return 1 if old is not None else 0
+
+        exponent = self._rate * (timestamp - state.t0)
+        if exponent > MAX_DECAY_EXPONENT:
+            self._rebase(state, timestamp)
+            exponent = 0.0
+        margin = sum(implied.values())
+        quote = _Quote(
+            prices, {outcome: p / margin for outcome, p in implied.items()}, timestamp,
+            weight, weight * math.exp(exponent), now
+        )
+        state.quotes[book] = quote
+        state.add(quote)
+        state.updates += 1
+        if state.updates % RESUM_EVERY == 0:
+            state.resum()
+        return 1
+
+    def _rebase(self, state: _Market, t0: float):
+        for quote in state.quotes.values():
+            quote.factor = quote.weight * math.exp(self._rate * (quote.timestamp - t0))
+        state.t0 = t0
+        state.resum()
+
+    def _sweep(self, now: float):
+        cutoff = now - EVENT_TTL_SECONDS
+        for key in [k for k, state in self._markets.items() if state.refreshed_at < cutoff]:
+            del self._markets[key]
+            markets = self._events.get(key[:2], [])
+            markets.remove(key[2])
+            if not markets:
+                del self._events[key[:2]]
+        self._swept_at = now
+
+    # --- Reads ---
+
+    def consensus(self, sport_key: str, event_id: str, market: str = "h2h",
+                  now: Optional[float] = None) -> Optional[Consensus]:
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._markets.get((sport_key, event_id, market))
+            if state is None:
+                return None
+            for book in [b for b, quote in state.quotes.items() if quote.seen < now - QUOTE_TTL_SECONDS]:
+                state.remove(state.quotes.pop(book))
+            if not state.quotes:
+                return None
+            outcomes = {
+                outcome: OutcomeConsensus(state.sums[outcome] / total, state.counts[outcome])
+                for outcome, total in state.weights.items() if total > 0
+            }
+            line_updated_at = max(quote.timestamp for quote in state.quotes.values())
+            return Consensus(sport_key, event_id, market, outcomes, line_updated_at, state.refreshed_at)
+
+    def event(self, sport_key: str, event_id: str, now: Optional[float] = None) -> Dict[str, Consensus]:
+        """Consensus for each market of an event."""
+        markets = list(self._events.get((sport_key, event_id), ()))
+        found = {market: self.consensus(sport_key, event_id, market, now) for market in markets}
+        return {market: consensus for market, consensus in found.items() if consensus is not None}
+
+    def events(self, sport_key: str) -> List[str]:
+        return [event_id for sport, event_id in list(self._events) if sport == sport_key]
+
+    def describe(self) -> dict:
+        return {
+            "book_weights": self.book_weights,
+            "default_weight": self.default_weight,
+            "half_life_seconds": self.half_life_seconds,
+        }
+
+
+_engine: Optional[ConsensusEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_consensus_engine() -> Optional[ConsensusEngine]:
+    """Process-wide engine, or None when CONSENSUS_ENABLED is off."""
+    global _engine
+    if _engine is None:
+        from config.settings import settings
+        if not settings.CONSENSUS_ENABLED:
+            return None
+        with _engine_lock:
+            if _engine is None:
+                _engine = ConsensusEngine(
+                    settings.CONSENSUS_BOOK_WEIGHTS, settings.CONSENSUS_DEFAULT_WEIGHT,
+                    settings.CONSENSUS_HALF_LIFE_SECONDS
+                )
+    return _engine
+
+
+def set_consensus_engine(engine: Optional[ConsensusEngine]):
+    """Override the process-wide engine (tests)."""
+    global _engine
+    _engine = engine
+
+
+def update_consensus(sport_key: str, ticks: Iterable[Tick]):
+    """Feed a refresh if the engine is enabled; never lets it fail the refresh."""
+    engine = get_consensus_engine()
+    if engine is None:
+        return
+    try:
+        engine.update(sport_key, ticks)
+    except Exception as e:
+        logger.warning(f"Consensus update failed for {sport_key}: {e}")
@@ -112,6 +112,14 @@ class EVResult(BaseModel):
         default=None,
         description="Detailed information about odds source (sportsbook, event, filtering)"
     )
+    probability_source: str = Field(
+        default="user",
+        description="Where true_probability came from: user or consensus"
+    )
+    probability_source_detail: Optional[dict] = Field(
+        default=None,
+        description="Consensus provenance (event, market, books, weights, timestamps)"
+    )
     calculation_timestamp: datetime = Field(
         ...,
         description="When this calculation was performed"
@@ -157,7 +165,9 @@ def calculate_straight_bet_ev(
     odds_timestamp: datetime,
     odds_source: str,
     max_odds_age_seconds: int = 60,
-    odds_source_detail: Optional[dict] = None
+    odds_source_detail: Optional[dict] = None,
+    probability_source: str = "user",
+    probability_source_detail: Optional[dict] = None
 ) -> EVResult:
     """
     Calculate Expected Value for a straight cash bet.
@@ -173,6 +183,7 @@ def calculate_straight_bet_ev(
         odds_timestamp: When odds were retrieved
         odds_source: API source identifier
         max_odds_age_seconds: Maximum acceptable odds age (default 60)
+        probability_source: "user", or "consensus" for the weighted no-vig market consensus
 
     Returns:
         EVResult with full calculation provenance
@@ -238,6 +249,8 @@ def calculate_straight_bet_ev(
             "cash_stake": float(cash_stake)
         },
         odds_source_detail=odds_source_detail,
+        probability_source=probability_source,
+        probability_source_detail=probability_source_detail,
         calculation_timestamp=calculation_time,
         odds_timestamp=odds_timestamp,
         odds_age_seconds=int(odds_age),
@@ -0,0 +1,607 @@
+"""
+Append-only line history: every price change of every line we fetch.
+
+Snapshots are replaced on each refresh, so without this there is no line
+movement to analyse (CLV, steam). Each refresh is compared with the last
+recorded price per line (event, book, market, outcome) and only the
+changes are appended as ticks:
+
+    (timestamp, event, book, market, outcome, price)
+
+timestamp is the book's last_update for the price.
+
+Layout (LINE_HISTORY_DIR/<sport>/), one segment per SEGMENT_SECONDS of
+ingest time:
+
+    <start>.lhc   chunks, appended one per refresh that changed anything:
+                    header   magic 4s b"ILHC", rows u32, first ts f64, last ts f64
+                    columns  ts f64[rows], event u32[rows], book u32[rows],
+                             market u32[rows], outcome u32[rows], price f64[rows]
+    <start>.str   the segment's string table, one JSON string per line
+                  (string id = line number, 0 = empty)
+
+Readers memory-map the chunk file and keep a per-event index (event id →
+row addresses) that is extended as chunks are appended, so "price history
+for this outcome at this book" touches only that event's rows.
+
+One process writes (an exclusive flock on writer.lock; with several
+workers that is the snapshot leader). Its maintenance thread compacts
+sealed segments into one chunk sorted by line and time, and deletes
+segments older than LINE_HISTORY_RETENTION_DAYS. Compaction keeps the
+string table and replaces the chunk file atomically; readers notice the
+new inode and rebuild their index.
+"""
+
+import fcntl
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from services.snapshot_store import valid_sport_key
+from utils.metrics import LINE_HISTORY_TICKS
+
+logger = logging.getLogger("ironman")
+
+# Ingest time covered by one segment file
+SEGMENT_SECONDS = 6 * 3600
+
+CHUNK_MAGIC = b"ILHC"
+CHUNK_HEADER = struct.Struct("<4sIdd")
+COLUMNS = (("ts", "d"), ("event", "I"), ("book", "I"), ("market", "I"), ("outcome", "I"), ("price", "d"))
+ROW_BYTES = sum(array(typecode).itemsize for _, typecode in COLUMNS)
+
+# Sealed segments with at least this many chunks are compacted
+COMPACT_MIN_CHUNKS = 16
+
+# Seconds between compaction/retention passes
+MAINTENANCE_SECONDS = 3600.0
+
+# A tick's timestamp may precede its segment's start by this much (book last_update lag)
+MAX_TICK_LAG_SECONDS = 3600.0
+
+_EPOCH = datetime(1970, 1, 1)
+_f64 = struct.Struct("=d")
+_u32 = struct.Struct("=I")
+
+
+class LineHistoryError(Exception):
+    """History files are corrupt or unusable"""
+    pass
+
+
+class Tick(NamedTuple):
+    timestamp: float  # unix seconds
+    event_id: str
+    book: str
+    market: str
+    outcome: str
+    price: float
+
+    @property
+    def line(self) -> Tuple[str, str, str, str]:
+        return (self.event_id, self.book, self.market, self.outcome)
+
+
+def _unix(value) -> float:
+    """Datetime or ISO string (naive = UTC) → unix seconds (NaN if unusable)."""
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - _EPOCH).total_seconds()
+    except (AttributeError, TypeError, ValueError):
+        return math.nan
+
+
+def ticks_from_body(body: dict) -> Iterator[Tick]:
+    """Ticks for every price in a /api/odds/{sport} body (h2h)."""
+    for event in body["events"]:
+        for book in event["bookmakers"]:
+            ts = _unix(book["last_update"])
+            for outcome in book["outcomes"]:
+                yield Tick(ts, event["id"], book["key"], "h2h", outcome["name"], float(outcome["price"]))
+
+
+def outcome_label(name: str, description: str = "", point: Optional[float] = None) -> str:
+    """One string per line: "Over", "Lakers -5.5", "LeBron James Over 25.5"."""
+    label = f"{description} {name}" if description else name
+    return label if point is None else f"{label} {point:g}"
+
+
+def ticks_from_market_snapshot(snapshot) -> Iterator[Tick]:
+    """Ticks for every row of a validated MarketSnapshot (services.market_store)."""
+    s = snapshot.strings
+    for row in range(len(snapshot)):
+        point = snapshot.point[row]
+        yield Tick(
+            snapshot.last_update[row],
+            s[snapshot.event_id[snapshot.event[row]]],
+            s[snapshot.book[row]],
+            s[snapshot.market[row]],
+            outcome_label(s[snapshot.outcome[row]], s[snapshot.description[row]],
+                          None if math.isnan(point) else point),
+            snapshot.price[row]
+        )
+
+
+class _Strings:
+    """A segment's string table, loaded incrementally as it grows."""
+
+    __slots__ = ("path", "values", "ids", "loaded")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[str] = [""]
+        self.ids: Dict[str, int] = {"": 0}
+        self.loaded = 0  # bytes of the file read so far
+
+    def refresh(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.loaded)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1  # a line still being written is read next time
+        for line in data[:end].splitlines():
+            self._add(json.loads(line))
+        self.loaded += end
+
+    def _add(self, value: str) -> int:
+        sid = len(self.values)
+        self.values.append(value)
+        self.ids[value] = sid
+        return sid
+
+    def intern(self, value: str, pending: List[bytes]) -> int:
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self._add(value)
+            pending.append(json.dumps(value).encode() + b"\n")
+        return sid
+
+
+def _encode_chunk(columns: Dict[str, array]) -> bytes:
+    ts = columns["ts"]
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, len(ts), min(ts), max(ts))
+    return header + b"".join(columns[name].tobytes() for name, _ in COLUMNS)
+
+
+def _complete_length(data, offset: int = 0) -> int:
+    """End offset of the complete chunks in data from offset on."""
+    while offset + CHUNK_HEADER.size <= len(data):
+        magic, rows, _, _ = CHUNK_HEADER.unpack_from(data, offset)
+        if magic != CHUNK_MAGIC:
+            raise LineHistoryError(f"Bad chunk header at offset {offset}")
+        end = offset + CHUNK_HEADER.size + rows * ROW_BYTES
+        if end > len(data):
+            break
+        offset = end
+    return offset
+
+
+class _Segment:
+    """Read view of one segment: mapped chunk file, string table, per-event index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reset(None)
+
+    def _reset(self, inode: Optional[int]):
+        self.inode = inode
+        self.map = None
+        self.scanned = 0
+        self.strings = _Strings(self.path[:-4] + ".str")
+        self.chunks: List[Tuple[int, int]] = []  # (offset, rows)
+        self.by_event: Dict[int, array] = {}  # event string id → chunk << 32 | row
+
+    def refresh(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_ino != self.inode:  # new or compacted file
+            self._reset(stat.st_ino)
+        if stat.st_size > self.scanned and (self.map is None or stat.st_size > len(self.map)):
+            with open(self.path, "rb") as f:
+                # The previous map is left to the garbage collector (a query may still use it)
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # After mapping: every string a mapped chunk uses is already in the file
+            self.strings.refresh()
+            self._scan()
+        return True
+
+    def _scan(self):
+        data, offset = self.map, self.scanned
+        end = _complete_length(data, offset)
+        while offset < end:
+            _, rows, _, _ = CHUNK_HEADER.unpack_from(data, offset)
+            number = len(self.chunks)
+            self.chunks.append((offset, rows))
+            events = array("I")
+            start = offset + CHUNK_HEADER.size + 8 * rows
+            events.frombytes(data[start:start + 4 * rows])
+            by_event = self.by_event
+            for row, sid in enumerate(events):
+                addresses = by_event.get(sid)
+                if addresses is None:
+                    addresses = by_event[sid] = array("Q")
+                addresses.append(number << 32 | row)
+            offset += CHUNK_HEADER.size + rows * ROW_BYTES
+        self.scanned = end
+
+    def view(self) -> "_View":
+        """Consistent read state (the writer may append while a query runs)."""
+        return _View(self.map, tuple(self.chunks), self.strings.values, self.strings.ids, self.by_event)
+
+
+class _View(NamedTuple):
+    data: Optional[mmap.mmap]
+    chunks: Tuple[Tuple[int, int], ...]
+    values: List[str]
+    ids: Dict[str, int]
+    by_event: Dict[int, array]
+
+    def _tick(self, address: int) -> Tick:
+        data, values = self.data, self.values
+        offset, rows = self.chunks[address >> 32]
+        row = address & 0xFFFFFFFF
+        base = offset + CHUNK_HEADER.size
+        return Tick(
+            _f64.unpack_from(data, base + 8 * row)[0],
+            values[_u32.unpack_from(data, base + 8 * rows + 4 * row)[0]],
+            values[_u32.unpack_from(data, base + 12 * rows + 4 * row)[0]],
+            values[_u32.unpack_from(data, base + 16 * rows + 4 * row)[0]],
+            values[_u32.unpack_from(data, base + 20 * rows + 4 * row)[0]],
+            _f64.unpack_from(data, base + 24 * rows + 8 * row)[0]
+        )
+
+    def event_ticks(self, event_id: str) -> Iterator[Tick]:
+        sid = self.ids.get(event_id)
+        if self.data is None or sid is None:
+            return
+        limit = len(self.chunks) << 32  # rows indexed after this view was taken are skipped
+        for address in self.by_event.get(sid, ()):
+            if address >= limit:
+                break
+            yield self._tick(address)
+
+    def all_ticks(self) -> Iterator[Tick]:
+        """Every tick, chunk by chunk (whole columns at a time)."""
+        if self.data is None:
+            return
+        data, values = self.data, self.values
+        for offset, rows in self.chunks:
+            position = offset + CHUNK_HEADER.size
+            columns = []
+            for _, typecode in COLUMNS:
+                column = array(typecode)
+                end = position + column.itemsize * rows
+                column.frombytes(data[position:end])
+                columns.append(column)
+                position = end
+            for ts, event, book, market, outcome, price in zip(*columns):
+                yield Tick(ts, values[event], values[book], values[market], values[outcome], price)
+
+
+class LineHistory:
+    def __init__(self, directory: str, retention_days: float = 30.0, segment_seconds: int = SEGMENT_SECONDS):
+        self.directory = directory
+        self.retention_seconds = retention_days * 86400
+        self.segment_seconds = segment_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd: Optional[int] = None
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._last: Dict[str, Dict[tuple, Tuple[float, float]]] = {}  # sport → line → (price, ts)
+        self._writing: Dict[str, Tuple[int, _Strings]] = {}  # sport → (segment start, string table)
+        self._segments: Dict[str, _Segment] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Files ---
+
+    def _sport_dir(self, sport_key: str) -> str:
+        if not valid_sport_key(sport_key):
+            raise ValueError(f"Invalid sport key: {sport_key!r}")
+        return os.path.join(self.directory, sport_key)
+
+    def _chunk_path(self, sport_key: str, start: int) -> str:
+        return os.path.join(self._sport_dir(sport_key), f"{start:010d}.lhc")
+
+    def sports(self) -> List[str]:
+        try:
+            return sorted(entry.name for entry in os.scandir(self.directory)
+                          if entry.is_dir() and valid_sport_key(entry.name))
+        except FileNotFoundError:
+            return []
+
+    def segments(self, sport_key: str) -> List[int]:
+        """Segment start times for a sport, oldest first."""
+        try:
+            names = os.listdir(self._sport_dir(sport_key))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-4]) for name in names if name.endswith(".lhc") and name[:-4].isdigit())
+
+    def _view(self, sport_key: str, start: int) -> _View:
+        path = self._chunk_path(sport_key, start)
+        with self._read_lock:
+            segment = self._segments.get(path)
+            if segment is None:
+                segment = self._segments[path] = _Segment(path)
+            segment.refresh()
+            return segment.view()
+
+    # --- Writer side ---
+
+    @property
+    def is_writer(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, "writer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"Line history writer: pid {os.getpid()}")
+        return True
+
+    def record(self, sport_key: str, ticks: Iterable[Tick], now: Optional[float] = None) -> int:
+        """
+        Append the ticks whose price differs from the line's last recorded
+        price; returns how many were written (0 if another process writes).
+        """
+        if not self.is_writer:
+            return 0
+        now = time.time() if now is None else now
+        start = int(now // self.segment_seconds * self.segment_seconds)
+        with self._write_lock:
+            last = self._last.get(sport_key)
+            if last is None:
+                last = self._last[sport_key] = self._load_last(sport_key)
+            changed = {}
+            for tick in ticks:
+                if tick.price == tick.price and tick.timestamp == tick.timestamp:  # no NaN
+                    previous = last.get(tick.line)
+                    if previous is None or previous[0] != tick.price:
+                        changed[tick.line] = tick
+            if not changed:
+                return 0
+            self._append(sport_key, start, list(changed.values()))
+            for line, tick in changed.items():
+                last[line] = (tick.price, tick.timestamp)
+        LINE_HISTORY_TICKS.labels(sport_key).inc(len(changed))
+        return len(changed)
+
+    def _load_last(self, sport_key: str) -> Dict[tuple, Tuple[float, float]]:
+        """Last price per line from the newest segment (a restarted writer records changes only)."""
+        last: Dict[tuple, Tuple[float, float]] = {}
+        starts = self.segments(sport_key)
+        if starts:
+            for tick in sorted(self._view(sport_key, starts[-1]).all_ticks(), key=lambda t: t.timestamp):
+                last[tick.line] = (tick.price, tick.timestamp)
+        return last
+
+    def _open_segment(self, sport_key: str, start: int) -> _Strings:
+        os.makedirs(self._sport_dir(sport_key), exist_ok=True)
+        path = self._chunk_path(sport_key, start)
+        # Drop whatever a crashed writer left half-written
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(_complete_length(f.read()))
+        strings_path = path[:-4] + ".str"
+        if os.path.exists(strings_path):
+            with open(strings_path, "r+b") as f:
+                data = f.read()
+                f.truncate(data.rfind(b"\n") + 1)
+        strings = _Strings(strings_path)
+        strings.refresh()
+        # Lines that did not move during the last segment are forgotten
+        last = self._last.get(sport_key, {})
+        for line in [line for line, (_, ts) in last.items() if ts < start - self.segment_seconds]:
+            del last[line]
+        return strings
+
+    def _append(self, sport_key: str, start: int, ticks: List[Tick]):
+        current = self._writing.get(sport_key)
+        if current is None or current[0] != start:
+            current = self._writing[sport_key] = (start, self._open_segment(sport_key, start))
+        strings = current[1]
+        pending: List[bytes] = []
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        for tick in ticks:
+            columns["ts"].append(tick.timestamp)
+            columns["event"].append(strings.intern(tick.event_id, pending))
+            columns["book"].append(strings.intern(tick.book, pending))
+            columns["market"].append(strings.intern(tick.market, pending))
+            columns["outcome"].append(strings.intern(tick.outcome, pending))
+            columns["price"].append(tick.price)
+        path = self._chunk_path(sport_key, start)
+        if pending:
+            data = b"".join(pending)
+            with open(strings.path, "ab") as f:
+                f.write(data)
+            strings.loaded += len(data)
+        # Strings first: a reader that sees the chunk can resolve every id in it
+        with open(path, "ab") as f:
+            f.write(_encode_chunk(columns))
+
+    # --- Queries ---
+
+    def history(
+        self,
+        sport_key: str,
+        event_id: str,
+        book: Optional[str] = None,
+        market: Optional[str] = None,
+        outcome: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> List[Tick]:
+        """Ticks for one event, optionally one book/market/outcome and time range, oldest first."""
+        ticks = []
+        for start in self.segments(sport_key):
+            if since is not None and start + self.segment_seconds < since:
+                continue
+            if until is not None and start - MAX_TICK_LAG_SECONDS > until:
+                break
+            for tick in self._view(sport_key, start).event_ticks(event_id):
+                if ((book is None or tick.book == book)
+                        and (market is None or tick.market == market)
+                        and (outcome is None or tick.outcome == outcome)
+                        and (since is None or tick.timestamp >= since)
+                        and (until is None or tick.timestamp <= until)):
+                    ticks.append(tick)
+        ticks.sort(key=lambda tick: tick.timestamp)
+        return ticks
+
+    def scan(self, sport_key: str, since: Optional[float] = None, until: Optional[float] = None) -> List[Tick]:
+        """Every tick of a sport with since <= timestamp < until, oldest first (replays, backtests)."""
+        ticks = []
+        for start in self.segments(sport_key):
+            if since is not None and start + self.segment_seconds < since:
+                continue
+            if until is not None and start - MAX_TICK_LAG_SECONDS >= until:
+                break
+            ticks.extend(
+                tick for tick in self._view(sport_key, start).all_ticks()
+                if (since is None or tick.timestamp >= since) and (until is None or tick.timestamp < until)
+            )
+        ticks.sort(key=lambda tick: tick.timestamp)
+        return ticks
+
+    # --- Maintenance (writer only) ---
+
+    def compact(self, sport_key: str, start: int) -> bool:
+        """
+        Rewrite a sealed segment as one chunk sorted by line and time,
+        dropping repeated prices. Returns False if there was nothing to do.
+        """
+        view = self._view(sport_key, start)
+        if len(view.chunks) < COMPACT_MIN_CHUNKS:
+            return False
+        ids = view.ids
+        ticks = sorted(view.all_ticks(), key=lambda t: (t.event_id, t.book, t.market, t.outcome, t.timestamp))
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        previous = None
+        for tick in ticks:
+            if previous is not None and previous.line == tick.line and previous.price == tick.price:
+                continue
+            previous = tick
+            columns["ts"].append(tick.timestamp)
+            columns["event"].append(ids[tick.event_id])
+            columns["book"].append(ids[tick.book])
+            columns["market"].append(ids[tick.market])
+            columns["outcome"].append(ids[tick.outcome])
+            columns["price"].append(tick.price)
+        path = self._chunk_path(sport_key, start)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_encode_chunk(columns))
+        os.replace(tmp, path)
+        logger.info(f"Compacted line history {sport_key}/{start}: {len(view.chunks)} chunks,"
+                    f" {len(ticks)} → {len(columns['ts'])} ticks")
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Delete segments older than the retention period; returns how many."""
+        now = time.time() if now is None else now
+        removed = 0
+        for sport_key in self.sports():
+            for start in self.segments(sport_key):
+                if start + self.segment_seconds >= now - self.retention_seconds:
+                    break
+                path = self._chunk_path(sport_key, start)
+                for name in (path, path[:-4] + ".str"):
+                    try:
+                        os.remove(name)
+                    except FileNotFoundError:
+                        pass
+                with self._read_lock:
+                    self._segments.pop(path, None)
+                removed += 1
+        return removed
+
+    def maintain(self, now: Optional[float] = None):
+        if not self.is_writer:
+            return
+        now = time.time() if now is None else now
+        current = int(now // self.segment_seconds * self.segment_seconds)
+        for sport_key in self.sports():
+            for start in self.segments(sport_key):
+                if start >= current:
+                    break
+                try:
+                    self.compact(sport_key, start)
+                except (LineHistoryError, OSError) as e:
+                    logger.warning(f"Line history compaction failed for {sport_key}/{start}: {e}")
+        self.expire(now)
+
+    def _loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.warning(f"Line history maintenance failed: {e}")
+
+    def start(self, interval: float = MAINTENANCE_SECONDS):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="line-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+_history: Optional[LineHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_line_history() -> Optional[LineHistory]:
+    """Process-wide history, or None when LINE_HISTORY_DIR is not set."""
+    global _history
+    if _history is None:
+        from config.settings import settings
+        if not settings.LINE_HISTORY_DIR:
+            return None
+        with _history_lock:
+            if _history is None:
+                _history = LineHistory(settings.LINE_HISTORY_DIR, settings.LINE_HISTORY_RETENTION_DAYS)
+    return _history
+
+
+def set_line_history(history: Optional[LineHistory]):
+    """Override the process-wide history (tests)."""
+    global _history
+    _history = history
+
+
+def record_ticks(sport_key: str, ticks: Iterable[Tick]):
+    """Record a refresh if history is enabled; never lets a history failure fail the refresh."""
+    history = get_line_history()
+    if history is None:
+        return
+    try:
+        history.record(sport_key, ticks)
+    except Exception as e:
+        logger.warning(f"Line history write failed for {sport_key}: {e}")
@@ -0,0 +1,326 @@
+"""
+Line-movement and steam detection over the odds refreshes.
+
+Every refresh's prices are fed through LineMoveDetector.observe as ticks
+(services.line_history.Tick). The detector keeps one sliding window per
+(sport, event, market, outcome) across books:
+
+    prices   book → last price seen
+    moves    deque of (time, book, change) inside the window
+    up/down  book → [moves, summed change] for the books in the window that
+             moved toward / away from this outcome
+
+change is the move in implied probability (1/new - 1/old), so a shortening
+price is positive. A tick costs one dict lookup when the price is
+unchanged; a change appends to the deque and updates one counter, and
+every entry leaves the window exactly once, so the work per price change
+is O(1) amortized.
+
+Two kinds of move are reported:
+
+    move   one book's price moved at least `move` in implied probability
+    steam  at least `steam_books` books moved the same way by at least
+           `steam_move` each within `window_seconds`; reported once per
+           episode (until the count drops below the threshold again), with
+           the books that have not followed yet as stale_books - the
+           prices still available elsewhere
+
+Thresholds are configurable per sport via LINE_MOVE_THRESHOLDS (JSON,
+sport key or "default" → overrides of the DEFAULT_THRESHOLDS fields).
+
+Moves are kept in a ring buffer of the last RECENT_MOVES with increasing
+ids (microsecond detection times, so ids from different workers are
+comparable) that GET /api/odds/{sport}/moves and the event stream read
+with since(). Detection is per process: without shared snapshots
+stale_odds feeds each refresh; with ODDS_SNAPSHOT_DIR every worker's
+odds_poller.SnapshotWatcher feeds each newly published snapshot of a
+wanted sport, so every worker sees the same moves.
+
+Point changes on spreads and totals are new outcome labels
+(line_history.outcome_label), so only price moves are detected there.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.line_history import Tick
+from utils.metrics import LINE_MOVES
+
+logger = logging.getLogger("ironman")
+
+# Moves kept for the endpoint and for stream clients catching up
+RECENT_MOVES = 2000
+
+# Windows not updated for this long are dropped (finished events)
+WINDOW_TTL_SECONDS = 6 * 3600.0
+
+# Seconds between sweeps for expired windows
+SWEEP_SECONDS = 600.0
+
+MOVE_KINDS = ("move", "steam")
+
+
+class LineMoveError(Exception):
+    """Invalid line-move thresholds"""
+    pass
+
+
+class MoveThresholds(NamedTuple):
+    move: float = 0.025  # single-book move, implied probability (0.025 = 2.5 points)
+    steam_move: float = 0.01  # smallest move that counts toward steam
+    steam_books: int = 3  # books moving the same way within the window
+    window_seconds: float = 300.0
+
+
+DEFAULT_THRESHOLDS = MoveThresholds()
+
+
+def parse_thresholds(config: Optional[Dict[str, dict]]) -> Dict[str, MoveThresholds]:
+    """
+    {"default": {...}, "<sport>": {...}} → thresholds per sport ("default"
+    applies to every sport without its own entry; fields left out keep
+    their defaults).
+
+    Raises:
+        LineMoveError: unknown field or a non-positive value
+    """
+    config = config or {}
+    default = _thresholds(config.get("default", {}), DEFAULT_THRESHOLDS)
+    by_sport = {"default": default}
+    for sport_key, overrides in config.items():
+        if sport_key != "default":
+            by_sport[sport_key] = _thresholds(overrides, default)
+    return by_sport
+
+
+def _thresholds(overrides: dict, base: MoveThresholds) -> MoveThresholds:
+    unknown = set(overrides) - set(MoveThresholds._fields)
+    if unknown:
+        raise LineMoveError(f"Unknown line-move threshold(s): {', '.join(sorted(unknown))}")
+    try:
+        thresholds = base._replace(**{k: type(getattr(base, k))(v) for k, v in overrides.items()})
+    except (TypeError, ValueError) as e:
+        raise LineMoveError(f"Invalid line-move threshold: {e}")
+    if min(thresholds) <= 0:
+        raise LineMoveError(f"Line-move thresholds must be positive: {thresholds._asdict()}")
+    return thresholds
+
+
+class Move(NamedTuple):
+    id: int
+    kind: str  # "move" or "steam"
+    sport_key: str
+    event_id: str
+    market: str
+    outcome: str
+    books: Tuple[str, ...]  # the book that moved, or every book in the steam
+    change: float  # implied probability; steam: mean per book over the window
+    price: float  # the triggering book's new price
+    previous_price: float
+    line_timestamp: float  # the triggering book's last_update (unix seconds)
+    detected_at: float
+    stale_books: Tuple[Tuple[str, float], ...] = ()  # steam: (book, price) not moved yet
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "sport_key": self.sport_key,
+            "event_id": self.event_id,
+            "market": self.market,
+            "outcome": self.outcome,
+            "books": list(self.books),
+            "probability_change": round(self.change, 4),
+            "price": self.price,
+            "previous_price": self.previous_price,
+            "line_timestamp": _iso(self.line_timestamp),
+            "detected_at": _iso(self.detected_at),
+            "stale_books": [{"book": book, "price": price} for book, price in self.stale_books],
+        }
+
+
+def _iso(ts: float) -> Optional[str]:
+    if ts != ts:  # NaN: the book sent no usable last_update
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _Window:
+    """Sliding-window state for one outcome across books."""
+
+    __slots__ = ("prices", "moves", "up", "down", "steam", "updated")
+
+    def __init__(self):
+        self.prices: Dict[str, float] = {}
+        self.moves: Deque[Tuple[float, str, float]] = deque()
+        self.up: Dict[str, list] = {}
+        self.down: Dict[str, list] = {}
+        self.steam = [False, False]  # (up, down) episode already reported
+        self.updated = 0.0
+
+    def add(self, now: float, book: str, change: float) -> Dict[str, list]:
+        self.moves.append((now, book, change))
+        side = self.up if change > 0 else self.down
+        entry = side.get(book)
+        if entry is None:
+            side[book] = [1, change]
+        else:
+            entry[0] += 1
+            entry[1] += change
+        return side
+
+    def evict(self, cutoff: float, steam_books: int):
+        moves = self.moves
+        while moves and moves[0][0] < cutoff:
+            _, book, change = moves.popleft()
+            side = self.up if change > 0 else self.down
+            entry = side[book]
+            entry[0] -= 1
+            entry[1] -= change
+            if entry[0] == 0:
+                del side[book]
+        if len(self.up) < steam_books:
+            self.steam[0] = False
+        if len(self.down) < steam_books:
+            self.steam[1] = False
+
+
+class LineMoveDetector:
+    def __init__(self, thresholds: Optional[Dict[str, dict]] = None, recent: int = RECENT_MOVES):
+        self._thresholds = parse_thresholds(thresholds)
+        self._windows: Dict[tuple, _Window] = {}
+        self._recent: Deque[Move] = deque(maxlen=recent)
+        self._last_id = 0
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+
+    def thresholds(self, sport_key: str) -> MoveThresholds:
+        return self._thresholds.get(sport_key, self._thresholds["default"])
+
+    @property
+    def latest_id(self) -> int:
+        return self._last_id
+
+    def observe(self, sport_key: str, ticks: Iterable[Tick], now: Optional[float] = None) -> List[Move]:
+        """Feed one refresh; returns the moves it triggered (also kept for since())."""
+        now = time.time() if now is None else now
+        t = self.thresholds(sport_key)
+        found = []
+        with self._lock:
+            windows = self._windows
+            for tick in ticks:
+                key = (sport_key, tick.event_id, tick.market, tick.outcome)
+                window = windows.get(key)
+                if window is None:
+                    window = windows[key] = _Window()
+                window.updated = now
+                previous = window.prices.get(tick.book)
+                window.prices[tick.book] = tick.price
+                if previous is None or previous == tick.price or previous <= 1 or tick.price <= 1:
+                    continue
+                change = 1 / tick.price - 1 / previous
+                window.evict(now - t.window_seconds, t.steam_books)
+                if abs(change) >= t.move:
+                    found.append(self._move(
+                        "move", sport_key, tick, (tick.book,), change, previous, now
+                    ))
+                if abs(change) < t.steam_move:
+                    continue
+                side = window.add(now, tick.book, change)
+                direction = 0 if change > 0 else 1
+                if len(side) >= t.steam_books and not window.steam[direction]:
+                    window.steam[direction] = True
+                    found.append(self._steam(sport_key, tick, window, side, previous, now, t))
+            if now - self._swept_at >= SWEEP_SECONDS:
+                self._sweep(now)
+        for move in found:
+            LINE_MOVES.labels(sport_key, move.kind).inc()
+        return found
+
+    def _next_id(self, now: float) -> int:
+        self._last_id = max(self._last_id + 1, int(now * 1_000_000))
+        return self._last_id
+
+    def _move(self, kind, sport_key, tick, books, change, previous, now, stale=()) -> Move:
+        move = Move(
+            self._next_id(now), kind, sport_key, tick.event_id, tick.market, tick.outcome,
+            books, change, tick.price, previous, tick.timestamp, now, stale
+        )
+        self._recent.append(move)
+        return move
+
+    def _steam(self, sport_key, tick, window, side, previous, now, t: MoveThresholds) -> Move:
+        change = sum(entry[1] for entry in side.values()) / len(side)
+        moved = sum(1 / window.prices[book] for book in side) / len(side)
+        if change > 0:
+            # Still offering the longer price the others moved away from
+            stale = [(b, p) for b, p in window.prices.items() if b not in side and 1 / p <= moved - t.steam_move]
+        else:
+            stale = [(b, p) for b, p in window.prices.items() if b not in side and 1 / p >= moved + t.steam_move]
+        return self._move(
+            "steam", sport_key, tick, tuple(sorted(side)), change, previous, now,
+            tuple(sorted(stale, key=lambda item: -item[1] if change > 0 else item[1]))
+        )
+
+    def _sweep(self, now: float):
+        cutoff = now - WINDOW_TTL_SECONDS
+        for key in [k for k, w in self._windows.items() if w.updated < cutoff]:
+            del self._windows[key]
+        self._swept_at = now
+
+    def since(self, after_id: int, sport_key: Optional[str] = None, event_id: Optional[str] = None,
+              kind: Optional[str] = None) -> List[Move]:
+        """Moves with id > after_id, oldest first (only what is still in the buffer)."""
+        with self._lock:
+            newer = []
+            for move in reversed(self._recent):
+                if move.id <= after_id:
+                    break
+                newer.append(move)
+        return [
+            m for m in reversed(newer)
+            if (sport_key is None or m.sport_key == sport_key)
+            and (event_id is None or m.event_id == event_id)
+            and (kind is None or m.kind == kind)
+        ]
+
+    def __len__(self):
+        return len(self._windows)
+
+
+_detector: Optional[LineMoveDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_line_move_detector() -> Optional[LineMoveDetector]:
+    """Process-wide detector, or None when LINE_MOVES_ENABLED is off."""
+    global _detector
+    if _detector is None:
+        from config.settings import settings
+        if not settings.LINE_MOVES_ENABLED:
+            return None
+        with _detector_lock:
+            if _detector is None:
+                _detector = LineMoveDetector(settings.LINE_MOVE_THRESHOLDS)
+    return _detector
+
+
+def set_line_move_detector(detector: Optional[LineMoveDetector]):
+    """Override the process-wide detector (tests)."""
+    global _detector
+    _detector = detector
+
+
+def observe_ticks(sport_key: str, ticks: Iterable[Tick]):
+    """Feed a refresh if detection is enabled; never lets detection fail the refresh."""
+    detector = get_line_move_detector()
+    if detector is None:
+        return
+    try:
+        detector.observe(sport_key, ticks)
+    except Exception as e:
+        logger.warning(f"Line move detection failed for {sport_key}: {e}")
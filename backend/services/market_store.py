@@ -0,0 +1,357 @@
+"""
+Columnar in-memory store for multi-market odds snapshots.
+
+validate_odds_response builds a Pydantic object per outcome and keeps h2h
+only. With spreads, totals and player props one sport's board is 10-50x
+larger, so this store keeps a snapshot as flat typed arrays instead:
+
+    per event    event_id, home, away (string ids), commence (unix s)
+    per row      event (event position), book, market, outcome, description
+                 (string ids), point, price, last_update (float64; point is
+                 NaN for markets without one, e.g. h2h)
+
+One row is one price for one outcome at one book: about 44 bytes whatever
+the market, against roughly a kilobyte for the nested model. Every string
+(book keys, market keys, team and player names) is interned once per
+snapshot in a StringPool and rows carry its integer id.
+
+Validation runs rule by rule over whole columns (supported book, requested
+market, price > 1.0, fresh last_update, at least two outcomes per
+book/market/line group) and the survivors are copied out in one pass, so
+refresh time grows with rows, not with the number of markets.
+
+Queries (rows_where, best_prices) and to_events() for the JSON response
+work on row indexes; later indexes and consumers build on the same columns.
+"""
+
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.metrics import VALIDATION_DROPPED
+
+# Markets available on the bulk /sports/{sport}/odds endpoint; anything else
+# (player props, alternate lines) needs the per-event endpoint
+FEATURED_MARKETS = ("h2h", "spreads", "totals")
+
+# Seconds a last_update may be ahead of our clock (upstream clock skew)
+FUTURE_TOLERANCE_SECONDS = 5.0
+
+NO_POINT = float("nan")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class StringPool:
+    """Interned strings; id 0 is the empty string (no value)."""
+
+    __slots__ = ("values", "_ids")
+
+    def __init__(self):
+        self.values: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+
+    def intern(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = len(self.values)
+            self.values.append(value)
+            self._ids[value] = sid
+        return sid
+
+    def id(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __getitem__(self, sid: int) -> str:
+        return self.values[sid]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _unix(value: Optional[str], cache: Dict[str, float]) -> float:
+    """API timestamp → unix seconds (NaN if missing or unparseable)."""
+    if not value:
+        return math.nan
+    ts = cache.get(value)
+    if ts is None:
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+            ts = (dt - _EPOCH).total_seconds()
+        except (ValueError, AttributeError, TypeError):
+            ts = math.nan
+        cache[value] = ts
+    return ts
+
+
+def _price(value) -> float:
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return price if math.isfinite(price) else math.nan
+
+
+class MarketSnapshot:
+    ROW_COLUMNS = ("event", "book", "market", "outcome", "description", "point", "price", "last_update")
+
+    def __init__(self, sport_key: str, retrieved_at: datetime, strings: Optional[StringPool] = None):
+        self.sport_key = sport_key
+        self.retrieved_at = retrieved_at
+        self.meta: dict = {}  # x-requests-* headers of the fetch
+        self.strings = strings or StringPool()
+        # Events
+        self.event_id = array("I")
+        self.home = array("I")
+        self.away = array("I")
+        self.commence = array("d")
+        self.sport_title = 0
+        # Book key id → title id
+        self.book_titles: Dict[int, int] = {}
+        # Rows
+        self.event = array("I")
+        self.book = array("I")
+        self.market = array("I")
+        self.outcome = array("I")
+        self.description = array("I")
+        self.point = array("d")
+        self.price = array("d")
+        self.last_update = array("d")
+
+    def __len__(self):
+        return len(self.price)
+
+    @property
+    def n_events(self) -> int:
+        return len(self.event_id)
+
+    @classmethod
+    def from_odds(cls, raw_data: Iterable[dict], sport_key: str, retrieved_at: datetime,
+                  dropped: Optional[dict] = None) -> "MarketSnapshot":
+        """
+        Load an Odds API events list (any markets) without filtering prices.
+
+        Structurally unusable items (event without id/teams/commence time,
+        book without key/title, outcome without name) are skipped and
+        counted in `dropped`; bad prices and timestamps become NaN for
+        validate_markets to reject.
+        """
+        dropped = {} if dropped is None else dropped
+        snap = cls(sport_key, retrieved_at)
+        intern = snap.strings.intern
+        times: Dict[str, float] = {}
+        ev_id, home, away, commence = snap.event_id, snap.home, snap.away, snap.commence
+        r_event, r_book, r_market, r_outcome = snap.event, snap.book, snap.market, snap.outcome
+        r_desc, r_point, r_price, r_updated = snap.description, snap.point, snap.price, snap.last_update
+
+        for event in raw_data:
+            if not event.get("id") or not event.get("home_team") or not event.get("away_team"):
+                _count(dropped, "event", "incomplete")
+                continue
+            start = _unix(event.get("commence_time"), times)
+            if math.isnan(start):
+                _count(dropped, "event", "invalid_commence_time")
+                continue
+            if not snap.sport_title:
+                snap.sport_title = intern(event.get("sport_title"))
+            position = len(ev_id)
+            ev_id.append(intern(event["id"]))
+            home.append(intern(event["home_team"]))
+            away.append(intern(event["away_team"]))
+            commence.append(start)
+
+            for book in event.get("bookmakers") or ():
+                if not book.get("key") or not book.get("title"):
+                    _count(dropped, "bookmaker", "incomplete")
+                    continue
+                book_id = intern(book["key"])
+                snap.book_titles.setdefault(book_id, intern(book["title"]))
+                book_updated = book.get("last_update")
+                for market in book.get("markets") or ():
+                    market_id = intern(market.get("key"))
+                    updated = _unix(market.get("last_update") or book_updated, times)
+                    for outcome in market.get("outcomes") or ():
+                        name = outcome.get("name")
+                        if not name:
+                            _count(dropped, "outcome", "incomplete")
+                            continue
+                        point = outcome.get("point")
+                        r_event.append(position)
+                        r_book.append(book_id)
+                        r_market.append(market_id)
+                        r_outcome.append(intern(name))
+                        r_desc.append(intern(outcome.get("description")))
+                        r_point.append(NO_POINT if point is None else _price(point))
+                        r_price.append(_price(outcome.get("price")))
+                        r_updated.append(updated)
+        return snap
+
+    def take(self, rows: Sequence[int]) -> "MarketSnapshot":
+        """New snapshot with only these rows (events and strings are shared)."""
+        snap = MarketSnapshot(self.sport_key, self.retrieved_at, self.strings)
+        snap.meta = self.meta
+        snap.event_id, snap.home, snap.away, snap.commence = self.event_id, self.home, self.away, self.commence
+        snap.sport_title = self.sport_title
+        snap.book_titles = self.book_titles
+        for column in self.ROW_COLUMNS:
+            source = getattr(self, column)
+            setattr(snap, column, array(source.typecode, [source[i] for i in rows]))
+        return snap
+
+    def nbytes(self) -> int:
+        """Bytes held by the event and row columns (strings not included)."""
+        columns = [self.event_id, self.home, self.away, self.commence] + [getattr(self, c) for c in self.ROW_COLUMNS]
+        return sum(column.itemsize * len(column) for column in columns)
+
+    # --- Queries ---
+
+    def rows_where(self, event: Optional[int] = None, book: Optional[str] = None,
+                   market: Optional[str] = None) -> List[int]:
+        """Row indexes matching an event position and/or book/market key."""
+        checks = []
+        if event is not None:
+            checks.append((self.event, event))
+        for column, value in ((self.book, book), (self.market, market)):
+            if value is not None:
+                sid = self.strings.id(value)
+                if sid is None:
+                    return []
+                checks.append((column, sid))
+        if not checks:
+            return list(range(len(self)))
+        column, value = checks[0]
+        rows = [i for i, v in enumerate(column) if v == value]
+        for column, value in checks[1:]:
+            rows = [i for i in rows if column[i] == value]
+        return rows
+
+    def line_key(self, row: int) -> Tuple[int, int, int, int, float]:
+        """(event, market, outcome, description, point) - same bet across books."""
+        point = self.point[row]
+        return (self.event[row], self.market[row], self.outcome[row], self.description[row],
+                None if math.isnan(point) else point)
+
+    def best_prices(self, rows: Optional[Iterable[int]] = None) -> Dict[tuple, Tuple[float, int]]:
+        """line_key → (best price, row) across books."""
+        best: Dict[tuple, Tuple[float, int]] = {}
+        price = self.price
+        for row in range(len(self)) if rows is None else rows:
+            key = self.line_key(row)
+            current = best.get(key)
+            if current is None or price[row] > current[0]:
+                best[key] = (price[row], row)
+        return best
+
+    def to_events(self, rows: Optional[Iterable[int]] = None) -> List[dict]:
+        """Odds API shaped events (bookmakers → markets → outcomes) for these rows."""
+        s = self.strings
+        events: Dict[int, dict] = {}
+        books: Dict[Tuple[int, int], dict] = {}
+        markets: Dict[Tuple[int, int, int], dict] = {}
+        for row in range(len(self)) if rows is None else rows:
+            e, b, m = self.event[row], self.book[row], self.market[row]
+            event = events.get(e)
+            if event is None:
+                event = events[e] = {
+                    "id": s[self.event_id[e]],
+                    "sport_key": self.sport_key,
+                    "sport_title": s[self.sport_title],
+                    "commence_time": _iso(self.commence[e]),
+                    "home_team": s[self.home[e]],
+                    "away_team": s[self.away[e]],
+                    "bookmakers": [],
+                }
+            book = books.get((e, b))
+            if book is None:
+                book = books[(e, b)] = {"key": s[b], "title": s[self.book_titles.get(b, b)], "markets": []}
+                event["bookmakers"].append(book)
+            market = markets.get((e, b, m))
+            if market is None:
+                market = markets[(e, b, m)] = {
+                    "key": s[m], "last_update": _iso(self.last_update[row]), "outcomes": []
+                }
+                book["markets"].append(market)
+            outcome = {"name": s[self.outcome[row]], "price": self.price[row]}
+            if self.description[row]:
+                outcome["description"] = s[self.description[row]]
+            if not math.isnan(self.point[row]):
+                outcome["point"] = self.point[row]
+            market["outcomes"].append(outcome)
+        return list(events.values())
+
+
+def _iso(ts: float) -> str:
+    return datetime.utcfromtimestamp(ts).isoformat() + "Z"
+
+
+def _count(dropped: dict, level: str, reason: str, n: int = 1):
+    if n:
+        dropped[(level, reason)] = dropped.get((level, reason), 0) + n
+
+
+def _allowed(strings: StringPool, keys: Iterable[str]) -> bytearray:
+    """Lookup table indexed by string id: 1 where the string is in keys."""
+    table = bytearray(len(strings))
+    for key in keys:
+        sid = strings.id(key)
+        if sid:
+            table[sid] = 1
+    return table
+
+
+def validate_markets(
+    snapshot: MarketSnapshot,
+    markets: Sequence[str],
+    books: Iterable[str],
+    max_age_seconds: float = 60,
+    now: Optional[datetime] = None,
+    dropped: Optional[dict] = None
+) -> MarketSnapshot:
+    """
+    Rows that pass every rule, as a new snapshot.
+
+    Each rule is one pass over its column(s); the drop count per rule is
+    published to odds_validation_dropped_total{level="row"}.
+    """
+    dropped = {} if dropped is None else dropped
+    n = len(snapshot)
+    now_ts = ((now or datetime.utcnow()) - _EPOCH).total_seconds()
+    oldest, newest = now_ts - max_age_seconds, now_ts + FUTURE_TOLERANCE_SECONDS
+    book_ok = _allowed(snapshot.strings, books)
+    market_ok = _allowed(snapshot.strings, markets)
+
+    rules = (
+        ("unsupported_book", lambda: [book_ok[b] for b in snapshot.book]),
+        ("unsupported_market", lambda: [market_ok[m] for m in snapshot.market]),
+        ("invalid_price", lambda: [p > 1.0 for p in snapshot.price]),  # NaN compares False
+        ("invalid_last_update", lambda: [t == t for t in snapshot.last_update]),
+        ("stale", lambda: [not t < oldest for t in snapshot.last_update]),
+        ("future_timestamp", lambda: [not t > newest for t in snapshot.last_update]),
+    )
+    keep = [True] * n
+    remaining = n
+    for reason, mask in rules:
+        keep = [k and bool(m) for k, m in zip(keep, mask())]
+        survivors = sum(keep)
+        _count(dropped, "row", reason, remaining - survivors)
+        remaining = survivors
+
+    # A price needs its counterpart(s): >= 2 outcomes per book/market/line
+    groups: Dict[tuple, int] = {}
+    event, book, market, desc, point = (snapshot.event, snapshot.book, snapshot.market,
+                                        snapshot.description, snapshot.point)
+    rows = [i for i in range(n) if keep[i]]
+    keys = [(event[i], book[i], market[i], desc[i], abs(point[i]) if point[i] == point[i] else None) for i in rows]
+    for key in keys:
+        groups[key] = groups.get(key, 0) + 1
+    valid = [row for row, key in zip(rows, keys) if groups[key] >= 2]
+    _count(dropped, "row", "too_few_outcomes", len(rows) - len(valid))
+
+    for (level, reason), count in dropped.items():
+        VALIDATION_DROPPED.labels(level, reason).inc(count)
+    return snapshot.take(valid)
@@ -0,0 +1,219 @@
+"""
+Odds snapshot poller with leader election across worker processes.
+
+Every worker starts an OddsSnapshotPoller, but only the one holding an
+exclusive flock on <ODDS_SNAPSHOT_DIR>/leader.lock fetches: the others keep
+retrying the lock every LEADER_RETRY_SECONDS, so when the leader process
+dies (the OS drops its lock) another worker takes over within seconds.
+
+The leader refreshes every supported sport requested in the last
+WANT_TTL_SECONDS (see SnapshotStore.want) once its snapshot is older than
+the poll interval, and publishes the finished response body (recording its
+price changes in the line history, if enabled). Sports the sports catalog
+marks as out of season are skipped (the route answers those without a
+fetch). Upstream usage is therefore one call per wanted sport per interval,
+whatever the worker count.
+
+Per-process consumers of every refresh (line-move detection, the
+consensus engine) follow the published snapshots with a SnapshotWatcher
+in every worker, the leader included.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from config.sports import SUPPORTED_SPORTS
+from services.snapshot_store import SnapshotStore
+
+logger = logging.getLogger("ironman")
+
+# Seconds between snapshot refreshes for a wanted sport
+DEFAULT_POLL_INTERVAL = 20.0
+
+# Stop refreshing a sport nobody asked for in this long
+WANT_TTL_SECONDS = 300.0
+
+# Non-leaders retry the leader lock this often
+LEADER_RETRY_SECONDS = 2.0
+
+# Leader loop tick (new wants are picked up within this)
+TICK_SECONDS = 0.25
+
+# Parallel upstream fetches when several sports are due at once
+MAX_CONCURRENT_FETCHES = 4
+
+# SnapshotWatcher: seconds between checks for newly published snapshots
+WATCH_SECONDS = 1.0
+
+
+def fetch_odds_payload(sport_key: str) -> bytes:
+    from services.line_history import record_ticks, ticks_from_body
+    from services.validated_odds import get_validated_odds, odds_response_body
+    from utils.http_cache import encode_body
+    body = odds_response_body(get_validated_odds(sport_key))
+    record_ticks(sport_key, ticks_from_body(body))
+    return encode_body(body)
+
+
+class OddsSnapshotPoller:
+    def __init__(
+        self,
+        store: SnapshotStore,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        fetch: Callable[[str], bytes] = fetch_odds_payload,
+        is_active: Optional[Callable[[str], bool]] = None
+    ):
+        self.store = store
+        self.interval = interval
+        self._fetch = fetch
+        if is_active is None:
+            from services.sports_catalog import catalog
+            is_active = catalog.is_active
+        self._is_active = is_active
+        self._lock_path = os.path.join(store.directory, "leader.lock")
+        self._lock_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight: set = set()
+        self._failed_at: dict = {}  # sport → time of last failed refresh (retry after interval)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        logger.info(f"Odds snapshot leader: pid {os.getpid()}")
+        return True
+
+    def release(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def due(self, now: float) -> list:
+        """Wanted sports whose snapshot is missing or older than the interval."""
+        sports = []
+        for sport in self.store.wanted(WANT_TTL_SECONDS, now):
+            if sport in self._in_flight or now - self._failed_at.get(sport, 0.0) < self.interval:
+                continue
+            # want/ is a shared directory: never poll a key that is not a supported sport
+            if sport not in SUPPORTED_SPORTS:
+                continue
+            if not self._is_active(sport):
+                continue
+            snapshot = self.store.read(sport)
+            if snapshot is None or now - snapshot.published_at >= self.interval:
+                sports.append(sport)
+        return sports
+
+    def refresh(self, sport_key: str) -> bool:
+        try:
+            payload = self._fetch(sport_key)
+            self.store.publish(sport_key, payload)
+        except Exception as e:
+            logger.warning(f"Odds snapshot refresh failed for {sport_key}: {e}")
+            self._failed_at[sport_key] = time.time()
+            return False
+        finally:
+            self._in_flight.discard(sport_key)
+        self._failed_at.pop(sport_key, None)
+        return True
+
+    def _loop(self):
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES, thread_name_prefix="odds-poll") as pool:
+            while not self._stop.is_set():
+                if not self.try_acquire():
+                    self._stop.wait(LEADER_RETRY_SECONDS)
+                    continue
+                try:
+                    for sport in self.due(time.time()):
+                        self._in_flight.add(sport)
+                        pool.submit(self.refresh, sport)
+                except Exception as e:
+                    logger.warning(f"Odds snapshot poller error: {e}")
+                self._stop.wait(TICK_SECONDS)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="odds-snapshot-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.release()
+
+
+class SnapshotWatcher:
+    """
+    Passes the ticks of every snapshot published for a wanted sport to
+    each feed (feed(sport_key, ticks)), once per snapshot.
+    """
+
+    def __init__(self, store: SnapshotStore, feeds: List[Callable[[str, list], object]],
+                 want_ttl: float = WANT_TTL_SECONDS):
+        self.store = store
+        self.feeds = feeds
+        self.want_ttl = want_ttl
+        self._seen: Dict[str, int] = {}  # sport → last snapshot seq fed
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """Feed new snapshots; returns how many sports had one."""
+        from services.line_history import ticks_from_body
+        fed = 0
+        for sport_key in self.store.wanted(self.want_ttl, now):
+            snapshot = self.store.read(sport_key)
+            if snapshot is None or self._seen.get(sport_key) == snapshot.seq:
+                continue
+            self._seen[sport_key] = snapshot.seq
+            ticks = list(ticks_from_body(json.loads(snapshot.payload)))
+            for feed in self.feeds:
+                try:
+                    feed(sport_key, ticks)
+                except Exception as e:
+                    logger.warning(f"Snapshot watcher feed failed for {sport_key}: {e}")
+            fed += 1
+        return fed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Snapshot watcher error: {e}")
+            self._stop.wait(WATCH_SECONDS)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="odds-snapshot-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
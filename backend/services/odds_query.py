@@ -0,0 +1,275 @@
+"""
+Filter, project and paginate an odds snapshot from precomputed indexes.
+
+GET /api/odds/{sport_key} used to send every event and every book; the
+dashboards then filtered client-side. With query parameters the route
+answers from an OddsIndex built once per snapshot version:
+
+    commence order   event positions sorted by commence time, plus the
+                     sorted timestamps for bisecting a time window
+    team tokens      lower-cased word of a team name → events
+    books            book key → events offering it
+    prices           every outcome price, sorted, with its event
+
+A query intersects the candidate sets of the filters it uses (smallest
+first) and only the requested page is copied out and projected, so the
+work per request grows with the matches and the page, not the slate.
+
+Filters:
+- books: only these bookmakers (events without any of them are dropped)
+- team: every word must be a substring of a word in the home or away team
+- commence_from / commence_to: commence time window (inclusive)
+- min_price / max_price: only outcomes in range (bookmakers and events
+  left without outcomes are dropped)
+- fields: event keys to return (id is always included)
+- limit / offset: page of the matches in commence-time order
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 500
+
+EVENT_FIELDS = ("id", "sport_key", "sport_title", "commence_time", "home_team", "away_team", "bookmakers")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class OddsQueryError(Exception):
+    """Raised when query parameters are invalid"""
+    pass
+
+
+def _timestamp(value) -> float:
+    """Datetime or ISO string (naive = UTC) → unix seconds."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class OddsQuery(NamedTuple):
+    books: Optional[FrozenSet[str]] = None
+    team: Tuple[str, ...] = ()  # query words
+    commence_from: Optional[float] = None
+    commence_to: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    fields: Optional[Tuple[str, ...]] = None
+    limit: Optional[int] = None
+    offset: int = 0
+
+    @property
+    def filters_outcomes(self) -> bool:
+        return self.books is not None or self.min_price is not None or self.max_price is not None
+
+    def canonical(self) -> str:
+        """Stable text form: equal queries share a cache entry and ETag."""
+        parts = []
+        for name, value in zip(self._fields, self):
+            if value is None or value == () or (name == "offset" and not value):
+                continue
+            if isinstance(value, (frozenset, tuple)):
+                value = ",".join(sorted(value) if isinstance(value, frozenset) else value)
+            parts.append(f"{name}={value}")
+        return "&".join(parts)
+
+
+def parse_query(
+    books: Optional[str] = None,
+    team: Optional[str] = None,
+    commence_from: Optional[datetime] = None,
+    commence_to: Optional[datetime] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> Optional[OddsQuery]:
+    """
+    OddsQuery from raw query parameters, or None when none were given
+    (the unfiltered snapshot is served as-is).
+
+    Raises:
+        OddsQueryError: If a parameter is invalid
+    """
+    book_keys = None
+    if books is not None:
+        book_keys = frozenset(key.strip() for key in books.split(",") if key.strip())
+        if not book_keys:
+            raise OddsQueryError("books must list at least one bookmaker key")
+
+    words: Tuple[str, ...] = ()
+    if team is not None:
+        words = tuple(_tokens(team))
+        if not words:
+            raise OddsQueryError("team must contain letters or digits")
+
+    start = _timestamp(commence_from) if commence_from is not None else None
+    end = _timestamp(commence_to) if commence_to is not None else None
+    if start is not None and end is not None and start > end:
+        raise OddsQueryError("commence_from is after commence_to")
+
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise OddsQueryError("min_price is above max_price")
+
+    selected = None
+    if fields is not None:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(EVENT_FIELDS))
+        if unknown or not requested:
+            raise OddsQueryError(f"fields must be among {', '.join(EVENT_FIELDS)}")
+        selected = tuple(name for name in EVENT_FIELDS if name == "id" or name in requested)
+
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise OddsQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if offset < 0:
+        raise OddsQueryError("offset must not be negative")
+
+    query = OddsQuery(book_keys, words, start, end, min_price, max_price, selected, limit, offset)
+    return None if query == OddsQuery() else query
+
+
+class OddsIndex:
+    """Indexes over one odds body; immutable once built."""
+
+    def __init__(self, body: dict):
+        self.envelope = {key: value for key, value in body.items() if key != "events"}
+        self.events: List[dict] = body["events"]
+
+        starts = [_timestamp(event["commence_time"]) for event in self.events]
+        self.order = sorted(range(len(self.events)), key=starts.__getitem__)
+        self.starts = [starts[position] for position in self.order]
+        self.rank = [0] * len(self.events)
+        for rank, position in enumerate(self.order):
+            self.rank[position] = rank
+
+        self.by_token: Dict[str, List[int]] = {}
+        self.by_book: Dict[str, List[int]] = {}
+        prices: List[Tuple[float, int]] = []
+        for position, event in enumerate(self.events):
+            for token in set(_tokens(event["home_team"]) + _tokens(event["away_team"])):
+                self.by_token.setdefault(token, []).append(position)
+            for book in event["bookmakers"]:
+                self.by_book.setdefault(book["key"], []).append(position)
+                prices.extend((float(outcome["price"]), position) for outcome in book["outcomes"])
+        prices.sort()
+        self.prices = [price for price, _ in prices]
+        self.price_events = [position for _, position in prices]
+
+    # --- Candidate sets ---
+
+    def _team(self, words: Iterable[str]) -> set:
+        matched = None
+        for word in words:
+            events = set()
+            for token, positions in self.by_token.items():  # vocabulary, not events
+                if word in token:
+                    events.update(positions)
+            matched = events if matched is None else matched & events
+        return matched or set()
+
+    def _books(self, books: FrozenSet[str]) -> set:
+        events = set()
+        for key in books:
+            events.update(self.by_book.get(key, ()))
+        return events
+
+    def _prices(self, low: Optional[float], high: Optional[float]) -> set:
+        start = 0 if low is None else bisect_left(self.prices, low)
+        end = len(self.prices) if high is None else bisect_right(self.prices, high)
+        return set(self.price_events[start:end])
+
+    def _window(self, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        """Range of commence ranks inside the window."""
+        first = 0 if start is None else bisect_left(self.starts, start)
+        last = len(self.starts) if end is None else bisect_right(self.starts, end)
+        return first, last
+
+    def matches(self, query: OddsQuery) -> List[int]:
+        """Event positions matching the query, in commence-time order."""
+        first, last = self._window(query.commence_from, query.commence_to)
+        by_price = query.min_price is not None or query.max_price is not None
+        sets = []
+        if query.team:
+            sets.append(self._team(query.team))
+        if query.books is not None:
+            sets.append(self._books(query.books))
+        if by_price:
+            sets.append(self._prices(query.min_price, query.max_price))
+        if not sets:
+            return self.order[first:last]
+
+        sets.sort(key=len)
+        candidates = sets[0].intersection(*sets[1:])
+        rank = self.rank
+        ranked = sorted(rank[position] for position in candidates if first <= rank[position] < last)
+        positions = [self.order[r] for r in ranked]
+        if query.books is not None and by_price:
+            # A price in range at a book that was not asked for does not count
+            positions = [p for p in positions if self._project(self.events[p], query) is not None]
+        return positions
+
+    # --- Output ---
+
+    @staticmethod
+    def _project(event: dict, query: OddsQuery) -> Optional[dict]:
+        """Event with only the requested books, prices and fields (None if nothing is left)."""
+        bookmakers = event["bookmakers"]
+        if query.filters_outcomes:
+            low = float("-inf") if query.min_price is None else query.min_price
+            high = float("inf") if query.max_price is None else query.max_price
+            kept = []
+            for book in bookmakers:
+                if query.books is not None and book["key"] not in query.books:
+                    continue
+                outcomes = [o for o in book["outcomes"] if low <= float(o["price"]) <= high]
+                if outcomes:
+                    kept.append(book if len(outcomes) == len(book["outcomes"]) else {**book, "outcomes": outcomes})
+            if not kept:
+                return None
+            bookmakers = kept
+        if query.fields is None:
+            return {**event, "bookmakers": bookmakers}
+        return {name: (bookmakers if name == "bookmakers" else event[name]) for name in query.fields}
+
+    def answer(self, query: OddsQuery) -> dict:
+        """Response body: the snapshot envelope plus one page of matching events."""
+        positions = self.matches(query)
+        end = len(positions) if query.limit is None else query.offset + query.limit
+        page = [self._project(self.events[p], query) for p in positions[query.offset:end]]
+        return {
+            **self.envelope,
+            "events": page,
+            "total_events": len(positions),
+            "offset": query.offset,
+            "limit": query.limit,
+            "next_offset": end if end < len(positions) else None
+        }
+
+
+class IndexCache:
+    """Latest OddsIndex per sport; a new snapshot version replaces the old one."""
+
+    def __init__(self):
+        self._items: Dict[str, Tuple[str, OddsIndex]] = {}
+
+    def get(self, key: str, version: str, build: Callable[[], dict]) -> OddsIndex:
+        current = self._items.get(key)
+        if current is None or current[0] != version:
+            current = (version, OddsIndex(build()))
+            self._items[key] = current
+        return current[1]
+
+    def clear(self):
+        self._items.clear()
@@ -1,23 +1,147 @@
-import requests
+import functools
+import threading
+import time
 from config.settings import settings
-from tenacity import retry, stop_after_attempt, wait_fixed
+from utils.logger import record_upstream
+from services.circuit_breaker import STATE_VALUES, CircuitBreaker
+from utils.metrics import ODDS_API_DURATION, ODDS_API_REQUESTS_REMAINING, gauge
 
 class OddsAPIError(Exception): pass
 
-BASE = "https://api.the-odds-api.com/v4/sports"
+class OddsAPIConfigError(OddsAPIError):
+    """ODDS_API_KEY is not set (not retried)"""
+    pass
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+class OddsAPICircuitOpenError(OddsAPIError):
+    """Upstream is failing; call rejected without contacting it (not retried)"""
+    pass
+
+BASE = f"{settings.ODDS_API_BASE.rstrip('/')}/sports"
+
+# Shared keep-alive session, created on first upstream call: importing
+# requests costs ~50 ms of cold start, and reusing the connection saves a
+# TLS handshake per call
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+# Opens after 5 consecutive failed attempts (network errors, 5xx, 429); one
+# probe is let through 30 s later. While open, calls fail in microseconds
+# instead of every request thread sitting through 3 attempts and 4 s of waits
+odds_api_breaker = CircuitBreaker("odds_api", failure_threshold=5, reset_timeout=30.0)
+
+gauge(
+    "odds_api_circuit_state", "Odds API circuit breaker (0 closed, 1 half-open, 2 open)",
+    function=lambda: {(): STATE_VALUES[odds_api_breaker.state]}
+)
+
+# Upstream attempts per call, and seconds between them
+RETRY_ATTEMPTS = 3
+RETRY_WAIT_SECONDS = 2.0
+
+def _with_retry(fn):
+    """
+    3 attempts, 2 s apart (config errors and an open circuit are not retried);
+    tenacity is imported on first call. The last attempt's OddsAPIError is
+    re-raised, so callers never see tenacity's RetryError.
+    """
+    retrying = None
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        nonlocal retrying
+        if retrying is None:
+            from tenacity import retry, retry_if_not_exception_type, stop_after_attempt
+            retrying = retry(
+                stop=stop_after_attempt(RETRY_ATTEMPTS), wait=lambda _: RETRY_WAIT_SECONDS, reraise=True,
+                retry=retry_if_not_exception_type((OddsAPIConfigError, OddsAPICircuitOpenError))
+            )(fn)
+        return retrying(*args, **kwargs)
+    return call
+
+def _api_key():
+    if not settings.ODDS_API_KEY:
+        raise OddsAPIConfigError("ODDS_API_KEY is not configured")
+    return settings.ODDS_API_KEY
+
+def _timed_get(url, endpoint, **kwargs):
+    # Upstream time is reported in the access log of the current request and in /metrics
+    if not odds_api_breaker.allow():
+        raise OddsAPICircuitOpenError(
+            f"Odds API circuit open after repeated failures; next probe in {odds_api_breaker.retry_after():.0f}s"
+        )
+    start = time.perf_counter()
+    status = "error"
+    try:
+        r = _get_session().get(url, **kwargs)
+        status = r.status_code
+    except Exception as e:
+        odds_api_breaker.record_failure()
+        import requests
+        if isinstance(e, requests.RequestException):
+            # Timeouts and connection errors surface like a 5xx, so the stale fallback catches them
+            raise OddsAPIError(f"Odds API request failed: {e}") from e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        record_upstream(elapsed)
+        ODDS_API_DURATION.labels(endpoint, status).observe(elapsed)
+    # 4xx other than 429 (bad key, unknown sport) means the upstream itself is up
+    if r.status_code >= 500 or r.status_code == 429:
+        odds_api_breaker.record_failure()
+    else:
+        odds_api_breaker.record_success()
+    return r
+
+@_with_retry
 def get_sports():
-    r = requests.get(f"{BASE}?apiKey={settings.ODDS_API_KEY}", timeout=15)
+    r = _timed_get(f"{BASE}?apiKey={_api_key()}", "sports", timeout=15)
     if r.status_code != 200:
         raise OddsAPIError(f"{r.status_code}: {r.text[:200]}")
     return r.json()
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-def get_odds(sport_key: str):
+def _markets_param(markets) -> str:
+    return markets if isinstance(markets, str) else ",".join(markets)
+
+def _odds_result(r):
+    remaining = r.headers.get("x-requests-remaining")
+    if remaining is not None:
+        try:
+            ODDS_API_REQUESTS_REMAINING.set(float(remaining))
+        except ValueError:
+            pass
+
+    from datetime import datetime
+    return {
+        "data": r.json(),
+        "meta": {
+            "x-requests-remaining": r.headers.get("x-requests-remaining"),
+            "x-requests-used": r.headers.get("x-requests-used")
+        },
+        "retrieved_at": datetime.utcnow().isoformat() + "Z"
+    }
+
+@_with_retry
+def get_odds(sport_key: str, markets="h2h"):
     """
     Fetch odds from The Odds API.
 
+    markets: market key(s) - "h2h" (MVP default), "spreads", "totals", or a
+    list / comma-separated string of them. Each market counts against the
+    quota separately. Player props need get_event_odds.
+
     CRITICAL: Returns DECIMAL odds format for correct EV calculations.
     CRITICAL: Validates and includes timestamps for staleness detection.
 
@@ -28,25 +152,56 @@ def get_odds(sport_key: str):
     """
     url = f"{BASE}/{sport_key}/odds"
     params = {
-        "apiKey": settings.ODDS_API_KEY,
+        "apiKey": _api_key(),
         "regions": "us",
-        "markets": "h2h",  # ONLY h2h for MVP - no spreads/totals yet
+        "markets": _markets_param(markets),
         "oddsFormat": "decimal",  # REQUIRED - not american
         "dateFormat": "iso"
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = _timed_get(url, "odds", params=params, timeout=20)
     if r.status_code != 200:
         raise OddsAPIError(f"{r.status_code}: {r.text[:200]}")
+    return _odds_result(r)
 
-    from datetime import datetime
-    return {
-        "data": r.json(),
-        "meta": {
-            "x-requests-remaining": r.headers.get("x-requests-remaining"),
-            "x-requests-used": r.headers.get("x-requests-used")
-        },
-        "retrieved_at": datetime.utcnow().isoformat() + "Z"
+@_with_retry
+def get_event_odds(sport_key: str, event_id: str, markets):
+    """
+    Fetch any markets (including player props) for one event.
+
+    Same return shape as get_odds, with "data" a one-element events list.
+    """
+    url = f"{BASE}/{sport_key}/events/{event_id}/odds"
+    params = {
+        "apiKey": _api_key(),
+        "regions": "us",
+        "markets": _markets_param(markets),
+        "oddsFormat": "decimal",
+        "dateFormat": "iso"
     }
+    r = _timed_get(url, "event_odds", params=params, timeout=20)
+    if r.status_code != 200:
+        raise OddsAPIError(f"{r.status_code}: {r.text[:200]}")
+    result = _odds_result(r)
+    result["data"] = [result["data"]] if isinstance(result["data"], dict) else result["data"]
+    return result
+
+@_with_retry
+def get_scores(sport_key: str, days_from: int = 3):
+    """
+    Fetch live and recently completed scores from The Odds API.
+
+    days_from: how many days back to include completed games (1-3).
+    """
+    url = f"{BASE}/{sport_key}/scores"
+    params = {
+        "apiKey": _api_key(),
+        "daysFrom": days_from,
+        "dateFormat": "iso"
+    }
+    r = _timed_get(url, "scores", params=params, timeout=20)
+    if r.status_code != 200:
+        raise OddsAPIError(f"{r.status_code}: {r.text[:200]}")
+    return r.json()
 
 def get_best_lines(sport_key: str, market: str = "h2h") -> list:
     data = get_odds(sport_key, markets=market)["data"]
@@ -0,0 +1,240 @@
+"""
+Parlay and round-robin EV.
+
+Legs are (decimal odds, YOUR win probability). A parlay of the legs in S
+pays stake × Π odds_i if every leg in S wins; a round robin "by k" is one
+parlay per k-leg combination, each with the same stake.
+
+Independent legs - exact, and without enumerating a single combination:
+
+    E[return of one parlay S]  = stake × Π_{i∈S} p_i o_i
+    E[round robin by k]        = stake × e_k(p_1 o_1, ..., p_n o_n)
+
+where e_k is the k-th elementary symmetric polynomial, built leg by leg
+in O(n·k) (C(12, 6) = 924 parlays cost 12 × 6 multiply-adds). The
+variance comes the same way from a DP over pairs of combinations
+(O(n·k²)), and the chance that at least one parlay wins is the chance
+that at least k legs win (a Poisson-binomial DP).
+
+Correlated legs (same-game parlays) - simulated: a Gaussian copula with
+the given correlation matrix decides which legs win together (leg i
+wins when z_i < Φ⁻¹(p_i), z ~ N(0, correlation)), so every leg keeps its
+own probability. Note the matrix is the correlation of the latent
+normals, not of the win/loss outcomes, which is always somewhat smaller.
+Each sample's round-robin returns come from the same e_k recurrence over
+that sample's winning odds, with every sample drawn and summed at once as
+numpy arrays. Results carry their standard error.
+
+Same formula as the straight-bet calculator, per parlay:
+EV = stake × (P × O - 1). No pushes, voids or boosts.
+"""
+
+import math
+from statistics import NormalDist
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy
+
+# Most legs in one request
+MAX_LEGS = 20
+
+# Simulation samples for correlated legs (default and limit)
+DEFAULT_SAMPLES = 200_000
+MAX_SAMPLES = 2_000_000
+
+
+class ParlayError(Exception):
+    """Invalid legs, sizes or correlation matrix"""
+    pass
+
+
+class Leg(NamedTuple):
+    odds: float  # decimal, > 1
+    probability: float  # YOUR win probability, 0 < p < 1
+
+
+class RoundRobinResult(NamedTuple):
+    size: int  # legs per parlay (size == legs: the straight parlay)
+    parlays: int
+    stake_per_parlay: float
+    total_stake: float
+    expected_return: float
+    ev: float
+    roi: float
+    win_probability: float  # at least one parlay wins
+    stdev: float  # of the total return
+    max_return: float  # every leg wins
+    method: str  # "exact" or "simulation"
+    standard_error: Optional[float] = None  # simulation: of expected_return
+    profit_probability: Optional[float] = None  # simulation, or the straight parlay
+
+    def as_dict(self) -> dict:
+        result = {
+            "size": self.size,
+            "parlays": self.parlays,
+            "stake_per_parlay": round(self.stake_per_parlay, 2),
+            "total_stake": round(self.total_stake, 2),
+            "expected_return": round(self.expected_return, 2),
+            "ev": round(self.ev, 2),
+            "roi": round(self.roi, 4),
+            "win_probability": round(self.win_probability, 6),
+            "profit_probability": None if self.profit_probability is None else round(self.profit_probability, 6),
+            "stdev": round(self.stdev, 2),
+            "max_return": round(self.max_return, 2),
+            "method": self.method,
+        }
+        if self.standard_error is not None:
+            result["standard_error"] = round(self.standard_error, 4)
+        return result
+
+
+def validate(legs: Sequence[Leg], sizes: Sequence[int], stake: float):
+    """Raises ParlayError"""
+    if not 2 <= len(legs) <= MAX_LEGS:
+        raise ParlayError(f"A parlay needs 2 to {MAX_LEGS} legs, got {len(legs)}")
+    for index, leg in enumerate(legs):
+        if not leg.odds > 1:
+            raise ParlayError(f"Leg {index}: odds must be > 1.0 (decimal), got {leg.odds}")
+        if not 0 < leg.probability < 1:
+            raise ParlayError(f"Leg {index}: probability must be between 0 and 1 (exclusive), got {leg.probability}")
+    if not sizes:
+        raise ParlayError("At least one round-robin size is needed")
+    for size in sizes:
+        if not 2 <= size <= len(legs):
+            raise ParlayError(f"Round-robin size must be between 2 and {len(legs)}, got {size}")
+    if not stake > 0:
+        raise ParlayError(f"Stake must be > 0, got {stake}")
+
+
+def elementary_symmetric(values: Sequence[float], k: int) -> List[float]:
+    """[e_0, ..., e_k] of values: e_j = sum over j-subsets of their product."""
+    e = [1.0] + [0.0] * k
+    for count, x in enumerate(values, 1):
+        for j in range(min(count, k), 0, -1):
+            e[j] += e[j - 1] * x
+    return e
+
+
+def _second_moment(legs: Sequence[Leg], k: int) -> float:
+    """E[(Σ_{|S|=k} Π_{i∈S} o_i·won_i)²], summing over pairs of k-subsets leg by leg."""
+    # m[a][b]: pairs (S, T) of the legs so far with |S| = a, |T| = b
+    m = [[0.0] * (k + 1) for _ in range(k + 1)]
+    m[0][0] = 1.0
+    for leg in legs:
+        one, both = leg.odds * leg.probability, leg.odds * leg.odds * leg.probability
+        for a in range(k, -1, -1):
+            row, above = m[a], m[a - 1] if a else None
+            for b in range(k, -1, -1):
+                value = row[b]
+                if b:
+                    value += row[b - 1] * one
+                if above is not None:
+                    value += above[b] * one
+                    if b:
+                        value += above[b - 1] * both
+                row[b] = value
+    return m[k][k]
+
+
+def _at_least(probabilities: Sequence[float], k: int) -> float:
+    """P(at least k of the independent legs win)."""
+    wins = [1.0]
+    for p in probabilities:
+        wins = [a * (1 - p) + b * p for a, b in zip(wins + [0.0], [0.0] + wins)]
+    return sum(wins[k:])
+
+
+def _result(legs, size, stake, expected, second_moment, win_probability, method,
+            standard_error=None, profit_probability=None) -> RoundRobinResult:
+    parlays = math.comb(len(legs), size)
+    total_stake = stake * parlays
+    max_return = stake * elementary_symmetric([leg.odds for leg in legs], size)[size]
+    return RoundRobinResult(
+        size, parlays, stake, total_stake, expected, expected - total_stake, (expected - total_stake) / total_stake,
+        win_probability, math.sqrt(max(second_moment - expected * expected, 0.0)), max_return, method,
+        standard_error, profit_probability
+    )
+
+
+def round_robin(legs: Sequence[Leg], sizes: Sequence[int], stake: float) -> List[RoundRobinResult]:
+    """Exact EV of each round-robin size for independent legs (size == len(legs): the straight parlay)."""
+    validate(legs, sizes, stake)
+    e = elementary_symmetric([leg.odds * leg.probability for leg in legs], max(sizes))
+    results = []
+    for size in sizes:
+        win_probability = _at_least([leg.probability for leg in legs], size)
+        results.append(_result(
+            legs, size, stake, stake * e[size], stake * stake * _second_moment(legs, size), win_probability,
+            "exact", profit_probability=win_probability if size == len(legs) else None
+        ))
+    return results
+
+
+def cholesky(correlation: Sequence[Sequence[float]], n: int) -> List[List[float]]:
+    """
+    Lower-triangular L with L·Lᵀ = correlation.
+
+    Raises:
+        ParlayError: not n×n, not symmetric, a diagonal other than 1, or not positive definite
+    """
+    if len(correlation) != n or any(len(row) != n for row in correlation):
+        raise ParlayError(f"The correlation matrix must be {n}×{n} (one row and column per leg)")
+    for i in range(n):
+        if abs(correlation[i][i] - 1) > 1e-9:
+            raise ParlayError(f"The correlation matrix diagonal must be 1, got {correlation[i][i]} for leg {i}")
+        for j in range(i):
+            if abs(correlation[i][j] - correlation[j][i]) > 1e-9:
+                raise ParlayError(f"The correlation matrix must be symmetric (legs {j} and {i})")
+            if not -1 < correlation[i][j] < 1:
+                raise ParlayError(f"Correlations must be between -1 and 1 (exclusive), got {correlation[i][j]}")
+    lower = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            total = correlation[i][j] - sum(lower[i][m] * lower[j][m] for m in range(j))
+            if i == j:
+                if total <= 1e-12:
+                    raise ParlayError("The correlation matrix is not positive definite")
+                lower[i][i] = math.sqrt(total)
+            else:
+                lower[i][j] = total / lower[j][j]
+    return lower
+
+
+def simulate(legs: Sequence[Leg], sizes: Sequence[int], stake: float, correlation: Sequence[Sequence[float]],
+             samples: int = DEFAULT_SAMPLES, seed: Optional[int] = None) -> List[RoundRobinResult]:
+    """EV of each round-robin size with correlated legs, by Gaussian-copula simulation."""
+    validate(legs, sizes, stake)
+    if not 1000 <= samples <= MAX_SAMPLES:
+        raise ParlayError(f"samples must be between 1000 and {MAX_SAMPLES}, got {samples}")
+    lower = cholesky(correlation, len(legs))
+    thresholds = [NormalDist().inv_cdf(leg.probability) for leg in legs]
+    moments = _simulate_arrays(legs, sizes, lower, thresholds, max(sizes), samples, seed)
+    results = []
+    for size in sizes:
+        mean, second, wins, profits = moments[size]
+        variance = max(second - mean * mean, 0.0)
+        results.append(_result(
+            legs, size, stake, stake * mean, stake * stake * second, wins, "simulation",
+            standard_error=stake * math.sqrt(variance / samples), profit_probability=profits
+        ))
+    return results
+
+
+def _simulate_arrays(legs, sizes, lower, thresholds, k, samples, seed) -> dict:
+    rng = numpy.random.default_rng(seed)
+    z = rng.standard_normal((samples, len(legs))) @ numpy.array(lower).T
+    paid = (z < numpy.array(thresholds)) * numpy.array([leg.odds for leg in legs])
+    e = numpy.zeros((k + 1, samples))
+    e[0] = 1.0
+    for i in range(len(legs)):
+        e[1:] += e[:-1] * paid[:, i]
+    moments = {}
+    for size in sizes:
+        parlays = math.comb(len(legs), size)
+        returns = e[size]
+        moments[size] = (
+            float(returns.mean()), float((returns * returns).mean()),
+            float((returns > 0).mean()), float((returns > parlays).mean())
+        )
+    return moments
+
@@ -0,0 +1,158 @@
+"""
+Time-Bucketed Rollups
+
+Pre-aggregated P&L / EV / CLV counters per user, bucketed by day, week and
+month, so dashboard charts read a few hundred small buckets instead of
+scanning the full bet history.
+
+One bucket per (period, user, dim, key, period_start) - in Mongo one
+collection per period (rollups_day, rollups_week, rollups_month):
+    dim "all"   key "all"            → every bet of the user
+    dim "sport" key "basketball_nba" → one sport
+    dim "book"  key "DraftKings"     → one sportsbook
+
+Bets are bucketed by when they were placed (loggedAt). A bet's stake, EV
+and eventual P&L therefore land in the same bucket, and every later change
+(closing odds, settlement) is a delta against that same bucket.
+
+Counters are the same ones the per-user summaries keep (see bet_metrics),
+applied with idempotent op ids by the storage backend (see db/repository).
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from db.repository import get_repository
+from services.bet_metrics import add_counters, contribution, contribution_delta, field_key
+
+
+PERIODS = ("day", "week", "month")
+
+
+class RollupQueryError(Exception):
+    """Raised for invalid rollup queries"""
+    pass
+
+
+def period_start(when: datetime, period: str) -> datetime:
+    """Start of the day / ISO week (Monday) / month containing when."""
+    day = datetime(when.year, when.month, when.day)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return datetime(when.year, when.month, 1)
+    raise RollupQueryError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}")
+
+
+def bucket_keys(bet: dict, period: str) -> List[dict]:
+    """The three rollup buckets (all / sport / book) a bet belongs to."""
+    start = period_start(bet.get("loggedAt") or datetime.utcnow(), period)
+    user = bet["user"]
+    return [
+        {"user": user, "dim": "all", "key": "all", "period_start": start},
+        {"user": user, "dim": "sport", "key": field_key(bet.get("sport")), "period_start": start},
+        {"user": user, "dim": "book", "key": field_key(bet.get("sportsbook")), "period_start": start},
+    ]
+
+
+def record_bet_rollups(old: Optional[dict], new: Optional[dict], op_id: Optional[str] = None) -> int:
+    """Apply one bet change to its day/week/month buckets."""
+    bet = new or old
+    if not bet:
+        return 0
+    delta = contribution_delta(old, new)
+    if not delta:
+        return 0
+
+    repo = get_repository()
+    applied = 0
+    for period in PERIODS:
+        updates = [(key, delta) for key in bucket_keys(bet, period)]
+        applied += repo.increment_rollups(period, updates, op_id)
+    return applied
+
+
+def series_point(doc: dict) -> dict:
+    """Chart point for one bucket."""
+    c = doc.get("counters", {})
+    settled_stake = c.get("settled_stake_sum", 0.0)
+    clv_n = c.get("clv_n", 0)
+    return {
+        "period_start": doc["period_start"],
+        "bets": int(c.get("bets", 0)),
+        "stake": round(c.get("stake_sum", 0.0), 2),
+        "expected_ev": round(c.get("ev_sum", 0.0), 2),
+        "realized_pnl": round(c.get("pnl_sum", 0.0), 2),
+        "settled_bets": int(c.get("pnl_n", 0)),
+        "roi": round(c.get("pnl_sum", 0.0) / settled_stake, 4) if settled_stake else None,
+        "avg_clv": round(c.get("clv_sum", 0.0) / clv_n, 4) if clv_n else None,
+    }
+
+
+def get_rollup_series(
+    user: str,
+    period: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sport: Optional[str] = None,
+    book: Optional[str] = None
+) -> dict:
+    """
+    Time series of realized P&L vs expected EV for a user.
+
+    One indexed range scan on (user, dim, key, period_start); a year of
+    daily buckets is at most 366 small buckets.
+    """
+    if period not in PERIODS:
+        raise RollupQueryError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}")
+    if sport and book:
+        raise RollupQueryError("Filter by sport or by book, not both")
+
+    if sport:
+        dim, key = "sport", field_key(sport)
+    elif book:
+        dim, key = "book", field_key(book)
+    else:
+        dim, key = "all", "all"
+
+    buckets = get_repository().find_rollups(
+        period, user, dim, key,
+        start=period_start(start, period) if start else None,
+        end=end
+    )
+
+    points = []
+    cumulative_pnl = 0.0
+    cumulative_ev = 0.0
+    for doc in buckets:
+        point = series_point(doc)
+        cumulative_pnl += point["realized_pnl"]
+        cumulative_ev += point["expected_ev"]
+        point["cumulative_pnl"] = round(cumulative_pnl, 2)
+        point["cumulative_ev"] = round(cumulative_ev, 2)
+        points.append(point)
+
+    return {"user": user, "period": period, "dim": dim, "key": key, "points": points}
+
+
+def build_rollups(bets: Iterable[dict], period: str) -> Dict[tuple, dict]:
+    """Compute bucket counters from scratch: {(dim, key, period_start): counters}."""
+    buckets: Dict[tuple, dict] = {}
+    for bet in bets:
+        counters = contribution(bet)
+        for key in bucket_keys(bet, period):
+            add_counters(buckets.setdefault((key["dim"], key["key"], key["period_start"]), {}), counters)
+    return buckets
+
+
+def rebuild_user_rollups(user: str) -> int:
+    """
+    Repair job: recompute every bucket of one user from their bets.
+
+    Returns the number of buckets written.
+    """
+    repo = get_repository()
+    bets = repo.find_bets(user)
+    return sum(repo.set_user_rollups(period, user, build_rollups(bets, period)) for period in PERIODS)
@@ -0,0 +1,211 @@
+"""
+Bet Settlement
+
+Sets Bet.result ('win', 'lose', 'push') and realized P&L from final scores.
+
+Pipeline:
+1. A ResultsSource returns final scores (Odds API scores endpoint, a local
+   JSON file, or a static list for tests).
+2. Open bets on completed events are settled in batched bulk updates
+   guarded on result being unset, so a bet is only ever settled once.
+3. Settled bets are flagged rollup_pending; the rollup phase folds them into
+   the per-user summaries with op id "settle:<bet id>" and then clears the
+   flag. A crash anywhere in between is safe to re-run: summaries skip op
+   ids they have already applied.
+
+Matching is by event_id, so only bets logged with an event_id and outcome
+can be settled automatically.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from db.repository import get_repository
+from services.bet_metrics import realized_pnl
+from services.summary_service import record_bet_change
+
+logger = logging.getLogger("ironman")
+
+
+# Bets per bulk update
+SETTLEMENT_BATCH_SIZE = 500
+
+# Outcome name The Odds API uses for a draw in 3-way markets
+DRAW_OUTCOME = "Draw"
+
+
+class SettlementError(Exception):
+    """Raised when results cannot be loaded or applied"""
+    pass
+
+
+class ResultsSource(ABC):
+    """
+    Where final scores come from.
+
+    fetch_results returns completed events as:
+        {"event_id", "sport", "home_team", "away_team", "home_score", "away_score"}
+    plus "commence_time" when the source knows it (backtests stop betting then).
+    It is abstract, so a source that does not implement it fails when it is
+    constructed rather than in the middle of a settlement run.
+    """
+
+    @abstractmethod
+    def fetch_results(self, sport: Optional[str] = None) -> List[dict]:
+        raise NotImplementedError
+
+
+class StaticResultsSource(ResultsSource):
+    """In-memory results (tests, manual corrections)."""
+
+    def __init__(self, results: Iterable[dict]):
+        self.results = list(results)
+
+    def fetch_results(self, sport: Optional[str] = None) -> List[dict]:
+        return [r for r in self.results if sport is None or r.get("sport") == sport]
+
+
+class FileResultsSource(StaticResultsSource):
+    """Results from a local JSON file (a list of result dicts)."""
+
+    def __init__(self, path: str):
+        try:
+            with open(path) as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            raise SettlementError(f"Cannot read results file {path}: {e}")
+        super().__init__(results)
+
+
+class OddsAPIResultsSource(ResultsSource):
+    """Completed games from The Odds API scores endpoint."""
+
+    def __init__(self, sports: Iterable[str], days_from: int = 3):
+        self.sports = list(sports)
+        self.days_from = days_from
+
+    def fetch_results(self, sport: Optional[str] = None) -> List[dict]:
+        from services.odds_service import get_scores
+
+        results = []
+        for sport_key in ([sport] if sport else self.sports):
+            for game in get_scores(sport_key, days_from=self.days_from):
+                if not game.get("completed") or not game.get("scores"):
+                    continue
+                scores = {s["name"]: s["score"] for s in game["scores"]}
+                try:
+                    results.append({
+                        "event_id": game["id"],
+                        "sport": game["sport_key"],
+                        "home_team": game["home_team"],
+                        "away_team": game["away_team"],
+                        "home_score": float(scores[game["home_team"]]),
+                        "away_score": float(scores[game["away_team"]]),
+                        "commence_time": game.get("commence_time")
+                    })
+                except (KeyError, TypeError, ValueError):
+                    continue  # Skip games with incomplete scores
+        return results
+
+
+def bet_result(bet: dict, result: dict) -> Optional[str]:
+    """
+    Settle one h2h bet against a final score.
+
+    Two-way markets push on a tie. In soccer (3-way h2h) a draw wins
+    the Draw outcome and loses both team outcomes.
+    Returns None if the bet's outcome does not belong to the event.
+    """
+    outcome = bet.get("outcome")
+    home, away = result["home_team"], result["away_team"]
+    home_score, away_score = result["home_score"], result["away_score"]
+
+    if home_score == away_score:
+        three_way = (result.get("sport") or bet.get("sport") or "").startswith("soccer")
+        if outcome == DRAW_OUTCOME:
+            return "win"
+        if outcome in (home, away):
+            return "lose" if three_way else "push"
+        return None
+
+    winner = home if home_score > away_score else away
+    if outcome == winner:
+        return "win"
+    if outcome in (home, away, DRAW_OUTCOME):
+        return "lose"
+    return None
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def settle_results(results: List[dict], batch_size: int = SETTLEMENT_BATCH_SIZE) -> Dict[str, int]:
+    """Settle every open bet on the given completed events."""
+    repo = get_repository()
+    by_event = {r["event_id"]: r for r in results}
+    stats = {"events": len(by_event), "settled": 0, "unmatched": 0}
+    settled_at = datetime.utcnow()
+
+    for event_ids in _chunks(list(by_event), batch_size):
+        updates = []
+        for bet in repo.find_open_bets(event_ids):
+            result = bet_result(bet, by_event[bet["event_id"]])
+            if result is None:
+                stats["unmatched"] += 1
+                continue
+            updates.append((bet["id"], {
+                "result": result,
+                "pnl": realized_pnl({**bet, "result": result}),
+                "settledAt": settled_at,
+                "rollup_pending": True
+            }))
+
+        for batch in _chunks(updates, batch_size):
+            stats["settled"] += repo.update_bets(batch, only_if_unset="result")
+
+    return stats
+
+
+def apply_pending_rollups(batch_size: int = SETTLEMENT_BATCH_SIZE) -> int:
+    """
+    Fold settled-but-not-rolled-up bets into per-user summaries.
+
+    Idempotent: each bet is applied under op id "settle:<bet id>".
+    """
+    repo = get_repository()
+    applied = 0
+    while True:
+        pending = repo.find_rollup_pending(batch_size)
+        if not pending:
+            return applied
+
+        for bet in pending:
+            before = {**bet, "result": None, "pnl": None}
+            record_bet_change(before, bet, op_id=f"settle:{bet['id']}")
+
+        repo.update_bets([(b["id"], {"rollup_pending": False}) for b in pending])
+        applied += len(pending)
+
+
+def run_settlement(source: ResultsSource, sport: Optional[str] = None) -> Dict[str, int]:
+    """Ingest results, settle bets, then update rollups."""
+    results = source.fetch_results(sport)
+    stats = settle_results(results)
+    stats["rolled_up"] = apply_pending_rollups()
+    logger.info(f"settlement: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("usage: python -m services.settlement_service <results.json>")
+        sys.exit(1)
+    print(run_settlement(FileResultsSource(sys.argv[1])))
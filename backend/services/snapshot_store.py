@@ -0,0 +1,325 @@
+"""
+Shared odds snapshot store for multi-worker deployments.
+
+With `uvicorn --workers N` each worker is a separate process. Instead of
+every worker fetching from The Odds API, one elected worker (see
+services.odds_poller) publishes each sport's finished /api/odds/{sport}
+response body into a memory-mapped file, and every worker serves those
+bytes directly - no upstream call, no validation, no JSON encoding.
+
+File layout (one file per sport, in ODDS_SNAPSHOT_DIR, ideally on tmpfs
+such as /dev/shm):
+
+    offset 0   magic      4s   b"ILSS"
+    offset 4   flags      u32  bit 0: superseded (file was replaced, reopen)
+    offset 8   seq        u64  seqlock counter: odd while a write is in progress
+    offset 16  published  f64  unix time the payload was published
+    offset 24  length     u32  payload bytes
+    offset 32  payload
+
+Writers bump seq to odd, write, then bump to even; readers retry until they
+see the same even seq before and after copying the payload. A payload that
+outgrows the file is written to a larger file which is renamed into place,
+and the old file is flagged superseded so readers reopen. Readers keep the
+last payload per sport and return it as-is while seq is unchanged, so a
+steady-state read is one header peek and no copy.
+
+Sports are published on demand: readers touch want/<sport> (throttled) and
+the poller only refreshes sports someone asked for recently. Only
+config.sports.SUPPORTED_SPORTS can be wanted, so clients cannot make the
+leader spend upstream quota on made-up keys (or grow want/ without bound).
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from config.sports import SUPPORTED_SPORTS
+
+MAGIC = b"ILSS"
+HEADER = struct.Struct("<4sIQdI")
+HEADER_SIZE = 32
+SEQ_OFFSET = 8
+FLAG_SUPERSEDED = 1
+
+# Smallest file created; grows to the next power of two above 1.5× payload
+MIN_CAPACITY = 64 * 1024
+
+# Seconds between want/<sport> touches per process (one syscall, not one per request)
+WANT_TOUCH_INTERVAL = 10.0
+
+# Read attempts before giving up on a snapshot that is being rewritten
+READ_RETRIES = 200
+
+# Snapshots older than this are not served (leader down or upstream failing)
+SNAPSHOT_MAX_AGE_SECONDS = 45.0
+
+# First request for a sport waits this long for the leader's first publish
+FIRST_SNAPSHOT_WAIT_SECONDS = 8.0
+
+_SPORT_KEY = re.compile(r"^[a-z0-9_]+$")
+
+_seq = struct.Struct("<Q")
+
+
+class SnapshotStoreError(Exception):
+    """Snapshot file is corrupt or unusable"""
+    pass
+
+
+class Snapshot(NamedTuple):
+    payload: bytes
+    published_at: float
+    seq: int
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.published_at
+
+
+def valid_sport_key(sport_key: str) -> bool:
+    return bool(_SPORT_KEY.match(sport_key or ""))
+
+
+def _capacity_for(length: int) -> int:
+    capacity = MIN_CAPACITY
+    while capacity < HEADER_SIZE + length * 3 // 2:
+        capacity *= 2
+    return capacity
+
+
+class _Reader:
+    __slots__ = ("map", "cached")
+
+    def __init__(self, mapped: mmap.mmap):
+        self.map = mapped
+        self.cached: Optional[Snapshot] = None
+
+
+class SnapshotStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.want_dir = os.path.join(directory, "want")
+        os.makedirs(self.want_dir, exist_ok=True)
+        self._readers: Dict[str, _Reader] = {}
+        self._writers: Dict[str, mmap.mmap] = {}
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, sport_key: str) -> str:
+        if not valid_sport_key(sport_key):
+            raise ValueError(f"Invalid sport key: {sport_key!r}")
+        return os.path.join(self.directory, f"{sport_key}.snap")
+
+    # --- Writer side (leader only) ---
+
+    def publish(self, sport_key: str, payload: bytes, published_at: Optional[float] = None) -> int:
+        """Publish a new payload; returns the new (even) seq."""
+        published_at = time.time() if published_at is None else published_at
+        with self._lock:
+            mapped = self._writers.get(sport_key)
+            if mapped is None:
+                mapped = self._open_writer(sport_key, len(payload))
+            elif HEADER_SIZE + len(payload) > len(mapped):
+                mapped = self._replace_file(sport_key, len(payload), mapped)
+
+            seq = _seq.unpack_from(mapped, SEQ_OFFSET)[0]
+            if seq % 2:
+                seq += 1  # a previous writer died mid-write
+            _seq.pack_into(mapped, SEQ_OFFSET, seq + 1)
+            mapped[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+            struct.pack_into("<dI", mapped, 16, published_at, len(payload))
+            _seq.pack_into(mapped, SEQ_OFFSET, seq + 2)
+            return seq + 2
+
+    def _open_writer(self, sport_key: str, length: int) -> mmap.mmap:
+        path = self._path(sport_key)
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return self._replace_file(sport_key, length, None)
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE + length:
+                os.close(fd)
+                fd = None
+                return self._replace_file(sport_key, length, None)
+            mapped = mmap.mmap(fd, size)
+        finally:
+            if fd is not None:
+                os.close(fd)
+        if mapped[:4] != MAGIC:
+            mapped.close()
+            return self._replace_file(sport_key, length, None)
+        self._writers[sport_key] = mapped
+        return mapped
+
+    def _replace_file(self, sport_key: str, length: int, old: Optional[mmap.mmap]) -> mmap.mmap:
+        path = self._path(sport_key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        capacity = _capacity_for(length)
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, capacity)
+            mapped = mmap.mmap(fd, capacity)
+        finally:
+            os.close(fd)
+        # Continue the old seq so readers never see it go backwards
+        seq = (_seq.unpack_from(old, SEQ_OFFSET)[0] + 2) & ~1 if old is not None else 0
+        HEADER.pack_into(mapped, 0, MAGIC, 0, seq, 0.0, 0)
+        os.replace(tmp, path)
+        if old is not None:
+            struct.pack_into("<I", old, 4, FLAG_SUPERSEDED)
+            old.close()
+        self._writers[sport_key] = mapped
+        return mapped
+
+    # --- Reader side (every worker) ---
+
+    def read(self, sport_key: str) -> Optional[Snapshot]:
+        """Latest snapshot for a sport, or None if nothing was published yet."""
+        reader = self._readers.get(sport_key)
+        if reader is None:
+            reader = self._open_reader(sport_key)
+            if reader is None:
+                return None
+
+        for _ in range(READ_RETRIES):
+            mapped = reader.map
+            seq = _seq.unpack_from(mapped, SEQ_OFFSET)[0]
+            if seq % 2:
+                time.sleep(0)  # writer mid-publish
+                continue
+            flags = struct.unpack_from("<I", mapped, 4)[0]
+            if flags & FLAG_SUPERSEDED:
+                reader = self._open_reader(sport_key)
+                if reader is None:
+                    return None
+                continue
+            cached = reader.cached
+            if cached is not None and cached.seq == seq:
+                return cached
+            published_at, length = struct.unpack_from("<dI", mapped, 16)
+            if length == 0 or HEADER_SIZE + length > len(mapped):
+                return None if length == 0 else self._corrupt(sport_key)
+            payload = mapped[HEADER_SIZE:HEADER_SIZE + length]
+            if _seq.unpack_from(mapped, SEQ_OFFSET)[0] != seq:
+                continue  # torn read, retry
+            reader.cached = Snapshot(payload, published_at, seq)
+            return reader.cached
+        return None
+
+    def read_fresh(self, sport_key: str, max_age: float = SNAPSHOT_MAX_AGE_SECONDS,
+                   wait: float = FIRST_SNAPSHOT_WAIT_SECONDS) -> Optional[Snapshot]:
+        """
+        Snapshot no older than max_age, registering demand for the sport.
+
+        If nothing was ever published for the sport, waits up to `wait`
+        seconds for the leader to pick up the new want. A stale snapshot
+        returns None right away so the caller can fall back to a direct fetch.
+        """
+        self.want(sport_key)
+        deadline = time.monotonic() + wait
+        while True:
+            snapshot = self.read(sport_key)
+            if snapshot is not None:
+                return snapshot if snapshot.age <= max_age else None
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    def _open_reader(self, sport_key: str) -> Optional[_Reader]:
+        try:
+            fd = os.open(self._path(sport_key), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE:
+                return None
+            mapped = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        if mapped[:4] != MAGIC:
+            mapped.close()
+            return None
+        # The previous map is not closed here: another thread may still be
+        # copying from it; it is released when the last reference goes
+        reader = _Reader(mapped)
+        self._readers[sport_key] = reader
+        return reader
+
+    def _corrupt(self, sport_key: str):
+        raise SnapshotStoreError(f"Corrupt snapshot file for {sport_key}")
+
+    # --- Demand registry ---
+
+    def want(self, sport_key: str, now: Optional[float] = None):
+        """Record that a client asked for this sport (throttled per process; unsupported sports are ignored)."""
+        if sport_key not in SUPPORTED_SPORTS:
+            return
+        now = time.time() if now is None else now
+        if now - self._touched.get(sport_key, 0.0) < WANT_TOUCH_INTERVAL:
+            return
+        self._touched[sport_key] = now
+        path = os.path.join(self.want_dir, sport_key)
+        try:
+            with open(path, "a"):
+                pass
+            os.utime(path, (now, now))
+        except OSError:
+            self._touched.pop(sport_key, None)
+
+    def wanted(self, ttl: float, now: Optional[float] = None) -> List[str]:
+        """Sports requested within the last ttl seconds."""
+        now = time.time() if now is None else now
+        sports = []
+        try:
+            entries = list(os.scandir(self.want_dir))
+        except FileNotFoundError:
+            return []
+        for entry in entries:
+            if not valid_sport_key(entry.name):
+                continue
+            try:
+                if now - entry.stat().st_mtime <= ttl:
+                    sports.append(entry.name)
+            except FileNotFoundError:
+                continue
+        return sorted(sports)
+
+    def close(self):
+        with self._lock:
+            for mapped in self._writers.values():
+                mapped.close()
+            self._writers.clear()
+        for reader in self._readers.values():
+            reader.map.close()
+        self._readers.clear()
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Process-wide store, or None when ODDS_SNAPSHOT_DIR is not set."""
+    global _store
+    if _store is None:
+        from config.settings import settings
+        if not settings.ODDS_SNAPSHOT_DIR:
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore(settings.ODDS_SNAPSHOT_DIR)
+    return _store
+
+
+def set_snapshot_store(store: Optional[SnapshotStore]):
+    """Override the process-wide store (tests)."""
+    global _store
+    _store = store
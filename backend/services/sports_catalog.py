@@ -0,0 +1,109 @@
+"""
+Active sports catalog.
+
+config.sports.SUPPORTED_SPORTS lists every sport the app can show; the Odds
+API's /sports endpoint (free: it does not count against the quota) says
+which of them are in season right now. The catalog refreshes that list in
+a background thread every SPORTS_CATALOG_REFRESH_SECONDS, keeps the
+intersection, and caches the grouped by-category view.
+
+Readers only ever touch the cache:
+- /api/odds/sports/available serves it (ETag changes with the active set)
+- the snapshot poller skips sports that are not active
+- /api/odds/{sport} answers an off-season sport with no events instead of
+  spending a quota call on it
+
+Until the first successful refresh (no API key, upstream down at boot) the
+catalog is the full static list and every supported sport is active. Keys
+outside SUPPORTED_SPORTS are never active, so nothing that checks the
+catalog (stale_odds.keep_fresh, the poller) fetches them.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from config.sports import SUPPORTED_SPORTS, get_sports_by_category
+
+logger = logging.getLogger("ironman")
+
+# Retry a failed refresh sooner than the normal interval
+RETRY_SECONDS = 60.0
+
+
+def _fetch_active() -> List[dict]:
+    from services.odds_service import get_sports
+    return get_sports()
+
+
+class CatalogState(NamedTuple):
+    sports: Dict[str, dict]  # active ∩ supported, SUPPORTED_SPORTS entries
+    by_category: Dict[str, list]
+    live: bool  # True once the active list came from upstream
+    refreshed_at: Optional[datetime]
+
+    @property
+    def version(self) -> str:
+        return ",".join(sorted(self.sports)) + (":live" if self.live else ":static")
+
+
+STATIC = CatalogState(dict(SUPPORTED_SPORTS), get_sports_by_category(), False, None)
+
+
+class SportsCatalog:
+    def __init__(self, fetch: Callable[[], List[dict]] = _fetch_active):
+        self._fetch = fetch
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Replaced in one assignment; readers never see a half-built catalog
+        self.state = STATIC
+
+    def load(self, upstream: List[dict]):
+        """Apply an Odds API /sports response."""
+        active = {item.get("key") for item in upstream if item.get("active")}
+        sports = {key: sport for key, sport in SUPPORTED_SPORTS.items() if key in active}
+        previous = self.state
+        self.state = CatalogState(sports, get_sports_by_category(sports), True, datetime.utcnow())
+        if not previous.live or sports.keys() != previous.sports.keys():
+            logger.info(f"Active sports: {len(sports)} of {len(SUPPORTED_SPORTS)} supported"
+                        f" ({', '.join(sorted(sports)) or 'none'})")
+
+    def refresh(self) -> bool:
+        try:
+            self.load(self._fetch())
+            return True
+        except Exception as e:
+            logger.warning(f"Sports catalog refresh failed: {e}")
+            return False
+
+    def is_active(self, sport_key: str) -> bool:
+        """False for a key outside SUPPORTED_SPORTS, or a supported sport the live catalog says is out of season."""
+        if sport_key not in SUPPORTED_SPORTS:
+            return False
+        state = self.state
+        return not state.live or sport_key in state.sports
+
+    def _loop(self, interval: float):
+        while not self._stop.is_set():
+            wait = interval if self.refresh() else min(interval, RETRY_SECONDS)
+            self._stop.wait(wait)
+
+    def start(self, interval: float):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="sports-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def reset(self):
+        """Back to the static list (tests)."""
+        self.state = STATIC
+
+
+catalog = SportsCatalog()
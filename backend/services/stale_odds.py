@@ -0,0 +1,234 @@
+"""
+In-process odds snapshots with stale-while-revalidate for GET /api/odds/{sport_key}.
+
+Every successful fetch is kept as the sport's snapshot, with a version tag
+(its fetch time) that the route turns into an ETag. A snapshot younger than
+ODDS_SNAPSHOT_INTERVAL is served as-is, so polling clients share one
+upstream call and get 304s until it is replaced; concurrent misses for a
+sport wait on one fetch instead of each calling the API.
+
+While the Odds API circuit is open or half-open (see
+odds_service.odds_api_breaker), the route answers from the last snapshot
+immediately and a background thread revalidates it - that thread is the
+half-open probe, so no client request ever waits on a failing upstream. If
+the circuit is still closed but the fetch fails anyway, the snapshot is
+served as well.
+
+Stale responses keep the snapshot's original retrieved_at and event
+timestamps and are marked:
+
+    "stale": true, "snapshot_age_seconds": 74.2, "odds_api_circuit": "open"
+
+They are for display only: POST /api/ev/calculate refuses odds whose
+timestamp is older than 60 seconds, so a stale snapshot cannot produce an
+EV figure.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from config.settings import settings
+from services.odds_service import OddsAPIError, odds_api_breaker
+from services.line_history import Tick, get_line_history, record_ticks, ticks_from_body, ticks_from_market_snapshot
+from services.alerts import evaluate_alerts, get_alert_engine
+from services.consensus import get_consensus_engine, update_consensus
+from services.line_moves import get_line_move_detector, observe_ticks
+from services.market_store import MarketSnapshot
+from services.snapshot_store import get_snapshot_store
+from services.sports_catalog import catalog
+from services.validated_odds import get_market_snapshot, get_validated_odds, odds_response_body
+
+logger = logging.getLogger("ironman")
+
+# Snapshots older than this are not served even during an outage
+STALE_MAX_AGE_SECONDS = 3600.0
+
+# Background revalidation threads (one refresh per sport at a time)
+REVALIDATE_WORKERS = 2
+
+
+class LastGood(NamedTuple):
+    body: dict
+    fetched_at: float
+
+    @property
+    def version(self) -> str:
+        return f"{int(self.fetched_at * 1_000_000):x}"
+
+
+_last_good: Dict[str, LastGood] = {}
+_revalidating: set = set()
+_fetch_locks: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def mark_stale(body: dict, fetched_at: float) -> dict:
+    return {
+        **body,
+        "stale": True,
+        "snapshot_age_seconds": round(time.time() - fetched_at, 1),
+        "odds_api_circuit": odds_api_breaker.state
+    }
+
+
+def last_good(sport_key: str, max_age: float = STALE_MAX_AGE_SECONDS) -> Optional[LastGood]:
+    snapshot = _last_good.get(sport_key)
+    if snapshot is None or time.time() - snapshot.fetched_at > max_age:
+        return None
+    return snapshot
+
+
+def fetch_fresh(sport_key: str) -> LastGood:
+    """Fetch, validate and remember a sport's odds body."""
+    body = odds_response_body(get_validated_odds(sport_key))
+    snapshot = LastGood(body, time.time())
+    _last_good[sport_key] = snapshot
+    _publish_ticks(sport_key, lambda: ticks_from_body(body))
+    return snapshot
+
+
+def _publish_ticks(sport_key: str, ticks: Callable[[], Iterable[Tick]]):
+    """Line history, move detection, consensus and alerts for a refresh (ticks are only built if one is on)."""
+    # With shared snapshots the leader's poller records the history (markets: nobody, each
+    # worker fetches its own); the rest is per process
+    record = get_snapshot_store() is None and get_line_history() is not None
+    detect = get_line_move_detector() is not None
+    weigh = get_consensus_engine() is not None
+    alert = weigh and get_alert_engine() is not None
+    if not (record or detect or weigh):
+        return
+    ticks = list(ticks())
+    if record:
+        record_ticks(sport_key, ticks)
+    if detect:
+        observe_ticks(sport_key, ticks)
+    if weigh:
+        update_consensus(sport_key, ticks)
+    if alert:
+        # After the consensus: rules compare prices against it
+        evaluate_alerts(sport_key, ticks)
+
+
+def _fetch_lock(sport_key: str) -> threading.Lock:
+    with _lock:
+        return _fetch_locks.setdefault(sport_key, threading.Lock())
+
+
+def _revalidate(sport_key: str):
+    try:
+        fetch_fresh(sport_key)
+    except Exception as e:
+        logger.debug(f"Odds revalidation failed for {sport_key}: {e}")
+    finally:
+        with _lock:
+            _revalidating.discard(sport_key)
+
+
+def revalidate_in_background(sport_key: str):
+    global _executor
+    with _lock:
+        if sport_key in _revalidating:
+            return
+        _revalidating.add(sport_key)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="odds-revalidate")
+        _executor.submit(_revalidate, sport_key)
+
+
+def get_odds_snapshot(sport_key: str) -> Tuple[LastGood, bool, bool]:
+    """
+    (snapshot, stale, cached) for a sport: a snapshot younger than
+    ODDS_SNAPSHOT_INTERVAL, a fresh fetch, or - when the upstream is
+    failing - the last good snapshot with stale=True.
+
+    Raises:
+        OddsAPIError: upstream failed and there is no snapshot to fall back on
+        OddsValidationError: response could not be validated
+    """
+    fresh_for = settings.ODDS_SNAPSHOT_INTERVAL
+    snapshot = last_good(sport_key)
+    if snapshot is not None and time.time() - snapshot.fetched_at < fresh_for:
+        return snapshot, False, True
+    if snapshot is not None and not odds_api_breaker.closed:
+        revalidate_in_background(sport_key)
+        return snapshot, True, True
+
+    with _fetch_lock(sport_key):
+        # Another request may have refreshed it while this one waited
+        current = last_good(sport_key)
+        if current is not None and time.time() - current.fetched_at < fresh_for:
+            return current, False, True
+        try:
+            return fetch_fresh(sport_key), False, False
+        except OddsAPIError:
+            if snapshot is None:
+                raise
+            logger.warning(f"Odds API failed for {sport_key}; serving snapshot from {snapshot.fetched_at:.0f}")
+            return snapshot, True, True
+
+
+def keep_fresh(sport_key: str):
+    """
+    Keep a sport refreshing for per-process consumers (line moves, consensus, alerts)
+    without serving a body: refresh it if due, or, with shared snapshots,
+    mark it wanted so the leader polls it. Unsupported and off-season sports
+    are never fetched.
+    """
+    if not catalog.is_active(sport_key):
+        return
+    store = get_snapshot_store()
+    if store is not None:
+        store.want(sport_key)
+        return
+    try:
+        get_odds_snapshot(sport_key)
+    except Exception as e:
+        logger.debug(f"Odds refresh failed for {sport_key}: {e}")
+
+
+def get_odds_body(sport_key: str) -> dict:
+    """Odds body for a sport; the last good snapshot marked stale if the upstream is failing."""
+    snapshot, stale, _ = get_odds_snapshot(sport_key)
+    return mark_stale(snapshot.body, snapshot.fetched_at) if stale else snapshot.body
+
+
+_markets: Dict[tuple, Tuple[MarketSnapshot, float]] = {}
+
+
+def get_cached_market_snapshot(sport_key: str, markets: Tuple[str, ...],
+                               event_id: Optional[str] = None) -> MarketSnapshot:
+    """Multi-market snapshot, reused for ODDS_SNAPSHOT_INTERVAL like the h2h one."""
+    key = (sport_key, tuple(sorted(markets)), event_id)
+    cached = _markets.get(key)
+    if cached is not None and time.time() - cached[1] < settings.ODDS_SNAPSHOT_INTERVAL:
+        return cached[0]
+    with _fetch_lock(f"{sport_key}:markets"):
+        cached = _markets.get(key)
+        if cached is not None and time.time() - cached[1] < settings.ODDS_SNAPSHOT_INTERVAL:
+            return cached[0]
+        snapshot = get_market_snapshot(sport_key, key[1], event_id)
+        _publish_ticks(sport_key, lambda: ticks_from_market_snapshot(snapshot))
+        # Expired entries are dropped as new ones arrive (props are keyed per event)
+        now = time.time()
+        for old in [k for k, (_, fetched_at) in _markets.items() if now - fetched_at > STALE_MAX_AGE_SECONDS]:
+            _markets.pop(old, None)
+        _markets[key] = (snapshot, now)
+        return snapshot
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def clear():
+    """Forget all snapshots (tests, benchmarks)."""
+    _last_good.clear()
+    _markets.clear()
@@ -0,0 +1,108 @@
+"""
+Per-User Bet Summaries
+
+One summary per user, kept up to date with atomic increments whenever a bet
+is logged, gets closing odds or is settled. The CLV and ROI views read that
+single summary instead of scanning bet history.
+
+Summary shape (as stored in Mongo's bet_summaries):
+    {
+        "user": "alice",
+        "totals":   {"bets": 12, "clv_n": 8, "clv_sum": 0.41, ...},
+        "by_sport": {"basketball_nba": {...same counters...}},
+        "by_book":  {"DraftKings": {...same counters...}},
+        "ops": ["log:<bet id>", "settle:<bet id>", ...]   # recent op ids
+    }
+
+Updates that carry an op id are idempotent: the storage backend records the
+id in the same atomic update, and a replay of the same op is skipped.
+
+If summaries ever drift, rebuild_user_summary / rebuild_all_summaries
+recompute them (and the time-bucketed rollups) from the stored bets.
+"""
+
+from typing import Optional
+
+from db.repository import get_repository
+from services.bet_metrics import (
+    add_counters,
+    contribution,
+    contribution_delta,
+    describe,
+    field_key,
+    summary_increment,
+)
+from services.rollup_service import rebuild_user_rollups, record_bet_rollups
+
+
+def apply_summary_delta(user: str, increment: dict, op_id: Optional[str] = None) -> bool:
+    """
+    Atomically apply dotted-path increments to a user's summary.
+
+    Returns True if the summary changed, False if there was nothing to apply
+    or the op id had already been applied.
+    """
+    return get_repository().increment_summary(user, increment, op_id)
+
+
+def record_bet_change(old: Optional[dict], new: Optional[dict], op_id: Optional[str] = None) -> bool:
+    """
+    Fold one bet change into its owner's summary and time-bucketed rollups.
+
+    old: bet document before the change (None for a newly logged bet)
+    new: bet document after the change
+    """
+    bet = new or old
+    if not bet:
+        return False
+    delta = contribution_delta(old, new)
+    applied = apply_summary_delta(bet["user"], summary_increment(bet, delta), op_id)
+    record_bet_rollups(old, new, op_id)
+    return applied
+
+
+def get_user_summary(user: str) -> dict:
+    """Point read of a user's summary, expanded into means/stddevs/ROI."""
+    doc = get_repository().get_summary(user)
+    return {
+        "user": user,
+        "totals": describe(doc.get("totals")),
+        "by_sport": {k: describe(v) for k, v in doc.get("by_sport", {}).items()},
+        "by_book": {k: describe(v) for k, v in doc.get("by_book", {}).items()},
+        "updatedAt": doc.get("updatedAt"),
+    }
+
+
+def build_summary(bets) -> dict:
+    """Compute summary counters from scratch for an iterable of bets."""
+    totals, by_sport, by_book = {}, {}, {}
+    for bet in bets:
+        counters = contribution(bet)
+        add_counters(totals, counters)
+        add_counters(by_sport.setdefault(field_key(bet.get("sport")), {}), counters)
+        add_counters(by_book.setdefault(field_key(bet.get("sportsbook")), {}), counters)
+    return {"totals": totals, "by_sport": by_sport, "by_book": by_book}
+
+
+def rebuild_user_summary(user: str) -> dict:
+    """
+    Repair job: recompute one user's summary from their bets.
+
+    Applied op ids are kept so replays of already-applied ops stay no-ops.
+    """
+    summary = build_summary(get_repository().find_bets(user))
+    get_repository().set_summary(user, summary)
+    return summary
+
+
+def rebuild_all_summaries() -> int:
+    """Repair job: rebuild every user's summary and rollups. Returns number of users."""
+    users = get_repository().bet_users()
+    for user in users:
+        rebuild_user_summary(user)
+        rebuild_user_rollups(user)
+    return len(users)
+
+
+if __name__ == "__main__":
+    print(f"Rebuilt summaries for {rebuild_all_summaries()} users")
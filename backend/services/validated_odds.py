@@ -10,12 +10,14 @@ FAILURES:
 - Unknown sportsbooks → skip that bookmaker
 """
 
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple
 from pydantic import BaseModel, Field, validator
 from decimal import Decimal, InvalidOperation
 
-from services.odds_service import get_odds, OddsAPIError
+from services.odds_service import get_odds, get_event_odds, OddsAPIError
+from services.market_store import FEATURED_MARKETS, MarketSnapshot, validate_markets
+from utils.metrics import VALIDATION_DROPPED, VALIDATION_DURATION, record_snapshot
 
 
 class OddsValidationError(Exception):
@@ -92,6 +94,24 @@ SUPPORTED_SPORTSBOOKS = {
 }
 
 
+def _parse_utc(value: str) -> datetime:
+    """
+    Parse an API timestamp ("2025-01-01T18:30:00Z") as naive UTC.
+
+    Everything else here compares against datetime.utcnow(), which is naive;
+    an aware value would raise TypeError and silently drop the event.
+    """
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _drop(dropped: dict, level: str, reason: str):
+    key = (level, reason)
+    dropped[key] = dropped.get(key, 0) + 1
+
+
 def validate_odds_response(
     raw_data: list,
     retrieved_at: datetime,
@@ -111,12 +131,15 @@ def validate_odds_response(
         OddsValidationError if data is fundamentally invalid or too stale
     """
     validated_events = []
+    # (level, reason) → count; published to metrics once per call
+    dropped = {}
 
     for event in raw_data:
         try:
             # Required fields
             event_id = event.get("id")
             if not event_id:
+                _drop(dropped, "event", "missing_id")
                 continue  # Skip events without ID
 
             sport_key = event.get("sport_key")
@@ -127,12 +150,14 @@ def validate_odds_response(
             bookmakers = event.get("bookmakers", [])
 
             if not all([sport_key, sport_title, commence_time, home_team, away_team]):
+                _drop(dropped, "event", "incomplete")
                 continue  # Skip incomplete events
 
             # Parse commence time
             try:
-                commence_dt = datetime.fromisoformat(commence_time.replace('Z', '+00:00'))
+                commence_dt = _parse_utc(commence_time)
             except (ValueError, AttributeError):
+                _drop(dropped, "event", "invalid_commence_time")
                 continue  # Skip if timestamp invalid
 
             # Validate bookmakers
@@ -142,29 +167,34 @@ def validate_odds_response(
 
                 # ONLY include supported sportsbooks
                 if book_key not in SUPPORTED_SPORTSBOOKS:
+                    _drop(dropped, "bookmaker", "unsupported")
                     continue  # Skip unsupported books
 
                 book_title = book.get("title")
                 last_update_str = book.get("last_update")
 
                 if not all([book_key, book_title, last_update_str]):
+                    _drop(dropped, "bookmaker", "incomplete")
                     continue  # Skip incomplete bookmakers
 
                 # Parse timestamp
                 try:
-                    last_update = datetime.fromisoformat(last_update_str.replace('Z', '+00:00'))
+                    last_update = _parse_utc(last_update_str)
                 except (ValueError, AttributeError):
+                    _drop(dropped, "bookmaker", "invalid_last_update")
                     continue
 
                 # Check staleness
                 age = (datetime.utcnow() - last_update).total_seconds()
                 if age > max_age_seconds:
+                    _drop(dropped, "bookmaker", "stale")
                     continue  # Skip stale odds
 
                 # Validate markets
                 markets = book.get("markets", [])
                 for market in markets:
                     if market.get("key") != "h2h":
+                        _drop(dropped, "market", "unsupported_market")
                         continue  # Only h2h for MVP
 
                     outcomes = market.get("outcomes", [])
@@ -175,19 +205,24 @@ def validate_odds_response(
                         price = outcome.get("price")
 
                         if not name or price is None:
+                            _drop(dropped, "outcome", "incomplete")
                             continue  # Skip incomplete outcomes
 
                         # Validate price
                         try:
                             price_decimal = Decimal(str(price))
                             if price_decimal <= Decimal('1.0'):
+                                _drop(dropped, "outcome", "invalid_price")
                                 continue  # Skip invalid odds
                             validated_outcomes.append(Outcome(name=name, price=price_decimal))
                         except (ValueError, InvalidOperation):
+                            _drop(dropped, "outcome", "unparseable_price")
                             continue  # Skip unparseable prices
 
                     # Must have at least 2 outcomes
-                    if len(validated_outcomes) >= 2:
+                    if len(validated_outcomes) < 2:
+                        _drop(dropped, "market", "too_few_outcomes")
+                    else:
                         validated_bookmakers.append(Bookmaker(
                             key=book_key,
                             title=book_title,
@@ -196,7 +231,9 @@ def validate_odds_response(
                         ))
 
             # Only include event if it has at least one valid bookmaker
-            if validated_bookmakers:
+            if not validated_bookmakers:
+                _drop(dropped, "event", "no_valid_bookmakers")
+            else:
                 validated_events.append(ValidatedOddsEvent(
                     id=event_id,
                     sport_key=sport_key,
@@ -209,8 +246,12 @@ def validate_odds_response(
 
         except Exception:
             # Skip events that cause any validation error
+            _drop(dropped, "event", "validation_error")
             continue
 
+    for (level, reason), count in dropped.items():
+        VALIDATION_DROPPED.labels(level, reason).inc(count)
+
     # Build response
     return ValidatedOddsResponse(
         events=validated_events,
@@ -220,6 +261,20 @@ def validate_odds_response(
     )
 
 
+def odds_response_body(validated: ValidatedOddsResponse) -> dict:
+    """Body of GET /api/odds/{sport_key} (also what shared snapshots hold)."""
+    return {
+        "events": [event.dict() for event in validated.events],
+        "retrieved_at": validated.retrieved_at.isoformat() + "Z",
+        "api_requests_remaining": validated.api_requests_remaining,
+        "api_requests_used": validated.api_requests_used,
+        "source": validated.source,
+        "supported_sportsbooks": list(SUPPORTED_SPORTSBOOKS.keys()),
+        "max_odds_age_seconds": 60,
+        "stale": False
+    }
+
+
 def get_validated_odds(sport_key: str) -> ValidatedOddsResponse:
     """
     Fetch and validate odds for a sport.
@@ -236,15 +291,48 @@ def get_validated_odds(sport_key: str) -> ValidatedOddsResponse:
     # Parse retrieved timestamp
     retrieved_str = response.get("retrieved_at")
     try:
-        retrieved_at = datetime.fromisoformat(retrieved_str.replace('Z', '+00:00'))
+        retrieved_at = _parse_utc(retrieved_str)
     except (ValueError, AttributeError):
         retrieved_at = datetime.utcnow()
 
     # Validate
-    validated = validate_odds_response(
-        raw_data=response["data"],
-        retrieved_at=retrieved_at,
-        meta=response["meta"]
-    )
+    with VALIDATION_DURATION.labels(sport_key).time():
+        validated = validate_odds_response(
+            raw_data=response["data"],
+            retrieved_at=retrieved_at,
+            meta=response["meta"]
+        )
+    record_snapshot(sport_key)
 
     return validated
+
+
+def get_market_snapshot(sport_key: str, markets: Tuple[str, ...] = ("h2h",),
+                        event_id: Optional[str] = None) -> MarketSnapshot:
+    """
+    Fetch and validate any markets for a sport into a columnar MarketSnapshot.
+
+    Featured markets (h2h, spreads, totals) come from the sport-wide odds
+    endpoint; anything else (player props, alternate lines) needs event_id
+    and comes from the per-event endpoint.
+
+    Raises:
+        OddsAPIError: If API request fails
+        OddsValidationError: If props are requested without an event_id
+    """
+    if event_id is None and not set(markets) <= set(FEATURED_MARKETS):
+        raise OddsValidationError(
+            f"Markets {sorted(set(markets) - set(FEATURED_MARKETS))} are only available per event"
+        )
+    response = get_event_odds(sport_key, event_id, markets) if event_id else get_odds(sport_key, markets=markets)
+    try:
+        retrieved_at = _parse_utc(response.get("retrieved_at"))
+    except (ValueError, AttributeError):
+        retrieved_at = datetime.utcnow()
+
+    with VALIDATION_DURATION.labels(sport_key).time():
+        dropped = {}
+        raw = MarketSnapshot.from_odds(response["data"], sport_key, retrieved_at, dropped)
+        snapshot = validate_markets(raw, markets, SUPPORTED_SPORTSBOOKS, dropped=dropped)
+    snapshot.meta = response["meta"]
+    return snapshot
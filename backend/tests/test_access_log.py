@@ -0,0 +1,80 @@
+"""
+Tests for the structured access log.
+
+Records must carry the route template and upstream/cache fields, and
+sampling must never drop errors or slow requests.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils import logger as access_log
+
+
+class CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.access)
+
+
+def make_client():
+    app = FastAPI()
+    app.middleware("http")(access_log.log_requests)
+
+    @app.get("/api/odds/{sport_key}")
+    def odds(sport_key: str):
+        access_log.record_upstream(0.25)
+        access_log.record_cache(False)
+        return {"sport": sport_key}
+
+    return TestClient(app)
+
+
+def capture():
+    handler = CaptureHandler()
+    access_log.access_logger.addHandler(handler)
+    return handler
+
+
+def test_record_fields():
+    handler = capture()
+    try:
+        make_client().get("/api/odds/basketball_nba")
+    finally:
+        access_log.access_logger.removeHandler(handler)
+
+    record = handler.records[-1]
+    assert record["method"] == "GET"
+    assert record["route"] == "/api/odds/{sport_key}"
+    assert record["status"] == 200
+    assert record["upstream_ms"] == 250.0
+    assert record["upstream_calls"] == 1
+    assert record["cache"] == "miss"
+    assert record["size"] > 0
+    assert record["latency_ms"] >= 0
+
+
+def test_sampling_keeps_errors_and_slow_requests():
+    access_log.configure_access_log(sample_rate=0.0, slow_request_ms=500)
+    try:
+        assert not access_log.should_log(200, 10.0)
+        assert access_log.should_log(404, 10.0)
+        assert access_log.should_log(500, 10.0)
+        assert access_log.should_log(200, 750.0)
+    finally:
+        access_log.configure_access_log(sample_rate=1.0, slow_request_ms=1000)
+
+
+def test_stats_outside_request_are_ignored():
+    # Services may run outside a request (pollers, jobs)
+    access_log.record_upstream(1.0)
+    access_log.record_cache(True)
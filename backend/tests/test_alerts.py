@@ -0,0 +1,262 @@
+"""
+Tests for EV alert rules, their index and delivery.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import alerts as alerts_route
+from services import alerts
+from services.alerts import AlertEngine, AlertError, WebhookSink, make_rule
+from services.consensus import ConsensusEngine
+from services.line_history import Tick
+
+T0 = 1_736_964_000.0
+BOOKS = ("betmgm", "caesars", "draftkings", "fanduel")
+
+
+def _board(ts=T0, event_id="evt1", **overrides):
+    """Every book at 1.90/1.90 unless overridden as book=(lakers, celtics)."""
+    ticks = []
+    for book in BOOKS:
+        lakers, celtics = overrides.get(book, (1.90, 1.90))
+        ticks += [Tick(ts, event_id, book, "h2h", "Lakers", lakers), Tick(ts, event_id, book, "h2h", "Celtics", celtics)]
+    return ticks
+
+
+class Feed:
+    """Consensus then alerts, as the refresh feeds them."""
+
+    def __init__(self, rules_file=""):
+        self.consensus = ConsensusEngine()
+        self.engine = AlertEngine(self.consensus, rules_file)
+
+    def __call__(self, ticks, now=T0):
+        self.consensus.update("basketball_nba", ticks, now=now)
+        return self.engine.observe("basketball_nba", ticks, now=now)
+
+
+def _rule(user="alice", **fields):
+    return make_rule(user, "basketball_nba", now=T0, **fields)
+
+
+class TestRules:
+    def test_fires_once_until_rearmed(self):
+        feed = Feed()
+        feed.engine.add_rule(_rule(books=["fanduel"]))
+        assert feed(_board()) == []
+        fired = feed(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20)
+        assert [(a.book, a.outcome, a.price) for a in fired] == [("fanduel", "Lakers", 2.10)]
+        assert fired[0].edge == pytest.approx(fired[0].fair_probability * 2.10 - 1)
+        assert fired[0].edge >= 0.02
+        # Still above the threshold: no repeat, even as other books move
+        assert feed(_board(T0 + 40, fanduel=(2.10, 1.75), betmgm=(1.88, 1.92)), now=T0 + 40) == []
+        # Drops back, then returns: alerts again
+        assert feed(_board(T0 + 60), now=T0 + 60) == []
+        assert len(feed(_board(T0 + 80, fanduel=(2.10, 1.75)), now=T0 + 80)) == 1
+
+    def test_consensus_move_alone(self):
+        feed = Feed()
+        feed.engine.add_rule(_rule(books=["fanduel"], min_edge=0.01))
+        feed(_board(fanduel=(1.95, 1.85)))
+        # FanDuel unchanged, the other books shorten the Lakers: its price is now value
+        fired = feed(_board(T0 + 20, fanduel=(1.95, 1.85), betmgm=(1.75, 2.05), caesars=(1.75, 2.05),
+                            draftkings=(1.75, 2.05)), now=T0 + 20)
+        assert [(a.book, a.outcome) for a in fired] == [("fanduel", "Lakers")]
+        # And back: re-armed without an alert
+        assert feed(_board(T0 + 40, fanduel=(1.95, 1.85)), now=T0 + 40) == []
+        assert len(feed(_board(T0 + 60, fanduel=(1.95, 1.85), betmgm=(1.75, 2.05), caesars=(1.75, 2.05),
+                               draftkings=(1.75, 2.05)), now=T0 + 60)) == 1
+
+    def test_price_filter_rechecked(self):
+        feed = Feed()
+        feed.engine.add_rule(_rule(books=["fanduel"], max_price=2.2))
+        feed(_board())
+        assert len(feed(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20)) == 1
+        # Longer still, but past max_price: re-armed
+        assert feed(_board(T0 + 40, fanduel=(2.30, 1.70)), now=T0 + 40) == []
+        assert len(feed(_board(T0 + 60, fanduel=(2.10, 1.75)), now=T0 + 60)) == 1
+
+    def test_index_only_matches_its_book_and_market(self):
+        feed = Feed()
+        feed.engine.add_rule(_rule(books=["draftkings"]))
+        feed.engine.add_rule(_rule(market="spreads"))
+        feed(_board())
+        assert feed(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20) == []
+
+    def test_any_book_and_filters(self):
+        feed = Feed()
+        anywhere = feed.engine.add_rule(_rule())
+        feed.engine.add_rule(_rule(user="bob", outcome="Celtics"))
+        feed.engine.add_rule(_rule(user="carol", max_price=2.0))
+        feed.engine.add_rule(_rule(user="dave", min_books=5))
+        feed.engine.add_rule(_rule(user="erin", min_edge=0.2))
+        feed(_board())
+        fired = feed(_board(T0 + 20, caesars=(2.10, 1.75)), now=T0 + 20)
+        assert [a.rule_id for a in fired] == [anywhere.id]
+        assert feed.engine.since(0, "alice") == fired
+        assert feed.engine.since(0, "bob") == []
+
+    def test_many_rules(self):
+        feed = Feed()
+        for i in range(5000):
+            feed.engine.add_rule(_rule(user=f"user{i % 50}", books=[BOOKS[i % 4]], min_edge=0.02 + i / 50_000))
+        feed(_board())
+        assert feed(_board(T0 + 20, draftkings=(1.92, 1.88)), now=T0 + 20) == []
+        fired = feed(_board(T0 + 40, fanduel=(2.10, 1.75)), now=T0 + 40)
+        assert fired and all(a.book == "fanduel" for a in fired)
+
+    def test_limits_and_validation(self, monkeypatch):
+        engine = AlertEngine(ConsensusEngine())
+        monkeypatch.setattr(alerts, "MAX_RULES_PER_USER", 1)
+        engine.add_rule(_rule())
+        with pytest.raises(AlertError):
+            engine.add_rule(_rule())
+        with pytest.raises(AlertError):
+            _rule(min_price=3, max_price=2)
+        with pytest.raises(AlertError):
+            _rule(colour="red")
+
+    def test_remove(self):
+        feed = Feed()
+        rule = feed.engine.add_rule(_rule())
+        assert not feed.engine.remove_rule(rule.id, user="bob")
+        assert feed.engine.remove_rule(rule.id, user="alice")
+        feed(_board())
+        assert feed(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20) == []
+        assert feed.engine.sports() == []
+
+
+class TestKeepFresh:
+    def test_unsupported_sports_not_refreshed(self, monkeypatch):
+        from services import stale_odds
+        refreshed = []
+        monkeypatch.setattr(stale_odds, "keep_fresh", refreshed.append)
+        monkeypatch.setattr(alerts, "KEEP_FRESH_SECONDS", 0.01)
+        engine = AlertEngine(ConsensusEngine())
+        engine.add_rule(_rule())
+        engine.add_rule(make_rule("alice", "made_up_sport", now=T0))  # e.g. from an old rules file
+        engine.start()
+        try:
+            deadline = time.monotonic() + 2
+            while not refreshed and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            engine.stop()
+        assert refreshed and set(refreshed) == {"basketball_nba"}
+
+
+class TestRulesFile:
+    def test_shared_between_engines(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(alerts, "RELOAD_SECONDS", 0)
+        path = str(tmp_path / "rules.json")
+        first, second = Feed(path), Feed(path)
+        rule = first.engine.add_rule(_rule(books=["fanduel"]))
+        assert [r.id for r in second.engine.rules("alice")] == [rule.id]
+        second(_board())
+        assert len(second(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20)) == 1
+        second.engine.remove_rule(rule.id)
+        assert first.engine.rules() == []
+        assert Feed(path).engine.rules() == []
+
+
+class TestWebhook:
+    def test_batches_and_gate(self):
+        posted = []
+
+        class Session:
+            def post(self, url, json, timeout):
+                posted.append((url, json))
+                return self
+
+            def raise_for_status(self):
+                pass
+
+        feed = Feed()
+        sink = WebhookSink("http://localhost:9000/alerts", batch=1)
+        feed.engine.sinks.append(sink)
+        feed.engine.add_rule(_rule(min_edge=0.0))  # two books moving also move the consensus
+        feed(_board())
+        feed(_board(T0 + 20, fanduel=(2.10, 1.75), caesars=(2.10, 1.75)), now=T0 + 20)
+        assert sink.flush(Session()) == 2
+        assert sorted(body["alerts"][0]["book"] for _, body in posted) == ["caesars", "fanduel"]
+
+        sink.gate = lambda: False  # not the snapshot leader
+        feed(_board(T0 + 40), now=T0 + 40)
+        feed(_board(T0 + 60, fanduel=(2.10, 1.75)), now=T0 + 60)
+        assert sink.flush(Session()) == 0
+
+
+class TestEndpoints:
+    """/api/alerts"""
+
+    @pytest.fixture
+    def feed(self, monkeypatch):
+        feed = Feed()
+        monkeypatch.setattr(alerts, "_engine", feed.engine)
+        return feed
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(alerts_route.router)
+        return TestClient(app)
+
+    def test_rules_and_alerts(self, client, feed):
+        response = client.post("/api/alerts/rules", json={"user": "alice", "sport_key": "basketball_nba",
+                                                           "books": ["fanduel"], "min_edge": 0.03})
+        assert response.status_code == 201
+        rule = response.json()
+        assert rule["books"] == ["fanduel"] and rule["min_edge"] == 0.03
+        assert client.get("/api/alerts/rules", params={"user": "alice"}).json()["count"] == 1
+
+        feed(_board())
+        feed(_board(T0 + 20, fanduel=(2.20, 1.70)), now=T0 + 20)
+        body = client.get("/api/alerts", params={"user": "alice"}).json()
+        assert body["count"] == 1
+        assert body["alerts"][0]["rule_id"] == rule["id"]
+        assert client.get("/api/alerts", params={"user": "alice", "since_id": body["last_id"]}).json()["count"] == 0
+
+        assert client.delete(f"/api/alerts/rules/{rule['id']}", params={"user": "bob"}).status_code == 404
+        assert client.delete(f"/api/alerts/rules/{rule['id']}", params={"user": "alice"}).status_code == 200
+
+    def test_errors(self, client, feed, monkeypatch):
+        rule = {"user": "alice", "sport_key": "basketball_nba"}
+        assert client.post("/api/alerts/rules", json={**rule, "sport_key": "Bad-Key"}).status_code == 422
+        assert client.post("/api/alerts/rules", json={**rule, "sport_key": "made_up_sport"}).status_code == 422
+        assert feed.engine.rules() == []
+        assert client.post("/api/alerts/rules", json={**rule, "min_price": 3, "max_price": 2}).status_code == 422
+        monkeypatch.setattr(alerts, "_engine", None)  # ALERTS_ENABLED is off
+        assert client.post("/api/alerts/rules", json=rule).status_code == 503
+
+    def test_stream(self, feed, monkeypatch):
+        monkeypatch.setattr(alerts_route, "STREAM_POLL_SECONDS", 0)
+        feed.engine.add_rule(_rule())
+        feed(_board())
+        feed(_board(T0 + 20, fanduel=(2.10, 1.75)), now=T0 + 20)
+
+        class Request:
+            checks = 0
+
+            async def is_disconnected(self):
+                self.checks += 1
+                return self.checks > 2
+
+        async def collect():
+            return [chunk async for chunk in alerts_route.alert_events(Request(), feed.engine, "alice", 0)]
+
+        chunks = asyncio.run(collect())
+        assert chunks[0] == "retry: 3000\n\n"
+        event = chunks[1].splitlines()
+        assert event[0] == f"id: {feed.engine.latest_id}"
+        assert event[1] == "event: alert"
+        assert json.loads(event[2][len("data: "):])["book"] == "fanduel"
@@ -0,0 +1,128 @@
+"""
+Tests for the EV backtester over the line history.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+
+from services.backtest import BacktestError, BacktestRule, consensus, main, run_backtest
+from services.line_history import LineHistory, Tick
+
+DAY = date(2025, 1, 15)
+T = datetime(2025, 1, 15, 1, tzinfo=timezone.utc).timestamp()
+BOOKS = ("betmgm", "caesars", "draftkings", "fanduel")
+
+RESULTS = [
+    {"event_id": "evt1", "sport": "basketball_nba", "home_team": "Lakers", "away_team": "Celtics",
+     "home_score": 110, "away_score": 104, "commence_time": "2025-01-15T02:00:00Z"},
+    {"event_id": "evt2", "sport": "basketball_nba", "home_team": "Lakers", "away_team": "Celtics",
+     "home_score": 99, "away_score": 90},
+]
+
+
+def _board(event_id, ts, **overrides):
+    """Every book at 1.90/1.90 unless overridden as book=(lakers, celtics)."""
+    ticks = []
+    for book in BOOKS:
+        lakers, celtics = overrides.get(book, (1.90, 1.90))
+        ticks += [Tick(ts, event_id, book, "h2h", "Lakers", lakers), Tick(ts, event_id, book, "h2h", "Celtics", celtics)]
+    return ticks
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    history = LineHistory(str(tmp_path))
+
+    def record(ticks):
+        history.record("basketball_nba", ticks, now=ticks[0].timestamp)
+
+    # evt1: opened the day before, DraftKings hangs a long Lakers price, then closes at 1.95
+    record(_board("evt1", T - 7200))
+    record(_board("evt1", T, draftkings=(2.10, 1.90)))
+    record(_board("evt1", T + 1800, draftkings=(1.95, 1.90)))
+    record(_board("evt1", T + 7200, draftkings=(3.0, 1.3)))  # in play: ignored
+    # evt2, the next day: FanDuel long on the Celtics, who lose
+    record(_board("evt2", T + 86400))
+    record(_board("evt2", T + 90000, fanduel=(1.90, 2.10)))
+    history.stop()
+    return str(tmp_path)
+
+
+def reject_all(candidate):
+    return False
+
+
+class TestConsensus:
+    def test_no_vig_average(self):
+        fair, books = consensus({"a": {"X": 1.9, "Y": 1.9}, "b": {"X": 1.5, "Y": 2.5}}, min_books=2)
+        assert books == 2
+        assert fair["X"] == pytest.approx((0.5 + (1 / 1.5) / (1 / 1.5 + 1 / 2.5)) / 2)
+        assert sum(fair.values()) == pytest.approx(1)
+
+    def test_incomplete_books_excluded(self):
+        assert consensus({"a": {"X": 1.9, "Y": 1.9}, "b": {"X": 1.5}}, min_books=2) == ({}, 1)
+
+
+class TestBacktest:
+    def test_single_day(self, history_dir):
+        report = run_backtest(history_dir, ["basketball_nba"], DAY, DAY, results=RESULTS, include_bets=True)
+        assert report["bets"] == 1
+        bet = report["bet_list"][0]
+        assert (bet["book"], bet["outcome"], bet["price"]) == ("draftkings", "Lakers", 2.10)
+        assert bet["placed_at"] == T
+        assert bet["closing_price"] == 1.95  # not the in-play 3.0
+        assert bet["clv"] == round((2.10 - 1.95) / 1.95, 3)
+        assert bet["result"] == "win" and bet["pnl"] == 110.0
+        assert bet["ev"] == pytest.approx(100 * (bet["fair_probability"] * 2.10 - 1), abs=0.01)
+        assert report["roi"] == 1.1
+        assert report["max_drawdown"] == 0
+
+    def test_drawdown_and_pool(self, history_dir):
+        serial = run_backtest(history_dir, ["basketball_nba"], DAY, date(2025, 1, 16), results=RESULTS)
+        pooled = run_backtest(history_dir, ["basketball_nba"], DAY, date(2025, 1, 16), results=RESULTS, workers=2)
+        serial.pop("elapsed_seconds")
+        pooled.pop("elapsed_seconds")
+        assert serial == pooled
+        assert serial["partitions"] == 2
+        assert (serial["bets"], serial["wins"], serial["losses"]) == (2, 1, 1)
+        assert serial["pnl"] == 10.0
+        assert serial["max_drawdown"] == 100.0
+
+    def test_without_results(self, history_dir):
+        report = run_backtest(history_dir, ["basketball_nba"], DAY, DAY)
+        # No commence_time either: the in-play prices are replayed too (Celtics 1.90 vs a 1.30 move)
+        assert (report["bets"], report["settled"], report["roi"]) == (2, 0, None)
+
+    def test_rule_filters(self, history_dir):
+        def bets(**rule):
+            return run_backtest(history_dir, ["basketball_nba"], DAY, DAY, BacktestRule(**rule), RESULTS)["bets"]
+
+        assert bets(min_edge=0.05) == 0
+        assert bets(min_books=5) == 0
+        assert bets(books=frozenset({"fanduel"})) == 0
+        assert bets(select=reject_all) == 0
+        assert bets(max_price=2.0) == 0
+
+    def test_invalid(self, history_dir):
+        with pytest.raises(BacktestError):
+            run_backtest(history_dir, ["basketball_nba"], DAY, date(2025, 1, 1))
+        with pytest.raises(BacktestError):
+            run_backtest(history_dir, ["basketball_nba"], DAY, DAY, BacktestRule(stake=0))
+
+
+class TestCommandLine:
+    def test_main(self, history_dir, tmp_path, capsys):
+        results = tmp_path / "results.json"
+        results.write_text(json.dumps(RESULTS))
+        assert main(["--history", history_dir, "--sports", "basketball_nba", "--from", "2025-01-15",
+                     "--to", "2025-01-16", "--results", str(results), "--workers", "1",
+                     "--select", "tests.test_backtest:reject_all"]) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["bets"] == 0
+        assert report["rule"]["select"] == "tests.test_backtest:reject_all"
@@ -0,0 +1,65 @@
+"""
+Tests for the benchmark tooling: the synthetic slate generator and the
+baseline comparison (the benchmarks themselves are run by hand).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import pytest
+
+from benchmarks.run import compare
+from benchmarks.slate import generate_slate
+from services.validated_odds import validate_odds_response
+
+NOW = datetime(2026, 1, 10, 18, 0, 0)
+
+
+class TestSlate:
+    """Seeded, realistic payloads"""
+
+    def test_seeded(self):
+        assert generate_slate(events=5, seed=3, now=NOW) == generate_slate(events=5, seed=3, now=NOW)
+        assert generate_slate(events=5, seed=3, now=NOW) != generate_slate(events=5, seed=4, now=NOW)
+
+    def test_shape(self):
+        slate = generate_slate(events=10, books=4, outcomes=3, stale_fraction=0, malformed_fraction=0, now=NOW)
+        assert len(slate) == 10
+        for event in slate:
+            assert len(event["bookmakers"]) == 4
+            outcomes = event["bookmakers"][0]["markets"][0]["outcomes"]
+            assert [o["name"] for o in outcomes][-1] == "Draw"
+            # Book margin: implied probabilities add up to more than 1
+            assert sum(1 / o["price"] for o in outcomes) > 1
+
+    def test_clean_slate_validates(self):
+        slate = generate_slate(events=10, books=3, stale_fraction=0, malformed_fraction=0)
+        validated = validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta={})
+        assert len(validated.events) == 10
+        assert all(len(e.bookmakers) == 3 for e in validated.events)
+
+    def test_stale_and_malformed_are_filtered(self):
+        slate = generate_slate(events=50, books=4, stale_fraction=1.0, malformed_fraction=0)
+        validated = validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta={})
+        assert validated.events == []
+
+        slate = generate_slate(events=200, books=4, stale_fraction=0, malformed_fraction=0.2, seed=9)
+        validated = validate_odds_response(raw_data=slate, retrieved_at=datetime.utcnow(), meta={})
+        assert 0 < len(validated.events) < 200
+
+    def test_outcome_count(self):
+        with pytest.raises(ValueError):
+            generate_slate(outcomes=4)
+
+
+class TestCompare:
+    """Regression check against a baseline"""
+
+    def test_flags_slowdowns_beyond_tolerance(self):
+        baseline = {"a": {"ops_per_sec": 1000}, "b": {"ops_per_sec": 1000}, "c": {"ops_per_sec": 1000}}
+        results = {"a": {"ops_per_sec": 850}, "b": {"ops_per_sec": 700}, "c": {"ops_per_sec": 2000},
+                   "new": {"ops_per_sec": 1}}
+        assert compare(results, baseline, tolerance=0.2) == [("b", 0.7)]
@@ -0,0 +1,117 @@
+"""
+Unit Tests for Bet Metrics
+
+Summaries are maintained incrementally, so the increments must add up to
+exactly what a from-scratch rebuild would produce.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services.bet_metrics import (
+    add_counters,
+    closing_line_value,
+    contribution,
+    contribution_delta,
+    describe,
+    realized_pnl,
+    summary_increment,
+)
+
+
+def make_bet(**overrides):
+    bet = {
+        "id": "b1",
+        "user": "alice",
+        "sport": "basketball_nba",
+        "sportsbook": "MyBookie.ag",
+        "odds": 2.10,
+        "stake": 100.0,
+        "closing_odds": None,
+        "clv": None,
+        "result": None,
+        "expectedValue": 5.0,
+    }
+    bet.update(overrides)
+    return bet
+
+
+class TestRealizedPnL:
+    """P&L of settled bets in decimal odds"""
+
+    def test_win(self):
+        assert realized_pnl(make_bet(result="win")) == pytest.approx(110.0)
+
+    def test_lose(self):
+        assert realized_pnl(make_bet(result="lose")) == -100.0
+
+    def test_push(self):
+        assert realized_pnl(make_bet(result="push")) == 0.0
+
+    def test_open_bet_has_no_pnl(self):
+        assert realized_pnl(make_bet()) is None
+
+
+class TestContributions:
+    """Incremental deltas must match a rebuild"""
+
+    def test_closing_line_value(self):
+        assert closing_line_value(2.10, 2.00) == 0.05
+        assert closing_line_value(2.10, None) is None
+
+    def test_new_bet_contribution(self):
+        counters = contribution(make_bet())
+        assert counters["bets"] == 1
+        assert counters["stake_sum"] == 100.0
+        assert "clv_n" not in counters
+        assert "pnl_n" not in counters
+
+    def test_deltas_add_up_to_final_state(self):
+        """log → closing odds → settle, applied as deltas, equals a rebuild"""
+        logged = make_bet()
+        closed = make_bet(closing_odds=2.0, clv=0.05)
+        settled = make_bet(closing_odds=2.0, clv=0.05, result="win")
+
+        running = {}
+        for old, new in [(None, logged), (logged, closed), (closed, settled)]:
+            add_counters(running, contribution_delta(old, new))
+
+        assert running == pytest.approx(contribution(settled))
+
+    def test_unchanged_bet_has_empty_delta(self):
+        bet = make_bet(clv=0.02)
+        assert contribution_delta(bet, dict(bet)) == {}
+
+    def test_increment_paths_are_safe_field_names(self):
+        increment = summary_increment(make_bet(), {"bets": 1})
+        assert increment == {
+            "totals.bets": 1,
+            "by_sport.basketball_nba.bets": 1,
+            "by_book.MyBookie_ag.bets": 1,
+        }
+
+
+class TestDescribe:
+    """Stats derived from counts, sums and sums of squares"""
+
+    def test_mean_stddev_and_roi(self):
+        counters = {}
+        add_counters(counters, contribution(make_bet(clv=0.10, result="win")))
+        add_counters(counters, contribution(make_bet(clv=-0.02, result="lose")))
+
+        stats = describe(counters)
+        assert stats["bets"] == 2
+        assert stats["clv"]["mean"] == pytest.approx(0.04)
+        assert stats["clv"]["stddev"] == pytest.approx(0.06)
+        assert stats["clv"]["positive"] == 1
+        assert stats["results"] == {"win": 1, "lose": 1, "push": 0}
+        assert stats["roi"] == pytest.approx(10.0 / 200.0)
+
+    def test_empty_summary(self):
+        stats = describe(None)
+        assert stats["bets"] == 0
+        assert stats["clv"]["mean"] is None
+        assert stats["roi"] is None
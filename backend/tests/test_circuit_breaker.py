@@ -0,0 +1,201 @@
+"""
+Tests for the Odds API circuit breaker and stale-while-revalidate odds.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from loadtest import fake_upstream
+from routes import ev as ev_route
+from routes import validated_odds as odds_route
+from services import odds_service, stale_odds
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from services.odds_service import OddsAPICircuitOpenError, OddsAPIError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """closed → open → half-open → closed/open"""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("t", failure_threshold=3, reset_timeout=10, clock=FakeClock())
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        breaker.record_success()  # resets the count
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    def test_half_open_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.retry_after() == 10
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # probe in flight
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("t", failure_threshold=5, reset_timeout=10, clock=clock)
+        for _ in range(5):
+            breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == 10
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = fake_upstream.start(latency_ms=0, jitter_ms=0, events=3, books=3, error_rate=1.0)
+    monkeypatch.setattr(odds_service, "BASE", f"{server.url}/sports")
+    yield server
+    server.shutdown()
+
+
+class TestOddsServiceBreaker:
+    """Upstream failures open the circuit; rejected calls never reach the upstream"""
+
+    def test_rejects_without_calling_upstream(self, upstream, monkeypatch):
+        breaker = CircuitBreaker("odds_api", failure_threshold=2, reset_timeout=60)
+        monkeypatch.setattr(odds_service, "odds_api_breaker", breaker)
+        for _ in range(2):
+            assert odds_service._timed_get(upstream.url + "/sports", "sports").status_code == 503
+        assert breaker.state == OPEN
+
+        started = time.perf_counter()
+        with pytest.raises(OddsAPICircuitOpenError):
+            odds_service._timed_get(upstream.url + "/sports", "sports")
+        assert time.perf_counter() - started < 0.1
+        assert upstream.stats()["total"] == 2
+
+    def test_client_errors_do_not_open(self, upstream, monkeypatch):
+        breaker = CircuitBreaker("odds_api", failure_threshold=1, reset_timeout=60)
+        monkeypatch.setattr(odds_service, "odds_api_breaker", breaker)
+        assert odds_service._timed_get(upstream.url + "/unknown", "sports").status_code == 404
+        assert breaker.state == CLOSED
+
+
+BODY = {"events": [], "retrieved_at": "2026-01-01T00:00:00Z", "source": "the-odds-api-v4", "stale": False}
+
+
+@pytest.fixture
+def swr(monkeypatch):
+    """Breaker with a 60 s reset and a controllable fake fetch"""
+    breaker = CircuitBreaker("odds_api", failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(stale_odds, "odds_api_breaker", breaker)
+    monkeypatch.setattr(stale_odds, "odds_response_body", lambda validated: dict(validated))
+    monkeypatch.setattr(stale_odds.settings, "ODDS_SNAPSHOT_INTERVAL", 0.0)  # always refetch
+    state = {"fail": False, "calls": 0}
+
+    def fetch(sport_key):
+        state["calls"] += 1
+        if state["fail"]:
+            breaker.record_failure()
+            raise OddsAPIError("503: down")
+        breaker.record_success()
+        return BODY
+
+    monkeypatch.setattr(stale_odds, "get_validated_odds", fetch)
+    stale_odds.clear()
+    yield breaker, state
+    stale_odds.clear()
+
+
+class TestStaleWhileRevalidate:
+    """Last good snapshot served (marked) while the upstream is down"""
+
+    def test_fresh_then_stale(self, swr):
+        breaker, state = swr
+        assert stale_odds.get_odds_body("basketball_nba")["stale"] is False
+
+        state["fail"] = True
+        body = stale_odds.get_odds_body("basketball_nba")
+        assert body["stale"] is True
+        assert body["odds_api_circuit"] == OPEN
+        assert body["snapshot_age_seconds"] >= 0
+        assert body["retrieved_at"] == BODY["retrieved_at"]
+
+    def test_open_circuit_serves_without_waiting(self, swr):
+        breaker, state = swr
+        stale_odds.get_odds_body("basketball_nba")
+        breaker.record_failure()
+        calls = state["calls"]
+
+        body = stale_odds.get_odds_body("basketball_nba")
+        assert body["stale"] is True
+        # The revalidation runs in the background (rejected by the open circuit here)
+        deadline = time.monotonic() + 2
+        while stale_odds._revalidating and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert state["calls"] == calls + 1
+
+    def test_no_snapshot_raises(self, swr):
+        breaker, state = swr
+        state["fail"] = True
+        with pytest.raises(OddsAPIError):
+            stale_odds.get_odds_body("icehockey_nhl")
+
+    def test_route_503_without_snapshot(self, swr):
+        breaker, state = swr
+        state["fail"] = True
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        response = TestClient(app).get("/api/odds/icehockey_nhl")
+        assert response.status_code == 503
+
+    def test_upstream_503_with_closed_circuit_serves_snapshot(self, upstream, monkeypatch):
+        """Retries exhausted on a real 503: the route serves the snapshot instead of a 500"""
+        breaker = CircuitBreaker("odds_api", failure_threshold=10, reset_timeout=60)
+        monkeypatch.setattr(odds_service, "odds_api_breaker", breaker)
+        monkeypatch.setattr(stale_odds, "odds_api_breaker", breaker)
+        monkeypatch.setattr(odds_service, "RETRY_WAIT_SECONDS", 0.0)
+        monkeypatch.setattr(odds_service.settings, "ODDS_API_KEY", "x")
+        monkeypatch.setattr(stale_odds.settings, "ODDS_SNAPSHOT_INTERVAL", 0.0)
+        stale_odds.clear()
+        stale_odds._last_good["basketball_nba"] = stale_odds.LastGood(BODY, time.time() - 30)
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        try:
+            response = TestClient(app).get("/api/odds/basketball_nba")
+        finally:
+            stale_odds.clear()
+        assert response.status_code == 200
+        assert response.json()["stale"] is True
+        assert response.json()["retrieved_at"] == BODY["retrieved_at"]
+        assert breaker.state == CLOSED
+        assert upstream.stats()["total"] == odds_service.RETRY_ATTEMPTS
+
+    def test_ev_refuses_stale_snapshot_odds(self):
+        """A snapshot 74 s old cannot be used for an EV calculation"""
+        app = FastAPI()
+        app.include_router(ev_route.router)
+        old = (datetime.utcnow() - timedelta(seconds=74)).isoformat() + "Z"
+        response = TestClient(app).post("/api/ev/calculate", json={
+            "odds": 2.1, "true_probability": 0.5, "cash_stake": 100,
+            "odds_timestamp": old, "odds_source": "the-odds-api-v4"
+        })
+        assert response.status_code == 422
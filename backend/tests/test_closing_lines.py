@@ -0,0 +1,128 @@
+"""
+Tests for automatic closing-line capture.
+
+Covers the no-vig consensus, the per-bet closing fields and the
+scheduler's per-sport coalescing (no Mongo / Odds API needed).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from services.validated_odds import Bookmaker, Outcome, ValidatedOddsEvent
+from services.closing_line_service import (
+    ClosingLineScheduler,
+    closing_changes,
+    closing_snapshot,
+    no_vig_consensus,
+)
+
+
+def make_event():
+    last_update = datetime.utcnow() - timedelta(seconds=5)
+    return ValidatedOddsEvent(
+        id="evt1",
+        sport_key="basketball_nba",
+        sport_title="NBA",
+        commence_time=datetime.utcnow() + timedelta(minutes=2),
+        home_team="Lakers",
+        away_team="Celtics",
+        bookmakers=[
+            Bookmaker(key="draftkings", title="DraftKings", last_update=last_update, outcomes=[
+                Outcome(name="Lakers", price=Decimal("1.91")),
+                Outcome(name="Celtics", price=Decimal("1.91")),
+            ]),
+            Bookmaker(key="fanduel", title="FanDuel", last_update=last_update, outcomes=[
+                Outcome(name="Lakers", price=Decimal("1.80")),
+                Outcome(name="Celtics", price=Decimal("2.05")),
+            ]),
+        ]
+    )
+
+
+class TestClosingSnapshot:
+    """Closing prices and consensus"""
+
+    def test_consensus_removes_vig(self):
+        consensus = no_vig_consensus(make_event())
+        fair_probs = [1 / price for price in consensus.values()]
+        assert sum(fair_probs) == pytest.approx(1.0, abs=1e-3)
+        assert consensus["Celtics"] > consensus["Lakers"]
+
+    def test_bet_uses_own_book_price(self):
+        snapshot = closing_snapshot(make_event(), datetime.utcnow())
+        bet = {"id": "b1", "odds": 2.00, "sportsbook": "DraftKings", "outcome": "Lakers"}
+
+        changes = closing_changes(bet, snapshot)
+        assert changes["closing_odds"] == 1.91
+        assert changes["closing_source"] == "book"
+        assert changes["clv"] == round((2.00 - 1.91) / 1.91, 3)
+
+    def test_unknown_book_falls_back_to_consensus(self):
+        snapshot = closing_snapshot(make_event(), datetime.utcnow())
+        bet = {"id": "b1", "odds": 2.00, "sportsbook": "Caesars", "outcome": "Lakers"}
+
+        changes = closing_changes(bet, snapshot)
+        assert changes["closing_source"] == "consensus"
+        assert changes["closing_odds"] == snapshot["consensus"]["Lakers"]
+
+    def test_unknown_outcome_is_skipped(self):
+        snapshot = closing_snapshot(make_event(), datetime.utcnow())
+        bet = {"id": "b1", "odds": 2.00, "sportsbook": "DraftKings", "outcome": "Draw"}
+        assert closing_changes(bet, snapshot) is None
+
+
+class TestScheduler:
+    """One upstream fetch per sport per capture window"""
+
+    def test_saturday_slate_coalesces_per_sport(self):
+        now = datetime(2026, 10, 17, 17, 0, 0)
+        kickoff = now + timedelta(minutes=2)
+        pending = [
+            # Half kick off now, half a couple of minutes later: same fetch
+            {"sport": "americanfootball_ncaaf", "event_id": f"cfb{i}",
+             "commence_time": kickoff + timedelta(minutes=2 * (i % 2))}
+            for i in range(300)
+        ] + [
+            {"sport": "soccer_epl", "event_id": f"epl{i}", "commence_time": kickoff - timedelta(seconds=30)}
+            for i in range(10)
+        ]
+        calls = []
+
+        def capture(sport, event_ids):
+            calls.append((sport, len(event_ids)))
+            return len(event_ids)
+
+        scheduler = ClosingLineScheduler(load_pending=lambda now, horizon: pending, capture=capture)
+        updated = scheduler.run_once(now)
+
+        assert updated == 310
+        assert sorted(calls) == [("americanfootball_ncaaf", 300), ("soccer_epl", 10)]
+
+    def test_events_are_not_captured_early(self):
+        now = datetime(2026, 10, 17, 12, 0, 0)
+        pending = [{"sport": "basketball_nba", "event_id": "late", "commence_time": now + timedelta(hours=3)}]
+        calls = []
+
+        scheduler = ClosingLineScheduler(
+            load_pending=lambda now, horizon: pending,
+            capture=lambda sport, ids: calls.append(sport) or 0
+        )
+        scheduler.run_once(now)
+        assert calls == []
+
+        scheduler.run_once(now + timedelta(hours=3) - timedelta(seconds=60))
+        assert calls == ["basketball_nba"]
+
+    def test_event_is_scheduled_once(self):
+        now = datetime(2026, 10, 17, 12, 0, 0)
+        pending = [{"sport": "icehockey_nhl", "event_id": "e1", "commence_time": now + timedelta(hours=1)}]
+        scheduler = ClosingLineScheduler(load_pending=lambda now, horizon: pending, capture=lambda s, i: 0)
+
+        assert scheduler.refresh(now) == 1
+        assert scheduler.refresh(now) == 0
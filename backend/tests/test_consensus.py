@@ -0,0 +1,185 @@
+"""
+Tests for the weighted no-vig consensus and its use as an EV probability source.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import consensus as consensus_route
+from routes import ev as ev_route
+from services import consensus, stale_odds
+from services.consensus import ConsensusEngine, ConsensusError
+from services.line_history import Tick
+
+T0 = 1_736_964_000.0
+
+
+def _quote(book, lakers, celtics, ts=T0, event_id="evt1"):
+    return [Tick(ts, event_id, book, "h2h", "Lakers", lakers), Tick(ts, event_id, book, "h2h", "Celtics", celtics)]
+
+
+def _no_vig(lakers, celtics):
+    return (1 / lakers) / (1 / lakers + 1 / celtics)
+
+
+class TestConsensus:
+    def test_weighted_mean_of_no_vig_probabilities(self):
+        engine = ConsensusEngine({"pinnacle": 3.0})
+        engine.update("basketball_nba", _quote("pinnacle", 1.8, 2.1) + _quote("fanduel", 1.9, 1.9), now=T0)
+        found = engine.consensus("basketball_nba", "evt1", now=T0)
+        expected = (3 * _no_vig(1.8, 2.1) + 0.5) / 4
+        assert found.outcomes["Lakers"].probability == pytest.approx(expected)
+        assert found.outcomes["Lakers"].books == 2
+        assert found.outcomes["Celtics"].probability == pytest.approx(1 - expected)
+        assert found.outcomes["Lakers"].fair_odds == pytest.approx(1 / expected)
+
+    def test_incremental_update_matches_recomputation(self):
+        engine = ConsensusEngine({"pinnacle": 2.0})
+        books = {"pinnacle": (1.8, 2.1), "fanduel": (1.9, 1.9), "betmgm": (1.85, 2.0)}
+        for book, (lakers, celtics) in books.items():
+            engine.update("basketball_nba", _quote(book, lakers, celtics), now=T0)
+        assert engine.update("basketball_nba", _quote("fanduel", 1.9, 1.9), now=T0 + 10) == 0  # unchanged
+        assert engine.update("basketball_nba", _quote("betmgm", 1.7, 2.2, ts=T0 + 20), now=T0 + 20) == 1
+        books["betmgm"] = (1.7, 2.2)
+        fresh = ConsensusEngine({"pinnacle": 2.0})
+        fresh.update("basketball_nba", [t for b, (l, c) in books.items() for t in _quote(b, l, c)], now=T0 + 20)
+        assert engine.consensus("basketball_nba", "evt1", now=T0 + 20).outcomes["Lakers"].probability == \
+            pytest.approx(fresh.consensus("basketball_nba", "evt1", now=T0 + 20).outcomes["Lakers"].probability)
+
+    def test_excluded_books_and_one_sided_quotes(self):
+        engine = ConsensusEngine({"offshore": 0.0})
+        engine.update("basketball_nba", _quote("offshore", 1.5, 2.8) + _quote("fanduel", 1.9, 1.9)
+                      + [Tick(T0, "evt1", "betmgm", "h2h", "Lakers", 1.2)], now=T0)
+        found = engine.consensus("basketball_nba", "evt1", now=T0)
+        assert found.outcomes["Lakers"] == (pytest.approx(0.5), 1)
+
+    def test_recency_decay(self):
+        engine = ConsensusEngine(half_life_seconds=60)
+        engine.update("basketball_nba", _quote("fanduel", 1.9, 1.9, ts=T0 - 60) + _quote("betmgm", 1.5, 2.8), now=T0)
+        # FanDuel's quote is one half-life older: half the weight
+        expected = (0.5 * 0.5 + _no_vig(1.5, 2.8)) / 1.5
+        assert engine.consensus("basketball_nba", "evt1", now=T0).outcomes["Lakers"].probability == \
+            pytest.approx(expected)
+        # Rebasing far in the future keeps the same relative weights
+        later = T0 + 10_000
+        engine.update("basketball_nba", _quote("betmgm", 1.5, 2.8, ts=later) + _quote("fanduel", 1.9, 1.9, ts=later - 60),
+                      now=later)
+        assert engine.consensus("basketball_nba", "evt1", now=later).outcomes["Lakers"].probability == \
+            pytest.approx(expected)
+
+    def test_pulled_books_expire(self):
+        engine = ConsensusEngine()
+        engine.update("basketball_nba", _quote("fanduel", 1.9, 1.9) + _quote("betmgm", 1.5, 2.8), now=T0)
+        engine.update("basketball_nba", _quote("betmgm", 1.5, 2.8), now=T0 + consensus.QUOTE_TTL_SECONDS)
+        found = engine.consensus("basketball_nba", "evt1", now=T0 + consensus.QUOTE_TTL_SECONDS + 1)
+        assert found.outcomes["Lakers"] == (pytest.approx(_no_vig(1.5, 2.8)), 1)
+
+    def test_event_markets(self):
+        engine = ConsensusEngine()
+        engine.update("basketball_nba", _quote("fanduel", 1.9, 1.9) + [
+            Tick(T0, "evt1", "fanduel", "spreads", "Lakers -5.5", 1.91),
+            Tick(T0, "evt1", "fanduel", "spreads", "Celtics +5.5", 1.91),
+        ], now=T0)
+        assert set(engine.event("basketball_nba", "evt1", now=T0)) == {"h2h", "spreads"}
+        assert engine.events("basketball_nba") == ["evt1"]
+        assert engine.consensus("basketball_nba", "evt2", now=T0) is None
+
+    def test_invalid(self):
+        with pytest.raises(ConsensusError):
+            ConsensusEngine({"fanduel": -1})
+        with pytest.raises(ConsensusError):
+            ConsensusEngine(half_life_seconds=-5)
+
+
+class TestFeeds:
+    def test_fetch_fresh(self, monkeypatch):
+        engine = ConsensusEngine()
+        monkeypatch.setattr(consensus, "_engine", engine)
+        monkeypatch.setattr(stale_odds, "odds_response_body", lambda validated: validated)
+        monkeypatch.setattr(stale_odds, "get_validated_odds", lambda sport_key: {"events": [{
+            "id": "evt1", "bookmakers": [{"key": "draftkings", "last_update": "2025-01-15T17:59:50Z",
+                                          "outcomes": [{"name": "Lakers", "price": 1.5},
+                                                       {"name": "Celtics", "price": 2.8}]}]
+        }]})
+        stale_odds.fetch_fresh("basketball_nba")
+        stale_odds.clear()
+        assert engine.consensus("basketball_nba", "evt1").outcomes["Lakers"].probability == \
+            pytest.approx(_no_vig(1.5, 2.8))
+
+
+class TestEndpoints:
+    """GET /api/odds/{sport_key}/consensus and POST /api/ev/calculate with the consensus"""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        engine = ConsensusEngine({"pinnacle": 2.0})
+        monkeypatch.setattr(consensus, "_engine", engine)
+        monkeypatch.setattr(consensus_route, "keep_fresh", lambda sport_key: None)
+        monkeypatch.setattr(ev_route, "keep_fresh", lambda sport_key: None)
+        now = time.time()
+        ticks = _quote("pinnacle", 1.8, 2.1, ts=now) + _quote("fanduel", 1.9, 1.9, ts=now) \
+            + _quote("betmgm", 1.85, 2.0, ts=now)
+        engine.update("basketball_nba", ticks, now=now)
+        return engine
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(consensus_route.router)
+        app.include_router(ev_route.router)
+        return TestClient(app)
+
+    def _ev(self, client, **fields):
+        body = {"odds": 2.2, "cash_stake": 100, "odds_timestamp": datetime.utcnow().isoformat() + "Z",
+                "odds_source": "the-odds-api-v4", "probability_source": "consensus",
+                "sport_key": "basketball_nba", "event_id": "evt1", "outcome_name": "Lakers", **fields}
+        return client.post("/api/ev/calculate", json=body)
+
+    def test_consensus(self, client, engine):
+        body = client.get("/api/odds/basketball_nba/consensus").json()
+        assert body["count"] == 1
+        lakers = body["events"][0]["markets"]["h2h"]["outcomes"]["Lakers"]
+        assert lakers["books"] == 3
+        assert lakers["fair_odds"] == round(1 / lakers["probability"], 4)
+        assert body["weights"]["book_weights"] == {"pinnacle": 2.0}
+        assert client.get("/api/odds/basketball_nba/consensus", params={"event_id": "nope"}).status_code == 404
+        assert client.get("/api/odds/basketball_nba/consensus", params={"market": "totals"}).json()["count"] == 0
+
+    def test_ev_from_consensus(self, client, engine):
+        response = self._ev(client)
+        assert response.status_code == 200
+        result = response.json()
+        probability = engine.consensus("basketball_nba", "evt1").outcomes["Lakers"].probability
+        assert result["probability_source"] == "consensus"
+        assert result["inputs"]["true_probability"] == round(probability, 6)
+        assert result["probability_source_detail"]["books"] == 3
+        assert float(result["ev_cash"]) == pytest.approx(100 * (round(probability, 6) * 2.2 - 1), abs=0.01)
+
+    def test_unsupported_sport_never_refreshed(self, client, engine, monkeypatch):
+        refreshed = []
+        monkeypatch.setattr(consensus_route, "keep_fresh", refreshed.append)
+        monkeypatch.setattr(ev_route, "keep_fresh", refreshed.append)
+        assert client.get("/api/odds/made_up_sport/consensus").status_code == 422
+        response = self._ev(client, sport_key="made_up/../../x")
+        assert response.status_code == 422
+        assert response.json()["detail"]["error"] == "Unsupported sport"
+        assert refreshed == []
+
+    def test_ev_errors(self, client, engine, monkeypatch):
+        assert self._ev(client, outcome_name="Knicks").status_code == 422
+        assert self._ev(client, event_id=None).status_code == 422
+        assert self._ev(client, probability_source="model").status_code == 422
+        assert self._ev(client, probability_source="user").json()["detail"]["error"] == "Missing probability"
+        monkeypatch.setattr(ev_route.settings, "CONSENSUS_MIN_BOOKS", 4)
+        assert self._ev(client).json()["detail"]["error"] == "Thin consensus"
+        monkeypatch.setattr(consensus, "_engine", None)  # CONSENSUS_ENABLED is off
+        assert self._ev(client).status_code == 503
+        assert client.get("/api/odds/basketball_nba/consensus").status_code == 503
@@ -0,0 +1,133 @@
+"""
+Tests for ETag/If-None-Match and cached compression on the odds endpoints.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import json
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from routes import validated_odds as odds_route
+from services import stale_odds
+from services.snapshot_store import SnapshotStore, set_snapshot_store
+from utils import http_cache
+from utils.http_cache import Representation, RepresentationCache, choose_encoding
+
+EVENTS = [{"id": f"e{i}", "home_team": "Home", "away_team": "Away", "bookmakers": []} for i in range(60)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = {"n": 0}
+
+    def fetch(sport_key):
+        calls["n"] += 1
+        return {"events": EVENTS, "fetch": calls["n"], "stale": False}
+
+    monkeypatch.setattr(stale_odds, "get_validated_odds", fetch)
+    monkeypatch.setattr(stale_odds, "odds_response_body", lambda validated: validated)
+    monkeypatch.setattr(settings, "ODDS_SNAPSHOT_INTERVAL", 60.0)
+    stale_odds.clear()
+    odds_route.representations.clear()
+
+    app = FastAPI()
+    app.include_router(odds_route.router)
+    yield TestClient(app), calls
+    stale_odds.clear()
+    odds_route.representations.clear()
+
+
+class TestConditionalGet:
+    """Strong ETag per snapshot version; 304 until it changes"""
+
+    def test_304_until_new_snapshot(self, client):
+        client, calls = client
+        first = client.get("/api/odds/basketball_nba", headers={"Accept-Encoding": "identity"})
+        etag = first.headers["etag"]
+        assert first.status_code == 200 and etag.startswith('"') and not etag.startswith('W/')
+
+        again = client.get("/api/odds/basketball_nba", headers={"If-None-Match": etag})
+        assert again.status_code == 304 and again.content == b""
+        assert calls["n"] == 1  # served from the in-process snapshot
+
+        stale_odds.clear()
+        changed = client.get("/api/odds/basketball_nba", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_sports_catalog_etag(self, client):
+        client, _ = client
+        first = client.get("/api/odds/sports/available")
+        assert first.json()["total_sports"] > 0
+        response = client.get("/api/odds/sports/available", headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == 304
+
+    def test_shared_snapshot_version(self, client, tmp_path):
+        client, calls = client
+        store = SnapshotStore(str(tmp_path))
+        set_snapshot_store(store)
+        try:
+            store.publish("basketball_nba", json.dumps({"events": EVENTS}).encode())
+            etag = client.get("/api/odds/basketball_nba").headers["etag"]
+            assert client.get("/api/odds/basketball_nba", headers={"If-None-Match": etag}).status_code == 304
+            store.publish("basketball_nba", json.dumps({"events": []}).encode())
+            assert client.get("/api/odds/basketball_nba", headers={"If-None-Match": etag}).status_code == 200
+        finally:
+            set_snapshot_store(None)
+        assert calls["n"] == 0
+
+
+class TestCompression:
+    """gzip once per version, matching the identity body"""
+
+    def test_gzip_cached_per_version(self, client, monkeypatch):
+        client, _ = client
+        compressions = []
+        real = gzip.compress
+        monkeypatch.setattr(http_cache.gzip, "compress", lambda data, **kw: compressions.append(1) or real(data, **kw))
+
+        plain = client.get("/api/odds/basketball_nba", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        for _ in range(3):
+            response = client.get("/api/odds/basketball_nba", headers={"Accept-Encoding": "gzip, deflate"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept, Accept-Encoding"
+            assert response.content == plain.content  # httpx decodes
+        assert len(compressions) == 1
+
+    def test_brotli_cached_per_version(self, client, monkeypatch):
+        client, _ = client
+        compressions = []
+        real = brotli.compress
+        monkeypatch.setattr(http_cache.brotli, "compress", lambda data, **kw: compressions.append(1) or real(data, **kw))
+
+        plain = client.get("/api/odds/basketball_nba", headers={"Accept-Encoding": "identity"})
+        for _ in range(3):
+            response = client.get("/api/odds/basketball_nba", headers={"Accept-Encoding": "gzip, br"})
+            assert response.headers["content-encoding"] == "br"
+            assert response.headers["etag"].endswith('-br"')
+            assert response.content == plain.content  # httpx decodes
+        assert len(compressions) == 1
+
+    def test_encoding_choice(self):
+        assert choose_encoding("gzip, br", 10_000) == "br"
+        assert choose_encoding("br;q=0, gzip", 10_000) == "gzip"
+        assert choose_encoding("gzip", 100) is None
+        assert choose_encoding("gzip;q=0, identity", 10_000) is None
+        assert choose_encoding("", 10_000) is None
+
+    def test_etag_differs_per_encoding(self):
+        representation = RepresentationCache().get("k", "abc", lambda: b"x" * 2000)
+        assert representation.etag() == '"abc"'
+        assert representation.etag("gzip") == '"abc-gzip"'
+        assert representation.matches('"other", W/"abc-gzip"')
+        assert not representation.matches('"abcd"')
+        assert gzip.decompress(representation.encoded("gzip")) == representation.body
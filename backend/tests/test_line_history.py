@@ -0,0 +1,158 @@
+"""
+Tests for the append-only line history store and its endpoint.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import validated_odds as odds_route
+from services import line_history
+from services.line_history import COMPACT_MIN_CHUNKS, LineHistory, Tick, outcome_label, ticks_from_body
+
+T0 = 1_736_964_000.0  # 2025-01-15T18:00:00Z
+SEGMENT = 3600
+
+
+def _body(lakers=1.80, celtics=2.10, dk_update="2025-01-15T17:59:50Z"):
+    return {"events": [{
+        "id": "evt1",
+        "home_team": "Lakers",
+        "away_team": "Celtics",
+        "bookmakers": [
+            {"key": "draftkings", "title": "DraftKings", "last_update": dk_update,
+             "outcomes": [{"name": "Lakers", "price": lakers}, {"name": "Celtics", "price": celtics}]},
+            {"key": "fanduel", "title": "FanDuel", "last_update": datetime(2025, 1, 15, 17, 59, 55),
+             "outcomes": [{"name": "Lakers", "price": 1.85}, {"name": "Celtics", "price": 2.0}]},
+        ],
+    }]}
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = LineHistory(str(tmp_path), retention_days=1, segment_seconds=SEGMENT)
+    yield store
+    store.stop()
+
+
+class TestRecord:
+    """Only changes are appended"""
+
+    def test_changes_only(self, history):
+        assert history.record("basketball_nba", ticks_from_body(_body()), now=T0) == 4
+        assert history.record("basketball_nba", ticks_from_body(_body()), now=T0 + 20) == 0
+        assert history.record("basketball_nba", ticks_from_body(_body(lakers=1.75)), now=T0 + 40) == 1
+
+        ticks = history.history("basketball_nba", "evt1", book="draftkings", outcome="Lakers")
+        assert [t.price for t in ticks] == [1.80, 1.75]
+        assert ticks[0].timestamp == T0 - 10 and ticks[0].market == "h2h"
+
+    def test_filters_and_order(self, history):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        ticks = history.history("basketball_nba", "evt1")
+        assert len(ticks) == 4
+        assert [t.timestamp for t in ticks] == sorted(t.timestamp for t in ticks)
+        assert {t.book for t in history.history("basketball_nba", "evt1", book="fanduel")} == {"fanduel"}
+        assert history.history("basketball_nba", "evt1", since=T0 - 7) == [
+            t for t in ticks if t.book == "fanduel"
+        ]
+        assert history.history("basketball_nba", "nope") == []
+
+    def test_restart_does_not_repeat_prices(self, history, tmp_path):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        history.stop()
+        restarted = LineHistory(str(tmp_path), segment_seconds=SEGMENT)
+        try:
+            assert restarted.record("basketball_nba", ticks_from_body(_body()), now=T0 + 20) == 0
+            assert restarted.record("basketball_nba", ticks_from_body(_body(celtics=2.2)), now=T0 + 40) == 1
+        finally:
+            restarted.stop()
+
+    def test_single_writer(self, history, tmp_path):
+        assert history.record("basketball_nba", ticks_from_body(_body()), now=T0) == 4
+        other = LineHistory(str(tmp_path), segment_seconds=SEGMENT)
+        assert not other.is_writer
+        assert other.record("basketball_nba", ticks_from_body(_body(lakers=1.5)), now=T0 + 20) == 0
+        # ...but reads what the writer appends, including later chunks
+        history.record("basketball_nba", ticks_from_body(_body(lakers=1.7)), now=T0 + 40)
+        assert [t.price for t in other.history("basketball_nba", "evt1", book="draftkings", outcome="Lakers")] == [1.8, 1.7]
+
+    def test_half_written_chunk_is_ignored(self, history, tmp_path):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        path = history._chunk_path("basketball_nba", int(T0 // SEGMENT * SEGMENT))
+        with open(path, "ab") as f:
+            f.write(b"ILHC\x05\x00\x00\x00" + b"\x00" * 20)  # header of a chunk whose rows never arrived
+        reader = LineHistory(str(tmp_path), segment_seconds=SEGMENT)
+        assert len(reader.history("basketball_nba", "evt1")) == 4
+
+    def test_segments_roll_by_ingest_time(self, history):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        history.record("basketball_nba", ticks_from_body(_body(lakers=1.7)), now=T0 + SEGMENT)
+        assert len(history.segments("basketball_nba")) == 2
+        assert [t.price for t in history.history("basketball_nba", "evt1", book="draftkings", outcome="Lakers")] == [1.8, 1.7]
+
+
+class TestMaintenance:
+    """Compaction of sealed segments and retention"""
+
+    def test_compaction_keeps_history(self, history):
+        for i in range(COMPACT_MIN_CHUNKS + 2):
+            price = 1.8 + (i % 3) / 100  # 1.80, 1.81, 1.82, 1.80, ...
+            history.record("basketball_nba", [Tick(T0 + i, "evt1", "draftkings", "h2h", "Lakers", price)], now=T0 + i)
+        before = history.history("basketball_nba", "evt1")
+        start = history.segments("basketball_nba")[0]
+
+        history.maintain(now=T0 + SEGMENT)  # the segment is now sealed
+        after = history.history("basketball_nba", "evt1")
+        assert after == before
+        assert len(history._view("basketball_nba", start).chunks) == 1
+        assert not history.compact("basketball_nba", start)  # already one chunk
+
+    def test_retention(self, history):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        history.record("basketball_nba", ticks_from_body(_body(lakers=1.7)), now=T0 + 2 * 86400)
+        assert history.expire(now=T0 + 2 * 86400) == 1
+        assert len(history.segments("basketball_nba")) == 1
+
+
+class TestLabels:
+    def test_outcome_label(self):
+        assert outcome_label("Lakers") == "Lakers"
+        assert outcome_label("Lakers", point=-5.5) == "Lakers -5.5"
+        assert outcome_label("Over", "LeBron James", 25.5) == "LeBron James Over 25.5"
+
+
+class TestHistoryEndpoint:
+    """GET /api/odds/{sport_key}/history"""
+
+    @pytest.fixture
+    def client(self, history):
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        line_history.set_line_history(history)
+        yield TestClient(app)
+        line_history.set_line_history(None)
+
+    def test_history(self, client, history):
+        history.record("basketball_nba", ticks_from_body(_body()), now=T0)
+        history.record("basketball_nba", ticks_from_body(_body(lakers=1.75)), now=T0 + 20)
+        response = client.get("/api/odds/basketball_nba/history",
+                              params={"event_id": "evt1", "book": "draftkings", "outcome": "Lakers"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["count"] == 2
+        assert body["ticks"][0] == {
+            "timestamp": "2025-01-15T17:59:50Z", "book": "draftkings", "market": "h2h",
+            "outcome": "Lakers", "price": 1.8
+        }
+
+    def test_disabled(self, client):
+        line_history.set_line_history(None)
+        response = client.get("/api/odds/basketball_nba/history", params={"event_id": "evt1"})
+        assert response.status_code == 503
@@ -0,0 +1,228 @@
+"""
+Tests for line-move / steam detection and its endpoints.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import line_moves as moves_route
+from services import line_moves, stale_odds
+from services.line_history import Tick
+from services.line_moves import LineMoveDetector, LineMoveError, parse_thresholds
+from services.odds_poller import SnapshotWatcher
+from services.snapshot_store import SnapshotStore
+
+T0 = 1_736_964_000.0
+BOOKS = ("draftkings", "fanduel", "betmgm", "caesars", "pointsbet")
+
+
+def _ticks(prices, outcome="Lakers", event_id="evt1"):
+    return [Tick(T0, event_id, book, "h2h", outcome, price) for book, price in prices.items()]
+
+
+def _opening(detector, now=T0):
+    return detector.observe("basketball_nba", _ticks({book: 2.0 for book in BOOKS}), now=now)
+
+
+class TestMoves:
+    """Single-book moves"""
+
+    def test_first_prices_and_repeats_are_not_moves(self):
+        detector = LineMoveDetector()
+        assert _opening(detector) == []
+        assert _opening(detector, now=T0 + 20) == []
+
+    def test_sharp_move(self):
+        detector = LineMoveDetector()
+        _opening(detector)
+        moves = detector.observe("basketball_nba", _ticks({"draftkings": 1.85}), now=T0 + 20)
+        assert [m.kind for m in moves] == ["move"]
+        move = moves[0]
+        assert move.books == ("draftkings",) and move.previous_price == 2.0 and move.price == 1.85
+        assert move.change == pytest.approx(1 / 1.85 - 0.5)
+
+    def test_small_move_is_ignored(self):
+        detector = LineMoveDetector()
+        _opening(detector)
+        assert detector.observe("basketball_nba", _ticks({"draftkings": 1.98}), now=T0 + 20) == []
+
+
+class TestSteam:
+    """Books moving together within the window"""
+
+    def test_steam_reports_stale_books_once(self):
+        detector = LineMoveDetector({"default": {"move": 0.5}})  # only steam
+        _opening(detector)
+        assert detector.observe("basketball_nba", _ticks({"draftkings": 1.9, "fanduel": 1.9}), now=T0 + 20) == []
+
+        moves = detector.observe("basketball_nba", _ticks({"betmgm": 1.91}), now=T0 + 40)
+        assert [m.kind for m in moves] == ["steam"]
+        steam = moves[0]
+        assert steam.books == ("betmgm", "draftkings", "fanduel")
+        assert steam.change > 0
+        assert steam.stale_books == (("caesars", 2.0), ("pointsbet", 2.0))
+
+        # A fourth book following is the same episode
+        assert detector.observe("basketball_nba", _ticks({"caesars": 1.9}), now=T0 + 60) == []
+
+    def test_window_expiry(self):
+        detector = LineMoveDetector({"default": {"move": 0.5, "window_seconds": 60}})
+        _opening(detector)
+        detector.observe("basketball_nba", _ticks({"draftkings": 1.9, "fanduel": 1.9}), now=T0)
+        # Too late to join the first two
+        assert detector.observe("basketball_nba", _ticks({"betmgm": 1.9}), now=T0 + 61) == []
+
+    def test_new_episode_after_window(self):
+        detector = LineMoveDetector({"default": {"move": 0.5, "window_seconds": 60}})
+        _opening(detector)
+        assert len(detector.observe("basketball_nba", _ticks({"draftkings": 1.9, "fanduel": 1.9, "betmgm": 1.9}),
+                                    now=T0)) == 1
+        moves = detector.observe("basketball_nba", _ticks({"draftkings": 1.8, "fanduel": 1.8, "betmgm": 1.8}),
+                                 now=T0 + 120)
+        assert [m.kind for m in moves] == ["steam"]
+
+    def test_opposite_directions_do_not_add_up(self):
+        detector = LineMoveDetector({"default": {"move": 0.5}})
+        _opening(detector)
+        assert detector.observe("basketball_nba", _ticks({"draftkings": 1.9, "fanduel": 2.1, "betmgm": 1.9}),
+                                now=T0 + 20) == []
+
+
+class TestThresholds:
+    def test_per_sport(self):
+        thresholds = parse_thresholds({"default": {"move": 0.05}, "icehockey_nhl": {"steam_books": 4}})
+        assert thresholds["icehockey_nhl"].move == 0.05
+        assert thresholds["icehockey_nhl"].steam_books == 4
+        detector = LineMoveDetector({"basketball_nba": {"steam_books": 2}})
+        assert detector.thresholds("basketball_nba").steam_books == 2
+        assert detector.thresholds("americanfootball_nfl").steam_books == 3
+
+    @pytest.mark.parametrize("config", [{"default": {"moves": 1}}, {"x": {"move": 0}}, {"x": {"move": "a"}}])
+    def test_invalid(self, config):
+        with pytest.raises(LineMoveError):
+            parse_thresholds(config)
+
+
+class TestSince:
+    def test_ids_and_filters(self):
+        detector = LineMoveDetector()
+        _opening(detector)
+        detector.observe("basketball_nba", _ticks({"draftkings": 1.8}), now=T0 + 20)
+        detector.observe("basketball_nba", _ticks({"draftkings": 2.0}, outcome="Celtics", event_id="evt2"),
+                         now=T0 + 20)
+        detector.observe("basketball_nba", _ticks({"draftkings": 1.8}, outcome="Celtics", event_id="evt2"),
+                         now=T0 + 40)
+        everything = detector.since(0)
+        assert len(everything) == 2
+        assert everything[0].id < everything[1].id == detector.latest_id
+        assert detector.since(everything[0].id) == everything[1:]
+        assert [m.event_id for m in detector.since(0, event_id="evt2")] == ["evt2"]
+        assert detector.since(0, sport_key="icehockey_nhl") == []
+
+
+class TestFeeds:
+    """Refreshes reach the detector"""
+
+    def test_snapshot_watcher(self, tmp_path):
+        store = SnapshotStore(str(tmp_path))
+        detector = LineMoveDetector()
+        watcher = SnapshotWatcher(store, [detector.observe], want_ttl=300)
+        store.want("basketball_nba")
+
+        def publish(price):
+            store.publish("basketball_nba", json.dumps({"events": [{
+                "id": "evt1", "bookmakers": [{"key": "draftkings", "last_update": "2025-01-15T17:59:50Z",
+                                              "outcomes": [{"name": "Lakers", "price": price}]}]
+            }]}).encode())
+
+        publish(2.0)
+        assert watcher.poll() == 1
+        assert watcher.poll() == 0  # same snapshot
+        publish(1.8)
+        assert watcher.poll() == 1
+        assert [m.price for m in detector.since(0)] == [1.8]
+        store.close()
+
+    def test_fetch_fresh(self, monkeypatch):
+        detector = LineMoveDetector()
+        monkeypatch.setattr(line_moves, "_detector", detector)
+        prices = iter([2.0, 1.8])
+        monkeypatch.setattr(stale_odds, "odds_response_body", lambda validated: validated)
+        monkeypatch.setattr(stale_odds, "get_validated_odds", lambda sport_key: {"events": [{
+            "id": "evt1", "bookmakers": [{"key": "draftkings", "last_update": "2025-01-15T17:59:50Z",
+                                          "outcomes": [{"name": "Lakers", "price": next(prices)}]}]
+        }]})
+        stale_odds.fetch_fresh("basketball_nba")
+        stale_odds.fetch_fresh("basketball_nba")
+        stale_odds.clear()
+        assert [m.kind for m in detector.since(0)] == ["move"]
+
+
+class TestEndpoints:
+    """GET /api/odds/{sport_key}/moves and /moves/stream"""
+
+    @pytest.fixture
+    def detector(self, monkeypatch):
+        detector = LineMoveDetector()
+        monkeypatch.setattr(line_moves, "_detector", detector)
+        monkeypatch.setattr(moves_route, "keep_fresh", lambda sport_key: None)
+        _opening(detector)
+        detector.observe("basketball_nba", _ticks({"draftkings": 1.8}), now=T0 + 20)
+        return detector
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(moves_route.router)
+        return TestClient(app)
+
+    def test_poll(self, client, detector):
+        body = client.get("/api/odds/basketball_nba/moves").json()
+        assert body["count"] == 1
+        assert body["moves"][0]["books"] == ["draftkings"]
+        assert body["moves"][0]["line_timestamp"] == "2025-01-15T18:00:00.000000Z"
+        assert body["thresholds"]["steam_books"] == 3
+        assert client.get("/api/odds/basketball_nba/moves", params={"since_id": body["last_id"]}).json()["count"] == 0
+
+    def test_keep_fresh_never_fetches_unsupported(self, monkeypatch):
+        fetched = []
+        monkeypatch.setattr(stale_odds, "get_odds_snapshot", fetched.append)
+        stale_odds.keep_fresh("made_up_sport")
+        stale_odds.keep_fresh("basketball_nba")
+        assert fetched == ["basketball_nba"]
+
+    def test_errors(self, client, detector, monkeypatch):
+        assert client.get("/api/odds/basketball_nba/moves", params={"kind": "drift"}).status_code == 422
+        assert client.get("/api/odds/Bad-Key/moves").status_code == 422
+        assert client.get("/api/odds/made_up_sport/moves").status_code == 422
+        assert client.get("/api/odds/made_up_sport/moves/stream").status_code == 422
+        monkeypatch.setattr(line_moves, "_detector", None)  # LINE_MOVES_ENABLED is off
+        assert client.get("/api/odds/basketball_nba/moves").status_code == 503
+
+    def test_stream(self, detector, monkeypatch):
+        monkeypatch.setattr(moves_route, "STREAM_POLL_SECONDS", 0)
+
+        class Request:
+            checks = 0
+
+            async def is_disconnected(self):
+                self.checks += 1
+                return self.checks > 2
+
+        async def collect():
+            return [chunk async for chunk in moves_route.move_events(Request(), detector, "basketball_nba", 0)]
+
+        chunks = asyncio.run(collect())
+        assert chunks[0] == "retry: 3000\n\n"
+        event = chunks[1].splitlines()
+        assert event[0] == f"id: {detector.latest_id}"
+        assert event[1] == "event: move"
+        assert json.loads(event[2][len("data: "):])["price"] == 1.8
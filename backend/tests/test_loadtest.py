@@ -0,0 +1,73 @@
+"""
+Tests for the load-test harness pieces that can run quickly: the fake
+upstream, the app's ODDS_API_BASE wiring, and the report maths.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from urllib.request import urlopen
+
+import pytest
+
+from loadtest import fake_upstream
+from loadtest.run import Recorder, compare, percentile
+from services import odds_service
+from services.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def upstream():
+    server = fake_upstream.start(latency_ms=0, jitter_ms=0, events=3, books=2)
+    yield server
+    server.shutdown()
+
+
+class TestFakeUpstream:
+    """Serves Odds API shaped payloads and counts calls"""
+
+    def test_odds_and_stats(self, upstream):
+        with urlopen(f"{upstream.url}/sports/basketball_nba/odds?apiKey=x") as response:
+            events = json.load(response)
+            assert response.headers["x-requests-used"] == "1"
+        assert len(events) == 3
+
+        with urlopen(f"{upstream.url}/sports") as response:
+            assert any(s["key"] == "basketball_nba" for s in json.load(response))
+
+        assert upstream.stats() == {"calls": {"odds": 1, "sports": 1}, "total": 2}
+
+    def test_odds_service_uses_base(self, upstream, monkeypatch):
+        monkeypatch.setattr(odds_service, "BASE", f"{upstream.url}/sports")
+        monkeypatch.setattr(odds_service.settings, "ODDS_API_KEY", "loadtest")
+        monkeypatch.setattr(odds_service, "odds_api_breaker", CircuitBreaker("odds_api"))
+        response = odds_service.get_odds("basketball_nba")
+        assert len(response["data"]) == 3
+        assert response["meta"]["x-requests-used"] == "1"
+
+
+class TestReport:
+    """Percentiles and before/after comparison"""
+
+    def test_percentile(self):
+        values = [i / 1000 for i in range(1, 101)]
+        assert percentile(values, 50) == 0.05
+        assert percentile(values, 99) == 0.099
+        assert percentile([], 95) == 0.0
+
+    def test_summary_and_compare(self):
+        before, after = Recorder(), Recorder()
+        for ms in (10, 20, 30):
+            before.record("GET /x", ms / 1000, 200)
+            after.record("GET /x", ms / 2000, 200)
+        after.record("GET /x", 0.001, None)
+
+        old, new = before.summary(1.0), after.summary(1.0)
+        assert new["errors"] == 1
+        assert new["routes"]["GET /x"]["statuses"] == {"200": 3, "exception": 1}
+
+        lines = compare(old, new)
+        assert lines[0] == "throughput: 3.0 → 4.0 req/s (+33.3%)"
+        assert any(line.startswith("GET /x: p50 20.0 → 5.0 ms (-75.0%)") for line in lines)
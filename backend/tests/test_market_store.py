@@ -0,0 +1,216 @@
+"""
+Tests for the columnar multi-market store and GET /api/odds/{sport}/markets.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.slate import generate_slate
+from routes import validated_odds as odds_route
+from services import stale_odds
+from services import validated_odds as validated
+from services.market_store import MarketSnapshot, validate_markets
+from services.validated_odds import SUPPORTED_SPORTSBOOKS, OddsValidationError, get_market_snapshot
+
+NOW = datetime(2025, 1, 15, 18, 0, 0)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat() + "Z"
+
+
+def _event(books, event_id="evt1"):
+    return {
+        "id": event_id,
+        "sport_key": "basketball_nba",
+        "sport_title": "NBA",
+        "commence_time": _iso(NOW + timedelta(hours=2)),
+        "home_team": "Lakers",
+        "away_team": "Celtics",
+        "bookmakers": books,
+    }
+
+
+def _book(key, markets, age=10, title=None):
+    return {
+        "key": key,
+        "title": title or key.title(),
+        "last_update": _iso(NOW - timedelta(seconds=age)),
+        "markets": markets,
+    }
+
+
+def _spreads(line=5.5, prices=(1.91, 1.95)):
+    return {"key": "spreads", "outcomes": [
+        {"name": "Lakers", "price": prices[0], "point": -line},
+        {"name": "Celtics", "price": prices[1], "point": line},
+    ]}
+
+
+def _h2h(prices=(1.8, 2.1)):
+    return {"key": "h2h", "outcomes": [
+        {"name": "Lakers", "price": prices[0]},
+        {"name": "Celtics", "price": prices[1]},
+    ]}
+
+
+def _validate(raw, markets=("h2h", "spreads", "totals")):
+    dropped = {}
+    snap = MarketSnapshot.from_odds(raw, "basketball_nba", NOW, dropped)
+    return validate_markets(snap, markets, SUPPORTED_SPORTSBOOKS, now=NOW, dropped=dropped), dropped
+
+
+class TestValidateMarkets:
+    """Column rules and outcome grouping"""
+
+    def test_keeps_valid_rows(self):
+        snap, dropped = _validate([_event([_book("draftkings", [_h2h(), _spreads()])])])
+        assert len(snap) == 4 and dropped == {}
+
+    def test_row_rules(self):
+        raw = [_event([
+            _book("unknownbook", [_h2h()]),
+            _book("fanduel", [_h2h(prices=(1.0, 2.1))]),  # one side invalid → pair broken
+            _book("betmgm", [_h2h()], age=120),
+            _book("draftkings", [{"key": "player_points", "outcomes": []}, _h2h()]),
+        ])]
+        snap, dropped = _validate(raw, markets=("h2h",))
+        assert dropped[("row", "unsupported_book")] == 2
+        assert dropped[("row", "invalid_price")] == 1
+        assert dropped[("row", "stale")] == 2
+        assert dropped[("row", "too_few_outcomes")] == 1
+        assert len(snap) == 2
+        assert {snap.strings[b] for b in snap.book} == {"draftkings"}
+
+    def test_unrequested_market_dropped(self):
+        snap, dropped = _validate([_event([_book("draftkings", [_h2h(), _spreads()])])], markets=("h2h",))
+        assert dropped[("row", "unsupported_market")] == 2
+        assert {snap.strings[m] for m in snap.market} == {"h2h"}
+
+    def test_spread_sides_pair_on_absolute_point(self):
+        # Two lines at the same book; the 6.5 line is missing its other side
+        spreads = _spreads(5.5)
+        spreads["outcomes"].append({"name": "Lakers", "price": 2.2, "point": -6.5})
+        snap, dropped = _validate([_event([_book("draftkings", [spreads])])])
+        assert len(snap) == 2 and dropped[("row", "too_few_outcomes")] == 1
+        assert sorted(snap.point) == [-5.5, 5.5]
+
+    def test_structural_drops(self):
+        broken = _event([_book("draftkings", [_h2h()])], event_id="")
+        bad_time = _event([_book("draftkings", [_h2h()])], event_id="evt2")
+        bad_time["commence_time"] = "not-a-date"
+        _, dropped = _validate([broken, bad_time])
+        assert dropped[("event", "incomplete")] == 1
+        assert dropped[("event", "invalid_commence_time")] == 1
+
+
+class TestMarketSnapshot:
+    """Round trip and queries"""
+
+    def test_to_events_round_trip(self):
+        props = {"key": "player_points", "outcomes": [
+            {"name": "Over", "description": "LeBron James", "price": 1.87, "point": 25.5},
+            {"name": "Under", "description": "LeBron James", "price": 1.95, "point": 25.5},
+        ]}
+        snap, _ = _validate([_event([_book("draftkings", [_h2h(), props])])], markets=("h2h", "player_points"))
+        event = snap.to_events()[0]
+        assert event["id"] == "evt1" and event["home_team"] == "Lakers"
+        assert event["commence_time"] == _iso(NOW + timedelta(hours=2))
+        markets = {m["key"]: m for m in event["bookmakers"][0]["markets"]}
+        assert markets["h2h"]["outcomes"][0] == {"name": "Lakers", "price": 1.8}
+        assert markets["player_points"]["outcomes"][0] == {
+            "name": "Over", "price": 1.87, "description": "LeBron James", "point": 25.5
+        }
+        assert markets["h2h"]["last_update"] == _iso(NOW - timedelta(seconds=10))
+
+    def test_best_prices_and_rows_where(self):
+        raw = [_event([
+            _book("draftkings", [_h2h((1.8, 2.1)), _spreads()]),
+            _book("fanduel", [_h2h((1.85, 2.0))]),
+        ])]
+        snap, _ = _validate(raw)
+        best = snap.best_prices(snap.rows_where(market="h2h"))
+        by_outcome = {snap.strings[key[2]]: (price, snap.strings[snap.book[row]]) for key, (price, row) in best.items()}
+        assert by_outcome == {"Lakers": (1.85, "fanduel"), "Celtics": (2.1, "draftkings")}
+        assert len(snap.rows_where(book="draftkings", market="spreads")) == 2
+        assert snap.rows_where(market="totals") == []
+
+    def test_memory_per_row_flat_across_markets(self):
+        now = datetime.utcnow()
+        h2h = MarketSnapshot.from_odds(generate_slate(events=20, books=8, now=now), "basketball_nba", now)
+        full = MarketSnapshot.from_odds(
+            generate_slate(events=20, books=8, now=now, markets=("h2h", "spreads", "totals", "player_points")),
+            "basketball_nba", now
+        )
+        assert len(full) > 5 * len(h2h)
+        per_row = full.nbytes() / len(full)
+        assert per_row <= 1.2 * h2h.nbytes() / len(h2h) and per_row < 64
+
+
+class TestMarketsEndpoint:
+    """GET /api/odds/{sport_key}/markets"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        calls = []
+
+        def fake_get_odds(sport_key, markets="h2h"):
+            calls.append(("odds", tuple(markets)))
+            return {"data": generate_slate(events=3, books=4, stale_fraction=0, malformed_fraction=0,
+                                           markets=markets),
+                    "meta": {"x-requests-remaining": "99", "x-requests-used": "1"}}
+
+        def fake_get_event_odds(sport_key, event_id, markets):
+            calls.append(("event", tuple(markets)))
+            data = generate_slate(events=1, books=4, stale_fraction=0, malformed_fraction=0, markets=markets)
+            data[0]["id"] = event_id
+            return {"data": data, "meta": {}}
+
+        monkeypatch.setattr(validated, "get_odds", fake_get_odds)
+        monkeypatch.setattr(validated, "get_event_odds", fake_get_event_odds)
+        stale_odds.clear()
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        yield TestClient(app), calls
+        stale_odds.clear()
+
+    def test_featured_markets(self, client):
+        http, calls = client
+        response = http.get("/api/odds/basketball_nba/markets?markets=h2h,spreads,totals")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows"] == 3 * 4 * 6 and len(body["events"]) == 3
+        assert body["api_requests_remaining"] == "99"
+        keys = {m["key"] for m in body["events"][0]["bookmakers"][0]["markets"]}
+        assert keys == {"h2h", "spreads", "totals"}
+
+        http.get("/api/odds/basketball_nba/markets?markets=totals,spreads,h2h")
+        assert calls == [("odds", ("h2h", "spreads", "totals"))]  # one cached snapshot
+
+    def test_props_need_event_id(self, client):
+        http, calls = client
+        response = http.get("/api/odds/basketball_nba/markets?markets=player_points")
+        assert response.status_code == 422 and calls == []
+
+        response = http.get("/api/odds/basketball_nba/markets?markets=player_points&event_id=abc")
+        assert response.status_code == 200
+        assert response.json()["events"][0]["id"] == "abc"
+        assert calls == [("event", ("player_points",))]
+
+    @pytest.mark.parametrize("markets", ["", "H2H", "h2h;drop", ",".join(f"m{i}" for i in range(11))])
+    def test_invalid_market_list(self, client, markets):
+        http, calls = client
+        assert http.get(f"/api/odds/basketball_nba/markets?markets={markets}").status_code == 422
+        assert calls == []
+
+    def test_props_guard_in_service(self):
+        with pytest.raises(OddsValidationError):
+            get_market_snapshot("basketball_nba", ("player_points",))
@@ -0,0 +1,124 @@
+"""
+Tests for the in-process metrics registry and the /metrics endpoint.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import metrics as metrics_route
+from services.validated_odds import validate_odds_response
+from utils import logger as access_log
+from utils.metrics import Counter, Gauge, Histogram, Registry, VALIDATION_DROPPED
+
+
+def odds_event(event_id, book="draftkings", price=2.1, age=5):
+    last_update = (datetime.utcnow() - timedelta(seconds=age)).isoformat() + "Z"
+    return {
+        "id": event_id,
+        "sport_key": "basketball_nba",
+        "sport_title": "NBA",
+        "commence_time": "2030-01-01T00:00:00Z",
+        "home_team": "Lakers",
+        "away_team": "Celtics",
+        "bookmakers": [{
+            "key": book,
+            "title": book.title(),
+            "last_update": last_update,
+            "markets": [{"key": "h2h", "outcomes": [
+                {"name": "Lakers", "price": price},
+                {"name": "Celtics", "price": 1.8},
+            ]}],
+        }],
+    }
+
+
+class TestRegistry:
+    """Text exposition format"""
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        hits = registry.register(Counter("hits_total", "Hits", ("route",)))
+        hits.labels("/a").inc()
+        hits.labels("/a").inc(2)
+        level = registry.register(Gauge("level", "Level", function=lambda: {(): 7}))
+
+        text = registry.render()
+        assert "# TYPE hits_total counter" in text
+        assert 'hits_total{route="/a"} 3' in text
+        assert "level 7" in text
+        assert level.kind == "gauge"
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+        assert "latency_seconds_sum 3.65" in lines
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        errors = registry.register(Counter("errors_total", "Errors", ("message",)))
+        errors.labels('bad "quote"').inc()
+        assert 'errors_total{message="bad \\"quote\\""} 1' in registry.render()
+
+
+class TestValidationDrops:
+    """Each validate_odds_response filter has its own counter"""
+
+    def test_drop_reasons(self):
+        stale = VALIDATION_DROPPED.labels("bookmaker", "stale")
+        unsupported = VALIDATION_DROPPED.labels("bookmaker", "unsupported")
+        bad_price = VALIDATION_DROPPED.labels("outcome", "invalid_price")
+        before = (stale.value, unsupported.value, bad_price.value)
+
+        validated = validate_odds_response(
+            raw_data=[
+                odds_event("ok"),
+                odds_event("stale", age=600),
+                odds_event("other_book", book="caesars"),
+                odds_event("bad_price", price=1.0),
+            ],
+            retrieved_at=datetime.utcnow(),
+            meta={},
+        )
+
+        assert [e.id for e in validated.events] == ["ok"]
+        assert stale.value - before[0] == 1
+        assert unsupported.value - before[1] == 1
+        assert bad_price.value - before[2] == 1
+
+
+class TestEndpoint:
+    """/metrics serves the registry, including request histograms"""
+
+    def test_scrape(self):
+        app = FastAPI()
+        app.middleware("http")(access_log.log_requests)
+        app.include_router(metrics_route.router)
+
+        @app.get("/api/things/{thing_id}")
+        def thing(thing_id: str):
+            return {"id": thing_id}
+
+        client = TestClient(app)
+        client.get("/api/things/1")
+        client.get("/api/things/2")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'route="/api/things/{thing_id}"' in response.text
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "# TYPE odds_validation_dropped_total counter" in response.text
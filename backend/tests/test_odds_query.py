@@ -0,0 +1,162 @@
+"""
+Tests for filtered, projected and paginated odds queries.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import validated_odds as odds_route
+from services.odds_query import OddsIndex, OddsQueryError, parse_query
+from services.stale_odds import LastGood
+
+START = datetime(2025, 1, 15, 18, 0, 0)
+
+
+def _event(event_id, home, away, hours, books):
+    return {
+        "id": event_id,
+        "sport_key": "basketball_nba",
+        "sport_title": "NBA",
+        "commence_time": START + timedelta(hours=hours),
+        "home_team": home,
+        "away_team": away,
+        "bookmakers": [
+            {"key": key, "title": key.title(), "last_update": START,
+             "outcomes": [{"name": home, "price": Decimal(str(prices[0]))},
+                          {"name": away, "price": Decimal(str(prices[1]))}]}
+            for key, prices in books
+        ],
+    }
+
+
+BODY = {
+    "events": [
+        _event("e3", "Portland Trail Blazers", "Utah Jazz", 3, [("draftkings", (1.5, 2.6))]),
+        _event("e1", "Los Angeles Lakers", "Boston Celtics", 1, [("draftkings", (1.8, 2.1)), ("fanduel", (1.9, 2.0))]),
+        _event("e2", "Miami Heat", "Los Angeles Clippers", 2, [("fanduel", (3.4, 1.3))]),
+    ],
+    "retrieved_at": "2025-01-15T17:59:00Z",
+    "source": "the-odds-api-v4",
+    "stale": False,
+}
+
+
+def _ids(index, **params):
+    return [event["id"] for event in index.answer(parse_query(**params))["events"]]
+
+
+class TestOddsIndex:
+    """Filters answered from the indexes"""
+
+    @pytest.fixture
+    def index(self):
+        return OddsIndex(BODY)
+
+    def test_commence_order_and_pages(self, index):
+        assert _ids(index, limit=10) == ["e1", "e2", "e3"]
+        page = index.answer(parse_query(limit=2))
+        assert page["total_events"] == 3 and page["next_offset"] == 2
+        last = index.answer(parse_query(limit=2, offset=2))
+        assert [e["id"] for e in last["events"]] == ["e3"] and last["next_offset"] is None
+        assert page["source"] == "the-odds-api-v4"
+
+    def test_team_substring(self, index):
+        assert _ids(index, team="los angeles") == ["e1", "e2"]
+        assert _ids(index, team="lak") == ["e1"]
+        assert _ids(index, team="trail blaz") == ["e3"]
+        assert _ids(index, team="knicks") == []
+
+    def test_books_filter_projects_bookmakers(self, index):
+        result = index.answer(parse_query(books="fanduel"))
+        assert [e["id"] for e in result["events"]] == ["e1", "e2"]
+        assert all([b["key"] for b in e["bookmakers"]] == ["fanduel"] for e in result["events"])
+
+    def test_commence_window(self, index):
+        assert _ids(index, commence_from=START + timedelta(hours=2)) == ["e2", "e3"]
+        assert _ids(index, commence_from=START + timedelta(hours=1), commence_to=START + timedelta(hours=2)) == ["e1", "e2"]
+
+    def test_price_range_filters_outcomes(self, index):
+        result = index.answer(parse_query(min_price=2.5))
+        assert [e["id"] for e in result["events"]] == ["e2", "e3"]
+        assert [o["name"] for o in result["events"][0]["bookmakers"][0]["outcomes"]] == ["Miami Heat"]
+
+    def test_books_and_price_must_meet_at_one_book(self, index):
+        # e1's 2.1 is at draftkings only
+        assert _ids(index, books="fanduel", min_price=2.05) == ["e2"]
+
+    def test_field_projection(self, index):
+        event = index.answer(parse_query(fields="home_team,commence_time"))["events"][0]
+        assert set(event) == {"id", "home_team", "commence_time"}
+
+
+class TestParseQuery:
+    """Parameter validation"""
+
+    def test_no_parameters(self):
+        assert parse_query() is None
+
+    @pytest.mark.parametrize("params", [
+        {"books": " , "},
+        {"team": "--"},
+        {"fields": "id,odds"},
+        {"limit": 0},
+        {"limit": 10_000},
+        {"offset": -1},
+        {"min_price": 3.0, "max_price": 2.0},
+        {"commence_from": START + timedelta(hours=1), "commence_to": START},
+    ])
+    def test_invalid(self, params):
+        with pytest.raises(OddsQueryError):
+            parse_query(**params)
+
+    def test_canonical_ignores_order(self):
+        assert parse_query(books="fanduel,draftkings").canonical() == parse_query(books="draftkings, fanduel").canonical()
+
+
+class TestOddsRouteQuery:
+    """GET /api/odds/{sport_key} with query parameters"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        snapshot = LastGood(BODY, 1_700_000_000.0)
+        monkeypatch.setattr(odds_route, "get_odds_snapshot", lambda sport_key: (snapshot, False, True))
+        odds_route.representations.clear()
+        odds_route.query_representations.clear()
+        odds_route.indexes.clear()
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        yield TestClient(app)
+        odds_route.indexes.clear()
+        odds_route.query_representations.clear()
+
+    def test_filtered_response(self, client):
+        response = client.get("/api/odds/basketball_nba?team=angeles&books=fanduel&fields=home_team,bookmakers&limit=1")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_events"] == 2 and body["next_offset"] == 1
+        assert body["events"] == [{
+            "id": "e1", "home_team": "Los Angeles Lakers",
+            "bookmakers": [{"key": "fanduel", "title": "Fanduel", "last_update": "2025-01-15T18:00:00",
+                            "outcomes": [{"name": "Los Angeles Lakers", "price": 1.9},
+                                         {"name": "Boston Celtics", "price": 2.0}]}]
+        }]
+
+    def test_etag_per_query(self, client):
+        full = client.get("/api/odds/basketball_nba")
+        filtered = client.get("/api/odds/basketball_nba?books=fanduel")
+        same = client.get("/api/odds/basketball_nba?books=fanduel,", headers={"If-None-Match": filtered.headers["etag"]})
+        assert full.headers["etag"] != filtered.headers["etag"]
+        assert same.status_code == 304
+
+    def test_invalid_query(self, client):
+        response = client.get("/api/odds/basketball_nba?fields=secret")
+        assert response.status_code == 422
+        assert response.json()["detail"]["error"] == "Invalid query"
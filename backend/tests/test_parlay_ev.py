@@ -0,0 +1,146 @@
+"""
+Tests for parlay / round-robin EV, exact and correlated.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from itertools import combinations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import ev as ev_route
+from services.parlay_ev import Leg, ParlayError, cholesky, round_robin, simulate
+
+LEGS = [Leg(1.91, 0.55), Leg(2.2, 0.48), Leg(1.65, 0.62), Leg(3.1, 0.34), Leg(1.8, 0.57)]
+
+
+def _brute_force(legs, size, stake):
+    """Mean, stdev and P(any parlay wins) over every win/loss combination of the legs."""
+    mean = second = wins = 0.0
+    for mask in range(1 << len(legs)):
+        won = [i for i in range(len(legs)) if mask >> i & 1]
+        p = math.prod(leg.probability if i in won else 1 - leg.probability for i, leg in enumerate(legs))
+        total = stake * sum(math.prod(legs[i].odds for i in combo) for combo in combinations(won, size))
+        mean += p * total
+        second += p * total * total
+        wins += p * (total > 0)
+    return mean, math.sqrt(second - mean * mean), wins
+
+
+def _identity(n):
+    return [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+
+
+class TestExact:
+    def test_straight_parlay(self):
+        result, = round_robin(LEGS[:2], [2], 10)
+        assert result.expected_return == pytest.approx(10 * 1.91 * 0.55 * 2.2 * 0.48)
+        assert result.ev == pytest.approx(result.expected_return - 10)
+        assert result.win_probability == pytest.approx(0.55 * 0.48)
+        assert result.profit_probability == result.win_probability
+        assert result.max_return == pytest.approx(10 * 1.91 * 2.2)
+
+    @pytest.mark.parametrize("size", [2, 3, 4, 5])
+    def test_round_robin_matches_enumeration(self, size):
+        result, = round_robin(LEGS, [size], 5)
+        mean, stdev, wins = _brute_force(LEGS, size, 5)
+        assert result.parlays == math.comb(5, size)
+        assert result.total_stake == 5 * result.parlays
+        assert result.expected_return == pytest.approx(mean)
+        assert result.stdev == pytest.approx(stdev)
+        assert result.win_probability == pytest.approx(wins)
+
+    def test_twelve_legs(self):
+        legs = [Leg(1.9 + 0.05 * i, 0.5 + 0.01 * i) for i in range(12)]
+        results = round_robin(legs, list(range(2, 13)), 1)
+        assert [r.parlays for r in results] == [math.comb(12, k) for k in range(2, 13)]
+        expected = sum(math.prod(leg.odds * leg.probability for leg in combo) for combo in combinations(legs, 6))
+        assert results[4].expected_return == pytest.approx(expected)
+
+    @pytest.mark.parametrize("legs, sizes, stake", [
+        (LEGS[:1], [1], 10), (LEGS, [6], 10), (LEGS, [1], 10), (LEGS, [], 10),
+        (LEGS, [2], 0), ([Leg(1.0, 0.5), Leg(2.0, 0.5)], [2], 10), ([Leg(2.0, 1.0), Leg(2.0, 0.5)], [2], 10),
+    ])
+    def test_invalid(self, legs, sizes, stake):
+        with pytest.raises(ParlayError):
+            round_robin(legs, sizes, stake)
+
+
+class TestCorrelated:
+    def test_uncorrelated_matches_exact(self):
+        exact, = round_robin(LEGS, [3], 10)
+        simulated, = simulate(LEGS, [3], 10, _identity(5), samples=40_000, seed=7)
+        assert simulated.method == "simulation"
+        assert abs(simulated.expected_return - exact.expected_return) < 4 * simulated.standard_error
+        assert simulated.win_probability == pytest.approx(exact.win_probability, abs=0.01)
+
+    def test_positive_correlation_raises_parlay_odds(self):
+        legs = [Leg(1.91, 0.55), Leg(1.91, 0.55)]
+        exact, = round_robin(legs, [2], 10)
+        correlated, = simulate(legs, [2], 10, [[1.0, 0.6], [0.6, 1.0]], samples=40_000, seed=7)
+        assert correlated.win_probability > exact.win_probability + 0.05
+        assert correlated.ev > exact.ev
+
+    def test_invalid_matrix(self):
+        with pytest.raises(ParlayError):
+            cholesky([[1.0, 0.5], [0.4, 1.0]], 2)  # not symmetric
+        with pytest.raises(ParlayError):
+            cholesky([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]], 3)  # not positive definite
+        with pytest.raises(ParlayError):
+            cholesky(_identity(2), 3)
+        with pytest.raises(ParlayError):
+            simulate(LEGS, [2], 10, _identity(5), samples=10)
+
+
+class TestEndpoint:
+    """POST /api/ev/parlay"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(ev_route.router)
+        return TestClient(app)
+
+    def test_round_robin(self, client):
+        legs = [{"odds": leg.odds, "probability": leg.probability} for leg in LEGS]
+        body = client.post("/api/ev/parlay", json={"legs": legs, "stake": 10, "sizes": [3, 2]}).json()
+        assert [r["size"] for r in body["results"]] == [2, 3]
+        assert body["results"][0]["parlays"] == 10
+        assert body["results"][0]["method"] == "exact"
+        assert "independent_results" not in body
+
+        straight = client.post("/api/ev/parlay", json={"legs": legs[:2], "stake": 10}).json()
+        assert straight["results"][0]["size"] == 2
+
+    def test_correlated(self, client):
+        legs = [{"odds": 1.91, "probability": 0.55}, {"odds": 1.91, "probability": 0.55}]
+        body = client.post("/api/ev/parlay", json={"legs": legs, "stake": 10, "seed": 1, "samples": 5000,
+                                                   "correlation": [[1, 0.5], [0.5, 1]]}).json()
+        assert body["results"][0]["method"] == "simulation"
+        assert body["independent_results"][0]["method"] == "exact"
+
+    def test_errors(self, client):
+        legs = [{"odds": 1.91, "probability": 0.55}, {"odds": 1.91, "probability": 0.55}]
+        assert client.post("/api/ev/parlay", json={"legs": legs, "stake": 10, "sizes": [3]}).status_code == 422
+        assert client.post("/api/ev/parlay", json={"legs": legs, "stake": 10,
+                                                   "correlation": [[1, 2], [2, 1]]}).status_code == 422
+        assert client.post("/api/ev/parlay", json={"legs": legs[:1], "stake": 10}).status_code == 422
+
+    def test_health_lists_parlays(self, client):
+        health = client.get("/api/ev/health").json()
+        assert "parlays" in health["features_supported"]
+        assert "parlays" not in health["features_not_supported"]
+
+    def test_app_health_matches(self):
+        from routes import health as health_route
+        app = FastAPI()
+        app.include_router(health_route.router)
+        health = TestClient(app).get("/health").json()
+        assert health["features_enabled"]["parlays"] and health["features_enabled"]["round_robins"]
+        assert "parlays" not in health["features_disabled"] and "teasers" in health["features_disabled"]
+        assert health["constraints"]["supported_markets"] == ["h2h", "spreads", "totals", "player_props"]
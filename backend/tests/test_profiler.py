@@ -0,0 +1,104 @@
+"""
+Tests for on-demand request profiling and the profile admin endpoints.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from routes import profiles
+from utils.profiler import ProfileNotFoundError, ProfileStore, RequestProfiler
+
+TOKEN = "s3cret"
+
+
+def busy_work(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path / "profiles"), keep=3)
+    monkeypatch.setattr(settings, "PROFILE_ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(profiles, "profile_store", store)
+
+    app = FastAPI()
+    app.middleware("http")(RequestProfiler(store, admin_token=TOKEN, interval=0.001))
+    app.include_router(profiles.router)
+
+    @app.get("/api/odds/{sport_key}")
+    def odds(sport_key: str):
+        busy_work(0.05)
+        return {"sport": sport_key}
+
+    return TestClient(app)
+
+
+class TestProfiling:
+    """Capture is triggered by the admin header only"""
+
+    def test_unprofiled_request(self, client):
+        client.get("/api/odds/basketball_nba")
+        client.get("/api/odds/basketball_nba", headers={"X-Profile": "wrong"})
+        assert profiles.profile_store.list() == []
+
+    def test_profiled_request(self, client):
+        response = client.get("/api/odds/basketball_nba", headers={"X-Profile": TOKEN})
+        assert response.status_code == 200
+
+        [entry] = profiles.profile_store.list()
+        assert entry["route"] == "/api/odds/{sport_key}"
+        assert entry["path"] == "/api/odds/basketball_nba"
+        assert entry["status"] == 200
+        assert entry["samples"] > 0
+        assert "stacks" not in entry
+
+        profile = profiles.profile_store.load(entry["id"])
+        assert any("busy_work" in stack for stack in profile["stacks"])
+
+    def test_ring_buffer(self, client):
+        for _ in range(5):
+            client.get("/api/odds/basketball_nba", headers={"X-Profile": TOKEN})
+        assert len(profiles.profile_store.list()) == 3
+
+    def test_bad_profile_id(self, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        with pytest.raises(ProfileNotFoundError):
+            store.load("../../etc/passwd")
+
+
+class TestAdminEndpoints:
+    """List and download, behind X-Admin-Token"""
+
+    def test_requires_token(self, client):
+        assert client.get("/api/admin/profiles").status_code == 403
+        assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+
+    def test_list_and_download(self, client):
+        client.get("/api/odds/basketball_nba", headers={"X-Profile": TOKEN})
+        admin = {"X-Admin-Token": TOKEN}
+
+        listing = client.get("/api/admin/profiles", headers=admin).json()
+        assert listing["count"] == 1
+        profile_id = listing["profiles"][0]["id"]
+
+        profile = client.get(f"/api/admin/profiles/{profile_id}", headers=admin).json()
+        assert profile["id"] == profile_id
+
+        flame = client.get(f"/api/admin/profiles/{profile_id}?format=folded", headers=admin)
+        assert flame.headers["content-type"].startswith("text/plain")
+        first = flame.text.splitlines()[0]
+        assert int(first.rsplit(" ", 1)[1]) > 0
+
+        assert client.get("/api/admin/profiles/0000000000000-deadbeef", headers=admin).status_code == 404
@@ -0,0 +1,174 @@
+"""
+Tests for per-client rate limiting and admission control.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from utils.metrics import RATE_LIMITED
+from utils.rate_limit import Budget, RateLimiter, TokenBuckets, route_group
+
+BUDGETS = {
+    "odds": Budget(per_minute=60, burst=3, max_concurrent=1),
+    "ev": Budget(per_minute=60, burst=5),
+    "bets": Budget(per_minute=60, burst=2),
+}
+
+
+def make_app(limiter):
+    app = FastAPI()
+    app.middleware("http")(limiter)
+    app.add_middleware(CORSMiddleware, allow_origins=["*"])
+
+    @app.get("/api/odds/{sport_key}")
+    async def odds(sport_key: str):
+        return {"sport": sport_key}
+
+    @app.get("/api/ev/health")
+    async def ev():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(BUDGETS, max_concurrent=2)
+
+
+@pytest.fixture
+def client(limiter):
+    return TestClient(make_app(limiter))
+
+
+class TestTokenBuckets:
+    """Lazy refill, burst cap and LRU bound"""
+
+    def test_burst_then_refill(self):
+        buckets = TokenBuckets(BUDGETS)
+        assert [buckets.take("odds", "a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert buckets.take("odds", "a", now=0.0) == pytest.approx(1.0)
+        assert buckets.take("odds", "a", now=0.5) == pytest.approx(0.5)
+        assert buckets.take("odds", "a", now=1.0) == 0.0
+
+    def test_refill_capped_at_burst(self):
+        buckets = TokenBuckets(BUDGETS)
+        buckets.take("bets", "a", now=0.0)
+        results = [buckets.take("bets", "a", now=1000.0) for _ in range(3)]
+        assert results[:2] == [0.0, 0.0] and results[2] > 0
+
+    def test_groups_and_clients_independent(self):
+        buckets = TokenBuckets(BUDGETS)
+        for _ in range(2):
+            buckets.take("bets", "a", now=0.0)
+        assert buckets.take("bets", "a", now=0.0) > 0
+        assert buckets.take("bets", "b", now=0.0) == 0.0
+        assert buckets.take("ev", "a", now=0.0) == 0.0
+
+    def test_lru_bound(self):
+        buckets = TokenBuckets(BUDGETS, max_buckets=2)
+        for client in ("a", "b", "c"):
+            buckets.take("ev", client, now=0.0)
+        assert len(buckets) == 2
+
+    def test_route_groups(self):
+        assert route_group("/api/odds/basketball_nba") == "odds"
+        assert route_group("/api/ev/calculate") == "ev"
+        assert route_group("/api/clv/123") == "bets"
+        assert route_group("/api/oddsbook") is None
+        assert route_group("/health") is None
+
+
+class TestRateLimitMiddleware:
+    """429 with Retry-After once a client's budget is spent"""
+
+    def test_limited_with_retry_after(self, client):
+        for _ in range(3):
+            assert client.get("/api/odds/basketball_nba").status_code == 200
+        before = RATE_LIMITED.labels("odds", "rate").value
+
+        response = client.get("/api/odds/basketball_nba", headers={"Origin": "https://app.example"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["error"]["type"] == "RateLimited"
+        assert response.headers["access-control-allow-origin"] == "*"
+        assert RATE_LIMITED.labels("odds", "rate").value == before + 1
+
+    def test_separate_budgets(self, client):
+        for _ in range(4):
+            client.get("/api/odds/basketball_nba")
+        assert client.get("/api/ev/health").status_code == 200
+
+    def test_rotating_user_id_does_not_bypass_ip(self, client):
+        for i in range(3):
+            assert client.get("/api/odds/basketball_nba", headers={"user-id": f"user{i}"}).status_code == 200
+        assert client.get("/api/odds/basketball_nba", headers={"user-id": "user3"}).status_code == 429
+
+    def test_user_id_is_an_extra_limit(self):
+        client = TestClient(make_app(RateLimiter(BUDGETS, proxy_hops=1)))
+        for i in range(3):
+            client.get("/api/odds/nfl", headers={"user-id": "alice", "X-Forwarded-For": f"1.1.1.{i}"})
+        alice = {"user-id": "alice", "X-Forwarded-For": "1.1.1.9"}
+        assert client.get("/api/odds/nfl", headers=alice).status_code == 429
+        assert client.get("/api/odds/nfl", headers={"X-Forwarded-For": "1.1.1.9"}).status_code == 200
+
+    def test_forwarded_ip_with_proxy_hops(self):
+        client = TestClient(make_app(RateLimiter(BUDGETS, proxy_hops=1)))
+        for _ in range(3):
+            client.get("/api/odds/nfl", headers={"X-Forwarded-For": "spoofed, 1.1.1.1"})
+        assert client.get("/api/odds/nfl", headers={"X-Forwarded-For": "other, 1.1.1.1"}).status_code == 429
+        assert client.get("/api/odds/nfl", headers={"X-Forwarded-For": "2.2.2.2"}).status_code == 200
+
+    def test_unlimited_paths(self, client):
+        for _ in range(20):
+            assert client.get("/health").status_code == 200
+
+
+class TestConcurrencyCaps:
+    """In-flight caps reject immediately instead of queueing"""
+
+    def test_group_and_global_caps(self, limiter):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_next(request):
+            started.set()
+            await release.wait()
+            return "ok"
+
+        def request(path, client_host):
+            from starlette.requests import Request
+            return Request({
+                "type": "http", "method": "GET", "path": path, "headers": [],
+                "client": (client_host, 1234), "query_string": b""
+            })
+
+        async def scenario():
+            first = asyncio.create_task(limiter(request("/api/odds/nfl", "1.1.1.1"), slow_next))
+            await started.wait()
+            odds = await limiter(request("/api/odds/nfl", "2.2.2.2"), slow_next)
+            assert odds.status_code == 429 and odds.headers["Retry-After"] == "1"
+
+            started.clear()
+            second = asyncio.create_task(limiter(request("/api/ev/health", "2.2.2.2"), slow_next))
+            await started.wait()
+            busy = await limiter(request("/api/ev/health", "3.3.3.3"), slow_next)
+            assert busy.status_code == 429
+
+            release.set()
+            assert await first == "ok" and await second == "ok"
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
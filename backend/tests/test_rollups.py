@@ -0,0 +1,82 @@
+"""
+Tests for time-bucketed ROI/EV rollups.
+
+Checks bucket boundaries and that rebuilt buckets produce the chart points
+the dashboards expect (no Mongo needed).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import pytest
+
+from services.rollup_service import (
+    RollupQueryError,
+    build_rollups,
+    period_start,
+    series_point,
+)
+
+
+def make_bet(logged_at, **overrides):
+    bet = {
+        "id": "b", "user": "alice", "sport": "basketball_nba", "sportsbook": "DraftKings",
+        "odds": 2.0, "stake": 100.0, "clv": None, "result": None,
+        "expectedValue": 4.0, "loggedAt": logged_at
+    }
+    bet.update(overrides)
+    return bet
+
+
+class TestPeriodStart:
+    """Bucket boundaries"""
+
+    def test_day(self):
+        assert period_start(datetime(2026, 10, 17, 23, 59), "day") == datetime(2026, 10, 17)
+
+    def test_week_starts_monday(self):
+        # 2026-10-17 is a Saturday
+        assert period_start(datetime(2026, 10, 17, 12), "week") == datetime(2026, 10, 12)
+
+    def test_month(self):
+        assert period_start(datetime(2026, 10, 17, 12), "month") == datetime(2026, 10, 1)
+
+    def test_unknown_period(self):
+        with pytest.raises(RollupQueryError):
+            period_start(datetime(2026, 10, 17), "quarter")
+
+
+class TestBuckets:
+    """Counters and chart points per bucket"""
+
+    def test_bets_split_by_day_and_dimension(self):
+        bets = [
+            make_bet(datetime(2026, 10, 16, 20), result="win", pnl=100.0),
+            make_bet(datetime(2026, 10, 17, 18), result="lose", pnl=-100.0, sportsbook="FanDuel"),
+            make_bet(datetime(2026, 10, 17, 21), clv=0.04),
+        ]
+        buckets = build_rollups(bets, "day")
+
+        assert buckets[("all", "all", datetime(2026, 10, 17))]["bets"] == 2
+        assert buckets[("book", "FanDuel", datetime(2026, 10, 17))]["bets"] == 1
+        assert buckets[("sport", "basketball_nba", datetime(2026, 10, 16))]["pnl_sum"] == 100.0
+
+    def test_week_bucket_chart_point(self):
+        bets = [
+            make_bet(datetime(2026, 10, 16, 20), result="win", pnl=100.0),
+            make_bet(datetime(2026, 10, 17, 18), result="lose", pnl=-100.0),
+            make_bet(datetime(2026, 10, 17, 21), clv=0.04),
+        ]
+        counters = build_rollups(bets, "week")[("all", "all", datetime(2026, 10, 12))]
+        point = series_point({"period_start": datetime(2026, 10, 12), "counters": counters})
+
+        assert point["bets"] == 3
+        assert point["stake"] == 300.0
+        assert point["expected_ev"] == 12.0
+        assert point["realized_pnl"] == 0.0
+        assert point["settled_bets"] == 2
+        assert point["roi"] == 0.0
+        assert point["avg_clv"] == 0.04
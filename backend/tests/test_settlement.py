@@ -0,0 +1,83 @@
+"""
+Tests for bet settlement.
+
+Verifies win/lose/push decisions from final scores and the pluggable
+results sources (no Mongo needed).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+
+from services.settlement_service import (
+    FileResultsSource,
+    ResultsSource,
+    SettlementError,
+    StaticResultsSource,
+    bet_result,
+)
+
+
+NBA_FINAL = {
+    "event_id": "e1", "sport": "basketball_nba",
+    "home_team": "Lakers", "away_team": "Celtics",
+    "home_score": 110, "away_score": 104
+}
+
+EPL_DRAW = {
+    "event_id": "e2", "sport": "soccer_epl",
+    "home_team": "Arsenal", "away_team": "Chelsea",
+    "home_score": 1, "away_score": 1
+}
+
+
+class TestBetResult:
+    """Settling h2h bets from scores"""
+
+    def test_winner_and_loser(self):
+        assert bet_result({"outcome": "Lakers"}, NBA_FINAL) == "win"
+        assert bet_result({"outcome": "Celtics"}, NBA_FINAL) == "lose"
+
+    def test_two_way_tie_pushes(self):
+        tie = {**NBA_FINAL, "sport": "americanfootball_nfl", "away_score": 110}
+        assert bet_result({"outcome": "Lakers"}, tie) == "push"
+
+    def test_soccer_draw_is_three_way(self):
+        assert bet_result({"outcome": "Draw"}, EPL_DRAW) == "win"
+        assert bet_result({"outcome": "Arsenal"}, EPL_DRAW) == "lose"
+
+    def test_draw_bet_loses_when_there_is_a_winner(self):
+        win = {**EPL_DRAW, "home_score": 2}
+        assert bet_result({"outcome": "Draw"}, win) == "lose"
+
+    def test_foreign_outcome_is_not_settled(self):
+        assert bet_result({"outcome": "Warriors"}, NBA_FINAL) is None
+
+
+class TestResultsSources:
+    """Pluggable results sources"""
+
+    def test_static_source_filters_by_sport(self):
+        source = StaticResultsSource([NBA_FINAL, EPL_DRAW])
+        assert source.fetch_results("soccer_epl") == [EPL_DRAW]
+        assert len(source.fetch_results()) == 2
+
+    def test_file_source(self, tmp_path):
+        path = tmp_path / "results.json"
+        path.write_text(json.dumps([NBA_FINAL]))
+        assert FileResultsSource(str(path)).fetch_results() == [NBA_FINAL]
+
+    def test_source_must_implement_fetch_results(self):
+        class Forgetful(ResultsSource):
+            pass
+
+        with pytest.raises(TypeError, match="fetch_results"):
+            Forgetful()
+
+    def test_missing_file_raises(self, tmp_path):
+        with pytest.raises(SettlementError):
+            FileResultsSource(str(tmp_path / "missing.json"))
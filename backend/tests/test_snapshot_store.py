@@ -0,0 +1,229 @@
+"""
+Tests for the cross-worker odds snapshot store and its leader-elected poller.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import multiprocessing
+import subprocess
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from loadtest import fake_upstream
+from loadtest.run import stop_app, _free_port
+from routes import validated_odds as odds_route
+from services.odds_poller import OddsSnapshotPoller
+from services.snapshot_store import MIN_CAPACITY, SnapshotStore, set_snapshot_store
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def _read_loop(directory, valid, stop_at, result):
+    reader = SnapshotStore(directory)
+    seen = 0
+    while time.time() < stop_at:
+        snapshot = reader.read("basketball_nba")
+        if snapshot is not None:
+            if snapshot.payload not in valid:
+                result.put("torn")
+                return
+            seen += 1
+    result.put(seen)
+
+
+class TestStore:
+    """Seqlock publish/read through the mmap file"""
+
+    def test_round_trip(self, store, tmp_path):
+        assert store.read("basketball_nba") is None
+        first = store.publish("basketball_nba", b'{"events":[]}', published_at=100.0)
+        snapshot = store.read("basketball_nba")
+        assert snapshot.payload == b'{"events":[]}'
+        assert snapshot.published_at == 100.0
+        assert snapshot.seq == first
+
+        # Unchanged seq: the cached object is returned, no copy
+        assert store.read("basketball_nba") is snapshot
+
+        # Another process's view (separate store object on the same directory)
+        other = SnapshotStore(str(tmp_path))
+        store.publish("basketball_nba", b'{"events":[1]}')
+        assert other.read("basketball_nba").payload == b'{"events":[1]}'
+        assert store.read("basketball_nba").seq == first + 2
+
+    def test_growth_supersedes_file(self, store, tmp_path):
+        reader = SnapshotStore(str(tmp_path))
+        store.publish("soccer_epl", b"x" * 100)
+        before = reader.read("soccer_epl")
+
+        big = b"y" * (MIN_CAPACITY * 2)
+        store.publish("soccer_epl", big)
+        after = reader.read("soccer_epl")
+        assert after.payload == big
+        assert after.seq > before.seq
+
+    def test_rejects_bad_sport_keys(self, store):
+        with pytest.raises(ValueError):
+            store.publish("../etc", b"{}")
+
+    def test_no_torn_reads_across_processes(self, store, tmp_path):
+        valid = [bytes([65 + i]) * (1000 + i * 7919) for i in range(8)]
+        store.publish("basketball_nba", valid[0])
+        stop_at = time.time() + 1.0
+        ctx = multiprocessing.get_context("fork")
+        result = ctx.Queue()
+        readers = [ctx.Process(target=_read_loop, args=(str(tmp_path), valid, stop_at, result)) for _ in range(2)]
+        for p in readers:
+            p.start()
+        i = 0
+        while time.time() < stop_at:
+            store.publish("basketball_nba", valid[i % len(valid)])
+            i += 1
+        outcomes = [result.get(timeout=10) for _ in readers]
+        for p in readers:
+            p.join()
+        assert all(isinstance(n, int) and n > 0 for n in outcomes), outcomes
+
+    def test_wanted(self, store):
+        store.want("basketball_nba", now=1000.0)
+        store.want("soccer_epl", now=1000.0)
+        assert store.wanted(ttl=60, now=1030.0) == ["basketball_nba", "soccer_epl"]
+        assert store.wanted(ttl=60, now=2000.0) == []
+
+    def test_unsupported_sport_not_wanted(self, store):
+        store.want("made_up_sport", now=1000.0)
+        assert store.wanted(ttl=60, now=1030.0) == []
+        assert not os.path.exists(os.path.join(store.want_dir, "made_up_sport"))
+
+
+class TestPoller:
+    """Leader election and demand-driven refresh"""
+
+    def test_single_leader(self, store):
+        first, second = OddsSnapshotPoller(store), OddsSnapshotPoller(store)
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        first.release()
+        assert second.try_acquire()
+        second.release()
+
+    def test_refreshes_wanted_sports_only(self, store):
+        calls = []
+
+        def fetch(sport):
+            calls.append(sport)
+            return json.dumps({"sport": sport}).encode()
+
+        poller = OddsSnapshotPoller(store, interval=20, fetch=fetch)
+        assert poller.due(time.time()) == []
+
+        store.want("icehockey_nhl")
+        assert poller.due(time.time()) == ["icehockey_nhl"]
+        assert poller.refresh("icehockey_nhl")
+        assert store.read("icehockey_nhl").payload == b'{"sport": "icehockey_nhl"}'
+        assert poller.due(time.time()) == []
+        assert poller.due(time.time() + 21) == ["icehockey_nhl"]
+        assert calls == ["icehockey_nhl"]
+
+    def test_failed_refresh_backs_off(self, store):
+        def fetch(sport):
+            raise RuntimeError("upstream down")
+
+        poller = OddsSnapshotPoller(store, interval=20, fetch=fetch)
+        store.want("icehockey_nhl")
+        assert not poller.refresh("icehockey_nhl")
+        assert poller.due(time.time()) == []
+
+    def test_skips_unsupported_want_files(self, store):
+        poller = OddsSnapshotPoller(store, interval=20, fetch=lambda sport: b"{}")
+        os.makedirs(store.want_dir, exist_ok=True)
+        open(os.path.join(store.want_dir, "made_up_sport"), "w").close()  # written by anything but want()
+        assert poller.due(time.time()) == []
+
+
+class TestRoute:
+    """/api/odds/{sport} serves snapshot bytes without calling upstream"""
+
+    def test_serves_snapshot(self, store, monkeypatch):
+        def no_upstream(sport_key):
+            raise AssertionError("upstream called")
+
+        monkeypatch.setattr(odds_route, "get_odds_snapshot", no_upstream)
+        set_snapshot_store(store)
+        try:
+            store.publish("basketball_nba", b'{"events":[],"source":"snapshot"}')
+            from fastapi import FastAPI
+            app = FastAPI()
+            app.include_router(odds_route.router)
+            response = TestClient(app).get("/api/odds/basketball_nba")
+        finally:
+            set_snapshot_store(None)
+
+        assert response.status_code == 200
+        assert response.content == b'{"events":[],"source":"snapshot"}'
+
+    def test_unsupported_sport_rejected_before_want(self, store):
+        set_snapshot_store(store)
+        try:
+            from fastapi import FastAPI
+            app = FastAPI()
+            app.include_router(odds_route.router)
+            response = TestClient(app).get("/api/odds/made_up_sport")
+        finally:
+            set_snapshot_store(None)
+
+        assert response.status_code == 422
+        assert store.wanted(ttl=60) == []
+
+
+class TestMultiWorker:
+    """Three uvicorn workers, one upstream call per sport per interval"""
+
+    def test_workers_share_one_fetch(self, tmp_path):
+        upstream = fake_upstream.start(latency_ms=20, jitter_ms=0, events=5, books=3)
+        port = _free_port()
+        env = dict(os.environ, ODDS_API_KEY="x", ODDS_API_BASE=upstream.url,
+                   ODDS_SNAPSHOT_DIR=str(tmp_path / "snapshots"), ODDS_SNAPSHOT_INTERVAL="60",
+                   ACCESS_LOG_SAMPLE_RATE="0")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", "3",
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            url = f"http://127.0.0.1:{port}"
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                try:
+                    if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.1)
+
+            bodies = set()
+            for _ in range(30):
+                # New connection each time so requests spread over workers
+                response = httpx.get(f"{url}/api/odds/basketball_nba", timeout=15,
+                                     headers={"Connection": "close"})
+                assert response.status_code == 200
+                bodies.add(response.content)
+        finally:
+            stop_app(process)
+            upstream.shutdown()
+
+        assert len(bodies) == 1
+        assert len(json.loads(bodies.pop())["events"]) > 0
+        assert upstream.stats()["calls"].get("odds") == 1
@@ -0,0 +1,104 @@
+"""
+Tests for the active sports catalog and its readers.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.sports import SUPPORTED_SPORTS
+from routes import validated_odds as odds_route
+from services.odds_poller import OddsSnapshotPoller
+from services.snapshot_store import SnapshotStore
+from services.sports_catalog import SportsCatalog, catalog
+
+UPSTREAM = [
+    {"key": "basketball_nba", "group": "Basketball", "title": "NBA", "active": True},
+    {"key": "icehockey_nhl", "group": "Ice Hockey", "title": "NHL", "active": True},
+    {"key": "baseball_mlb", "group": "Baseball", "title": "MLB", "active": False},
+    {"key": "cricket_ipl", "group": "Cricket", "title": "IPL", "active": True},  # not supported
+]
+
+
+@pytest.fixture
+def live_catalog():
+    catalog.load(UPSTREAM)
+    odds_route.representations.clear()
+    yield catalog
+    catalog.reset()
+    odds_route.representations.clear()
+
+
+class TestSportsCatalog:
+    """Active ∩ supported, static until the first successful refresh"""
+
+    def test_static_until_refreshed(self):
+        fresh = SportsCatalog(fetch=lambda: UPSTREAM)
+        assert not fresh.state.live
+        assert set(fresh.state.sports) == set(SUPPORTED_SPORTS)
+        assert fresh.is_active("baseball_mlb")
+        assert not fresh.is_active("made_up_sport")
+
+    def test_intersection(self):
+        fresh = SportsCatalog(fetch=lambda: UPSTREAM)
+        assert fresh.refresh()
+        assert set(fresh.state.sports) == {"basketball_nba", "icehockey_nhl"}
+        assert set(fresh.state.by_category) == {"Basketball", "Hockey"}
+        assert not fresh.is_active("baseball_mlb")
+        assert not fresh.is_active("cricket_ipl")  # not a supported sport
+
+    def test_failed_refresh_keeps_last_list(self):
+        responses = [UPSTREAM]
+
+        def fetch():
+            if not responses:
+                raise RuntimeError("upstream down")
+            return responses.pop()
+
+        fresh = SportsCatalog(fetch=fetch)
+        assert fresh.refresh()
+        version = fresh.state.version
+        assert not fresh.refresh()
+        assert fresh.state.version == version and fresh.state.live
+
+
+class TestCatalogReaders:
+    """Endpoint and poller read the cache only"""
+
+    def test_available_endpoint(self, live_catalog):
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        client = TestClient(app)
+
+        first = client.get("/api/odds/sports/available")
+        body = first.json()
+        assert body["total_sports"] == 2 and body["catalog"] == "live"
+        assert set(body["sports"]) == {"basketball_nba", "icehockey_nhl"}
+
+        live_catalog.load(UPSTREAM[:1])
+        second = client.get("/api/odds/sports/available", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 200 and second.json()["total_sports"] == 1
+
+    def test_inactive_sport_skips_upstream(self, live_catalog, monkeypatch):
+        def no_upstream(sport_key):
+            raise AssertionError("upstream called")
+
+        monkeypatch.setattr(odds_route, "get_odds_snapshot", no_upstream)
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        response = TestClient(app).get("/api/odds/baseball_mlb")
+        assert response.status_code == 200
+        assert response.json()["events"] == [] and response.json()["sport_active"] is False
+
+    def test_poller_skips_inactive(self, live_catalog, tmp_path):
+        store = SnapshotStore(str(tmp_path))
+        poller = OddsSnapshotPoller(store, interval=20, fetch=lambda sport: b"{}")
+        for sport in ("basketball_nba", "baseball_mlb"):
+            store.want(sport)
+        assert poller.due(time.time()) == ["basketball_nba"]
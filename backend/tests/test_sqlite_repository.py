@@ -0,0 +1,146 @@
+"""
+End-to-end tests for the embedded SQLite storage backend.
+
+Runs the real bet, closing-line, settlement, summary and rollup services
+against a temporary SQLite file - no Mongo needed.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.repository import BetRepository, set_repository
+from db.sqlite import SQLiteRepository
+from models.bet import Bet
+from services.bet_service import fetch_bets, log_bet, update_closing_odds
+from services.closing_line_service import apply_closing_snapshot, find_pending_events
+from services.clv_service import generate_clv_report
+from services.rollup_service import get_rollup_series
+from services.settlement_service import StaticResultsSource, run_settlement
+from services.summary_service import get_user_summary, rebuild_user_summary
+
+
+KICKOFF = datetime.utcnow() + timedelta(hours=1)
+
+FINAL = {
+    "event_id": "evt1", "sport": "basketball_nba",
+    "home_team": "Lakers", "away_team": "Celtics",
+    "home_score": 110, "away_score": 104
+}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "bets.db"))
+    set_repository(repository)
+    yield repository
+    set_repository(None)
+    repository.close()
+
+
+def place(user="alice", outcome="Lakers", odds=2.10, stake=100.0, book="DraftKings"):
+    return log_bet(Bet(
+        user=user, matchup="Lakers vs Celtics", sportsbook=book, sport="basketball_nba",
+        event_id="evt1", outcome=outcome, commence_time=KICKOFF, odds=odds, stake=stake
+    ))
+
+
+def snapshot():
+    return {
+        "event_id": "evt1",
+        "sport": "basketball_nba",
+        "captured_at": datetime.utcnow(),
+        "books": {"draftkings": {"title": "DraftKings", "prices": {"Lakers": 2.00, "Celtics": 1.85}}},
+        "consensus": {"Lakers": 2.02, "Celtics": 1.98},
+    }
+
+
+class TestInterface:
+    def test_incomplete_backend_fails_at_construction(self):
+        class Partial(BetRepository):
+            def insert_bet(self, bet):
+                pass
+
+        with pytest.raises(TypeError, match="find_bets"):
+            Partial()
+
+    def test_sqlite_implements_everything(self):
+        assert not SQLiteRepository.__abstractmethods__
+
+
+class TestBets:
+    """Bet storage round trips"""
+
+    def test_log_and_fetch(self, repo):
+        bet = place()
+        stored = fetch_bets("alice")
+        assert [b["id"] for b in stored] == [bet["id"]]
+        assert stored[0]["commence_time"] == KICKOFF
+        assert isinstance(stored[0]["loggedAt"], datetime)
+
+    def test_manual_closing_odds(self, repo):
+        bet = place()
+        updated = update_closing_odds(bet["id"], 2.00)
+        assert updated["clv"] == 0.05
+        assert generate_clv_report("alice")["average_clv"] == 0.05
+
+    def test_unknown_bet(self, repo):
+        assert update_closing_odds("missing", 2.0) is None
+
+
+class TestLifecycle:
+    """log → closing line → settlement, with idempotent replays"""
+
+    def test_closing_line_capture(self, repo):
+        place()
+        place(outcome="Celtics", odds=1.80)
+
+        pending = find_pending_events(datetime.utcnow(), 7200)
+        assert [(e["sport"], e["event_id"]) for e in pending] == [("basketball_nba", "evt1")]
+
+        assert apply_closing_snapshot(snapshot()) == 2
+        assert apply_closing_snapshot(snapshot()) == 0  # replay is a no-op
+        assert find_pending_events(datetime.utcnow(), 7200) == []
+
+        clv = get_user_summary("alice")["totals"]["clv"]
+        assert clv["count"] == 2
+        assert clv["positive"] == 1
+
+    def test_settlement_and_rollups(self, repo):
+        place()
+        place(outcome="Celtics", odds=1.80, book="FanDuel")
+        source = StaticResultsSource([FINAL])
+
+        stats = run_settlement(source)
+        assert stats["settled"] == 2
+        assert stats["rolled_up"] == 2
+
+        replay = run_settlement(source)
+        assert replay["settled"] == 0
+        assert replay["rolled_up"] == 0
+
+        totals = get_user_summary("alice")["totals"]
+        assert totals["results"] == {"win": 1, "lose": 1, "push": 0}
+        assert totals["pnl"]["sum"] == pytest.approx(10.0)
+        assert totals["roi"] == pytest.approx(10.0 / 200.0)
+
+        series = get_rollup_series("alice", period="day")
+        assert len(series["points"]) == 1
+        assert series["points"][0]["realized_pnl"] == pytest.approx(10.0)
+
+        by_book = get_rollup_series("alice", period="month", book="FanDuel")
+        assert by_book["points"][0]["realized_pnl"] == pytest.approx(-100.0)
+
+    def test_rebuild_matches_incremental(self, repo):
+        place()
+        place(user="bob", outcome="Celtics", odds=1.80)
+        apply_closing_snapshot(snapshot())
+        run_settlement(StaticResultsSource([FINAL]))
+
+        incremental = get_user_summary("alice")["totals"]
+        rebuild_user_summary("alice")
+        assert get_user_summary("alice")["totals"] == incremental
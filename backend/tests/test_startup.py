@@ -0,0 +1,95 @@
+"""
+Tests for cold-start behaviour: the app imports without ODDS_API_KEY or a
+database, readiness waits for warm-up, and the startup report is served.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+import time
+
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from services import odds_service
+from utils.startup import StartupTimer, import_times
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    env = {k: v for k, v in os.environ.items() if k != "ODDS_API_KEY"}
+    return subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+class TestColdImport:
+    """Importing the app does no optional or network work"""
+
+    def test_imports_without_api_key_or_heavy_modules(self):
+        result = run_python(
+            "import sys, main; "
+            "print(sorted(m for m in ('pymongo', 'requests', 'tenacity', 'db.mongo') if m in sys.modules))"
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
+    def test_mongo_client_is_lazy(self):
+        result = run_python(
+            "import db.mongo as m; assert m._client is None; "
+            "m.get_bets_collection(); assert m._client is not None; m.close_client(); print('ok')"
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "ok"
+
+    def test_import_report(self):
+        rows = import_times("config.settings")
+        assert any(name == "config.settings" for name, _, _, _ in rows)
+
+
+class TestLifespan:
+    """Readiness flips after warm-up"""
+
+    def test_ready_after_warm_up(self):
+        import main
+
+        with TestClient(main.app) as client:
+            assert client.get("/health").status_code == 200
+            deadline = time.monotonic() + 10
+            while True:
+                response = client.get("/health/ready")
+                if response.status_code == 200 or time.monotonic() > deadline:
+                    break
+                time.sleep(0.02)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert {"import framework", "import app", "warm-up"} <= set(body["startup"]["phases_ms"])
+
+    def test_missing_api_key_is_503(self, monkeypatch):
+        import main
+
+        monkeypatch.setattr(settings, "ODDS_API_KEY", "")
+        calls = []
+        monkeypatch.setattr(odds_service, "_timed_get", lambda *a, **k: calls.append(a))
+
+        response = TestClient(main.app).get("/api/odds/basketball_nba")
+        assert response.status_code == 503
+        assert response.json()["detail"]["message"] == "ODDS_API_KEY is not configured"
+        assert calls == []  # failed fast, no retries
+
+
+class TestStartupTimer:
+    def test_phases_accumulate(self):
+        timer = StartupTimer()
+        with timer.phase("a"):
+            pass
+        with timer.phase("a"):
+            pass
+        timer.mark_ready()
+        report = timer.report()
+        assert report["ready"] is True
+        assert list(report["phases_ms"]) == ["a"]
@@ -0,0 +1,179 @@
+"""
+Tests for MessagePack / Arrow content negotiation.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import ev as ev_route
+from routes import validated_odds as odds_route
+from services.stale_odds import LastGood
+from utils import wire_formats
+from utils.wire_formats import ARROW, JSON, MSGPACK, columns, negotiate
+
+BODY = {
+    "events": [{
+        "id": "e1",
+        "sport_key": "basketball_nba",
+        "sport_title": "NBA",
+        "commence_time": "2025-01-15T20:00:00",
+        "home_team": "Lakers",
+        "away_team": "Celtics",
+        "bookmakers": [
+            {"key": "draftkings", "title": "DraftKings", "last_update": "2025-01-15T17:59:50",
+             "outcomes": [{"name": "Lakers", "price": 1.8}, {"name": "Celtics", "price": 2.1}]},
+        ],
+    }],
+    "retrieved_at": "2025-01-15T18:00:00Z",
+    "source": "the-odds-api-v4",
+    "stale": False,
+}
+
+
+def _ev_bet(**overrides):
+    bet = {
+        "odds": 2.05,
+        "true_probability": 0.52,
+        "cash_stake": 100.0,
+        "odds_timestamp": (datetime.utcnow() - timedelta(seconds=5)).isoformat() + "Z",
+        "odds_source": "the-odds-api-v4",
+    }
+    bet.update(overrides)
+    return bet
+
+
+class TestNegotiate:
+    """Accept header → media type"""
+
+    ALL = (JSON, MSGPACK, ARROW)
+
+    @pytest.mark.parametrize("accept, expected", [
+        (None, JSON),
+        ("application/json", JSON),
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack", MSGPACK),
+        ("application/json;q=0.5, application/vnd.apache.arrow.stream", ARROW),
+        ("text/html,*/*;q=0.8", JSON),
+        ("text/plain", JSON),  # never asked for binary: unchanged behaviour
+    ])
+    def test_choice(self, accept, expected):
+        assert negotiate(accept, self.ALL) == expected
+
+    def test_unavailable_binary_is_not_acceptable(self):
+        assert negotiate("application/vnd.apache.arrow.stream", (JSON, MSGPACK)) is None
+        assert negotiate("application/vnd.apache.arrow.stream, */*;q=0.1", (JSON,)) == JSON
+
+
+class TestColumns:
+    """Rows → Arrow columns"""
+
+    def test_flatten_and_fill(self):
+        data = columns([
+            {"a": 1, "inputs": {"odds": 2.0}, "tags": ["x"]},
+            {"b": "y", "when": "2025-01-15T18:00:00Z"},
+        ], timestamps=("when",))
+        assert data == {
+            "a": [1, None],
+            "inputs.odds": [2.0, None],
+            "tags": ['["x"]', None],
+            "b": [None, "y"],
+            "when": [None, datetime(2025, 1, 15, 18, 0, 0)],
+        }
+
+
+class TestOddsFormats:
+    """GET /api/odds/{sport_key} in each format"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        snapshot = LastGood(BODY, 1_700_000_000.0)
+        monkeypatch.setattr(odds_route, "get_odds_snapshot", lambda sport_key: (snapshot, False, True))
+        odds_route.representations.clear()
+        odds_route.query_representations.clear()
+        app = FastAPI()
+        app.include_router(odds_route.router)
+        yield TestClient(app)
+        odds_route.representations.clear()
+        odds_route.query_representations.clear()
+
+    def test_msgpack(self, client):
+        import msgpack
+        response = client.get("/api/odds/basketball_nba", headers={"Accept": MSGPACK})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK
+        assert msgpack.unpackb(response.content) == json.loads(client.get("/api/odds/basketball_nba").content)
+
+    def test_arrow(self, client):
+        import pyarrow
+        import pyarrow.ipc
+        response = client.get("/api/odds/basketball_nba?books=draftkings", headers={"Accept": ARROW})
+        assert response.status_code == 200
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        assert table.column("price").to_pylist() == [1.8, 2.1]
+        assert table.column("outcome").to_pylist() == ["Lakers", "Celtics"]
+        assert table.schema.field("commence_time").type == pyarrow.timestamp("us")
+        assert json.loads(table.schema.metadata[b"envelope"])["total_events"] == 1
+
+    def test_etag_per_format(self, client):
+        json_tag = client.get("/api/odds/basketball_nba").headers["etag"]
+        packed = client.get("/api/odds/basketball_nba", headers={"Accept": MSGPACK})
+        assert packed.headers["etag"] != json_tag and "Accept" in packed.headers["vary"]
+        # A JSON ETag does not validate a cached MessagePack body
+        assert client.get("/api/odds/basketball_nba", headers={"Accept": MSGPACK, "If-None-Match": json_tag}).status_code == 200
+        assert client.get("/api/odds/basketball_nba", headers={"Accept": MSGPACK, "If-None-Match": packed.headers["etag"]}).status_code == 304
+
+    def test_encoded_once_per_version(self, client, monkeypatch):
+        calls = []
+        real = wire_formats.to_msgpack
+        monkeypatch.setattr(wire_formats, "to_msgpack", lambda data: calls.append(1) or real(data))
+        for _ in range(3):
+            client.get("/api/odds/basketball_nba", headers={"Accept": MSGPACK})
+        assert len(calls) == 1
+
+    def test_406_without_table(self, client):
+        """/sports/available has no rows to put in an Arrow table"""
+        response = client.get("/api/odds/sports/available", headers={"Accept": ARROW})
+        assert response.status_code == 406
+        assert response.json()["available"] == [JSON, MSGPACK]
+
+
+class TestBatchEV:
+    """POST /api/ev/calculate/batch"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(ev_route.router)
+        return TestClient(app)
+
+    def test_partial_failures(self, client):
+        stale = (datetime.utcnow() - timedelta(minutes=5)).isoformat() + "Z"
+        response = client.post("/api/ev/calculate/batch", json={"bets": [
+            _ev_bet(), _ev_bet(odds_timestamp=stale), _ev_bet(odds_timestamp="yesterday")
+        ]})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["calculated"] == 1 and body["failed"] == 2
+        assert body["results"][0]["index"] == 0 and body["results"][0]["ev_cash"] == 6.6
+        assert [(e["index"], e["status_code"]) for e in body["errors"]] == [(1, 422), (2, 422)]
+
+    def test_batch_limit(self, client):
+        bets = [_ev_bet()] * (ev_route.MAX_BATCH_SIZE + 1)
+        assert client.post("/api/ev/calculate/batch", json={"bets": bets}).status_code == 422
+
+    def test_arrow_rows(self, client):
+        import pyarrow
+        import pyarrow.ipc
+        response = client.post("/api/ev/calculate/batch", json={"bets": [_ev_bet(), _ev_bet(odds=1.9)]},
+                               headers={"Accept": ARROW})
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        assert table.column("index").to_pylist() == [0, 1]
+        assert table.column("inputs.odds").to_pylist() == [2.05, 1.9]
@@ -0,0 +1,181 @@
+"""
+Conditional GET and cached compression for versioned response bodies.
+
+A Representation is one version of a body (an odds snapshot, the sports
+catalog) plus its compressed variants, built at most once per version:
+compression runs when a snapshot is refreshed, not on every poll.
+
+cached_response() then answers a request from it:
+- If-None-Match matching the version's ETag → 304 with no body
+- Accept-Encoding br (preferred) or gzip and a body of at least
+  MIN_COMPRESS_BYTES → the cached compressed bytes
+- otherwise the identity bytes
+
+Each encoding gets its own strong ETag ("<tag>", "<tag>-gzip", "<tag>-br");
+If-None-Match accepts any of them, since they all decode to the same body.
+
+The body may also be sent as MessagePack or Arrow when the Accept header
+asks for it (utils.wire_formats). Those variants are encoded from the JSON
+once per version as well, and tagged per format ("<tag>-msgpack-gzip").
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import brotli
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from utils.wire_formats import JSON, SUFFIXES, TableBuilder, encode, negotiate, not_acceptable, offered_formats
+
+# Smaller bodies are sent uncompressed (not worth the CPU or the header bytes)
+MIN_COMPRESS_BYTES = 1024
+
+# Polling clients must revalidate every time; 304s make that cheap
+CACHE_CONTROL = "no-cache"
+
+
+def encode_body(body) -> bytes:
+    """Same bytes FastAPI's JSONResponse would send for this body."""
+    return json.dumps(
+        jsonable_encoder(body), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def content_tag(payload: bytes) -> str:
+    """Version tag derived from content (bodies without a snapshot version)."""
+    return hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+
+class Representation:
+    __slots__ = ("tag", "body", "_variants", "_encoded", "_lock")
+
+    def __init__(self, tag: str, body: bytes):
+        self.tag = tag
+        self.body = body  # JSON
+        self._variants: Dict[str, bytes] = {}
+        self._encoded: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding: Optional[str] = None, media_type: str = JSON) -> str:
+        parts = [part for part in (self.tag, SUFFIXES[media_type], encoding) if part]
+        return '"' + "-".join(parts) + '"'
+
+    def matches(self, if_none_match: str, media_type: str = JSON) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {self.etag(encoding, media_type) for encoding in (None, "gzip", "br")}
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate in tags:
+                return True
+        return False
+
+    def variant(self, media_type: str, table: Optional[TableBuilder] = None) -> bytes:
+        """The body in another wire format, encoded on first use."""
+        if media_type == JSON:
+            return self.body
+        data = self._variants.get(media_type)
+        if data is None:
+            with self._lock:
+                data = self._variants.get(media_type)
+                if data is None:
+                    data = encode(json.loads(self.body), media_type, table)
+                    self._variants[media_type] = data
+        return data
+
+    def encoded(self, encoding: str, media_type: str = JSON) -> bytes:
+        data = self._encoded.get((media_type, encoding))
+        if data is None:
+            body = self.variant(media_type)
+            with self._lock:
+                data = self._encoded.get((media_type, encoding))
+                if data is None:
+                    if encoding == "br":
+                        data = brotli.compress(body, quality=5)
+                    else:
+                        data = gzip.compress(body, compresslevel=6, mtime=0)
+                    self._encoded[(media_type, encoding)] = data
+        return data
+
+
+class RepresentationCache:
+    """
+    Latest Representation per key; a new version replaces the old one.
+
+    With max_items set, the least recently used keys are evicted beyond it
+    (keys that come from client input, e.g. one per query string).
+    """
+
+    def __init__(self, max_items: Optional[int] = None):
+        self._items: "OrderedDict[str, Representation]" = OrderedDict()
+        self._max_items = max_items
+
+    def get(self, key: str, tag: str, build: Callable[[], bytes]) -> Representation:
+        current = self._items.get(key)
+        if current is None or current.tag != tag:
+            current = Representation(tag, build())
+            self._items[key] = current
+        if self._max_items is not None:
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+        return current
+
+    def clear(self):
+        self._items.clear()
+
+
+def _accepted(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, size: int) -> Optional[str]:
+    if size < MIN_COMPRESS_BYTES or not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def cached_response(request: Request, representation: Representation,
+                    table: Optional[TableBuilder] = None) -> Response:
+    """
+    Answer from a Representation: 304, or the body in the negotiated format
+    and encoding. table turns the decoded JSON into Arrow columns; without
+    it only JSON and MessagePack are offered.
+    """
+    offered = offered_formats(table)
+    media_type = negotiate(request.headers.get("accept"), offered)
+    if media_type is None:
+        return not_acceptable(offered)
+    body = representation.variant(media_type, table)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(body))
+    headers = {
+        "ETag": representation.etag(encoding, media_type),
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and representation.matches(if_none_match, media_type):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(body, media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(representation.encoded(encoding, media_type), media_type=media_type, headers=headers)
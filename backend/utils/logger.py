@@ -1,11 +1,127 @@
+import atexit
+import json
 import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
 from fastapi import Request
 
+from utils.metrics import CACHE_REQUESTS, HTTP_REQUEST_DURATION
+
 logger = logging.getLogger("ironman")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# Access log: one JSON line per request, written by a background thread.
+# The request path only puts the record on a queue; formatting and I/O
+# happen in the QueueListener thread, off the event loop.
+access_logger = logging.getLogger("ironman.access")
+access_logger.propagate = False
+
+# Log this fraction of fast, successful requests (errors and slow requests are always logged)
+ACCESS_LOG_SAMPLE_RATE = 1.0
+
+# Requests slower than this are always logged
+SLOW_REQUEST_MS = 1000.0
+
+
+class RequestStats:
+    """Per-request timings that services fill in while handling a request."""
+
+    __slots__ = ("upstream_ms", "upstream_calls", "cache")
+
+    def __init__(self):
+        self.upstream_ms = 0.0
+        self.upstream_calls = 0
+        self.cache: Optional[str] = None  # "hit" / "miss" / None (no cache involved)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_upstream(seconds: float):
+    """Add one upstream (Odds API) call to the current request's stats."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.upstream_ms += seconds * 1000
+        stats.upstream_calls += 1
+
+
+def record_cache(hit: bool):
+    """Mark the current request as served from cache (hit) or not (miss)."""
+    result = "hit" if hit else "miss"
+    CACHE_REQUESTS.labels(result).inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.cache = result
+
+
+class AccessLogFormatter(logging.Formatter):
+    def format(self, record):
+        fields = {"ts": round(record.created, 3), **getattr(record, "access", {})}
+        return json.dumps(fields, separators=(",", ":"))
+
+
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(AccessLogFormatter())
+_listener = QueueListener(_queue, _handler, respect_handler_level=False)
+access_logger.addHandler(QueueHandler(_queue))
+access_logger.setLevel(logging.INFO)
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def configure_access_log(sample_rate: Optional[float] = None, slow_request_ms: Optional[float] = None):
+    """Override sampling (e.g. from settings at startup)."""
+    global ACCESS_LOG_SAMPLE_RATE, SLOW_REQUEST_MS
+    if sample_rate is not None:
+        ACCESS_LOG_SAMPLE_RATE = max(0.0, min(1.0, sample_rate))
+    if slow_request_ms is not None:
+        SLOW_REQUEST_MS = slow_request_ms
+
+
+def should_log(status: int, latency_ms: float) -> bool:
+    if status >= 400 or latency_ms >= SLOW_REQUEST_MS:
+        return True
+    return ACCESS_LOG_SAMPLE_RATE >= 1.0 or random.random() < ACCESS_LOG_SAMPLE_RATE
+
+
+def route_template(request: Request) -> str:
+    """Route path template ("/api/odds/{sport_key}"), not the concrete URL."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
 async def log_requests(request: Request, call_next):
-    logger.info(f">>> {request.method} {request.url}")
-    response = await call_next(request)
-    logger.info(f"<<< {response.status_code} {request.method} {request.url}")
-    return response
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    start = time.perf_counter()
+    status = 500
+    size = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        size = response.headers.get("content-length")
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        latency_ms = elapsed * 1000
+        _request_stats.reset(token)
+        route = route_template(request)
+        HTTP_REQUEST_DURATION.labels(request.method, route, status).observe(elapsed)
+        if should_log(status, latency_ms):
+            access_logger.info("access", extra={"access": {
+                "method": request.method,
+                "route": route,
+                "status": status,
+                "latency_ms": round(latency_ms, 2),
+                "upstream_ms": round(stats.upstream_ms, 2),
+                "upstream_calls": stats.upstream_calls,
+                "cache": stats.cache,
+                "size": int(size) if size is not None else None,
+            }})
@@ -0,0 +1,291 @@
+"""
+In-process metrics registry (Prometheus text exposition format).
+
+Deliberately tiny and cheap enough to leave on in production:
+- label values are resolved to a child once (dict lookup on a tuple);
+- a counter increment or histogram observation is a bisect plus a couple of
+  additions under a per-metric lock;
+- nothing is formatted until /metrics is scraped.
+
+Usage:
+    REQUESTS = counter("http_requests_total", "Requests served", ("route",))
+    REQUESTS.labels("/health").inc()
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds (5 ms → 10 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_label_str(self.label_names, key)} {_num(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, label_names=(), function: Optional[Callable[[], Dict[tuple, float]]] = None):
+        super().__init__(name, help_text, label_names)
+        # Optional callback evaluated at scrape time: {label values tuple: value}
+        self._function = function
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self):
+        values = {key: child.value for key, child in list(self._children.items())}
+        if self._function is not None:
+            values.update(self._function())
+        for key, value in values.items():
+            yield f"{self.name}{_label_str(self.label_names, key)} {_num(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_num(bound)}"'
+                yield f"{self.name}_bucket{_label_str(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.label_names, key)} {_num(total)}"
+            yield f"{self.name}_count{_label_str(self.label_names, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, label_names))
+
+
+def gauge(name: str, help_text: str, label_names: Tuple[str, ...] = (), function=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, label_names, function=function))
+
+
+def histogram(name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, label_names, buckets=buckets))
+
+
+# --- Application metrics ---
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ("method", "route", "status")
+)
+ODDS_API_DURATION = histogram(
+    "odds_api_request_duration_seconds", "Odds API call latency",
+    ("endpoint", "status")
+)
+ODDS_API_REQUESTS_REMAINING = gauge(
+    "odds_api_requests_remaining", "Odds API quota remaining (last response header)"
+)
+VALIDATION_DURATION = histogram(
+    "odds_validation_duration_seconds", "validate_odds_response duration",
+    ("sport",), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+VALIDATION_DROPPED = counter(
+    "odds_validation_dropped_total", "Items dropped by each validate_odds_response filter",
+    ("level", "reason")
+)
+CACHE_REQUESTS = counter(
+    "odds_cache_requests_total", "Odds cache lookups", ("result",)
+)
+LINE_HISTORY_TICKS = counter(
+    "line_history_ticks_total", "Price changes appended to the line history", ("sport",)
+)
+LINE_MOVES = counter(
+    "line_moves_total", "Line moves and steam detected", ("sport", "kind")
+)
+ALERTS = counter(
+    "alerts_total", "EV alerts triggered", ("sport",)
+)
+ALERT_WEBHOOK_FAILURES = counter(
+    "alert_webhook_failures_total", "Alerts not delivered to the webhook", ("reason",)
+)
+RATE_LIMITED = counter(
+    "http_rate_limited_total", "Requests rejected with 429 by the rate limiter", ("group", "reason")
+)
+
+# sport → unix time of the last validated snapshot
+_snapshot_times: Dict[str, float] = {}
+
+
+def record_snapshot(sport: str, retrieved_at: Optional[float] = None):
+    _snapshot_times[sport] = retrieved_at if retrieved_at is not None else time.time()
+
+
+def _snapshot_ages() -> Dict[tuple, float]:
+    now = time.time()
+    return {(sport, ): round(now - ts, 3) for sport, ts in list(_snapshot_times.items())}
+
+
+def _cache_hit_ratio() -> Dict[tuple, float]:
+    hits = CACHE_REQUESTS.labels("hit").value
+    misses = CACHE_REQUESTS.labels("miss").value
+    total = hits + misses
+    return {(): round(hits / total, 4) if total else 0.0}
+
+
+SNAPSHOT_AGE = gauge(
+    "odds_snapshot_age_seconds", "Age of the latest validated odds per sport",
+    ("sport",), function=_snapshot_ages
+)
+CACHE_HIT_RATIO = gauge(
+    "odds_cache_hit_ratio", "Share of odds cache lookups served from cache",
+    function=_cache_hit_ratio
+)
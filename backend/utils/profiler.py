@@ -0,0 +1,218 @@
+"""
+On-demand per-request profiling.
+
+A request is profiled when it carries the admin header
+(X-Profile: <PROFILE_ADMIN_TOKEN>) or is picked by PROFILE_SAMPLE_RATE.
+The middleware is only installed when PROFILING_ENABLED is set, so there is
+no per-request cost at all when profiling is off.
+
+Sampling profiler, not cProfile: our route handlers are sync and run in the
+threadpool, while cProfile only sees the thread that enabled it. A sampler
+thread walks sys._current_frames() every PROFILE_INTERVAL seconds and counts
+collapsed stacks ("module:function;module:function;..."), which is what
+flamegraph.pl and speedscope read. Idle threads (parked in a wait/select) are
+skipped; other busy threads during the request are included and labelled by
+thread name.
+
+Profiles are JSON files in PROFILE_DIR, a ring buffer of the newest
+PROFILE_KEEP. Only one request is profiled at a time.
+"""
+
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import Request
+
+from utils.logger import logger, route_template
+
+PROFILE_HEADER = "x-profile"
+
+# Seconds between stack samples
+PROFILE_INTERVAL = 0.005
+
+# Deepest stack recorded per sample (innermost frames kept)
+MAX_STACK_DEPTH = 128
+
+# Profile ids are generated here and checked on download (no path tricks)
+PROFILE_ID_PATTERN = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+# Leaf frames that mean "this thread is parked", e.g. idle threadpool workers
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("threading.py", "_wait_for_tstate_lock"),
+}
+
+_busy = threading.Lock()
+
+
+class ProfileNotFoundError(Exception):
+    """Unknown or malformed profile id"""
+    pass
+
+
+class StackSampler(threading.Thread):
+    """Background thread counting collapsed stacks of all busy threads."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            key = collapse(frame)
+            if key is None:
+                continue
+            self.stacks[f"{names.get(thread_id, thread_id)};{key}"] += 1
+        self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def collapse(frame) -> Optional[str]:
+    """Frame chain → "outer;...;inner", or None if the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return None
+    parts: List[str] = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+        parts.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of profiles."""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = directory
+        self.keep = max(1, keep)
+
+    def _path(self, profile_id: str) -> str:
+        if not PROFILE_ID_PATTERN.match(profile_id or ""):
+            raise ProfileNotFoundError(profile_id)
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [n[:-5] for n in names if n.endswith(".json") and PROFILE_ID_PATTERN.match(n[:-5])]
+        return sorted(ids)  # ids start with a millisecond timestamp
+
+    def save(self, profile: dict) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        profile = {"id": profile_id, **profile}
+        path = self._path(profile_id)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(profile, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+        for old in self._ids()[:-self.keep]:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+        return profile_id
+
+    def load(self, profile_id: str) -> dict:
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ProfileNotFoundError(profile_id)
+
+    def list(self) -> List[dict]:
+        """Newest first, without the stack data."""
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                profile = self.load(profile_id)
+            except (ProfileNotFoundError, ValueError):
+                continue  # rotated out or half-written
+            profile.pop("stacks", None)
+            entries.append(profile)
+        return entries
+
+
+def folded(profile: dict) -> str:
+    """Collapsed-stack text ("stack count" per line) for flamegraph tools."""
+    stacks: Dict[str, int] = profile.get("stacks", {})
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+class RequestProfiler:
+    """HTTP middleware; install with app.middleware("http")(profiler)."""
+
+    def __init__(self, store: ProfileStore, admin_token: str = "", sample_rate: float = 0.0,
+                 interval: float = PROFILE_INTERVAL):
+        self.store = store
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def wants_profile(self, request: Request) -> bool:
+        header = request.headers.get(PROFILE_HEADER)
+        if self.admin_token and header and secrets.compare_digest(header.encode(), self.admin_token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, request: Request, call_next):
+        if not self.wants_profile(request) or not _busy.acquire(blocking=False):
+            return await call_next(request)
+
+        sampler = StackSampler(self.interval)
+        status = 500
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop()
+            _busy.release()
+            try:
+                profile_id = self.store.save({
+                    "method": request.method,
+                    "path": request.url.path,
+                    "route": route_template(request),
+                    "status": status,
+                    "started_at": round(time.time() - duration, 3),
+                    "duration_ms": round(duration * 1000, 2),
+                    "interval_ms": self.interval * 1000,
+                    "samples": sampler.samples,
+                    "stacks": dict(sampler.stacks),
+                })
+                logger.info(f"Profiled {request.method} {request.url.path} → {profile_id}")
+            except OSError as e:
+                logger.warning(f"Could not save profile: {e}")
@@ -0,0 +1,160 @@
+"""
+Per-client rate limiting and admission control.
+
+Two checks run before a request reaches a route, and both reject at once
+with 429 + Retry-After:
+
+1. Token bucket per (route group, client). Groups are picked by path prefix
+   (odds / ev / bets) and each has its own rate and burst, so a client
+   polling odds in a tight loop cannot spend the EV budget, and the other
+   way round. Health, metrics and docs are never limited.
+2. Concurrency caps: a global limit on in-flight requests for this worker,
+   plus a per-group limit (odds requests hold a threadpool thread for the
+   whole upstream call).
+
+Every request is charged to its client IP's bucket. A "user-id" header
+(the header the old backend_raw_copy middleware used) is client-supplied
+and unauthenticated, so it is never trusted as the identity: its bucket is
+only an extra limit on top of the IP's, catching one user spread over
+several addresses. Sending a new header value per request gains nothing.
+
+State lives in memory per worker: one [tokens, last_refill] pair per
+bucket in an LRU dict capped at MAX_BUCKETS, so every update is O(1).
+The middleware runs on the event loop thread, so no locking is needed.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from utils.metrics import RATE_LIMITED
+
+USER_ID_HEADER = "user-id"
+
+# Buckets kept in memory; the least recently used are dropped first
+# (a dropped bucket simply starts full again)
+MAX_BUCKETS = 100_000
+
+# Path prefix → route group
+ROUTE_GROUPS = (
+    ("/api/odds", "odds"),
+    ("/api/ev", "ev"),
+    ("/api/bets", "bets"),
+    ("/api/clv", "bets"),
+)
+
+
+class Budget(NamedTuple):
+    per_minute: float
+    burst: int
+    max_concurrent: int = 0  # 0 = no per-group cap
+
+
+def route_group(path: str) -> Optional[str]:
+    for prefix, group in ROUTE_GROUPS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return group
+    return None
+
+
+def client_ip(request: Request, proxy_hops: int = 0) -> str:
+    if proxy_hops > 0:
+        # Behind N trusted proxies the client is the Nth entry from the right
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= proxy_hops:
+            return "ip:" + forwarded[-proxy_hops]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def client_keys(request: Request, proxy_hops: int = 0) -> Tuple[str, ...]:
+    """Buckets a request is charged to: always its IP, plus its user-id header's as an extra limit."""
+    user_id = request.headers.get(USER_ID_HEADER)
+    ip = client_ip(request, proxy_hops)
+    return (ip, "user:" + user_id[:128]) if user_id else (ip,)
+
+
+class TokenBuckets:
+    """Token buckets keyed by (group, client) with LRU eviction."""
+
+    def __init__(self, budgets: Dict[str, Budget], max_buckets: int = MAX_BUCKETS):
+        self.budgets = budgets
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+
+    def take(self, group: str, client: str, now: Optional[float] = None) -> float:
+        """0.0 if allowed, else seconds until a token is available."""
+        budget = self.budgets[group]
+        rate = budget.per_minute / 60.0
+        now = time.monotonic() if now is None else now
+        key = (group, client)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(budget.burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(budget.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / rate if rate > 0 else 60.0
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def too_many_requests(message: str, retry_after: float) -> JSONResponse:
+    seconds = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        status_code=429,
+        content={"ok": False, "error": {"type": "RateLimited", "message": message, "retry_after": seconds}},
+        headers={"Retry-After": str(seconds)}
+    )
+
+
+class RateLimiter:
+    """HTTP middleware; install with app.middleware("http")(limiter)."""
+
+    def __init__(self, budgets: Dict[str, Budget], max_concurrent: int = 0, proxy_hops: int = 0):
+        self.buckets = TokenBuckets(budgets)
+        self.budgets = budgets
+        self.max_concurrent = max_concurrent
+        self.proxy_hops = proxy_hops
+        self.in_flight = 0
+        self.in_flight_by_group: Dict[str, int] = {group: 0 for group in budgets}
+
+    async def __call__(self, request: Request, call_next):
+        group = route_group(request.url.path)
+        if group is None or group not in self.budgets or request.method == "OPTIONS":
+            return await call_next(request)
+
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            RATE_LIMITED.labels(group, "global_concurrency").inc()
+            return too_many_requests("Server busy, retry shortly", 1)
+        group_cap = self.budgets[group].max_concurrent
+        if group_cap and self.in_flight_by_group[group] >= group_cap:
+            RATE_LIMITED.labels(group, "group_concurrency").inc()
+            return too_many_requests(f"Too many concurrent {group} requests, retry shortly", 1)
+
+        for client in client_keys(request, self.proxy_hops):
+            wait = self.buckets.take(group, client)
+            if wait > 0:
+                RATE_LIMITED.labels(group, "rate").inc()
+                return too_many_requests(f"Rate limit exceeded for {group} requests", wait)
+
+        self.in_flight += 1
+        self.in_flight_by_group[group] += 1
+        try:
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
+            self.in_flight_by_group[group] -= 1
@@ -0,0 +1,120 @@
+"""
+Startup timing.
+
+main.py wraps its import and warm-up phases in startup.phase(...); the
+lifespan logs the resulting report once warm-up finishes, and
+/health/ready serves it. Readiness flips only after warm-up, so the
+platform health check does not route users to a cold process.
+
+For a per-module breakdown of import time, run from backend/:
+    python -m utils.startup            # top packages and modules by import time
+    python -m utils.startup --top 40
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux /proc), else None."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / _CLOCK_TICKS  # field 22: starttime
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.ready_after: Optional[float] = None  # seconds since process start
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after = process_age()
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "ready_after_ms": round(self.ready_after * 1000) if self.ready_after is not None else None,
+        }
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.report()["phases_ms"].items())
+        since = f" ({self.ready_after * 1000:.0f} ms after process start)" if self.ready_after else ""
+        return f"Startup: {phases}; ready{since}"
+
+
+startup = StartupTimer()
+
+
+# --- python -X importtime breakdown ---
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(module: str = "main") -> List[Tuple[str, int, int, int]]:
+    """[(module, self µs, cumulative µs, depth)] from a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def import_report(module: str = "main", top: int = 20) -> str:
+    rows = import_times(module)
+    total = next((cumulative for name, _, cumulative, _ in rows if name == module), 0)
+
+    by_package: Dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    lines = [f"import {module}: {total / 1000:.1f} ms total", "", "by top-level package (self time):"]
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {us / 1000:8.1f} ms  {package}")
+    lines += ["", "slowest modules (cumulative, first-level imports of app code):"]
+    app_modules = [r for r in rows if r[3] <= 1 or r[0].split(".")[0] in
+                   ("main", "routes", "services", "utils", "config", "db", "models")]
+    for name, _, cumulative, _ in sorted(app_modules, key=lambda r: -r[2])[:top]:
+        lines.append(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Where does startup import time go?")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    print(import_report(args.module, args.top))
@@ -0,0 +1,189 @@
+"""
+Binary wire formats negotiated from the Accept header.
+
+JSON stays the default. Clients that decode large bodies (quant notebooks
+pulling whole boards or bet histories) can ask for:
+
+    application/msgpack                  the same document as the JSON,
+                                         MessagePack encoded
+    application/vnd.apache.arrow.stream  the endpoint's rows as one Arrow
+                                         IPC stream with typed columns; the
+                                         rest of the document is JSON in the
+                                         schema metadata under "envelope"
+
+Both encoders are requirements (msgpack, pyarrow); pyarrow is imported on
+the first Arrow response, as it adds ~130 ms to cold start. Arrow needs a
+table builder, so a request whose Accept header names only binary formats
+an endpoint cannot produce gets 406 with the formats it can; any other
+Accept header that matches nothing gets JSON, as before.
+
+Versioned bodies are encoded once per version (see utils.http_cache); the
+helpers here are also used directly for per-request bodies.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+import msgpack
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+# Short names used in ETags
+SUFFIXES = {JSON: "", MSGPACK: "msgpack", ARROW: "arrow"}
+
+# (columns, envelope) for the Arrow form of a JSON-ready body
+TableBuilder = Callable[[Any], Tuple[Dict[str, list], dict]]
+
+
+def offered_formats(table: Optional[TableBuilder] = None) -> List[str]:
+    """Formats an endpoint can produce for a body (Arrow needs a table builder)."""
+    return [JSON, MSGPACK, ARROW] if table is not None else [JSON, MSGPACK]
+
+
+def _accepted(accept: str) -> List[Tuple[float, int, str]]:
+    """(q, position, media type) for each acceptable entry."""
+    entries = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = (piece.strip() for piece in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type and quality > 0:
+            entries.append((quality, position, ALIASES.get(media_type, media_type)))
+    return entries
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    Best offered media type for an Accept header.
+
+    None (→ 406) only when the client asked solely for binary formats that
+    are not offered; anything else unmatched falls back to JSON.
+    """
+    if not accept:
+        return JSON
+    entries = sorted(_accepted(accept), key=lambda entry: (-entry[0], entry[1]))
+    for _, _, media_type in entries:
+        if media_type in offered:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    if any(media_type in (MSGPACK, ARROW) for _, _, media_type in entries):
+        return None
+    return JSON
+
+
+def not_acceptable(offered: Sequence[str]) -> Response:
+    return JSONResponse(
+        status_code=406,
+        content={
+            "error": "Not acceptable",
+            "message": "Requested format is not available on this server",
+            "available": list(offered)
+        }
+    )
+
+
+def to_msgpack(data) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def to_arrow(columns: Dict[str, list], envelope: dict) -> bytes:
+    import pyarrow
+    import pyarrow.ipc
+    arrays = {}
+    for name, values in columns.items():
+        array = pyarrow.array(values)
+        # Team, book and outcome names repeat on every row: send each once
+        arrays[name] = array.dictionary_encode() if pyarrow.types.is_string(array.type) else array
+    table = pyarrow.Table.from_pydict(arrays, metadata={"envelope": json.dumps(envelope)})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(data, media_type: str, table: Optional[TableBuilder] = None) -> bytes:
+    """Encode a JSON-ready body (jsonable_encoder output) as media_type."""
+    if media_type == MSGPACK:
+        return to_msgpack(data)
+    if media_type == ARROW:
+        return to_arrow(*table(data))
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def negotiated_response(request: Request, body, table: Optional[TableBuilder] = None,
+                        status_code: int = 200) -> Response:
+    """Response for a per-request body in whichever format the client accepts."""
+    offered = offered_formats(table)
+    media_type = negotiate(request.headers.get("accept"), offered)
+    if media_type is None:
+        return not_acceptable(offered)
+    data = jsonable_encoder(body)
+    if media_type == JSON:
+        return JSONResponse(status_code=status_code, content=data, headers={"Vary": "Accept"})
+    return Response(encode(data, media_type, table), status_code=status_code, media_type=media_type,
+                    headers={"Vary": "Accept"})
+
+
+def _parse_timestamp(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def columns(rows: Iterable[dict], timestamps: Sequence[str] = ()) -> Dict[str, list]:
+    """
+    Row dicts → column lists for Arrow.
+
+    Columns appear in first-seen order and missing values are None. Nested
+    dicts are flattened one level ("inputs.odds"), lists become JSON text,
+    and the named timestamp columns are parsed from ISO strings (naive UTC).
+    """
+    data: Dict[str, list] = {}
+    count = 0
+    for row in rows:
+        flat = {}
+        for key, value in row.items():
+            if isinstance(value, dict):
+                for inner, inner_value in value.items():
+                    flat[f"{key}.{inner}"] = inner_value
+            else:
+                flat[key] = json.dumps(value) if isinstance(value, list) else value
+        for key, value in flat.items():
+            column = data.get(key)
+            if column is None:
+                column = data[key] = [None] * count
+            column.append(value)
+        count += 1
+        for column in data.values():
+            if len(column) < count:
+                column.append(None)
+    for key in timestamps:
+        if key in data:
+            data[key] = [_parse_timestamp(value) for value in data[key]]
+    return data